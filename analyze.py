@@ -10,10 +10,21 @@ default, just the "best" model from the optimization history will be evaluated.
 to also evaluate the best performing models for each objective defined in the config-file-path .yaml file.
 Alternatively, the -k of --model-key argument can be used to specify a list of models, with accepted keys being either
 "best" or the name of a specialist. Additional models can also be specified via the -i or --model-id argument, which
-refer to the unique integer ids associated with each model stored in the storage-file-path .hdf5 file.
+refer to the unique integer ids associated with each model stored in the storage-file-path .hdf5 file. Storage files
+written by another storage backend (see nested.storage) are read by the backend selected by their extension, or by the
+--storage-backend argument.
 
 If the export argument is provided, during model evaluation, data is exported to an .hdf5 file, organized by model
-labels.
+labels. By default, each worker exports to its own temp output file, and these are merged by the master process. With
+--export-mode=parallel, all workers write their exported data collectively into a single .hdf5 file with the parallel
+HDF5 (mpio) driver, which requires h5py built with MPI support. With --export-mode=link, no data is copied;
+the temp output files are kept, and the export file only contains external links to their datasets. The linked data
+can be copied into the export file later with nested.optimize_utils.consolidate_hdf5_export_file. With
+--export-mode=tree, the workers merge the temp output files pairwise in parallel. With --export-mode=aggregate, workers
+stream their temp output files in bounded chunks to --export-aggregators workers, which each write one file. In parallel
+and aggregate modes, temp output files can be staged on node-local storage with --export-temp-dir, so that exported data
+is only written once to the shared filesystem; by default, they are written to --output-dir. Both modes require MPI,
+and otherwise fall back to merge mode.
 
 To run, put the directory containing the nested repository into $PYTHONPATH.
 From the directory that contains the custom scripts required for model evaluation, execute nested.analyze as a module
@@ -48,31 +59,50 @@ context = Context()
 @click.option("--config-file-path", type=click.Path(exists=True, file_okay=True, dir_okay=False), default=None)
 @click.option("--sobol", is_flag=True)
 @click.option("--storage-file-path", type=str, default=None)
+@click.option("--storage-backend", type=click.Choice(['hdf5', 'sqlite', 'memory']), default=None)
 @click.option("--param-file-path", type=str, default=None)
 @click.option("-k", "--model-key", type=str, multiple=True)
 @click.option("-i", "--model-id", type=int, multiple=True)
 @click.option("--export", is_flag=True)
 @click.option("--output-dir", type=click.Path(exists=True, file_okay=False, dir_okay=True), default='data')
 @click.option("--export-file-path", type=str, default=None)
+@click.option("--export-compression", type=click.Choice(['source', 'gzip', 'lzf', 'none']), default='source')
+@click.option("--export-compression-level", type=int, default=None)
+@click.option("--export-mode", type=click.Choice(['merge', 'parallel', 'link', 'tree', 'aggregate']),
+              default='merge')
+@click.option("--export-aggregators", type=int, default=1)
+@click.option("--export-temp-dir", type=click.Path(exists=True, file_okay=False, dir_okay=True), default=None,
+              help='node-local directory (e.g. /dev/shm) to stage temp output files in parallel and aggregate export '
+                   'modes; default is --output-dir')
 @click.option("--label", type=str, default=None)
 @click.option("--disp", is_flag=True)
 @click.option("--check-config", is_flag=True)
 @click.option("--interactive", is_flag=True)
 @click.option("--plot", is_flag=True)
 @click.pass_context
-def main(cli, config_file_path, sobol, storage_file_path, param_file_path, model_key, model_id, export,
-         output_dir, export_file_path, label, disp, check_config, interactive, plot):
+def main(cli, config_file_path, sobol, storage_file_path, storage_backend, param_file_path, model_key, model_id, export,
+         output_dir, export_file_path, export_compression, export_compression_level, export_mode, export_aggregators,
+         export_temp_dir, label, disp, check_config, interactive, plot):
     """
     :param cli: :class:'click.Context': used to process/pass through unknown click arguments
     :param config_file_path: str (path)
     :param sobol: bool
     :param storage_file_path: str (path)
+    :param storage_backend: str; default is determined by the extension of storage_file_path
     :param param_file_path: str (path)
     :param model_key: list of str
     :param model_id: list of int
     :param export: bool
     :param output_dir: str
     :param export_file_path: str
+    :param export_compression: str; 'source': keep the compression of data exported by each worker
+    :param export_compression_level: int; only for gzip compression
+    :param export_mode: str; 'merge': merge worker temp output files on the master process; 'parallel': workers write
+        collectively into one file; 'link': link the datasets of worker temp output files into one file; 'tree':
+        workers merge temp output files pairwise in parallel; 'aggregate': workers send exported data to aggregators
+    :param export_aggregators: int; number of workers that write exported data in aggregate mode
+    :param export_temp_dir: str (dir path); node-local directory for temp output files in parallel and aggregate
+        modes; default is output_dir
     :param label: str
     :param disp: bool
     :param check_config: bool
@@ -92,7 +122,8 @@ def main(cli, config_file_path, sobol, storage_file_path, param_file_path, model
                                 context.default_params, context.feature_names, context.objective_names, context.target_val,
                                 context.target_range, context.output_dir, context.disp,
                                 optimization_title=context.optimization_title, label=context.label, plot=context.plot,
-                                export_file_path=context.export_file_path, **context.kwargs)
+                                export_file_path=context.export_file_path, export_mode=context.export_mode,
+                                export_temp_dir=context.export_temp_dir, **context.kwargs)
 
         for config_synchronize_func in context.config_synchronize_funcs:
             context.interface.synchronize(config_synchronize_func)
@@ -108,7 +139,7 @@ def main(cli, config_file_path, sobol, storage_file_path, param_file_path, model
                 raise RuntimeError("Please specify storage-file-path.")
             print("Sobol: performing sensitivity analysis...")
             sys.stdout.flush()
-            storage = PopulationStorage(file_path=storage_file_path)
+            storage = PopulationStorage(file_path=storage_file_path, lazy=True, backend=storage_backend)
             sobol_analysis(config_file_path, storage)
         else:
             if len(context.model_id) < 1 and len(context.model_key) < 1:
@@ -121,7 +152,8 @@ def main(cli, config_file_path, sobol, storage_file_path, param_file_path, model
                     get_model_group(context.param_names, context.objective_names,
                                     param_file_path=context.param_file_path,
                                     storage_file_path=context.storage_file_path, model_id=context.model_id,
-                                    model_key=context.model_key, verbose=context.disp)
+                                    model_key=context.model_key, verbose=context.disp,
+                                    storage_backend=storage_backend)
             features, objectives = evaluate_population(context, param_arrays, model_ids, context.export)
 
             if context.plot:
@@ -130,7 +162,9 @@ def main(cli, config_file_path, sobol, storage_file_path, param_file_path, model
             if context.export:
                 merge_exported_data(context, param_arrays, model_ids, model_labels, features, objectives,
                                     export_file_path=context.export_file_path, output_dir=context.output_dir,
-                                    verbose=context.disp)
+                                    verbose=context.disp, compression=export_compression,
+                                    compression_level=export_compression_level, mode=export_mode,
+                                    num_aggregators=export_aggregators)
                 write_metadata(context.export_file_path, meta_dict)
             for shutdown_func in context.shutdown_worker_funcs:
                 context.interface.apply(shutdown_func)
@@ -174,7 +208,7 @@ def write_metadata(file_path, meta_dict):
 
 
 def get_model_group(param_names, objective_names, param_file_path=None, storage_file_path=None, model_id=None,
-                    model_key=None, verbose=False):
+                    model_key=None, verbose=False, storage_backend=None):
     """
 
     :param param_names: list of str
@@ -184,6 +218,7 @@ def get_model_group(param_names, objective_names, param_file_path=None, storage_
     :param model_id: list of int or str
     :param model_key: list of str
     :param verbose: bool
+    :param storage_backend: str; default is determined by the extension of storage_file_path
     :return: tuple of lists
     """
     if param_file_path is None and storage_file_path is None:
@@ -198,9 +233,9 @@ def get_model_group(param_names, objective_names, param_file_path=None, storage_
     meta_dict = {'enum_model': [], 'Storage': False, 'keys': [], 'keys_mod': []}
     
     if storage_file_path is not None:
-        if not os.path.isfile(storage_file_path):
+        if not storage_file_exists(storage_file_path, storage_backend):
             raise Exception('nested.analyze: invalid storage_file_path: %s' % storage_file_path)
-        OptRep = StorageModelReport(file_path=storage_file_path)
+        OptRep = StorageModelReport(file_path=storage_file_path, backend=storage_backend)
         obj_names = OptRep.objective_names
         spe_p0 = OptRep.get_category_att()
         spe_arr = OptRep.get_category_id()
@@ -548,34 +548,20 @@ class Perturbations(object):
 #------------------processing populationstorage and normalizing data
 
 def pop_to_matrix(population, input_str, output_str, param_strings, obj_strings):
-    """converts collection of individuals in PopulationStorage into a matrix for data manipulation
+    """converts collection of individuals in PopulationStorage into a matrix for data manipulation. Generations are
+    streamed into preallocated matrices (see PopulationStorage.get_history_matrix)
 
     :param population: PopulationStorage object
     :return: data: 2d array. rows = each data point or individual, col = parameters, then features
     """
-    total_models = np.sum([len(x) for x in population.history])
-    if total_models == 0:
+    def get_column(var_str):
+        if var_str in param_strings:
+            return 'x'
+        return 'objectives' if var_str in obj_strings else 'features'
+    if np.sum(population.get_generation_sizes('population')) == 0:
         return np.array([]), np.array([])
-    if input_str in param_strings:
-        X_data = np.zeros((total_models, len(population.param_names)))
-    elif input_str in obj_strings:
-        X_data = np.zeros((total_models, len(population.objective_names)))
-    else:
-        X_data = np.zeros((total_models, len(population.feature_names)))
-    y_data = np.zeros((total_models, len(population.objective_names))) if output_str in obj_strings else \
-        np.zeros((total_models, len(population.feature_names)))
-    counter = 0
-    for generation in population.history:
-        for datum in generation:
-            y_data[counter] = datum.objectives if output_str in obj_strings else datum.features
-            if input_str in param_strings:
-                X_data[counter] = datum.x
-            elif input_str in obj_strings:
-                X_data[counter] = datum.objectives
-            else:
-                X_data[counter] = datum.features
-            counter += 1
-    return X_data, y_data
+    return population.get_history_matrix(get_column(input_str)), \
+           population.get_history_matrix(get_column(output_str))
 
 
 def x0_to_index(population, x0_string, X_data, input_str, param_strings, obj_strings):
@@ -1792,13 +1778,11 @@ def get_var_idx_agnostic(var_name, input_dict, output_dict):
 def sum_objectives(pop, n):
     summed_obj = np.zeros((n,))
     counter = 0
-    for generation in pop.history:
-        for datum in generation:
-            if datum.objectives is None:
-                summed_obj[counter] = np.NaN
-            else:
-                summed_obj[counter] = sum(abs(datum.objectives))
-            counter += 1
+    for gen_start, gen_stop, block in pop.iter_generations(['objectives'], ['population'], chunk=pop.path_length):
+        # models without objectives are stored as nan
+        this_summed_obj = np.sum(np.abs(block['population']['objectives']), axis=1)
+        summed_obj[counter:counter + len(this_summed_obj)] = this_summed_obj
+        counter += len(this_summed_obj)
     return summed_obj
 
 
@@ -44,6 +44,7 @@ context = Context()
 @click.option("--param-gen", type=str, default='PopulationAnnealing')  # "Sobol" and "Pregenerated" also accepted
 @click.option("--hot-start", is_flag=True)
 @click.option("--storage-file-path", type=str, default=None)
+@click.option("--storage-backend", type=click.Choice(['hdf5', 'sqlite', 'memory']), default=None)
 @click.option("--param-file-path", type=str, default=None)
 @click.option("--x0-key", type=str, default=None)
 @click.option("--output-dir", type=click.Path(exists=True, file_okay=False, dir_okay=True), default='data')
@@ -51,14 +52,15 @@ context = Context()
 @click.option("--disp", is_flag=True)
 @click.option("--interactive", is_flag=True)
 @click.pass_context
-def main(cli, config_file_path, param_gen, hot_start, storage_file_path, param_file_path, x0_key, output_dir, label,
-         disp, interactive):
+def main(cli, config_file_path, param_gen, hot_start, storage_file_path, storage_backend, param_file_path, x0_key,
+         output_dir, label, disp, interactive):
     """
     :param cli: :class:'click.Context': used to process/pass through unknown click arguments
     :param config_file_path: str (path)
     :param param_gen: str (must refer to callable in globals())
     :param hot_start: bool
     :param storage_file_path: str (path)
+    :param storage_backend: str; default is determined by the extension of storage_file_path
     :param param_file_path: str (path)
     :param x0_key: str
     :param output_dir: str
@@ -89,12 +91,17 @@ def main(cli, config_file_path, param_gen, hot_start, storage_file_path, param_f
             print('nested.optimize: worker initialization took %.2f s' % (time.time() - start_time))
         sys.stdout.flush()
 
+        param_gen_kwargs = dict(context.kwargs)
+        if storage_backend is not None:
+            param_gen_kwargs['storage_backend'] = storage_backend
+        # used by termination criteria with budgets in core-hours
+        param_gen_kwargs.setdefault('num_cores', context.interface.global_size)
         context.param_gen_instance = context.ParamGenClass(
             param_names=context.param_names, feature_names=context.feature_names,
             objective_names=context.objective_names, x0=context.x0_array, bounds=context.bounds,
             rel_bounds=context.rel_bounds, disp=disp, hot_start=hot_start,
             storage_file_path=context.storage_file_path, config_file_path=context.config_file_path,
-            **context.kwargs)
+            constraint_names=context.constraint_names, **param_gen_kwargs)
         optimize()
         context.storage = context.param_gen_instance.storage
         if not context.storage.survivors or not context.storage.survivors[-1]:
@@ -118,6 +125,7 @@ def main(cli, config_file_path, param_gen, hot_start, storage_file_path, param_f
         time.sleep(1.)
 
         if not context.interactive:
+            context.storage.close()
             context.interface.stop()
 
     except Exception as e:
@@ -125,6 +133,8 @@ def main(cli, config_file_path, param_gen, hot_start, storage_file_path, param_f
         traceback.print_exc(file=sys.stdout)
         sys.stdout.flush()
         time.sleep(1.)
+        if 'param_gen_instance' in context():
+            context.param_gen_instance.storage.close()
         context.interface.stop()
         raise e
 
@@ -138,6 +148,8 @@ def optimize():
         context.param_gen_instance.update_population(features, objectives)
         del features
         del objectives
+    # block until any generations queued for storage have been written to file
+    context.param_gen_instance.storage.flush()
     for shutdown_func in context.shutdown_worker_funcs:
         context.interface.apply(shutdown_func)
 
@@ -257,6 +269,7 @@ def evaluate_population(context, population, model_ids=None, export=False):
             del temp_model_ids
         if 'synchronize_func' in stage:
             context.interface.synchronize(stage['synchronize_func'])
+        skip_flagrant_violations(context, features_pop_dict, working_model_ids)
     for get_objectives_func in context.get_objectives_funcs:
         features_pop_list = [features_pop_dict[model_id] for model_id in working_model_ids]
         result_pop_list = context.interface.map_sync(get_objectives_func, features_pop_list, working_model_ids,
@@ -285,6 +298,29 @@ def evaluate_population(context, population, model_ids=None, export=False):
     return features_pop_list, objectives_pop_list
 
 
+def skip_flagrant_violations(context, features_pop_dict, working_model_ids):
+    """
+    Constraints that are computed as features are known before all stages have been computed. Models with a total
+    violation above max_constraint_violation are removed from working_model_ids, so that later stages are skipped.
+    Since they do not compute all required features, they are then marked as failed.
+    :param context: :class:'Context'
+    :param features_pop_dict: dict of dict
+    :param working_model_ids: list
+    """
+    if not context.constraint_names or context.max_constraint_violation is None:
+        return
+    for model_id in list(working_model_ids):
+        constraints = [features_pop_dict[model_id][name] for name in context.constraint_names
+                       if name in features_pop_dict[model_id]]
+        violation = get_constraint_violation(np.array([constraints], dtype='float64'))[0]
+        if violation > context.max_constraint_violation:
+            working_model_ids.remove(model_id)
+            if context.disp:
+                print('nested.optimize: model_id: %s violated constraints by %.3E; skipping later stages' %
+                      (str(model_id), violation))
+    sys.stdout.flush()
+
+
 if __name__ == '__main__':
     main(args=sys.argv[(list_find(lambda s: s.find(os.path.basename(__file__)) != -1, sys.argv) + 1):],
          standalone_mode=False)
@@ -4,12 +4,19 @@ Library of functions and classes to support nested.optimize
 __author__ = 'Aaron D. Milstein, Grace Ng, and Prannath Moolchand'
 from nested.utils import *
 from nested.parallel import find_context, find_context_name
+from nested.storage import *
 import collections
 from scipy._lib._util import check_random_state
+from scipy.special import comb
 from copy import deepcopy
+from functools import partial
 import uuid
 import warnings
+import bisect
+import heapq
+import itertools
 import shutil
+import tempfile
 import yaml
 
 
@@ -35,13 +42,558 @@ class Individual(object):
         self.model_id = model_id
 
 
+class IndividualView(object):
+    """
+    Behaves like an :class:'Individual', but reads and writes a single row of a :class:'PopulationArray'.
+    """
+    __slots__ = ('population', 'index')
+
+    def __init__(self, population, index):
+        """
+
+        :param population: :class:'PopulationArray'
+        :param index: int
+        """
+        self.population = population
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, IndividualView) and other.population is self.population and \
+               other.index == self.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.population), self.index))
+
+    def __repr__(self):
+        return 'IndividualView(model_id=%s)' % str(self.model_id)
+
+    def __getstate__(self):
+        return self.population, self.index
+
+    def __setstate__(self, state):
+        self.population, self.index = state
+
+    @property
+    def model_id(self):
+        model_id = int(self.population.columns['model_id'][self.index])
+        return None if model_id < 0 else model_id
+
+    @model_id.setter
+    def model_id(self, model_id):
+        self.population.columns['model_id'][self.index] = -1 if model_id is None else model_id
+
+    @property
+    def x(self):
+        return self.population.columns['x'][self.index]
+
+    @x.setter
+    def x(self, x):
+        self.population.columns['x'][self.index] = x
+
+    @property
+    def features(self):
+        return self.population.get_value('features', self.index)
+
+    @features.setter
+    def features(self, features):
+        self.population.set_value('features', self.index, features)
+
+    @property
+    def objectives(self):
+        return self.population.get_value('objectives', self.index)
+
+    @objectives.setter
+    def objectives(self, objectives):
+        self.population.set_value('objectives', self.index, objectives)
+
+    @property
+    def normalized_objectives(self):
+        return self.population.get_value('normalized_objectives', self.index)
+
+    @normalized_objectives.setter
+    def normalized_objectives(self, normalized_objectives):
+        self.population.set_value('normalized_objectives', self.index, normalized_objectives)
+
+    @property
+    def energy(self):
+        return self.population.get_value('energy', self.index)
+
+    @energy.setter
+    def energy(self, energy):
+        self.population.set_value('energy', self.index, energy)
+
+    @property
+    def rank(self):
+        rank = self.population.get_value('rank', self.index)
+        return None if rank is None else int(rank)
+
+    @rank.setter
+    def rank(self, rank):
+        self.population.set_value('rank', self.index, rank)
+
+    @property
+    def distance(self):
+        return self.population.get_value('distance', self.index)
+
+    @distance.setter
+    def distance(self, distance):
+        self.population.set_value('distance', self.index, distance)
+
+    @property
+    def fitness(self):
+        fitness = self.population.get_value('fitness', self.index)
+        return None if fitness is None else int(fitness)
+
+    @fitness.setter
+    def fitness(self, fitness):
+        self.population.set_value('fitness', self.index, fitness)
+
+    @property
+    def survivor(self):
+        return bool(self.population.columns['survivor'][self.index])
+
+    @survivor.setter
+    def survivor(self, survivor):
+        self.population.columns['survivor'][self.index] = bool(survivor)
+
+
+class PopulationArray(object):
+    """
+    Stores the attributes of a population of models as contiguous arrays, with one row per model, rather than as a list
+    of :class:'Individual'. Columns follow the conventions of nested.storage. Attributes that have not been set (None)
+    are tracked with a boolean mask per column, and are filled with missing values (a model_id of -1, and nan for all
+    other attributes).
+    Indexing with an int returns an :class:'IndividualView', so a PopulationArray can be used wherever a list of
+    :class:'Individual' is expected. Indexing with a slice, an array of int, or a boolean mask returns a new
+    PopulationArray containing copies of the selected rows.
+    Populations stored in a :class:'PopulationStorage' are frozen (their arrays are read-only), so that they can be
+    shared by reference rather than copied. A frozen population is never modified in place; replace and updated_from
+    return a new frozen population that shares all unmodified columns with the original.
+    """
+    column_names = get_column_names('population')
+    array_columns = ['x', 'features', 'objectives', 'normalized_objectives']
+    # attributes that can be None
+    optional_columns = ['features', 'objectives', 'normalized_objectives'] + scalar_columns
+    # attributes assigned during evaluation and selection of a population (see nested.storage)
+    ranking_columns = list(ranking_columns)
+
+    def __init__(self, columns, widths=None, missing=None):
+        """
+
+        :param columns: dict of array; missing columns are filled with missing values
+        :param widths: dict; see get_column_widths; required for missing array columns
+        :param missing: dict of array of bool; by default, inferred from missing values (see nested.storage)
+        """
+        if 'model_id' in columns:
+            num_models = len(columns['model_id'])
+        elif 'x' in columns:
+            num_models = len(columns['x'])
+        else:
+            raise ValueError('PopulationArray: either model_id or x must be provided')
+        self.widths = dict() if widths is None else dict(widths)
+        self.columns = dict()
+        for column in self.column_names:
+            if column in columns:
+                data = np.asarray(columns[column], dtype=get_column_dtype(column))
+                if data.ndim == 2:
+                    self.widths[column] = data.shape[1]
+                elif column in self.array_columns:
+                    data = data.reshape(num_models, self.widths.get(column, None) or 0)
+                    self.widths[column] = data.shape[1]
+            else:
+                width = self.widths.get(column, None)
+                if width is None and column in self.array_columns:
+                    width = self.widths.get('objectives', None) if column == 'normalized_objectives' else None
+                    width = 0 if width is None else width
+                    self.widths[column] = width
+                shape = (num_models,) if width is None else (num_models, width)
+                data = np.full(shape, get_column_fillvalue(column), dtype=get_column_dtype(column))
+            self.columns[column] = data
+        self.missing = dict()
+        for column in self.optional_columns:
+            if missing is not None and column in missing:
+                self.missing[column] = np.asarray(missing[column], dtype=bool)
+            else:
+                data = self.columns[column]
+                if data.ndim == 1:
+                    self.missing[column] = np.isnan(data)
+                elif data.shape[1] == 0:
+                    self.missing[column] = np.full(num_models, column not in columns, dtype=bool)
+                else:
+                    self.missing[column] = np.all(np.isnan(data), axis=1)
+        self.frozen = False
+
+    @classmethod
+    def from_x(cls, x, model_ids=None, widths=None):
+        """
+        Creates a new population from an array of parameters.
+        :param x: 2d array or list of array
+        :param model_ids: list of int
+        :param widths: dict
+        :return: :class:'PopulationArray'
+        """
+        x = np.array(x, dtype='float64')
+        if x.ndim == 1:
+            x = x.reshape(len(x), -1 if len(x) > 0 else (widths or dict()).get('x', 0))
+        if model_ids is None:
+            model_ids = np.full(len(x), -1, dtype='int64')
+        else:
+            model_ids = [-1 if model_id is None else model_id for model_id in model_ids]
+        return cls({'x': x, 'model_id': model_ids}, widths)
+
+    @classmethod
+    def from_population(cls, population, widths=None, copy=True):
+        """
+        Copies a list of :class:'Individual' (or an existing PopulationArray) into a new PopulationArray.
+        :param population: list of :class:'Individual' or :class:'PopulationArray'
+        :param widths: dict
+        :param copy: bool; if False, an existing PopulationArray is returned as is
+        :return: :class:'PopulationArray'
+        """
+        if isinstance(population, PopulationArray):
+            return population.copy() if copy else population
+        widths = dict() if widths is None else dict(widths)
+        for column in cls.array_columns:
+            if widths.get(column, None) is None:
+                for individual in population:
+                    val = getattr(individual, column)
+                    if val is not None:
+                        widths[column] = len(val)
+                        break
+        if widths.get('normalized_objectives', None) is None:
+            widths['normalized_objectives'] = widths.get('objectives', None)
+        for column in cls.array_columns:
+            if widths.get(column, None) is None:
+                widths[column] = 0
+        for column in cls.column_names:
+            if column not in widths:
+                widths[column] = None
+        missing = {column: [getattr(individual, column) is None for individual in population]
+                   for column in cls.optional_columns}
+        return cls(population_to_columns(population, 'population', widths), widths, missing)
+
+    @classmethod
+    def concatenate(cls, populations, widths=None):
+        """
+        Copies the rows of a sequence of populations into a new PopulationArray.
+        :param populations: list of :class:'PopulationArray' or list of :class:'Individual'
+        :param widths: dict
+        :return: :class:'PopulationArray'
+        """
+        populations = [population if isinstance(population, PopulationArray) else
+                       cls.from_population(population, widths) for population in populations]
+        populations = [population for population in populations if len(population) > 0] or populations[:1]
+        if not populations:
+            return cls({'model_id': []}, widths)
+        columns = {column: np.concatenate([population.columns[column] for population in populations])
+                   for column in cls.column_names}
+        missing = {column: np.concatenate([population.missing[column] for population in populations])
+                   for column in cls.optional_columns}
+        return cls(columns, populations[0].widths, missing)
+
+    def __len__(self):
+        return len(self.columns['model_id'])
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield IndividualView(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if index < 0 or index >= len(self):
+                raise IndexError('PopulationArray: index out of range')
+            return IndividualView(self, int(index))
+        return self.take(index)
+
+    def __setitem__(self, index, individual):
+        view = self[index]
+        for column in self.column_names:
+            setattr(view, column, getattr(individual, column))
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return 'PopulationArray(size=%i)' % len(self)
+
+    def take(self, indexes):
+        """
+        Returns a new PopulationArray containing copies of the selected rows.
+        :param indexes: slice, array of int, or boolean mask
+        :return: :class:'PopulationArray'
+        """
+        if isinstance(indexes, slice):
+            # basic slicing would return views of the original arrays
+            indexes = np.arange(len(self))[indexes]
+        else:
+            indexes = np.asarray(indexes)
+            if indexes.dtype != bool:
+                indexes = indexes.astype('int64')
+        return PopulationArray({column: data[indexes] for column, data in viewitems(self.columns)}, self.widths,
+                               {column: data[indexes] for column, data in viewitems(self.missing)})
+
+    def copy(self):
+        """
+        Returns a new (not frozen) PopulationArray containing copies of all rows.
+        :return: :class:'PopulationArray'
+        """
+        return self.take(slice(None))
+
+    def freeze(self):
+        """
+        Makes all arrays read-only, so that the population can be shared by reference.
+        :return: :class:'PopulationArray'; self
+        """
+        for data in list(self.columns.values()) + list(self.missing.values()):
+            data.flags.writeable = False
+        self.frozen = True
+        return self
+
+    def replace(self, columns, missing=None):
+        """
+        Returns a new frozen PopulationArray with the specified columns replaced. All other columns are shared with this
+        population, not copied. Arrays passed in are not copied, and become read-only.
+        :param columns: dict of array or scalar
+        :param missing: dict of array of bool; by default, replaced columns are marked as set
+        :return: :class:'PopulationArray'
+        """
+        population = PopulationArray.__new__(PopulationArray)
+        population.widths = self.widths
+        population.columns = dict(self.columns)
+        population.missing = dict(self.missing)
+        for column, data in viewitems(columns):
+            data = np.asarray(data, dtype=get_column_dtype(column))
+            if data.shape != self.columns[column].shape:
+                data = np.array(np.broadcast_to(data, self.columns[column].shape))
+            population.columns[column] = data
+            if column in population.missing:
+                if missing is not None and column in missing:
+                    population.missing[column] = np.asarray(missing[column], dtype=bool)
+                else:
+                    population.missing[column] = np.zeros(len(self), dtype=bool)
+        return population.freeze()
+
+    def get_value(self, column, index):
+        """
+        Returns None if the requested attribute has not been set.
+        :param column: str
+        :param index: int
+        :return: array or float or None
+        """
+        if self.missing[column][index]:
+            return None
+        return self.columns[column][index]
+
+    def set_value(self, column, index, val):
+        """
+
+        :param column: str
+        :param index: int
+        :param val: array or float or None
+        """
+        if val is None:
+            self.columns[column][index] = np.nan
+            self.missing[column][index] = True
+        else:
+            if column in self.array_columns:
+                val = [None2nan(this_val) for this_val in val]
+            self.columns[column][index] = val
+            self.missing[column][index] = False
+
+    def is_missing(self, column):
+        """
+        Returns a boolean mask of the models for which the specified attribute has not been set.
+        :param column: str
+        :return: array of bool
+        """
+        if column in self.missing:
+            return self.missing[column]
+        elif column == 'model_id':
+            return self.columns['model_id'] < 0
+        return np.zeros(len(self), dtype=bool)
+
+    def get_model_ids(self):
+        """
+
+        :return: list of int
+        """
+        return [None if model_id < 0 else int(model_id) for model_id in self.columns['model_id']]
+
+    def match_rows(self, source):
+        """
+        For each model in this population, finds the row of the source population with the same model_id.
+        :param source: :class:'PopulationArray'
+        :return: tuple of array; (boolean mask of matched models, row of the source population for each model)
+        """
+        if len(self) == 0 or len(source) == 0:
+            return np.zeros(len(self), dtype=bool), np.zeros(len(self), dtype='int64')
+        source_ids = source.columns['model_id']
+        order = np.argsort(source_ids, kind='stable')
+        pos = np.minimum(np.searchsorted(source_ids[order], self.columns['model_id']), len(order) - 1)
+        rows = order[pos]
+        match = (source_ids[rows] == self.columns['model_id']) & (self.columns['model_id'] >= 0)
+        return match, rows
+
+    def update_from(self, source, columns=None):
+        """
+        For each model in this population that is also contained in the source population (by model_id), copies the
+        specified columns from the source population.
+        :param source: :class:'PopulationArray'
+        :param columns: list of str; default is ranking_columns
+        """
+        if columns is None:
+            columns = self.ranking_columns
+        match, rows = self.match_rows(source)
+        if not np.any(match):
+            return
+        for column in columns:
+            self.columns[column][match] = source.columns[column][rows[match]]
+            if column in self.missing:
+                self.missing[column][match] = source.missing[column][rows[match]]
+
+    def updated_from(self, source, columns=None):
+        """
+        Like update_from, but returns a new frozen PopulationArray rather than modifying this one. Only the updated
+        columns are copied. If no models are contained in the source population, returns this population.
+        :param source: :class:'PopulationArray'
+        :param columns: list of str; default is ranking_columns
+        :return: :class:'PopulationArray'
+        """
+        if columns is None:
+            columns = self.ranking_columns
+        match, rows = self.match_rows(source)
+        if not np.any(match):
+            return self
+        new_columns = dict()
+        new_missing = dict()
+        for column in columns:
+            new_columns[column] = np.array(self.columns[column])
+            new_columns[column][match] = source.columns[column][rows[match]]
+            if column in self.missing:
+                new_missing[column] = np.array(self.missing[column])
+                new_missing[column][match] = source.missing[column][rows[match]]
+        return self.replace(new_columns, new_missing)
+
+
+def get_population_values(population, column):
+    """
+    Returns the values of one attribute for each member of a population, and a boolean mask of the members for which
+    the attribute is None. Works with either a :class:'PopulationArray' or a list of :class:'Individual'.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param column: str
+    :return: tuple of array
+    """
+    if isinstance(population, PopulationArray):
+        return population.columns[column], population.is_missing(column)
+    missing = np.array([getattr(individual, column) is None for individual in population], dtype=bool)
+    if column in PopulationArray.array_columns:
+        width = max([len(getattr(individual, column)) for individual in population
+                     if getattr(individual, column) is not None] or [0])
+        data = np.full((len(population), width), np.nan)
+        for i, individual in enumerate(population):
+            val = getattr(individual, column)
+            if val is not None and len(val) > 0:
+                data[i, :len(val)] = val
+        return data, missing
+    return np.array([np.nan if missing[i] else getattr(individual, column)
+                     for i, individual in enumerate(population)], dtype='float64'), missing
+
+
+def set_population_values(population, column, values, indexes=None):
+    """
+    Modifies in place one attribute of the specified members of a population. Works with either a
+    :class:'PopulationArray' or a list of :class:'Individual'.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param column: str
+    :param values: array
+    :param indexes: array of int; default is all members
+    """
+    if indexes is None:
+        indexes = np.arange(len(population))
+    if isinstance(population, PopulationArray):
+        population.columns[column][indexes] = values
+        if column in population.missing:
+            population.missing[column][indexes] = False
+        return
+    for index, val in zip(indexes, values):
+        if column in ['rank', 'fitness']:
+            val = int(val)
+        elif column == 'distance':
+            val = float(val)
+        setattr(population[index], column, val)
+
+
+def set_population_columns(population, columns, indexes=None):
+    """
+    Modifies in place several attributes of the specified members of a population, in one pass over the members of a
+    list of :class:'Individual'. Works with either a :class:'PopulationArray' or a list of :class:'Individual'.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param columns: dict of array
+    :param indexes: array of int; default is all members
+    """
+    if isinstance(population, PopulationArray):
+        for column, values in viewitems(columns):
+            set_population_values(population, column, values, indexes)
+        return
+    if indexes is None:
+        indexes = np.arange(len(population))
+    converters = {'rank': int, 'fitness': int, 'distance': float}
+    items = [(column, values, converters.get(column)) for column, values in viewitems(columns)]
+    for i, index in enumerate(indexes):
+        individual = population[index]
+        for column, values, converter in items:
+            setattr(individual, column, values[i] if converter is None else converter(values[i]))
+
+
+def take_population(population, indexes):
+    """
+    Returns the selected members of a population, in order. A :class:'PopulationArray' returns a new
+    :class:'PopulationArray', and a list returns a list of the same :class:'Individual' objects.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param indexes: array of int
+    :return: :class:'PopulationArray' or list of :class:'Individual'
+    """
+    if isinstance(population, PopulationArray):
+        return population.take(indexes)
+    return [population[index] for index in indexes]
+
+
+def columns_to_population(columns, category, widths=None):
+    """
+    Converts rows of data read from a storage table (see nested.storage) into a :class:'PopulationArray'.
+    :param columns: dict of array
+    :param category: str
+    :param widths: dict; see get_column_widths
+    :return: :class:'PopulationArray'
+    """
+    return PopulationArray(columns, widths).freeze()
+
+
 class PopulationStorage(object):
     """
     Class used to store populations of parameters and objectives during optimization.
     """
+    # attribute that contains the list of generations of each storage category (see nested.storage)
+    category_attrs = dict(zip(population_categories, ['history', 'survivors', 'specialists', 'prev_survivors',
+                                                      'prev_specialists', 'failed']))
 
     def __init__(self, param_names=None, feature_names=None, objective_names=None, path_length=None,
-                 normalize='global', file_path=None):
+                 normalize='global', file_path=None, flush_interval=1, flush_signal=None, async_write=False,
+                 lazy=False, swmr=False, follow=False, backend=None, compression='gzip', compression_level=None,
+                 chunk_size=256):
         """
 
         :param param_names: list of str
@@ -50,17 +602,44 @@ class PopulationStorage(object):
         :param path_length: int
         :param normalize: str; 'global': normalize over entire history, 'local': normalize per iteration
         :param file_path: str (path)
+        :param flush_interval: int; number of saved generations between flushes of the storage file to disk
+        :param flush_signal: int or str; e.g. 'SIGUSR1'; flush the storage file to disk upon receipt of this signal
+        :param async_write: bool; write saved generations to the storage file in a background thread
+        :param lazy: bool; when loading from file_path, only read each stored generation when it is accessed
+        :param swmr: bool; keep the storage file in SWMR mode while saving, so that other processes can read it
+        :param follow: bool; open file_path in SWMR mode, so that generations appended by another process can be
+            loaded with refresh
+        :param backend: str; 'hdf5', 'sqlite', or 'memory'; default is determined by the extension of each file path
+            (see nested.storage.get_storage_backend)
+        :param compression: str or None; 'gzip' or 'lzf'; compression of tables saved to .hdf5 files (see
+            nested.storage.get_compression_kwargs)
+        :param compression_level: int; only for gzip compression
+        :param chunk_size: int; number of rows per chunk of tables saved to .hdf5 files
         """
+        self.flush_interval = int(flush_interval)
+        self.flush_signal = flush_signal
+        self.async_write = async_write not in [False, 'False', 'false', 0, '0']
+        self.swmr = swmr not in [False, 'False', 'false', 0, '0']
+        self.follow = follow
+        self.backend = backend
+        # validated here, rather than when the storage file is first saved
+        get_compression_kwargs(compression, compression_level)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunk_size = int(chunk_size)
+        self.writer = None  # :class:'PopulationStorageWriter' that keeps the storage file open between saves
+        self.lazy = False
+        self.file_path = file_path
+        self._summed_obj = None
         if file_path is not None:
-            from nested.lsa import sum_objectives
-            if os.path.isfile(file_path):
-                self.load(file_path)
+            if storage_file_exists(file_path, backend):
+                self.load(file_path, lazy=lazy, swmr=follow)
             else:
                 raise IOError('PopulationStorage: invalid file path: %s' % file_path)
-            self.total_models = sum([len(gen) for gen in self.history])  # doesn't include failed models
-            self.summed_obj = sum_objectives(self, self.total_models)  # for plotting
-            self.best_model = self.survivors[-1][0] if self.survivors and self.survivors[-1] else None
             self.param_matrix, self.obj_matrix, self.feat_matrix = [None] * 3  # for dumb_plot
+            # doesn't include failed models
+            self.total_models = int(np.sum(self.get_generation_sizes('population')))
+            self.best_model = self.survivors[-1][0] if self.survivors and self.survivors[-1] else None
         else:
             if isinstance(param_names, collections.Iterable) and isinstance(feature_names, collections.Iterable) and \
                     isinstance(objective_names, collections.Iterable):
@@ -91,16 +670,34 @@ class PopulationStorage(object):
             self.count = 0
             self.total_models = 0  # total_models != count
 
+    @property
+    def summed_obj(self):
+        """
+        Sum of the absolute objectives of each model in the population history, for plotting. Since this requires
+        reading the objectives of every stored model, it is only computed when first accessed.
+        :return: array of float
+        """
+        if getattr(self, '_summed_obj', None) is None:
+            from nested.lsa import sum_objectives
+            self._summed_obj = sum_objectives(self, int(np.sum(self.get_generation_sizes('population'))))
+        return self._summed_obj
+
+    @summed_obj.setter
+    def summed_obj(self, summed_obj):
+        self._summed_obj = summed_obj
+
     def append(self, population, survivors=None, specialists=None, prev_survivors=None,
                prev_specialists=None, failed=None, min_objectives=None, max_objectives=None, **kwargs):
         """
-
-        :param population: list of :class:'Individual'
-        :param survivors: list of :class:'Individual'
-        :param specialists: list of :class:'Individual'
-        :param prev_survivors: list of :class:'Individual'
-        :param prev_specialists: list of :class:'Individual'
-        :param failed: list of :class:'Individual'
+        Each population can be provided either as a :class:'PopulationArray' or as a list of :class:'Individual'. A
+        PopulationArray is stored by reference, and is frozen; a list of :class:'Individual' is copied into a new frozen
+        PopulationArray.
+        :param population: :class:'PopulationArray'
+        :param survivors: :class:'PopulationArray'
+        :param specialists: :class:'PopulationArray'
+        :param prev_survivors: :class:'PopulationArray'
+        :param prev_specialists: :class:'PopulationArray'
+        :param failed: :class:'PopulationArray'
         :param min_objectives: array of float
         :param max_objectives: array of float
         :param kwargs: dict of additional param_gen-specific attributes
@@ -119,16 +716,17 @@ class PopulationStorage(object):
             min_objectives = []
         if max_objectives is None:
             max_objectives = []
-        self.survivors.append(deepcopy(survivors))
-        self.specialists.append(deepcopy(specialists))
-        self.prev_survivors.append(deepcopy(prev_survivors))
-        self.prev_specialists.append(deepcopy(prev_specialists))
-        self.history.append(deepcopy(population))
-        self.failed.append(deepcopy(failed))
+        widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+        self.survivors.append(PopulationArray.from_population(survivors, widths, copy=False).freeze())
+        self.specialists.append(PopulationArray.from_population(specialists, widths, copy=False).freeze())
+        self.prev_survivors.append(PopulationArray.from_population(prev_survivors, widths, copy=False).freeze())
+        self.prev_specialists.append(PopulationArray.from_population(prev_specialists, widths, copy=False).freeze())
+        self.history.append(PopulationArray.from_population(population, widths, copy=False).freeze())
+        self.failed.append(PopulationArray.from_population(failed, widths, copy=False).freeze())
         self.count += len(population) + len(failed)
         self.total_models += len(population)
-        self.min_objectives.append(deepcopy(min_objectives))
-        self.max_objectives.append(deepcopy(max_objectives))
+        self.min_objectives.append(list(min_objectives))
+        self.max_objectives.append(list(max_objectives))
 
         for key in kwargs:
             if key not in self.attributes:
@@ -139,6 +737,18 @@ class PopulationStorage(object):
             else:
                 self.attributes[key].append(None)
 
+    def set_attribute(self, key, val, gen_index=-1):
+        """
+        Sets the value of a user-defined attribute of a stored generation, e.g. a metric computed after the
+        generation was appended. Generations without a value of a new attribute are assigned None.
+        :param key: str
+        :param val: float or str
+        :param gen_index: int
+        """
+        if key not in self.attributes:
+            self.attributes[key] = [None] * len(self.history)
+        self.attributes[key][gen_index] = val
+
     def plot(self, subset=None, show_failed=False, mark_specialists=True):
         """
 
@@ -148,27 +758,24 @@ class PopulationStorage(object):
         :param show_failed: bool; whether to show failed models when plotting parameters
         :param mark_specialists: bool; whether to mark specialists
         """
-        def get_group_stats(groups):
+        def update_group_stats(key, groups):
+            """
+            Appends the statistics of the values of all groups in the current iteration to group_stats.
+            :param key: str or tuple
+            :param groups: defaultdict(list(array))
+            """
+            vals = np.concatenate([groups[group_name][-1] for group_name in groups])
+            group_stats[key]['mean'].append(np.mean(vals))
+            group_stats[key]['median'].append(np.median(vals))
+            group_stats[key]['std'].append(np.std(vals))
+
+        def get_group_stats(key):
             """
 
-            :param groups: defaultdict(list(list of float))
+            :param key: str or tuple
             :return: tuple of array
             """
-            mean_vals = []
-            median_vals = []
-            std_vals = []
-            for i in range(max_iter):
-                vals = []
-                for group_name in groups:
-                    vals.extend(groups[group_name][i])
-                mean_vals.append(np.mean(vals))
-                median_vals.append(np.median(vals))
-                std_vals.append(np.std(vals))
-            mean_vals = np.array(mean_vals)
-            median_vals = np.array(median_vals)
-            std_vals = np.array(std_vals)
-
-            return mean_vals, median_vals, std_vals
+            return tuple(np.array(group_stats[key][stat]) for stat in ['mean', 'median', 'std'])
 
         import matplotlib.pyplot as plt
         from matplotlib.pyplot import cm
@@ -216,80 +823,70 @@ class PopulationStorage(object):
         param_history = defaultdict(lambda: defaultdict(list))
         feature_history = defaultdict(lambda: defaultdict(list))
         objective_history = defaultdict(lambda: defaultdict(list))
+        # running statistics of each iteration, so that only the plotted columns of each model are kept in memory
+        group_stats = defaultdict(lambda: defaultdict(list))
         param_name_list = self.param_names
         feature_name_list = self.feature_names
         objective_name_list = self.objective_names
         max_fitness = 0
 
-        max_gens = len(self.history)
-        num_gen = 0
+        columns = ['model_id', 'rank', 'fitness', 'energy', 'objectives', 'survivor']
+        if 'parameters' in categories:
+            columns.append('x')
+        if 'features' in categories:
+            columns.append('features')
         max_iter = 0
-        while num_gen < max_gens:
-            this_iter_specialist_ids = \
-                set([individual.model_id for individual in self.specialists[num_gen + self.path_length - 1]])
-            groups = defaultdict(list)
-            for i in range(self.path_length):
-                this_gen = list(set(self.prev_survivors[num_gen + i] + self.prev_specialists[num_gen + i]))
-                this_gen.extend(self.history[num_gen + i])
-                for individual in this_gen:
-                    if mark_specialists and individual.model_id in this_iter_specialist_ids:
-                        groups['specialists'].append(individual)
-                    elif individual.survivor:
-                        groups['survivors'].append(individual)
-                    else:
-                        groups['population'].append(individual)
-                groups['failed'].extend(self.failed[num_gen + i])
+        # each block contains the generations of one iteration
+        for gen_start, gen_stop, block in \
+                self.iter_generations(columns, ['population', 'specialists', 'prev_survivors', 'prev_specialists',
+                                                'failed'], chunk=self.path_length):
+            specialists = block['specialists']
+            this_iter_specialist_ids = specialists['model_id'][specialists['generation'] == gen_stop - 1]
+            # previous survivors that were also previous specialists are only included once per generation
+            prev = {column: np.concatenate([block['prev_survivors'][column], block['prev_specialists'][column]])
+                    for column in columns + ['generation']}
+            _, unique_indexes = np.unique(np.column_stack([prev['generation'], prev['model_id']]), axis=0,
+                                          return_index=True)
+            this_gen = {column: np.concatenate([prev[column][np.sort(unique_indexes)], block['population'][column]])
+                        for column in columns}
+            is_specialist = np.isin(this_gen['model_id'], this_iter_specialist_ids) if mark_specialists else \
+                np.zeros(len(this_gen['model_id']), dtype=bool)
+            masks = {'specialists': is_specialist, 'survivors': ~is_specialist & this_gen['survivor']}
+            masks['population'] = ~masks['specialists'] & ~masks['survivors']
 
             for group_name in ['population', 'survivors', 'specialists']:
-                group = groups[group_name]
-                this_ranks = []
-                this_fitness = []
-                this_rel_energy = []
-                this_abs_energy = []
-                for individual in group:
-                    this_ranks.append(individual.rank)
-                    this_fitness.append(individual.fitness)
-                    this_rel_energy.append(individual.energy)
-                    this_abs_energy.append(np.sum(individual.objectives))
-                ranks_history[group_name].append(this_ranks)
-                fitness_history[group_name].append(this_fitness)
-                if len(this_fitness) > 0:
-                    max_fitness = max(max_fitness, max(this_fitness))
-                rel_energy_history[group_name].append(this_rel_energy)
-                abs_energy_history[group_name].append(this_abs_energy)
+                mask = masks[group_name]
+                ranks_history[group_name].append(this_gen['rank'][mask])
+                fitness_history[group_name].append(this_gen['fitness'][mask])
+                if np.any(mask):
+                    max_fitness = max(max_fitness, np.max(this_gen['fitness'][mask]))
+                rel_energy_history[group_name].append(this_gen['energy'][mask])
+                abs_energy_history[group_name].append(np.sum(this_gen['objectives'][mask], axis=1))
                 if 'parameters' in categories:
                     for param_name in categories['parameters']:
                         index = param_name_list.index(param_name)
-                        this_param_history = []
-                        for individual in group:
-                            this_param_history.append(individual.x[index])
-                        param_history[param_name][group_name].append(this_param_history)
+                        param_history[param_name][group_name].append(this_gen['x'][mask, index])
                 if 'features' in categories:
                     for feature_name in categories['features']:
                         index = feature_name_list.index(feature_name)
-                        this_feature_history = []
-                        for individual in group:
-                            this_feature_history.append(individual.features[index])
-                        feature_history[feature_name][group_name].append(this_feature_history)
+                        feature_history[feature_name][group_name].append(this_gen['features'][mask, index])
                 if 'objectives' in categories:
                     for objective_name in categories['objectives']:
                         index = objective_name_list.index(objective_name)
-                        this_objective_history = []
-                        for individual in group:
-                            this_objective_history.append(individual.objectives[index])
-                        objective_history[objective_name][group_name].append(this_objective_history)
+                        objective_history[objective_name][group_name].append(this_gen['objectives'][mask, index])
 
             if 'parameters' in categories:
-                group_name = 'failed'
-                group = groups[group_name]
                 for param_name in categories['parameters']:
                     index = param_name_list.index(param_name)
-                    this_param_history = []
-                    for individual in group:
-                        this_param_history.append(individual.x[index])
-                    param_history[param_name][group_name].append(this_param_history)
-
-            num_gen += self.path_length
+                    param_history[param_name]['failed'].append(block['failed']['x'][:, index])
+
+            update_group_stats('rel_energy', rel_energy_history)
+            update_group_stats('abs_energy', abs_energy_history)
+            for key, history in zip(['parameters', 'features', 'objectives'],
+                                    [param_history, feature_history, objective_history]):
+                if key in categories:
+                    for name in categories[key]:
+                        update_group_stats((key, name), history[name])
             max_iter += 1
 
         fig, axes = plt.subplots(1, figsize=(6.5, 4.8))
@@ -322,7 +919,7 @@ class PopulationStorage(object):
         clean_axes(axes)
         fig.show()
 
-        rel_energy_mean, rel_energy_med, rel_energy_std = get_group_stats(rel_energy_history)
+        rel_energy_mean, rel_energy_med, rel_energy_std = get_group_stats('rel_energy')
 
         fig, axes = plt.subplots(1, figsize=(7., 4.8))
         for i in range(max_iter):
@@ -358,7 +955,7 @@ class PopulationStorage(object):
         fig.subplots_adjust(right=0.8)
         fig.show()
 
-        abs_energy_mean, abs_energy_med, abs_energy_std = get_group_stats(abs_energy_history)
+        abs_energy_mean, abs_energy_med, abs_energy_std = get_group_stats('abs_energy')
 
         fig, axes = plt.subplots(1, figsize=(7., 4.8))
         for i in range(max_iter):
@@ -396,7 +993,7 @@ class PopulationStorage(object):
 
         if 'parameters' in categories:
             for param_name in categories['parameters']:
-                param_mean, param_med, param_std = get_group_stats(param_history[param_name])
+                param_mean, param_med, param_std = get_group_stats(('parameters', param_name))
 
                 fig, axes = plt.subplots(1, figsize=(7., 4.8))
                 for i in range(max_iter):
@@ -444,7 +1041,7 @@ class PopulationStorage(object):
 
         if 'features' in categories:
             for feature_name in categories['features']:
-                feature_mean, feature_med, feature_std = get_group_stats(feature_history[feature_name])
+                feature_mean, feature_med, feature_std = get_group_stats(('features', feature_name))
 
                 fig, axes = plt.subplots(1, figsize=(7., 4.8))
                 for i in range(max_iter):
@@ -486,7 +1083,7 @@ class PopulationStorage(object):
 
         if 'objectives' in categories:
             for objective_name in categories['objectives']:
-                objective_mean, objective_med, objective_std = get_group_stats(objective_history[objective_name])
+                objective_mean, objective_med, objective_std = get_group_stats(('objectives', objective_name))
 
                 fig, axes = plt.subplots(1, figsize=(7., 4.8))
                 for i in range(max_iter):
@@ -619,9 +1216,77 @@ class PopulationStorage(object):
 
     def _convert_val_to_matrix(self):
         """allows slicing for easier plotting"""
-        from nested.lsa import pop_to_matrix
-        self.param_matrix, self.feat_matrix = pop_to_matrix(self, 'p', 'f', ['p'], ['o'])
-        _, self.obj_matrix = pop_to_matrix(self, 'p', 'o', ['p'], ['o'])
+        self.param_matrix = self.get_history_matrix('x')
+        self.feat_matrix = self.get_history_matrix('features')
+        self.obj_matrix = self.get_history_matrix('objectives')
+
+    def get_generation_sizes(self, category='population'):
+        """
+        Returns the number of models in each generation of a storage category, without reading any generations that
+        were loaded lazily.
+        :param category: str
+        :return: array of int
+        """
+        populations = getattr(self, self.category_attrs[category])
+        if isinstance(populations, LazyGenerationList):
+            return populations.get_lengths()
+        return np.array([len(population) for population in populations], dtype='int64')
+
+    def iter_generations(self, columns=None, categories=None, chunk=1, start=0):
+        """
+        Iterates over all generations, chunk generations at a time, and yields blocks of column arrays rather than
+        populations (see nested.storage.iter_generation_blocks). When loaded lazily, blocks are read directly from the
+        storage file, so that the full history never needs to be held in memory.
+        :param columns: list of str; default is all columns of each category
+        :param categories: list of str; e.g. 'population', 'failed'; default is all categories
+        :param chunk: int; number of generations per block
+        :param start: int; first generation
+        :return: generator of tuple; (first generation, last generation + 1, block)
+        """
+        if categories is None:
+            categories = population_categories
+        if self.lazy and not any([getattr(self, self.category_attrs[category]).modified for category in categories]):
+            with open_storage_reader(self.history.file_path, self.history.backend, self.history.swmr) as reader:
+                # exclude generations committed by a writer since the history was loaded
+                for gen_start, gen_stop, block in reader.iter_generation_blocks(columns, categories, chunk, start,
+                                                                                len(self.history)):
+                    yield gen_start, gen_stop, block
+            return
+        chunk = max(1, int(chunk))
+        num_gen = len(self.history)
+        for gen_start in range(start, num_gen, chunk):
+            gen_stop = min(gen_start + chunk, num_gen)
+            block = dict()
+            for category in categories:
+                category_columns = get_column_names(category) if columns is None else \
+                    [column for column in columns if column in get_column_names(category)]
+                populations = getattr(self, self.category_attrs[category])[gen_start:gen_stop]
+                data = {column: np.concatenate([get_population_values(population, column)[0]
+                                                for population in populations])
+                        for column in category_columns}
+                data['generation'] = np.repeat(np.arange(gen_start, gen_stop),
+                                               [len(population) for population in populations])
+                block[category] = data
+            yield gen_start, gen_stop, block
+
+    def get_history_matrix(self, column, category='population'):
+        """
+        Returns one row per model in the history of all generations. The matrix is preallocated and filled by
+        streaming blocks of generations with iter_generations.
+        :param column: str; 'x', 'features', or 'objectives'
+        :param category: str; 'population' or 'failed'
+        :return: 2d array
+        """
+        if column not in ['x', 'features', 'objectives'] or column not in get_column_names(category):
+            raise ValueError('PopulationStorage: get_history_matrix: invalid column: %s' % column)
+        widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+        matrix = np.empty((int(np.sum(self.get_generation_sizes(category))), widths[column]))
+        start = 0
+        for gen_start, gen_stop, block in self.iter_generations([column], [category], chunk=self.path_length):
+            data = block[category][column]
+            matrix[start:start + len(data)] = data
+            start += len(data)
+        return matrix
 
     def _get_var_col(self, idx, cat):
         if cat[0] == 'p':
@@ -722,9 +1387,7 @@ class PopulationStorage(object):
         categories = ['parameters', 'features', 'objectives']
 
         if self.param_matrix is None:
-            from nested.lsa import pop_to_matrix
-            self.param_matrix, self.feat_matrix = pop_to_matrix(self, 'p', 'f', ['p'], ['o'])
-            _, self.obj_matrix = pop_to_matrix(self, 'p', 'o', ['p'], ['o'])
+            self._convert_val_to_matrix()
 
         def on_X_change(_):
             if X_category.value == 'parameters':
@@ -804,16 +1467,193 @@ class PopulationStorage(object):
             plot_widget, X_cat=X_category, y_cat=y_category, this_inp=inp, this_out=out)
 
     def get_model_from_number(self, num):
-        flat_li = [model for sub in self.history for model in sub]
-        return flat_li[num]
+        """
+        Returns the model at the specified position in the history of all generations.
+        :param num: int
+        :return: :class:'IndividualView'
+        """
+        offsets = np.cumsum([len(population) for population in self.history])
+        gen_index = int(np.searchsorted(offsets, num, side='right'))
+        if num < 0 or gen_index >= len(offsets):
+            raise IndexError('PopulationStorage: get_model_from_number: invalid model number: %i' % num)
+        start = offsets[gen_index - 1] if gen_index > 0 else 0
+        return self.history[gen_index][int(num - start)]
+
+    def get(self, model_ids):
+        """
+        Returns the specified models from the history of all generations, including failed models, in the requested
+        order. When loaded lazily, models are read directly from the storage file using its 'model_index' (see
+        nested.storage), or the index on the 'model_id' column of an SQLite storage file.
+        :param model_ids: list of int
+        :return: :class:'PopulationArray'
+        """
+        model_ids = np.asarray(model_ids, dtype='int64').reshape(-1)
+        widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+        if self.lazy and not self.history.modified and not self.failed.modified:
+            with open_storage_reader(self.history.file_path, self.history.backend, self.history.swmr) as reader:
+                return PopulationArray(reader.read_models(model_ids), widths).freeze()
+        sources = [self.history, self.failed]
+        stored_ids, source_keys, rows = [], [], []
+        for source_index, populations in enumerate(sources):
+            for gen_index, population in enumerate(populations):
+                stored_ids.append(population.columns['model_id'])
+                source_keys.append(np.full(len(population), source_index * len(self.history) + gen_index))
+                rows.append(np.arange(len(population)))
+        if not stored_ids or len(model_ids) == 0:
+            if len(model_ids) > 0:
+                raise KeyError('PopulationStorage: model_ids not found in storage: %s' % str(model_ids))
+            return PopulationArray({'model_id': model_ids}, widths)
+        stored_ids, source_keys, rows = \
+            np.concatenate(stored_ids), np.concatenate(source_keys), np.concatenate(rows)
+        order = np.argsort(stored_ids, kind='stable')
+        pos = order[np.minimum(np.searchsorted(stored_ids[order], model_ids), len(order) - 1)]
+        found = stored_ids[pos] == model_ids
+        if not np.all(found):
+            raise KeyError('PopulationStorage: model_ids not found in storage: %s' % str(model_ids[~found]))
+        # read each generation once
+        source_keys, rows = source_keys[pos], rows[pos]
+        perm = np.argsort(source_keys, kind='stable')
+        pieces = []
+        for key in np.unique(source_keys):
+            selected = perm[source_keys[perm] == key]
+            population = sources[key // len(self.history)][key % len(self.history)]
+            pieces.append(population.take(rows[selected]))
+        return PopulationArray.concatenate(pieces, widths).take(np.argsort(perm, kind='stable'))
+
+    def query_models(self, filters, columns=None, category='population'):
+        """
+        Returns the models of one category that satisfy all of the specified filters, e.g. all models with objective
+        'f1' < 0.1: [('f1', '<', 0.1)] (see nested.storage.query_generation_blocks). When loaded lazily, the query is
+        evaluated by the storage backend, which, for SQLite storage files, uses indexed columns.
+        :param filters: list of tuple; (name, operator, value)
+        :param columns: list of str; default is all columns of the category
+        :param category: str; e.g. 'population', 'failed', 'survivors'
+        :return: dict of array; the requested columns, and the 'generation' of each selected model
+        """
+        if category not in self.category_attrs:
+            raise ValueError('PopulationStorage: query_models: invalid category: %s' % category)
+        populations = getattr(self, self.category_attrs[category])
+        if self.lazy and not populations.modified:
+            with open_storage_reader(populations.file_path, populations.backend, populations.swmr) as reader:
+                return reader.query_models(filters, columns, category, stop=len(populations))
+        names = [self.param_names, self.feature_names, self.objective_names]
+        if columns is None:
+            columns = get_column_names(category)
+        read_columns = get_query_columns(filters, columns, category, *names)
+        blocks = self.iter_generations(read_columns, [category], chunk=self.path_length)
+        return query_generation_blocks(blocks, filters, *names, columns=columns, category=category)
+
+    def get_writer(self, file_path, mode='a'):
+        """
+        Returns a :class:'StorageWriter' of the storage backend of the specified file (or an
+        :class:'AsyncPopulationStorageWriter') that keeps the file open between calls to save.
+        :param file_path: str (path)
+        :param mode: str; 'a': append to an existing file, 'w': overwrite
+        :return: :class:'PopulationStorageWriter'
+        """
+        if self.writer is not None and (self.writer.file_path != file_path or mode == 'w'):
+            self.close()
+        if self.writer is None:
+            if self.async_write:
+                self.writer = AsyncPopulationStorageWriter(
+                    file_path, self.param_names, self.feature_names, self.objective_names, self.path_length,
+                    self.normalize, mode=mode, flush_interval=self.flush_interval, flush_signal=self.flush_signal,
+                    chunk_size=self.chunk_size, swmr=self.swmr, backend=self.backend, compression=self.compression,
+                    compression_level=self.compression_level)
+            else:
+                self.writer = get_storage_writer(
+                    file_path, self.param_names, self.feature_names, self.objective_names, self.path_length,
+                    self.normalize, backend=self.backend, mode=mode, flush_interval=self.flush_interval,
+                    flush_signal=self.flush_signal, chunk_size=self.chunk_size, swmr=self.swmr,
+                    compression=self.compression, compression_level=self.compression_level)
+        return self.writer
+
+    def flush(self):
+        """
+        Flushes any data saved to the storage file to disk. If saving in a background thread, blocks until all
+        previously saved generations have been written.
+        """
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        """
+        Closes the storage file, if it has been kept open by previous calls to save. If saving in a background thread,
+        blocks until all previously saved generations have been written.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['writer'] = None
+        return state
 
     def save(self, file_path, n=None):
         """
-        Adds data from the most recent n generations to the hdf5 file.
+        Adds data from the most recent n generations to the hdf5 file. The file is kept open between calls, and each
+        generation is appended as rows of resizable tables (see nested.storage). Files written with storage_version 1
+        (one group per generation) continue to be appended to in their original format. Files with the extension of
+        another storage backend (or any file, if a backend was specified) are written by that backend.
+        :param file_path: str
+        :param n: str or int
+        """
+        start_time = time.time()
+        if n != 'all' and (self.writer is None or self.writer.file_path != file_path) and \
+                get_storage_backend(file_path, self.backend) == 'hdf5' and os.path.isfile(file_path):
+            with h5py.File(file_path, 'r') as f:
+                legacy = len(f) > 0 and not is_table_storage(f)
+            if legacy:
+                self.save_legacy(file_path, n)
+                return
+        writer = self.get_writer(file_path, mode='w' if n == 'all' else 'a')
+        if n is None:
+            n = 1
+        elif n == 'all':
+            n = len(self.history)
+        elif not isinstance(n, int):
+            n = 1
+            print('PopulationStorage: defaulting to exporting last generation to file.')
+        gen_index = len(self.history) - n
+        if gen_index < 0:
+            gen_index = 0
+            n = len(self.history)
+            if n != 0:
+                print('PopulationStorage: defaulting to exporting all %i generations to file.' % n)
+        if gen_index < writer.num_generations:
+            print('PopulationStorage: generations %i to %i already exported to file.' %
+                  (gen_index, min(len(self.history), writer.num_generations) - 1))
+        elif gen_index > writer.num_generations:
+            print('PopulationStorage: also exporting %i unsaved generations preceding generation %i to file.' %
+                  (gen_index - writer.num_generations, gen_index))
+        gen_index = writer.num_generations
+
+        j = 0
+        while gen_index < len(self.history):
+            populations = dict(zip(population_categories,
+                                   [self.history[gen_index], self.survivors[gen_index], self.specialists[gen_index],
+                                    self.prev_survivors[gen_index], self.prev_specialists[gen_index],
+                                    self.failed[gen_index]]))
+            attributes = {key: self.attributes[key][gen_index] for key in self.attributes}
+            writer.append_generation(populations, self.count, min_objectives=self.min_objectives[gen_index],
+                                     max_objectives=self.max_objectives[gen_index], attributes=attributes)
+            j += 1
+            gen_index += 1
+
+        if j != 0:
+            print('PopulationStorage: saving %i generations (up to generation %i) to file: %s took %.2f s' %
+                  (j, gen_index - 1, file_path, time.time() - start_time))
+
+    def save_legacy(self, file_path, n=None):
+        """
+        Adds data from the most recent n generations to an hdf5 file with storage_version 1, which contains one group
+        per generation, and one group per stored model.
         :param file_path: str
         :param n: str or int
         """
         start_time = time.time()
+        compression_kwargs = get_compression_kwargs(self.compression, self.compression_level)
         io = 'w' if n == 'all' else 'a'
         with h5py.File(file_path, io) as f:
             if 'param_names' not in f.attrs:
@@ -857,11 +1697,11 @@ class PopulationStorage(object):
                         f[str(gen_index)].create_dataset(
                             'min_objectives',
                             data=[None2nan(val) for val in self.min_objectives[gen_index]],
-                            compression='gzip')
+                            **compression_kwargs)
                         f[str(gen_index)].create_dataset(
                             'max_objectives',
                             data=[None2nan(val) for val in self.max_objectives[gen_index]],
-                            compression='gzip')
+                            **compression_kwargs)
                     for group_name, population in \
                             zip(['population', 'survivors', 'specialists', 'prev_survivors', 'prev_specialists',
                                  'failed'],
@@ -873,7 +1713,7 @@ class PopulationStorage(object):
                             f[str(gen_index)][group_name].create_group(str(i))
                             f[str(gen_index)][group_name][str(i)].attrs['id'] = None2nan(individual.model_id)
                             f[str(gen_index)][group_name][str(i)].create_dataset(
-                                'x', data=[None2nan(val) for val in individual.x], compression='gzip')
+                                'x', data=[None2nan(val) for val in individual.x], **compression_kwargs)
                             if group_name != 'failed':
                                 f[str(gen_index)][group_name][str(i)].attrs['energy'] = None2nan(individual.energy)
                                 f[str(gen_index)][group_name][str(i)].attrs['rank'] = None2nan(individual.rank)
@@ -886,16 +1726,16 @@ class PopulationStorage(object):
                                 if individual.features is not None:
                                     f[str(gen_index)][group_name][str(i)].create_dataset(
                                         'features', data=[None2nan(val) for val in individual.features],
-                                        compression='gzip')
+                                        **compression_kwargs)
                                 if individual.objectives is not None:
                                     f[str(gen_index)][group_name][str(i)].create_dataset(
                                         'objectives', data=[None2nan(val) for val in individual.objectives],
-                                        compression='gzip')
+                                        **compression_kwargs)
                                 if individual.normalized_objectives is not None:
                                     f[str(gen_index)][group_name][str(i)].create_dataset(
                                         'normalized_objectives',
                                         data=[None2nan(val) for val in individual.normalized_objectives],
-                                        compression='gzip')
+                                        **compression_kwargs)
                 n -= 1
                 gen_index += 1
 
@@ -903,13 +1743,16 @@ class PopulationStorage(object):
             print('PopulationStorage: saving %i generations (up to generation %i) to file: %s took %.2f s' %
                   (j, gen_index - 1, file_path, time.time() - start_time))
 
-    def load(self, file_path):
+    def load(self, file_path, lazy=False, swmr=False):
         """
-
+        Files with storage_version 1 are always loaded in full. The file is read by its storage backend (see
+        nested.storage.get_storage_backend).
         :param file_path: str
+        :param lazy: bool; only read each stored generation when it is accessed
+        :param swmr: bool; open the file in SWMR mode, so that it can be read while it is being written
         """
         start_time = time.time()
-        if not os.path.isfile(file_path):
+        if not storage_file_exists(file_path, self.backend):
             raise IOError('PopulationStorage: invalid file path: %s' % file_path)
         self.history = []  # a list of populations, each corresponding to one generation
         self.survivors = []  # a list of populations (some may be empty)
@@ -920,83 +1763,281 @@ class PopulationStorage(object):
         self.min_objectives = []  # list of array of float
         self.max_objectives = []  # list of array of float
         self.attributes = {}  # a dict containing lists of user specified attributes
-        with h5py.File(file_path, 'r') as f:
-            self.param_names = list(get_h5py_attr(f.attrs, 'param_names'))
-            self.feature_names = list(get_h5py_attr(f.attrs, 'feature_names'))
-            self.objective_names = list(get_h5py_attr(f.attrs, 'objective_names'))
-            self.path_length = int(f.attrs['path_length'])
-            self.normalize = get_h5py_attr(f.attrs, 'normalize')
-            if 'user_attribute_names' in f.attrs and len(f.attrs['user_attribute_names']) > 0:
-                for key in get_h5py_attr(f.attrs, 'user_attribute_names'):
-                    self.attributes[key] = []
-
-            for gen_index in range(len(f)):
-                for key in self.attributes:
-                    if key in f[str(gen_index)].attrs:
-                        self.attributes[key].append(get_h5py_attr(f[str(gen_index)].attrs, key))
-                self.count = int(f[str(gen_index)].attrs['count'])
-                if 'min_objectives' in f[str(gen_index)]:
-                    self.min_objectives.append(f[str(gen_index)]['min_objectives'][:])
-                else:
-                    self.min_objectives.append([])
-                if 'max_objectives' in f[str(gen_index)]:
-                    self.max_objectives.append(f[str(gen_index)]['max_objectives'][:])
-                else:
-                    self.max_objectives.append([])
-                history, survivors, specialists, prev_survivors, prev_specialists, failed = [], [], [], [], [], []
-                for group_name, population in \
-                        zip(['population', 'survivors', 'specialists', 'prev_survivors', 'prev_specialists', 'failed'],
-                            [history, survivors, specialists, prev_survivors, prev_specialists, failed]):
-                    if group_name not in f[str(gen_index)].keys():
-                        continue
-                    group = f[str(gen_index)][group_name]
-                    for i in range(len(group)):
-                        indiv_data = group[str(i)]
-                        model_id = nan2None(indiv_data.attrs['id'])
-                        individual = Individual(indiv_data['x'][:], model_id=model_id)
-                        if group_name != 'failed':
-                            if 'features' in indiv_data:
-                                individual.features = indiv_data['features'][:]
-                            if 'objectives' in indiv_data:
-                                individual.objectives = indiv_data['objectives'][:]
-                            if 'normalized_objectives' in indiv_data:
-                                individual.normalized_objectives = indiv_data['normalized_objectives'][:]
-                            individual.energy = nan2None(indiv_data.attrs.get('energy', np.nan))
-                            individual.rank = nan2None(indiv_data.attrs.get('rank', np.nan))
-                            individual.distance = nan2None(indiv_data.attrs.get('distance', np.nan))
-                            individual.fitness = nan2None(indiv_data.attrs.get('fitness', np.nan))
-                            individual.survivor = nan2None(indiv_data.attrs.get('survivor', np.nan))
-                        population.append(individual)
-                self.history.append(history)
-                self.survivors.append(survivors)
-                self.specialists.append(specialists)
-                self.prev_survivors.append(prev_survivors)
-                self.prev_specialists.append(prev_specialists)
-                self.failed.append(failed)
+        self.count = 0
+        with open_storage_reader(file_path, self.backend, swmr) as reader:
+            metadata = reader.read_metadata()
+            self.param_names = list(metadata['param_names'])
+            self.feature_names = list(metadata['feature_names'])
+            self.objective_names = list(metadata['objective_names'])
+            self.path_length = int(metadata['path_length'])
+            self.normalize = metadata['normalize']
+            for key in metadata['user_attribute_names']:
+                self.attributes[key] = []
+            self.lazy = lazy and reader.is_table_storage()
+            if reader.is_table_storage():
+                if self.lazy:
+                    widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+                    for category, attr in viewitems(self.category_attrs):
+                        setattr(self, attr, LazyGenerationList(file_path, category, [], widths,
+                                                               columns_to_population, swmr=swmr,
+                                                               backend=self.backend))
+                self.load_tables(reader)
+            else:
+                self.load_legacy(reader.file)
+        self._num_loaded = len(self.history)
         print('PopulationStorage: loading %i generations from file: %s took %.2f s' %
               (len(self.history), file_path, time.time() - start_time))
 
-    def global_rerank(self, storage_file_path=None, num_survivors=None):
-        print("Running...")
-        sys.stdout.flush()
-        entire_history = []
-        for hist in self.history:
-            entire_history += hist
-        if num_survivors is None: num_survivors = len(self.survivors[-1])
-
-        assign_fitness_by_dominance(entire_history )
-        assign_normalized_objectives(entire_history)
-        assign_relative_energy(entire_history)
-        assign_rank_by_fitness_and_energy(entire_history)
-        specialists = get_specialists(entire_history)
-        best = select_survivors_by_rank(entire_history, num_survivors=num_survivors)
-
-        # delete specialists and survivors in the last generation
-        self.survivors[-1] = best
-        self.specialists[-1] = specialists
+    def load_tables(self, reader, start=0):
+        """
+        Loads the history stored in a file with storage_version >= 2, which contains one table per category.
+        Only generations from start onwards are loaded, and appended to the generations already loaded. If the lists of
+        generations are instances of :class:'LazyGenerationList', only the bounds of the new generations are read.
+        :param reader: :class:'StorageReader'
+        :param start: int; first generation to load
+        :return: int; number of generations loaded
+        """
+        num_gen = reader.get_num_generations()
+        if num_gen <= start:
+            return 0
+        self.count = int(reader.read_generation_values('count', num_gen - 1, num_gen)[0])
+        for key, target in zip(['min_objectives', 'max_objectives'], [self.min_objectives, self.max_objectives]):
+            data = reader.read_generation_values(key, start, num_gen)
+            for row in data:
+                target.append([] if np.all(np.isnan(row)) else row)
+        attribute_values = reader.read_generation_attribute_values(start, num_gen)
+        for key in attribute_values:
+            if key not in self.attributes:
+                self.attributes[key] = [None] * start
+        for key in self.attributes:
+            self.attributes[key].extend(attribute_values.get(key, [None] * (num_gen - start)))
+        widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+        for category, attr in viewitems(self.category_attrs):
+            bounds = reader.read_generation_bounds(category, start, num_gen)
+            target = getattr(self, attr)
+            if isinstance(target, LazyGenerationList):
+                target.extend_stored(bounds)
+                continue
+            population = columns_to_population(reader.read_category_rows(category, bounds[0, 0], bounds[-1, 1]),
+                                               category, widths)
+            for row_start, row_stop in bounds - bounds[0, 0]:
+                target.append(population[row_start:row_stop].freeze())
+        return num_gen - start
+
+    def refresh(self):
+        """
+        Loads any generations that have been appended to the storage file since it was loaded, e.g. by an optimization
+        that is still running and writing in SWMR mode (see follow). Generations that were already loaded are not read
+        again.
+        :return: int; number of new generations
+        """
+        if self.file_path is None or not self.follow:
+            raise RuntimeError('PopulationStorage: refresh: storage must be loaded from a file_path with follow=True')
+        start = len(self.history)
+        if self.writer is not None or start != self._num_loaded:
+            raise RuntimeError('PopulationStorage: refresh: cannot refresh storage that has been appended to')
+        with open_storage_reader(self.file_path, self.backend, swmr=True) as reader:
+            if not reader.is_table_storage():
+                return 0
+            num_new = self.load_tables(reader, start=start)
+        if num_new == 0:
+            return 0
+        self._num_loaded += num_new
+        new_models = int(np.sum(self.get_generation_sizes('population')[start:]))
+        if self._summed_obj is not None:
+            new_summed_obj = np.zeros((new_models,))
+            counter = 0
+            for gen_start, gen_stop, block in self.iter_generations(['objectives'], ['population'],
+                                                                    chunk=self.path_length, start=start):
+                this_summed_obj = np.sum(np.abs(block['population']['objectives']), axis=1)
+                new_summed_obj[counter:counter + len(this_summed_obj)] = this_summed_obj
+                counter += len(this_summed_obj)
+            self._summed_obj = np.append(self._summed_obj, new_summed_obj)
+        self.total_models += new_models
+        self.best_model = self.survivors[-1][0] if self.survivors and self.survivors[-1] else None
+        return num_new
+
+    def preload(self, n=None):
+        """
+        When loaded lazily, reads the last n stored generations of each category into memory, with a single read per
+        category. This is all that is needed to resume an optimization (see PopulationAnnealing), while earlier
+        generations remain on disk until they are accessed (e.g. by global_rerank, or for plotting).
+        :param n: int; default is path_length
+        """
+        if n is None:
+            n = self.path_length
+        for attr in viewvalues(self.category_attrs):
+            populations = getattr(self, attr)
+            if isinstance(populations, LazyGenerationList):
+                populations.preload(populations.num_stored - int(n))
+
+    def load_legacy(self, f):
+        """
+        Loads the history stored in an hdf5 file with storage_version 1, which contains one group per generation, and
+        one group per stored model.
+        :param f: :class:'h5py.File'
+        """
+        widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+        for gen_index in range(len(f)):
+            for key in self.attributes:
+                if key in f[str(gen_index)].attrs:
+                    self.attributes[key].append(get_h5py_attr(f[str(gen_index)].attrs, key))
+            self.count = int(f[str(gen_index)].attrs['count'])
+            if 'min_objectives' in f[str(gen_index)]:
+                self.min_objectives.append(f[str(gen_index)]['min_objectives'][:])
+            else:
+                self.min_objectives.append([])
+            if 'max_objectives' in f[str(gen_index)]:
+                self.max_objectives.append(f[str(gen_index)]['max_objectives'][:])
+            else:
+                self.max_objectives.append([])
+            history, survivors, specialists, prev_survivors, prev_specialists, failed = [], [], [], [], [], []
+            for group_name, population in \
+                    zip(['population', 'survivors', 'specialists', 'prev_survivors', 'prev_specialists', 'failed'],
+                        [history, survivors, specialists, prev_survivors, prev_specialists, failed]):
+                if group_name not in f[str(gen_index)].keys():
+                    continue
+                group = f[str(gen_index)][group_name]
+                for i in range(len(group)):
+                    indiv_data = group[str(i)]
+                    model_id = nan2None(indiv_data.attrs['id'])
+                    individual = Individual(indiv_data['x'][:], model_id=model_id)
+                    if group_name != 'failed':
+                        if 'features' in indiv_data:
+                            individual.features = indiv_data['features'][:]
+                        if 'objectives' in indiv_data:
+                            individual.objectives = indiv_data['objectives'][:]
+                        if 'normalized_objectives' in indiv_data:
+                            individual.normalized_objectives = indiv_data['normalized_objectives'][:]
+                        individual.energy = nan2None(indiv_data.attrs.get('energy', np.nan))
+                        individual.rank = nan2None(indiv_data.attrs.get('rank', np.nan))
+                        individual.distance = nan2None(indiv_data.attrs.get('distance', np.nan))
+                        individual.fitness = nan2None(indiv_data.attrs.get('fitness', np.nan))
+                        individual.survivor = nan2None(indiv_data.attrs.get('survivor', np.nan))
+                    population.append(individual)
+            for target, population in zip([self.history, self.survivors, self.specialists, self.prev_survivors,
+                                           self.prev_specialists, self.failed],
+                                          [history, survivors, specialists, prev_survivors, prev_specialists, failed]):
+                target.append(PopulationArray.from_population(population, widths).freeze())
+
+    def update_generations(self, source, generations, columns=None):
+        """
+        Stored populations are frozen. Replaces each of the specified stored populations with a copy in which the
+        specified columns are updated from the source population (by model_id). Unmodified columns are shared.
+        :param source: :class:'PopulationArray'
+        :param generations: list of tuple; (category, generation index), e.g. ('history', -1)
+        :param columns: list of str; default is PopulationArray.ranking_columns
+        """
+        for category, index in generations:
+            populations = getattr(self, category)
+            populations[index] = populations[index].updated_from(source, columns)
+
+    def global_rerank(self, storage_file_path=None, num_survivors=None, disp=True, epsilon=None,
+                      constraint_names=None):
+        """
+        Ranks all models in the history of all generations together, as if they were candidates for selection in a
+        single iteration, and replaces the survivors and specialists of the last generation with the best ranked models.
+        Only the objectives of the entire history are held in memory at once; they are streamed from file when loaded
+        lazily (see get_history_matrix), and non-dominated fronts are computed without comparing every pair of models
+        (see get_fitness_by_dominance). The ranking attributes of each generation are then updated one generation at a
+        time. If storage_file_path is specified, the entire reranked history is written to that file. If it is the
+        file that this storage was loaded from, the file is rewritten to a temporary file that then replaces it.
+        With epsilon, the models of the entire history are reduced to the occupied boxes of an epsilon grid in
+        normalized objective space before the non-dominated sort, so fronts are only computed between boxes, and
+        survivors are selected from one representative model per box first (see get_epsilon_box_ranking).
+        :param storage_file_path: str (path)
+        :param num_survivors: int; default is the number of survivors of the last generation
+        :param disp: bool
+        :param epsilon: float or list of float; size of the boxes in each normalized objective
+        :param constraint_names: list of str; features that contain constraint values. Infeasible models are ranked
+            after all feasible models, and are not selected as specialists (see get_constrained_ranking)
+        """
+        start_time = time.time()
+        if len(self.history) == 0:
+            raise RuntimeError('PopulationStorage: global_rerank: no generations have been stored')
+        if num_survivors is None:
+            num_survivors = len(self.survivors[-1])
+        objectives = self.get_history_matrix('objectives')
+        if np.any(np.isnan(objectives)):
+            raise RuntimeError('PopulationStorage: global_rerank: objectives have not been stored for all models in '
+                               'the population history')
+        constraint_indexes = get_constraint_indexes(self.feature_names, constraint_names)
+        if constraint_indexes:
+            violation = get_constraint_violation(self.get_history_matrix('features')[:, constraint_indexes])
+        else:
+            violation = np.zeros(len(objectives))
+        min_objectives, max_objectives = get_feasible_objectives_edges(objectives, violation)
+        if epsilon is None:
+            fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+                get_constrained_ranking(objectives, violation, min_objectives, max_objectives)
+        else:
+            fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+                get_constrained_ranking(objectives, violation, min_objectives, max_objectives,
+                                        get_epsilon_box_ranking, epsilon=epsilon)
+        indexes = np.argsort(rank_vals)
+        if disp:
+            print('PopulationStorage: global_rerank: ranking %i models in %i non-dominated fronts took %.2f s' %
+                  (len(objectives), int(np.max(fitness_vals)) + 1, time.time() - start_time))
+            sys.stdout.flush()
+
+        survivor_indexes = indexes[:num_survivors]
+        feasible_indexes = np.flatnonzero(violation <= 0.)
+        if len(feasible_indexes) in [0, len(objectives)]:
+            specialist_indexes = get_specialist_indexes(objectives, energy_vals)
+        else:
+            specialist_indexes = feasible_indexes[get_specialist_indexes(objectives[feasible_indexes],
+                                                                         energy_vals[feasible_indexes])]
+        selected_indexes = np.union1d(survivor_indexes, specialist_indexes)
+        selected = dict()
+        gen_start = 0
+        chunk = max(1, self.path_length)
+        for gen_index, size in enumerate(self.get_generation_sizes('population')):
+            gen_stop = gen_start + size
+            if isinstance(self.history, LazyGenerationList) and gen_index % chunk == 0:
+                self.history.preload(gen_index, gen_index + chunk)
+            population = self.history[gen_index]
+            if size > 0:
+                self.history[gen_index] = population.replace(
+                    {'fitness': fitness_vals[gen_start:gen_stop],
+                     'normalized_objectives': normalized_objectives[gen_start:gen_stop],
+                     'energy': energy_vals[gen_start:gen_stop], 'rank': rank_vals[gen_start:gen_stop]})
+                this_selected = selected_indexes[(selected_indexes >= gen_start) & (selected_indexes < gen_stop)]
+                for index in this_selected:
+                    selected[index] = self.history[gen_index].take([index - gen_start])
+            gen_start = gen_stop
+        self.survivors[-1] = PopulationArray.concatenate([selected[index] for index in survivor_indexes],
+                                                         self.history[-1].widths).freeze()
+        self.specialists[-1] = PopulationArray.concatenate([selected[index] for index in specialist_indexes],
+                                                           self.history[-1].widths).freeze()
 
         if storage_file_path is not None:
-            self.save(storage_file_path)
+            self.save_all(storage_file_path)
+        if disp:
+            print('PopulationStorage: global_rerank: selecting %i survivors and %i specialists from %i generations '
+                  'took %.2f s' % (len(self.survivors[-1]), len(self.specialists[-1]), len(self.history),
+                                   time.time() - start_time))
+            sys.stdout.flush()
+
+    def save_all(self, file_path):
+        """
+        Writes all generations to a new storage file, replacing any existing file. If this storage was loaded from the
+        same file, or is currently saving to it, the generations are first written to a temporary file, which then
+        replaces the original file. Storage that was loaded from the file is then reloaded from it.
+        :param file_path: str (path)
+        """
+        loaded = self.file_path is not None and is_same_storage_file(self.file_path, file_path, self.backend)
+        saving = self.writer is not None and is_same_storage_file(self.writer.file_path, file_path, self.backend)
+        if not loaded and not saving:
+            self.save(file_path, n='all')
+            self.close()
+            return
+        self.close()
+        temp_file_path = get_temp_storage_file_path(file_path, 'rewrite')
+        self.save(temp_file_path, n='all')
+        self.close()
+        replace_storage_file(temp_file_path, file_path, self.backend)
+        if loaded:
+            self.load(file_path, lazy=self.lazy, swmr=self.follow)
 
 
 class RelativeBoundedStep(object):
@@ -1348,34 +2389,582 @@ class RelativeBoundedStep(object):
         return True
 
 
-class PopulationAnnealing(object):
+def get_constrained_feature_names(feature_names, constraint_names=None):
     """
-    This class is inspired by scipy.optimize.basinhopping. It provides a generator interface to produce a list of
-    parameter arrays intended for parallel evaluation. Features multi-objective metrics for selection and adaptive
-    reduction of step_size (or temperature) every iteration. During each iteration, each individual in the population
-    takes path_length number of independent steps within the specified bounds, then individuals are selected to seed the
-    population for the next iteration.
+    The values of constraints are stored as features, so that they are available when candidates from previous
+    generations are ranked. Returns the names of the features to store.
+    :param feature_names: list of str
+    :param constraint_names: list of str
+    :return: list of str
     """
+    feature_names = list(feature_names)
+    if constraint_names:
+        feature_names.extend([name for name in constraint_names if name not in feature_names])
+    return feature_names
 
-    def __init__(self, param_names=None, feature_names=None, objective_names=None, pop_size=1, x0=None, bounds=None,
-                 rel_bounds=None, wrap_bounds=False, take_step=None, evaluate=None, select=None, seed=None,
-                 normalize='global', max_iter=50, path_length=3, initial_step_size=0.5, adaptive_step_factor=0.9,
-                 survival_rate=0.2, diversity_rate=0.05, fitness_range=2, disp=False, hot_start=False,
-                 storage_file_path=None, specialists_survive=True, **kwargs):
+
+def get_constraint_indexes(feature_names, constraint_names=None):
+    """
+
+    :param feature_names: list of str
+    :param constraint_names: list of str
+    :return: list of int
+    """
+    if not constraint_names:
+        return []
+    missing = [name for name in constraint_names if name not in feature_names]
+    if missing:
+        raise ValueError('get_constraint_indexes: constraints are not stored as features: %s' % ', '.join(missing))
+    return [list(feature_names).index(name) for name in constraint_names]
+
+
+def get_constrained_features(feature_dict, objective_dict, constraint_names=None):
+    """
+    The values of constraints can be computed as features, or returned by get_objectives along with objectives.
+    Returns a dict of features that includes any constraint values returned with objectives.
+    :param feature_dict: dict
+    :param objective_dict: dict
+    :param constraint_names: list of str
+    :return: dict
+    """
+    if not constraint_names:
+        return feature_dict
+    feature_dict = dict(feature_dict)
+    for name in constraint_names:
+        if name in objective_dict:
+            feature_dict[name] = objective_dict[name]
+    return feature_dict
+
+
+def get_population_violation(population, constraint_indexes):
+    """
+    Returns the total constraint violation of each member of a population (see get_constraint_violation).
+    :param population: :class:'PopulationArray'
+    :param constraint_indexes: list of int; columns of features that contain constraint values
+    :return: array of float
+    """
+    if len(constraint_indexes) == 0 or len(population) == 0:
+        return np.zeros(len(population))
+    features, missing = get_population_values(population, 'features')
+    return get_constraint_violation(features[:, constraint_indexes])
+
+
+def get_feasible_population(population, violation):
+    """
+    Returns the feasible members of a population, or the entire population if all or none of its members are
+    feasible.
+    :param population: :class:'PopulationArray'
+    :param violation: array of float
+    :return: :class:'PopulationArray'
+    """
+    feasible = violation <= 0.
+    if np.all(feasible) or not np.any(feasible):
+        return population
+    return population.take(np.flatnonzero(feasible))
+
+
+class EnergyStall(object):
+    """
+    Termination criterion for use with PopulationAnnealing. Stops when the lowest energy of the candidates of each
+    iteration has not improved by more than tol over the last num_iter iterations. Since the edges used to normalize
+    objectives can change between iterations, the best objectives of each iteration are stored, and their energies are
+    recomputed with the current edges. Iterations are counted from the most recent start or hot start.
+    """
+
+    def __init__(self, num_iter=5, tol=1.e-3, **kwargs):
         """
-        :param param_names: list of str
-        :param feature_names: list of str
-        :param objective_names: list of str
-        :param pop_size: int
-        :param x0: array
-        :param bounds: list of tuple of float
-        :param rel_bounds: list of list
-        :param wrap_bounds: bool
-        :param take_step: callable
-        :param evaluate: str or callable
-        :param select: str or callable
-        :param seed: int or :class:'np.random.RandomState'
-        :param normalize: str; 'global': normalize over entire history, 'local': normalize per iteration
+
+        :param num_iter: int
+        :param tol: float; improvement in energy (the sum of objectives normalized to [0, 1])
+        """
+        self.num_iter = int(num_iter)
+        self.tol = float(tol)
+        self.best_objectives = []
+
+    def __call__(self, generator, candidates):
+        """
+
+        :param generator: :class:'PopulationAnnealing'
+        :param candidates: :class:'PopulationArray'
+        :return: str or None; reason for stopping
+        """
+        energy_vals, missing = get_population_values(candidates, 'energy')
+        objectives, missing = get_population_values(candidates, 'objectives')
+        self.best_objectives.append(objectives[np.argmin(energy_vals)])
+        if len(self.best_objectives) <= self.num_iter:
+            return None
+        energy_vals = np.sum(get_normalized_objectives(np.array(self.best_objectives), generator.min_objectives,
+                                                       generator.max_objectives).astype('float64'), axis=1)
+        if np.min(energy_vals[-self.num_iter:]) > np.min(energy_vals[:-self.num_iter]) - self.tol:
+            return 'energy did not improve by more than %.3E in %i iterations' % (self.tol, self.num_iter)
+        return None
+
+
+class HypervolumeStall(object):
+    """
+    Termination criterion for use with PopulationAnnealing. Stops when the hypervolume of the non-dominated models has
+    not improved by more than a relative tolerance over the last num_iter iterations. Enables track_hypervolume, unless
+    there are more than hypervolume_max_tracked_objectives objectives, and reads the 'hypervolume' attribute of stored
+    generations, so iterations before a hot start are included.
+    """
+    track_hypervolume = True
+
+    def __init__(self, num_iter=5, tol=1.e-3, **kwargs):
+        """
+
+        :param num_iter: int
+        :param tol: float; improvement relative to the hypervolume num_iter iterations ago
+        """
+        self.num_iter = int(num_iter)
+        self.tol = float(tol)
+
+    def __call__(self, generator, candidates):
+        """
+
+        :param generator: :class:'PopulationAnnealing'
+        :param candidates: :class:'PopulationArray'
+        :return: str or None; reason for stopping
+        """
+        hypervolume = [val for val in generator.storage.attributes.get('hypervolume', [])
+                       if val is not None and not np.isnan(val)]
+        if len(hypervolume) <= self.num_iter:
+            return None
+        prev_hypervolume = hypervolume[-self.num_iter - 1]
+        if hypervolume[-1] - prev_hypervolume <= self.tol * abs(prev_hypervolume):
+            return 'hypervolume did not improve by more than %.3E in %i iterations' % (self.tol, self.num_iter)
+        return None
+
+
+class MinStepSize(object):
+    """
+    Termination criterion for use with PopulationAnnealing. Stops when the step size of the next iteration would be
+    below min_step_size.
+    """
+
+    def __init__(self, min_step_size=1.e-3, **kwargs):
+        """
+
+        :param min_step_size: float
+        """
+        self.min_step_size = float(min_step_size)
+
+    def __call__(self, generator, candidates):
+        """
+
+        :param generator: :class:'PopulationAnnealing'
+        :param candidates: :class:'PopulationArray'
+        :return: str or None; reason for stopping
+        """
+        step_size = generator.take_step.stepsize * generator.adaptive_step_factor
+        if step_size < self.min_step_size:
+            return 'step size %.3E is below %.3E' % (step_size, self.min_step_size)
+        return None
+
+
+class TimeBudget(object):
+    """
+    Termination criterion for use with PopulationAnnealing. Stops when another iteration, taking as long as the
+    slowest iteration so far, would exceed a budget of wall-clock time, or of core-hours (wall-clock hours multiplied by
+    num_cores). Time is counted from the most recent start or hot start.
+    """
+
+    def __init__(self, max_time=None, max_core_hours=None, num_cores=None, **kwargs):
+        """
+
+        :param max_time: float; wall-clock time in s
+        :param max_core_hours: float
+        :param num_cores: int; default is the num_cores of the generator
+        """
+        if max_time is None and max_core_hours is None:
+            raise ValueError('TimeBudget: either max_time or max_core_hours must be specified')
+        self.max_time = None if max_time is None else float(max_time)
+        self.max_core_hours = None if max_core_hours is None else float(max_core_hours)
+        self.num_cores = num_cores
+        self.prev_time = None
+        self.max_iter_time = 0.
+
+    def __call__(self, generator, candidates):
+        """
+
+        :param generator: :class:'PopulationAnnealing'
+        :param candidates: :class:'PopulationArray'
+        :return: str or None; reason for stopping
+        """
+        current_time = time.time()
+        prev_time = generator.start_time if self.prev_time is None else self.prev_time
+        self.max_iter_time = max(self.max_iter_time, current_time - prev_time)
+        self.prev_time = current_time
+        elapsed = current_time - generator.start_time
+        if self.max_time is not None and elapsed + self.max_iter_time > self.max_time:
+            return 'time budget of %.2f s would be exceeded (%.2f s elapsed)' % (self.max_time, elapsed)
+        if self.max_core_hours is not None:
+            num_cores = generator.num_cores if self.num_cores is None else int(self.num_cores)
+            core_hours = elapsed * num_cores / 3600.
+            if core_hours + self.max_iter_time * num_cores / 3600. > self.max_core_hours:
+                return 'budget of %.2f core-hours would be exceeded (%.2f core-hours elapsed)' % \
+                       (self.max_core_hours, core_hours)
+        return None
+
+
+def get_termination_criteria(termination):
+    """
+    Termination criteria can be specified as a callable, or the name of a callable in this module (e.g. EnergyStall,
+    HypervolumeStall, MinStepSize, or TimeBudget), or a dict that maps names to dicts of kwargs (e.g. from a .yaml
+    config file), or a list of any of these. Each criterion is called with the generator and the evaluated candidates
+    at the end of each iteration, and returns the reason for stopping, or None. Classes are instantiated.
+    :param termination: callable, str, dict, or list
+    :return: list of callable
+    """
+    if termination is None:
+        return []
+    if isinstance(termination, dict):
+        return [get_termination_criterion(name, kwargs) for name, kwargs in viewitems(termination)]
+    if isinstance(termination, (list, tuple)):
+        criteria = []
+        for item in termination:
+            criteria.extend(get_termination_criteria(item))
+        return criteria
+    return [get_termination_criterion(termination)]
+
+
+def get_termination_criterion(criterion, kwargs=None):
+    """
+
+    :param criterion: callable or str
+    :param kwargs: dict
+    :return: callable
+    """
+    if kwargs is None:
+        kwargs = {}
+    if isinstance(criterion, basestring):
+        if criterion not in globals() or not isinstance(globals()[criterion], collections.Callable):
+            raise ValueError('get_termination_criterion: termination criterion: %s not found' % criterion)
+        criterion = globals()[criterion]
+    elif not isinstance(criterion, collections.Callable):
+        raise TypeError('get_termination_criterion: termination criterion: %s is not callable' % str(criterion))
+    if isinstance(criterion, type):
+        criterion = criterion(**kwargs)
+    elif kwargs:
+        raise ValueError('get_termination_criterion: kwargs can only be provided to a class of termination criterion')
+    return criterion
+
+
+class ParetoArchive(object):
+    """
+    Maintains the non-dominated set of all models added to it, so that it does not need to be recomputed from the
+    entire history. Models are added with their objective values, and are removed as soon as another model dominates
+    them. Models with objective values equal to those of an archived model are not added.
+    The objective values and model_ids of archived models are kept in contiguous arrays, which grow by doubling, and
+    from which a removed model is deleted by moving the last archived model into its row.
+    With 2 objectives, the archive is also kept as a front sorted by the first objective, so that each model is added
+    or removed in O(log N) time. Otherwise, each added model is compared with all archived models at once.
+    The size of the archive can be bounded either by epsilon-dominance, which keeps at most one model per box of
+    size epsilon in objective space, or by max_size, which removes the archived models with the lowest crowding
+    distance (see get_crowding_distance).
+    """
+
+    def __init__(self, num_objectives, max_size=None, epsilon=None, capacity=64):
+        """
+
+        :param num_objectives: int
+        :param max_size: int
+        :param epsilon: float or array of float; size of the boxes in each objective
+        :param capacity: int; initial number of rows of the archive arrays
+        """
+        self.num_objectives = int(num_objectives)
+        if self.num_objectives < 1:
+            raise ValueError('ParetoArchive: invalid num_objectives: %s' % str(num_objectives))
+        self.max_size = None if max_size is None else int(max_size)
+        if epsilon is None:
+            self.epsilon = None
+        else:
+            self.epsilon = np.broadcast_to(np.asarray(epsilon, dtype='float64'), (self.num_objectives,)).copy()
+            if np.any(self.epsilon <= 0.):
+                raise ValueError('ParetoArchive: epsilon must be positive: %s' % str(epsilon))
+        # with 2 objectives and no boxes, the archive is also kept as a sorted front
+        self.sorted_front = self.num_objectives == 2 and self.epsilon is None
+        capacity = max(1, int(capacity))
+        self.size = 0
+        self.objectives = np.empty((capacity, self.num_objectives))
+        self.model_ids = np.empty(capacity, dtype='int64')
+        # with epsilon, the box that contains each archived model
+        self.keys = None if self.epsilon is None else np.empty((capacity, self.num_objectives))
+        self.rows = dict()  # model_id: row of the archive arrays
+        self.front = ([], [], [])  # sorted front: first objective, second objective, model_id
+        self.specialists = None
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, model_id):
+        return model_id in self.rows
+
+    def get_model_ids(self):
+        """
+        Returns the model_ids of the archived models, sorted by the first objective for a sorted front.
+        :return: array of int
+        """
+        if self.sorted_front:
+            return np.array(self.front[2], dtype='int64')
+        return self.model_ids[:self.size].copy()
+
+    def get_objectives(self):
+        """
+        Returns the objective values of the archived models, in the same order as get_model_ids.
+        :return: 2d array
+        """
+        if self.sorted_front:
+            return np.column_stack((self.front[0], self.front[1])).reshape(-1, 2)
+        return self.objectives[:self.size].copy()
+
+    def get_archived(self, model_ids):
+        """
+        Returns a boolean mask of the specified models that are currently archived.
+        :param model_ids: array of int
+        :return: array of bool
+        """
+        return np.array([int(model_id) in self.rows for model_id in model_ids], dtype=bool)
+
+    def get_specialists(self):
+        """
+        For each objective, returns the model_id of the archived model with the lowest value.
+        :return: array of int
+        """
+        if len(self) == 0:
+            return np.array([], dtype='int64')
+        if self.sorted_front:
+            return np.array([self.front[2][0], self.front[2][-1]], dtype='int64')
+        if self.specialists is None:
+            # rows are not kept in the order in which models were added, so ties are broken by model_id
+            objectives = self.objectives[:self.size]
+            model_ids = self.model_ids[:self.size]
+            self.specialists = np.array([np.min(model_ids[objectives[:, m] == np.min(objectives[:, m])])
+                                         for m in range(self.num_objectives)], dtype='int64')
+        return np.array(self.specialists, dtype='int64')
+
+    def append(self, objectives, model_id):
+        """
+        Adds a row to the archive arrays.
+        :param objectives: array of float
+        :param model_id: int
+        """
+        if self.size == len(self.model_ids):
+            capacity = 2 * len(self.model_ids)
+            self.objectives = np.resize(self.objectives, (capacity, self.num_objectives))
+            self.model_ids = np.resize(self.model_ids, capacity)
+            if self.keys is not None:
+                self.keys = np.resize(self.keys, (capacity, self.num_objectives))
+        self.objectives[self.size] = objectives
+        self.model_ids[self.size] = model_id
+        if self.keys is not None:
+            self.keys[self.size] = np.floor(self.objectives[self.size] / self.epsilon)
+        self.rows[model_id] = self.size
+        self.size += 1
+
+    def delete(self, model_id):
+        """
+        Removes a row from the archive arrays by moving the last row into its place.
+        :param model_id: int
+        :return: array of float; objective values of the removed model
+        """
+        row = self.rows.pop(model_id)
+        objectives = self.objectives[row].copy()
+        last = self.size - 1
+        if row != last:
+            self.objectives[row] = self.objectives[last]
+            self.model_ids[row] = self.model_ids[last]
+            if self.keys is not None:
+                self.keys[row] = self.keys[last]
+            self.rows[int(self.model_ids[row])] = row
+        self.size = last
+        return objectives
+
+    def add(self, objectives, model_ids):
+        """
+        Adds models to the archive, in order, and removes any archived models that they dominate. Returns a boolean
+        mask of the models that were added. Without epsilon, models that are dominated by another model of the same
+        batch are never added, and a batch that is at least as large as the archive is merged with it at once (see
+        merge). With max_size, models can be removed again when the archive is pruned.
+        :param objectives: 2d array
+        :param model_ids: array of int
+        :return: array of bool
+        """
+        objectives = np.asarray(objectives, dtype='float64').reshape(-1, self.num_objectives)
+        model_ids = np.asarray(model_ids, dtype='int64').reshape(-1)
+        for model_id in model_ids.tolist():
+            if model_id in self.rows:
+                raise ValueError('ParetoArchive: add: model_id: %i has already been archived' % model_id)
+        added = np.zeros(len(objectives), dtype=bool)
+        # get_fitness_by_dominance does not rank a single objective
+        by_dominance = self.epsilon is None and not self.sorted_front and self.num_objectives > 1
+        if by_dominance and len(objectives) > 1:
+            indexes = np.flatnonzero(get_fitness_by_dominance(objectives) == 0)
+        else:
+            indexes = np.arange(len(objectives))
+        if by_dominance and len(indexes) > 1 and len(indexes) >= len(self):
+            added[indexes] = self.merge(objectives[indexes], model_ids[indexes])
+        else:
+            for i in indexes.tolist():
+                if self.sorted_front:
+                    added[i] = self.add_to_sorted_front(objectives[i], int(model_ids[i]))
+                else:
+                    added[i] = self.add_to_set(objectives[i], int(model_ids[i]))
+        if self.max_size is not None and len(self) > self.max_size:
+            self.prune(len(self) - self.max_size)
+        return added
+
+    def merge(self, objectives, model_ids):
+        """
+        Adds a batch of models with one non-dominated sort of the archived and the new models (see
+        get_fitness_by_dominance), instead of comparing each new model with the entire archive. The result is the same
+        as adding the models one at a time: of models with equal objective values, only the first is kept, and archived
+        models come first.
+        :param objectives: 2d array
+        :param model_ids: array of int
+        :return: array of bool
+        """
+        num_archived = self.size
+        combined = np.concatenate([self.objectives[:num_archived], objectives])
+        front = np.flatnonzero(get_fitness_by_dominance(combined) == 0)
+        keep = np.zeros(len(combined), dtype=bool)
+        keep[front[np.unique(combined[front], axis=0, return_index=True)[1]]] = True
+        for model_id in self.model_ids[:num_archived][~keep[:num_archived]].tolist():
+            self.remove(model_id)
+        added = keep[num_archived:]
+        for i in np.flatnonzero(added).tolist():
+            self.append(objectives[i], int(model_ids[i]))
+        self.specialists = None
+        return added
+
+    def add_to_sorted_front(self, objectives, model_id):
+        """
+        The first objective strictly increases along a sorted front, and the second objective strictly decreases.
+        :param objectives: array of float
+        :param model_id: int
+        :return: bool
+        """
+        vals0, vals1, model_ids = self.front
+        val0, val1 = float(objectives[0]), float(objectives[1])
+        j = bisect.bisect_left(vals0, val0)
+        if (j > 0 and vals1[j - 1] <= val1) or (j < len(vals0) and vals0[j] == val0 and vals1[j] <= val1):
+            return False
+        # remove the archived models that are dominated by the new model
+        k = j
+        while k < len(vals0) and vals1[k] >= val1:
+            self.delete(model_ids[k])
+            k += 1
+        vals0[j:k] = [val0]
+        vals1[j:k] = [val1]
+        model_ids[j:k] = [model_id]
+        self.append(objectives, model_id)
+        return True
+
+    def add_to_set(self, objectives, model_id):
+        """
+        Compares a new model with all archived models at once. With epsilon, models are compared by the boxes that
+        contain them, and a model replaces another model in the same box if it dominates it, or if neither dominates
+        the other and it is closer to the lower corner of the box.
+        :param objectives: array of float
+        :param model_id: int
+        :return: bool
+        """
+        if self.size > 0:
+            archived = self.objectives[:self.size]
+            if self.epsilon is None:
+                this_key, keys = objectives, archived
+            else:
+                this_key, keys = np.floor(objectives / self.epsilon), self.keys[:self.size]
+            better_equal = np.all(keys <= this_key, axis=1)
+            if np.any(better_equal & np.any(keys < this_key, axis=1)):
+                return False
+            same = better_equal & np.all(keys == this_key, axis=1)
+            if np.any(same):
+                if self.epsilon is None:
+                    return False
+                other = archived[same][0]
+                if not np.any(objectives < other):
+                    return False
+                if np.any(objectives > other):
+                    corner = this_key * self.epsilon
+                    if np.sum((objectives - corner) ** 2) >= np.sum((other - corner) ** 2):
+                        return False
+            dominated = np.all(this_key <= keys, axis=1) & (np.any(this_key < keys, axis=1) | same)
+            for dominated_id in self.model_ids[:self.size][dominated].tolist():
+                self.remove(dominated_id)
+        self.append(objectives, model_id)
+        if self.specialists is not None:
+            better = objectives < self.objectives[[self.rows[int(specialist)] for specialist in self.specialists],
+                                                  np.arange(self.num_objectives)]
+            self.specialists[better] = model_id
+        return True
+
+    def remove(self, model_id):
+        """
+        Removes a model from the archive, if it has been archived.
+        :param model_id: int
+        """
+        model_id = int(model_id)
+        if model_id not in self.rows:
+            return
+        objectives = self.delete(model_id)
+        if self.sorted_front:
+            vals0, vals1, model_ids = self.front
+            j = bisect.bisect_left(vals0, objectives[0])
+            del vals0[j], vals1[j], model_ids[j]
+        elif self.specialists is not None and model_id in self.specialists:
+            self.specialists = None
+
+    def prune(self, num_models):
+        """
+        Removes the specified number of archived models with the lowest crowding distance, one at a time, so that the
+        crowding distance of the remaining models is updated after each removal. The models with the lowest value of
+        each objective are kept.
+        :param num_models: int
+        """
+        for i in range(num_models):
+            model_ids = self.get_model_ids()
+            objectives = self.get_objectives()
+            if not self.sorted_front:
+                # rows are not kept in the order in which models were added, so ties are broken by model_id
+                order = np.argsort(model_ids, kind='stable')
+                model_ids, objectives = model_ids[order], objectives[order]
+            distance = get_crowding_distance(objectives)
+            self.remove(model_ids[np.argmin(distance)])
+
+
+class PopulationAnnealing(object):
+    """
+    This class is inspired by scipy.optimize.basinhopping. It provides a generator interface to produce a list of
+    parameter arrays intended for parallel evaluation. Features multi-objective metrics for selection and adaptive
+    reduction of step_size (or temperature) every iteration. During each iteration, each individual in the population
+    takes path_length number of independent steps within the specified bounds, then individuals are selected to seed the
+    population for the next iteration.
+    """
+
+    def __init__(self, param_names=None, feature_names=None, objective_names=None, pop_size=1, x0=None, bounds=None,
+                 rel_bounds=None, wrap_bounds=False, take_step=None, evaluate=None, select=None, seed=None,
+                 normalize='global', max_iter=50, path_length=3, initial_step_size=0.5, adaptive_step_factor=0.9,
+                 survival_rate=0.2, diversity_rate=0.05, fitness_range=2, disp=False, hot_start=False,
+                 storage_file_path=None, specialists_survive=True, storage_flush_interval=1, storage_flush_signal=None,
+                 storage_async_write=True, storage_swmr=True, storage_backend=None, storage_compression='gzip',
+                 storage_compression_level=None, storage_chunk_size=256, archive=False, archive_size=None,
+                 archive_epsilon=None, track_hypervolume=None, hypervolume_reference=None,
+                 hypervolume_method='auto', hypervolume_num_samples=None, termination=None, num_cores=1,
+                 constraint_names=None, **kwargs):
+        """
+        :param param_names: list of str
+        :param feature_names: list of str
+        :param objective_names: list of str
+        :param pop_size: int
+        :param x0: array
+        :param bounds: list of tuple of float
+        :param rel_bounds: list of list
+        :param wrap_bounds: bool
+        :param take_step: callable
+        :param evaluate: str or callable
+        :param select: str or callable
+        :param seed: int or :class:'np.random.RandomState'
+        :param normalize: str; 'global': normalize over entire history, 'local': normalize per iteration
         :param max_iter: int
         :param path_length: int
         :param initial_step_size: float in range(0., 1.]
@@ -1387,6 +2976,35 @@ class PopulationAnnealing(object):
         :param hot_start: bool
         :param storage_file_path: str (path)
         :param specialists_survive: bool; whether to include specialists as survivors
+        :param storage_flush_interval: int; number of saved generations between flushes of the storage file to disk
+        :param storage_flush_signal: str; e.g. 'SIGUSR1'; flush the storage file to disk upon receipt of this signal
+        :param storage_async_write: bool; write to the storage file in a background thread
+        :param storage_swmr: bool; keep the storage file in SWMR mode, so that it can be read during optimization
+        :param storage_backend: str; 'hdf5', 'sqlite', or 'memory'; default is determined by the extension of
+            storage_file_path
+        :param storage_compression: str or None; 'gzip' or 'lzf'; compression of an .hdf5 storage file
+        :param storage_compression_level: int; only for gzip compression
+        :param storage_chunk_size: int; number of rows per chunk of an .hdf5 storage file
+        :param archive: bool; maintain the non-dominated set of the entire history in a :class:'ParetoArchive'; archived
+            candidates are ranked as the first front, the other candidates are only sorted into the fronts required for
+            selection (see get_archived_ranking), and the specialists of the archive are selected as specialists
+        :param archive_size: int; maximum size of the archive
+        :param archive_epsilon: float or list of float; size of the epsilon-dominance boxes of the archive
+        :param track_hypervolume: bool; store the hypervolume of the archive as the 'hypervolume' attribute of the
+            last generation of each iteration (implies archive); default is True if a termination criterion requires
+            it, unless there are more than hypervolume_max_tracked_objectives objectives
+        :param hypervolume_reference: list of float; reference point in objective space; default is the max_objectives
+            of the first iteration
+        :param hypervolume_method: str; see get_hypervolume
+        :param hypervolume_num_samples: int; number of samples of the 'monte_carlo' method; default depends on the
+            size of the archive (see get_hypervolume_num_samples)
+        :param termination: callable, str, dict, or list; criteria to stop before max_iter, evaluated at the end of
+            each iteration (see get_termination_criteria)
+        :param num_cores: int; number of cores used to evaluate each population, for budgets in core-hours
+        :param constraint_names: list of str; constraints are satisfied when their values are <= 0, and are stored as
+            features. Infeasible models are ranked after all feasible models (see get_constrained_ranking), and the
+            total violation of each candidate is passed to the select method, so that feasible models are selected
+            first (see get_selection_order)
         :param kwargs: dict of additional options, catches generator-specific options that do not apply
         """
         if x0 is None:
@@ -1427,12 +3045,20 @@ class PopulationAnnealing(object):
         diversity_rate = float(diversity_rate)
         fitness_range = int(fitness_range)
         if hot_start:
-            if self.storage_file_path is None or not os.path.isfile(self.storage_file_path):
+            if self.storage_file_path is None or not storage_file_exists(self.storage_file_path, storage_backend):
                 raise IOError('PopulationAnnealing: invalid file path. Cannot hot start from stored history: %s' %
                               hot_start)
-            self.storage = PopulationStorage(file_path=self.storage_file_path)
+            # only the last path_length generations are needed to resume; earlier generations are read on demand
+            self.storage = PopulationStorage(file_path=self.storage_file_path,
+                                             flush_interval=storage_flush_interval,
+                                             flush_signal=storage_flush_signal, async_write=storage_async_write,
+                                             lazy=True, swmr=storage_swmr, backend=storage_backend,
+                                             compression=storage_compression,
+                                             compression_level=storage_compression_level,
+                                             chunk_size=storage_chunk_size)
             param_names = self.storage.param_names
             self.path_length = self.storage.path_length
+            self.storage.preload(self.path_length)
             if 'step_size' in self.storage.attributes:
                 current_step_size = self.storage.attributes['step_size'][-1]
             else:
@@ -1453,9 +3079,16 @@ class PopulationAnnealing(object):
                 self.normalize = normalize
             else:
                 raise ValueError('PopulationAnnealing: normalize argument must be either \'global\' or \'local\'')
-            self.storage = PopulationStorage(param_names=param_names, feature_names=feature_names,
+            self.storage = PopulationStorage(param_names=param_names,
+                                             feature_names=get_constrained_feature_names(feature_names,
+                                                                                         constraint_names),
                                              objective_names=objective_names, path_length=path_length,
-                                             normalize=self.normalize)
+                                             normalize=self.normalize, flush_interval=storage_flush_interval,
+                                             flush_signal=storage_flush_signal, async_write=storage_async_write,
+                                             swmr=storage_swmr, backend=storage_backend,
+                                             compression=storage_compression,
+                                             compression_level=storage_compression_level,
+                                             chunk_size=storage_chunk_size)
             self.path_length = path_length
             self.num_gen = 0
             self.population = []
@@ -1465,6 +3098,38 @@ class PopulationAnnealing(object):
             self.max_objectives = []
             self.count = 0
             self.objectives_stored = False
+        self.widths = get_column_widths(self.storage.param_names, self.storage.feature_names,
+                                        self.storage.objective_names)
+        self.constraint_names = list(constraint_names) if constraint_names else []
+        self.constraint_indexes = get_constraint_indexes(self.storage.feature_names, self.constraint_names)
+        self.termination_criteria = get_termination_criteria(termination)
+        self.termination_reason = None
+        self.num_cores = int(num_cores)
+        if any([getattr(criterion, 'track_hypervolume', False) for criterion in self.termination_criteria]):
+            if track_hypervolume is None and len(self.storage.objective_names) > hypervolume_max_tracked_objectives:
+                warnings.warn('PopulationAnnealing: hypervolume is not tracked with %i objectives, so termination '
+                              'criteria that require it will not stop the optimization; set track_hypervolume=True '
+                              'to track it' % len(self.storage.objective_names), RuntimeWarning)
+                track_hypervolume = False
+            elif track_hypervolume is None:
+                track_hypervolume = True
+        self.track_hypervolume = bool(track_hypervolume)
+        self.hypervolume_reference = hypervolume_reference
+        self.hypervolume_method = hypervolume_method
+        self.hypervolume_num_samples = hypervolume_num_samples
+        if archive or self.track_hypervolume:
+            self.archive = ParetoArchive(len(self.storage.objective_names), max_size=archive_size,
+                                         epsilon=archive_epsilon)
+            if hot_start:
+                # the archive is not stored, but is rebuilt by streaming the stored history
+                for gen_start, gen_stop, block in self.storage.iter_generations(['model_id', 'objectives', 'features'],
+                                                                                ['population'],
+                                                                                chunk=self.path_length):
+                    data = block['population']
+                    feasible = get_constraint_violation(data['features'][:, self.constraint_indexes]) <= 0.
+                    self.archive.add(data['objectives'][feasible], data['model_id'][feasible])
+        else:
+            self.archive = None
         self.pop_size = int(pop_size)
         if take_step is None:
             self.take_step = RelativeBoundedStep(self.x0, param_names=param_names, bounds=bounds, rel_bounds=rel_bounds,
@@ -1499,7 +3164,7 @@ class PopulationAnnealing(object):
         """
         self.start_time = time.time()
         self.local_time = self.start_time
-        while self.num_gen < self.max_gens:
+        while self.num_gen < self.max_gens and self.termination_reason is None:
             if self.num_gen == 0:
                 self.init_population()
             elif not self.objectives_stored:
@@ -1515,17 +3180,16 @@ class PopulationAnnealing(object):
                       (self.num_gen, len(self.population)))
             self.local_time = time.time()
             sys.stdout.flush()
-            generation, model_ids = [], []
-            for individual in self.population:
-                generation.append(individual.x)
-                model_ids.append(individual.model_id)
+            generation = list(self.population.columns['x'])
+            model_ids = self.population.get_model_ids()
             yield generation, model_ids
             self.num_gen += 1
         if not self.objectives_stored:
             raise Exception('PopulationAnnealing: objectives from final Gen %i were not stored or evaluated' %
                             (self.num_gen - 1))
+        self.storage.close()
         if self.disp:
-            print('PopulationAnnealing: %i generations took %.2f s' % (self.max_gens, time.time() - self.start_time))
+            print('PopulationAnnealing: %i generations took %.2f s' % (self.num_gen, time.time() - self.start_time))
         sys.stdout.flush()
 
     def update_population(self, features, objectives):
@@ -1535,27 +3199,34 @@ class PopulationAnnealing(object):
         :param features: list of dict
         :param objectives: list of dict
         """
-        filtered_population = []
-        failed = []
+        filtered_indexes = []
+        this_objectives = []
+        this_features = []
         for i, objective_dict in enumerate(objectives):
             feature_dict = features[i]
             if not isinstance(objective_dict, dict):
                 raise TypeError('PopulationAnnealing.update_population: objectives must be a list of dict')
             if not isinstance(feature_dict, dict):
                 raise TypeError('PopulationAnnealing.update_population: features must be a list of dict')
-            if not (all(key in objective_dict for key in self.storage.objective_names) and
-                    all(key in feature_dict for key in self.storage.feature_names)):
-                failed.append(self.population[i])
-            else:
-                this_objectives = np.array([objective_dict[key] for key in self.storage.objective_names])
-                self.population[i].objectives = this_objectives
-                this_features = np.array([feature_dict[key] for key in self.storage.feature_names])
-                self.population[i].features = this_features
-                filtered_population.append(self.population[i])
-        self.population = filtered_population
+            feature_dict = get_constrained_features(feature_dict, objective_dict, self.constraint_names)
+            if all(key in objective_dict for key in self.storage.objective_names) and \
+                    all(key in feature_dict for key in self.storage.feature_names):
+                filtered_indexes.append(i)
+                this_objectives.append([objective_dict[key] for key in self.storage.objective_names])
+                this_features.append([feature_dict[key] for key in self.storage.feature_names])
+        if filtered_indexes:
+            set_population_values(self.population, 'objectives', this_objectives, filtered_indexes)
+            set_population_values(self.population, 'features', this_features, filtered_indexes)
+        failed = self.population.take(np.setdiff1d(np.arange(len(self.population)), filtered_indexes))
+        self.population = self.population.take(filtered_indexes)
         self.storage.append(self.population, prev_survivors=self.prev_survivors,
                             prev_specialists=self.prev_specialists, failed=failed,
                             step_size=self.take_step.stepsize)
+        if self.archive is not None and len(self.population) > 0:
+            # infeasible models are not archived
+            feasible = get_population_violation(self.population, self.constraint_indexes) <= 0.
+            self.archive.add(self.population.columns['objectives'][feasible],
+                             self.population.columns['model_id'][feasible])
         self.prev_survivors = []
         self.prev_specialists = []
         self.objectives_stored = True
@@ -1567,57 +3238,133 @@ class PopulationAnnealing(object):
         if (self.num_gen + 1) % self.path_length == 0:
             candidates = self.get_candidates()
             if len(candidates) > 0:
+                violation = get_population_violation(candidates, self.constraint_indexes)
+                # infeasible models do not contribute to the edges used to normalize objectives
                 self.min_objectives, self.max_objectives = \
-                    get_objectives_edges(candidates, min_objectives=self.min_objectives,
-                                         max_objectives=self.max_objectives, normalize=self.normalize)
-                self.evaluate(candidates, min_objectives=self.min_objectives, max_objectives=self.max_objectives)
-                self.specialists = get_specialists(candidates)
-                self.survivors = \
+                    get_objectives_edges(get_feasible_population(candidates, violation),
+                                         min_objectives=self.min_objectives, max_objectives=self.max_objectives,
+                                         normalize=self.normalize)
+                evaluate_kwargs = {'violation': violation} if self.constraint_indexes else {}
+                if self.archive is not None:
+                    # archived candidates form the first front, and only the fronts required for selection are sorted
+                    evaluate_kwargs['archived'] = self.archive.get_archived(candidates.columns['model_id'])
+                    evaluate_kwargs['num_ranked'] = self.num_survivors + self.num_diversity_survivors
+                    evaluate_kwargs['num_fronts'] = self.fitness_range if self.num_diversity_survivors > 0 else 0
+                self.evaluate(candidates, min_objectives=self.min_objectives, max_objectives=self.max_objectives,
+                              **evaluate_kwargs)
+                self.specialists = PopulationArray.from_population(self.get_specialists(candidates, violation),
+                                                                   self.widths, copy=False)
+                select_kwargs = {'violation': violation} if self.constraint_indexes else {}
+                self.survivors = PopulationArray.from_population(
                     self.select(candidates, self.num_survivors, self.num_diversity_survivors,
-                                fitness_range=self.fitness_range, disp=self.disp)
+                                fitness_range=self.fitness_range, disp=self.disp, **select_kwargs), self.widths,
+                    copy=False)
                 if self.disp:
                     print('PopulationAnnealing: Gen %i, evaluating iteration took %.2f s' %
                           (self.num_gen, time.time() - self.local_time))
+                    if self.archive is not None:
+                        print('PopulationAnnealing: Gen %i, %i non-dominated models archived' %
+                              (self.num_gen, len(self.archive)))
                 self.local_time = time.time()
-                for individual in self.survivors:
-                    individual.survivor = True
-                if self.specialists_survive:
-                    for individual in self.specialists:
-                        individual.survivor = True
-                self.storage.survivors[-1] = deepcopy(self.survivors)
-                self.storage.specialists[-1] = deepcopy(self.specialists)
-                self.storage.min_objectives[-1] = deepcopy(self.min_objectives)
-                self.storage.max_objectives[-1] = deepcopy(self.max_objectives)
+                mark_survivors(candidates, self.survivors, self.specialists, self.specialists_survive)
+                self.storage.update_generations(candidates, self.get_candidate_generations())
+                self.storage.survivors[-1] = self.survivors.freeze()
+                self.storage.specialists[-1] = self.specialists.freeze()
+                self.storage.min_objectives[-1] = list(self.min_objectives)
+                self.storage.max_objectives[-1] = list(self.max_objectives)
+                if self.track_hypervolume:
+                    self.update_hypervolume()
+                self.check_termination(candidates)
             if self.storage_file_path is not None:
                 self.storage.save(self.storage_file_path, n=self.path_length)
         sys.stdout.flush()
 
-    def get_candidates(self):
+    def get_specialists(self, candidates, violation):
+        """
+        For each objective, returns the feasible candidate with the lowest objective value. With an archive, these are
+        the specialists of the archive, which are not dominated by any model in the history, if they are all candidates.
+        :param candidates: :class:'PopulationArray'
+        :param violation: array of float
+        :return: :class:'PopulationArray'
+        """
+        if self.archive is not None and len(self.archive) > 0:
+            model_ids = self.archive.get_specialists()
+            candidate_ids = candidates.columns['model_id']
+            if np.all(np.isin(model_ids, candidate_ids)):
+                indexes = np.argsort(candidate_ids, kind='stable')
+                return candidates.take(indexes[np.searchsorted(candidate_ids[indexes], model_ids)])
+        return get_specialists(get_feasible_population(candidates, violation))
+
+    def check_termination(self, candidates):
+        """
+        Evaluates each termination criterion at the end of an iteration. The reason for stopping is stored as the
+        'termination' attribute of the current generation.
+        :param candidates: :class:'PopulationArray'
+        """
+        for criterion in self.termination_criteria:
+            reason = criterion(self, candidates)
+            if reason is not None:
+                self.termination_reason = reason
+                self.storage.set_attribute('termination', reason)
+                if self.disp:
+                    print('PopulationAnnealing: Gen %i, stopping early: %s' % (self.num_gen, reason))
+                return
+
+    def update_hypervolume(self):
+        """
+        Stores the hypervolume of the non-dominated models in the archive as an attribute of the current generation.
+        Unless a reference point was provided, the max_objectives of the first evaluated iteration is used, so that the
+        hypervolume of later iterations is comparable, including after a hot start.
+        """
+        if self.hypervolume_reference is None:
+            for max_objectives in self.storage.max_objectives[self.path_length - 1::self.path_length]:
+                if len(max_objectives) > 0:
+                    self.hypervolume_reference = list(max_objectives)
+                    break
+            else:
+                return
+        # samples are seeded so that monte_carlo estimates of consecutive iterations are comparable
+        hypervolume = get_hypervolume(self.archive.get_objectives(), self.hypervolume_reference,
+                                      method=self.hypervolume_method, num_samples=self.hypervolume_num_samples,
+                                      random=0)
+        self.storage.set_attribute('hypervolume', hypervolume)
+        if self.disp:
+            print('PopulationAnnealing: Gen %i, hypervolume: %.4E' % (self.num_gen, hypervolume))
+
+    def get_candidate_generations(self):
         """
-        :return: list of :class:'Individual'
+        Returns the stored populations that contribute candidates for selection during the current iteration.
+        :return: list of tuple; (category, generation index)
         """
-        candidates = []
-        candidates.extend(self.storage.prev_survivors[-self.path_length])
+        generations = [('prev_survivors', -self.path_length)]
         if self.specialists_survive:
-            candidates.extend(self.storage.prev_specialists[-self.path_length])
-        # remove duplicates
-        candidates = list(set(candidates))
+            generations.append(('prev_specialists', -self.path_length))
         for i in range(1, self.path_length + 1):
-            candidates.extend(self.storage.history[-i])
-        return candidates
+            generations.append(('history', -i))
+        return generations
+
+    def get_candidates(self):
+        """
+        Returns a copy of all candidates for selection. After evaluation, ranking attributes are copied back to the
+        stored populations with update_generations.
+        :return: :class:'PopulationArray'
+        """
+        candidates = PopulationArray.concatenate([getattr(self.storage, category)[index] for category, index in
+                                                  self.get_candidate_generations()], self.widths)
+        # remove duplicates (e.g. a previous survivor that was also a previous specialist)
+        unique_ids, indexes = np.unique(candidates.columns['model_id'], return_index=True)
+        return candidates.take(np.sort(indexes))
 
     def init_population(self):
         """
         """
-        pop_size = self.pop_size
-        self.population = []
+        x = []
         if self.x0 is not None and self.num_gen == 0:
-            self.population.append(Individual(self.x0, model_id=self.count))
-            pop_size -= 1
-            self.count += 1
-        for i in range(pop_size):
-            self.population.append(Individual(self.take_step(self.x0, stepsize=1., wrap=True), model_id=self.count))
-            self.count += 1
+            x.append(self.x0)
+        for i in range(self.pop_size - len(x)):
+            x.append(self.take_step(self.x0, stepsize=1., wrap=True))
+        self.population = PopulationArray.from_x(x, list(range(self.count, self.count + len(x))), self.widths)
+        self.count += len(x)
 
     def step_survivors(self):
         """
@@ -1629,23 +3376,20 @@ class PopulationAnnealing(object):
             print('PopulationAnnealing: Gen %i, previous step_size: %.3f, new step_size: %.3f' % \
                   (self.num_gen, self.take_step.stepsize, new_step_size))
         self.take_step.stepsize = new_step_size
-        new_population = []
         if not self.survivors:
             self.init_population()
         else:
-            self.prev_survivors = deepcopy(self.survivors)
-            self.prev_specialists = deepcopy(self.specialists)
-            group = list(self.prev_survivors)
+            # survivors are frozen once stored; the previous survivors share all columns except survivor
+            self.prev_survivors = self.survivors.replace({'survivor': False})
+            self.prev_specialists = self.specialists.replace({'survivor': False})
+            group = [self.prev_survivors]
             if self.specialists_survive:
-                group.extend(self.prev_specialists)
-            group_size = len(group)
-            for individual in group:
-                individual.survivor = False
-            for i in range(self.pop_size):
-                individual = Individual(self.take_step(group[i % group_size].x), model_id=self.count)
-                new_population.append(individual)
-                self.count += 1
-            self.population = new_population
+                group.append(self.prev_specialists)
+            group_x = np.concatenate([population.columns['x'] for population in group])
+            group_size = len(group_x)
+            x = [self.take_step(group_x[i % group_size]) for i in range(self.pop_size)]
+            self.population = PopulationArray.from_x(x, list(range(self.count, self.count + len(x))), self.widths)
+            self.count += len(x)
         self.survivors = []
         self.specialists = []
 
@@ -1656,19 +3400,19 @@ class PopulationAnnealing(object):
         if this_pop_size == 0:
             self.init_population()
         else:
-            new_population = []
-            for i in range(self.pop_size):
-                individual = Individual(self.take_step(self.population[i % this_pop_size].x), model_id=self.count)
-                new_population.append(individual)
-                self.count += 1
-            self.population = new_population
+            x = [self.take_step(self.population.columns['x'][i % this_pop_size]) for i in range(self.pop_size)]
+            self.population = PopulationArray.from_x(x, list(range(self.count, self.count + len(x))), self.widths)
+            self.count += len(x)
 
 
 class Pregenerated(object):
     def __init__(self, param_names=None, feature_names=None, objective_names=None, hot_start=False,
                  storage_file_path=None, config_file_path=None, pregen_param_file_path=None, evaluate=None, select=None,
                  disp=False, pop_size=50, fitness_range=2, survival_rate=.2, normalize='global',
-                 specialists_survive=True, **kwargs):
+                 specialists_survive=True, storage_flush_interval=1, storage_flush_signal=None,
+                 storage_async_write=True, storage_swmr=True, storage_backend=None, storage_compression='gzip',
+                 storage_compression_level=None, storage_chunk_size=256, epsilon=None, constraint_names=None,
+                 **kwargs):
         """
 
         :param param_names: list of str
@@ -1686,12 +3430,32 @@ class Pregenerated(object):
         :param survival_rate: float between 0 and 1
         :param normalize: str, 'local' or 'global'
         :param specialists_survive: bool
+        :param storage_flush_interval: int; number of saved generations between flushes of the storage file to disk
+        :param storage_flush_signal: str; e.g. 'SIGUSR1'; flush the storage file to disk upon receipt of this signal
+        :param storage_async_write: bool; write to the storage file in a background thread
+        :param storage_swmr: bool; keep the storage file in SWMR mode, so that it can be read during optimization
+        :param storage_backend: str; 'hdf5', 'sqlite', or 'memory'; default is determined by the extension of
+            storage_file_path
+        :param storage_compression: str or None; 'gzip' or 'lzf'; compression of an .hdf5 storage file
+        :param storage_compression_level: int; only for gzip compression
+        :param storage_chunk_size: int; number of rows per chunk of an .hdf5 storage file
+        :param epsilon: float or list of float; if provided, the candidates of each chunk (its models and the
+            previous survivors and specialists) are ranked by epsilon-box dominance in normalized objective space,
+            with boxes of this size (see evaluate_population_by_epsilon_dominance). Models of previous chunks are
+            not ranked again; to rank the entire history by epsilon-box dominance, see PopulationStorage.global_rerank
+        :param constraint_names: list of str; constraints are satisfied when their values are <= 0, and are stored as
+            features. Infeasible models are ranked after all feasible models (see get_constrained_ranking), and the
+            total violation of each candidate is passed to the select method, so that feasible models are selected
+            first (see get_selection_order)
         :param kwargs:
         """
         if pregen_param_file_path is None:
             raise RuntimeError("Path to file containing parameters must be specified.")
         if evaluate is None:
-            self.evaluate = evaluate_population_annealing
+            if epsilon is None:
+                self.evaluate = evaluate_population_annealing
+            else:
+                self.evaluate = evaluate_population_by_epsilon_dominance
         elif isinstance(evaluate, collections.Callable):
             self.evaluate = evaluate
         elif isinstance(evaluate, basestring) and evaluate in globals() and \
@@ -1699,6 +3463,7 @@ class Pregenerated(object):
             self.evaluate = globals()[evaluate]
         else:
             raise TypeError("Pregenerated: evaluate must be callable.")
+        self.evaluate_kwargs = {} if epsilon is None else {'epsilon': epsilon}
         if select is None:
             self.select = select_survivors_by_rank_and_fitness  # select_survivors_by_rank
         elif isinstance(select, collections.Callable):
@@ -1725,8 +3490,14 @@ class Pregenerated(object):
         self.storage_file_path = storage_file_path
         self.config_file_path = config_file_path
 
-        if hot_start and os.path.isfile(storage_file_path):
-            self.storage = PopulationStorage(file_path=storage_file_path)
+        if hot_start and storage_file_exists(storage_file_path, storage_backend):
+            self.storage = PopulationStorage(file_path=storage_file_path, flush_interval=storage_flush_interval,
+                                             flush_signal=storage_flush_signal, async_write=storage_async_write,
+                                             lazy=True, swmr=storage_swmr, backend=storage_backend,
+                                             compression=storage_compression,
+                                             compression_level=storage_compression_level,
+                                             chunk_size=storage_chunk_size)
+            self.storage.preload(1)
             self.population = self.storage.history[-1]
             self.survivors = self.storage.survivors[-1]
             self.specialists = self.storage.specialists[-1]
@@ -1741,8 +3512,15 @@ class Pregenerated(object):
             self.pop_size = len(self.storage.history[0]) + len(self.storage.failed[0])
             self.curr_iter = len(self.storage.history)
         else:
-            self.storage = PopulationStorage(param_names=param_names, feature_names=feature_names,
-                                             objective_names=objective_names, normalize=normalize, path_length=1)
+            self.storage = PopulationStorage(param_names=param_names,
+                                             feature_names=get_constrained_feature_names(feature_names,
+                                                                                         constraint_names),
+                                             objective_names=objective_names, normalize=normalize, path_length=1,
+                                             flush_interval=storage_flush_interval, flush_signal=storage_flush_signal,
+                                             async_write=storage_async_write, swmr=storage_swmr,
+                                             backend=storage_backend, compression=storage_compression,
+                                             compression_level=storage_compression_level,
+                                             chunk_size=storage_chunk_size)
             self.storage.count = 0
             self.population = []
             self.survivors = []
@@ -1756,6 +3534,10 @@ class Pregenerated(object):
             else:
                 raise ValueError('Pregenerated: normalize argument must be either \'global\' or \'local\'')
             self.curr_iter = 0
+        self.widths = get_column_widths(self.storage.param_names, self.storage.feature_names,
+                                        self.storage.objective_names)
+        self.constraint_names = list(constraint_names) if constraint_names else []
+        self.constraint_indexes = get_constraint_indexes(self.storage.feature_names, self.constraint_names)
 
         if self.corruption():
             self.curr_iter -= 1
@@ -1772,31 +3554,34 @@ class Pregenerated(object):
         for i in range(self.start_iter, self.max_iter):
             self.curr_iter = i
             self.curr_gid_range = range(i * self.pop_size, min((i + 1) * self.pop_size, self.num_points))
-            self.population = [Individual(x=self.pregen_params[j], model_id=j) for j in self.curr_gid_range]
-            self.prev_survivors = deepcopy(self.survivors)
-            self.prev_specialists = deepcopy(self.specialists)
-            yield [individual.x for individual in self.population], \
-                  list(self.curr_gid_range)
+            self.population = PopulationArray.from_x(self.pregen_params[list(self.curr_gid_range)],
+                                                     list(self.curr_gid_range), self.widths)
+            self.prev_survivors = self.survivors
+            self.prev_specialists = self.specialists
+            yield list(self.population.columns['x']), list(self.curr_gid_range)
+        self.storage.close()
 
     def update_population(self, features, objectives):
-        filtered_population = []
-        failed = []
+        filtered_indexes = []
+        this_objectives = []
+        this_features = []
         for i, objective_dict in enumerate(objectives):
             feature_dict = features[i]
             if not isinstance(objective_dict, dict):
                 raise TypeError('Pregenerated.update_population: objectives must be a list of dict')
             if not isinstance(feature_dict, dict):
                 raise TypeError('Pregenerated.update_population: features must be a list of dict')
-            if not (all(key in objective_dict for key in self.storage.objective_names) and
-                    all(key in feature_dict for key in self.storage.feature_names)):
-                failed.append(self.population[i])
-            else:
-                this_objectives = np.array([objective_dict[key] for key in self.storage.objective_names])
-                self.population[i].objectives = this_objectives
-                this_features = np.array([feature_dict[key] for key in self.storage.feature_names])
-                self.population[i].features = this_features
-                filtered_population.append(self.population[i])
-        self.population = filtered_population
+            feature_dict = get_constrained_features(feature_dict, objective_dict, self.constraint_names)
+            if all(key in objective_dict for key in self.storage.objective_names) and \
+                    all(key in feature_dict for key in self.storage.feature_names):
+                filtered_indexes.append(i)
+                this_objectives.append([objective_dict[key] for key in self.storage.objective_names])
+                this_features.append([feature_dict[key] for key in self.storage.feature_names])
+        if filtered_indexes:
+            set_population_values(self.population, 'objectives', this_objectives, filtered_indexes)
+            set_population_values(self.population, 'features', this_features, filtered_indexes)
+        failed = self.population.take(np.setdiff1d(np.arange(len(self.population)), filtered_indexes))
+        self.population = self.population.take(filtered_indexes)
         self.storage.append(self.population, prev_survivors=self.prev_survivors,
                             prev_specialists=self.prev_specialists, failed=failed)
         self.prev_survivors = []
@@ -1809,53 +3594,66 @@ class Pregenerated(object):
 
         candidates = self.get_candidates()
         if len(candidates) > 0:
+            violation = get_population_violation(candidates, self.constraint_indexes)
+            # infeasible models do not contribute to the edges used to normalize objectives
             self.min_objectives, self.max_objectives = \
-                get_objectives_edges(candidates, min_objectives=self.min_objectives,
-                                     max_objectives=self.max_objectives, normalize=self.normalize)
-            self.evaluate(candidates, min_objectives=self.min_objectives, max_objectives=self.max_objectives)
-            self.specialists = get_specialists(candidates)
-            self.survivors = \
-                self.select(candidates, self.num_survivors, fitness_range=self.fitness_range, disp=self.disp)
+                get_objectives_edges(get_feasible_population(candidates, violation),
+                                     min_objectives=self.min_objectives, max_objectives=self.max_objectives,
+                                     normalize=self.normalize)
+            evaluate_kwargs = dict(self.evaluate_kwargs)
+            if self.constraint_indexes:
+                evaluate_kwargs['violation'] = violation
+            self.evaluate(candidates, min_objectives=self.min_objectives, max_objectives=self.max_objectives,
+                          **evaluate_kwargs)
+            self.specialists = PopulationArray.from_population(
+                get_specialists(get_feasible_population(candidates, violation)), self.widths, copy=False)
+            select_kwargs = {'violation': violation} if self.constraint_indexes else {}
+            self.survivors = PopulationArray.from_population(
+                self.select(candidates, self.num_survivors, fitness_range=self.fitness_range, disp=self.disp,
+                            **select_kwargs), self.widths, copy=False)
             if self.disp:
                 print('Pregenerated: Iter %i, evaluating iteration took %.2f s' %
                       (self.curr_iter, time.time() - self.local_time))
             self.local_time = time.time()
-            for individual in self.survivors:
-                individual.survivor = True
-            if self.specialists_survive:
-                for individual in self.specialists:
-                    individual.survivor = True
-            self.storage.survivors[-1] = deepcopy(self.survivors)
-            self.storage.specialists[-1] = deepcopy(self.specialists)
-            self.storage.min_objectives[-1] = deepcopy(self.min_objectives)
-            self.storage.max_objectives[-1] = deepcopy(self.max_objectives)
+            mark_survivors(candidates, self.survivors, self.specialists, self.specialists_survive)
+            self.storage.update_generations(candidates, self.get_candidate_generations())
+            self.storage.survivors[-1] = self.survivors.freeze()
+            self.storage.specialists[-1] = self.specialists.freeze()
+            self.storage.min_objectives[-1] = list(self.min_objectives)
+            self.storage.max_objectives[-1] = list(self.max_objectives)
         if self.storage_file_path is not None:
             self.storage.save(self.storage_file_path)
         sys.stdout.flush()
 
-    def get_candidates(self):
+    def get_candidate_generations(self):
         """
-        :return: list of :class:'Individual'
+        Returns the stored populations that contribute candidates for selection during the current iteration.
+        :return: list of tuple; (category, generation index)
         """
-        candidates = []
-        candidates.extend(self.storage.prev_survivors[-1])
+        generations = [('prev_survivors', -1)]
         if self.specialists_survive:
-            candidates.extend(self.storage.prev_specialists[-1])
-        candidates.extend(self.storage.history[-1])
-        # remove duplicates; duplicate individuals may have different memory addresses
-        # candidates = list(set(candidates))
-        all_x = set()
-        dedup_candidates = []
-        for i, indiv in enumerate(candidates):
-            x = tuple(indiv.x)
-            if x not in all_x:
-                all_x.add(x)
-                dedup_candidates.append(indiv)
-        return dedup_candidates
+            generations.append(('prev_specialists', -1))
+        generations.append(('history', -1))
+        return generations
+
+    def get_candidates(self):
+        """
+        Returns a copy of all candidates for selection. After evaluation, ranking attributes are copied back to the
+        stored populations with update_generations.
+        :return: :class:'PopulationArray'
+        """
+        candidates = PopulationArray.concatenate([getattr(self.storage, category)[index] for category, index in
+                                                  self.get_candidate_generations()], self.widths)
+        # remove duplicates; duplicate individuals may have different model_ids
+        if len(candidates) == 0:
+            return candidates
+        unique_x, indexes = np.unique(candidates.columns['x'], axis=0, return_index=True)
+        return candidates.take(np.sort(indexes))
 
     def corruption(self):
         # casting bc np.sum returns a float if the list is empty
-        offset = int(np.sum([len(x) for x in self.storage.history]) + np.sum([len(x) for x in self.storage.failed]))
+        offset = int(np.sum(self.storage.get_generation_sizes('population')) +
+                     np.sum(self.storage.get_generation_sizes('failed')))
         if not self.hot_start and offset != 0:
             raise RuntimeError("Pregenerated: The hot-start flag was not provided, but some models in the "
                                "storage file have already been analyzed.")
@@ -1863,6 +3661,13 @@ class Pregenerated(object):
             raise RuntimeError("Pregenerated: The total number of analyzed models (%i) in the storage file exceeds the "
                                "number of models in the parameters-only file (%i)." % (offset, self.num_points))
 
+        if offset > 0:
+            with open_storage_reader(self.storage_file_path, self.storage.backend) as reader:
+                if reader.is_table_storage():
+                    # generations are committed atomically, and any rows from an incomplete save are discarded when
+                    # the file is next opened for writing
+                    return False
+
         # check if the previous model was incompletely saved
         last_gen = int(offset / self.pop_size)
         if last_gen != 0 and offset % self.pop_size == 0:
@@ -1993,29 +3798,42 @@ class OptimizationReport(object):
         objective_names: list of str,
         feature_names: list of str
     """
-    def __init__(self, storage=None, file_path=None):
+    def __init__(self, storage=None, file_path=None, follow=False, backend=None):
         """
         Can either quickly load optimization results from a file, or report from an already loaded instance of
-            :class:'PopulationStorage'.
+            :class:'PopulationStorage'. If follow is True, the file is opened in SWMR mode, and the results of
+            generations appended by an optimization that is still running can be loaded with refresh.
         :param storage: :class:'PopulationStorage'
         :param file_path: str (path)
+        :param follow: bool
+        :param backend: str; default is determined by the extension of file_path
         """
+        self.file_path = file_path
+        self.follow = follow
+        self.backend = backend
+        self.num_gen = None
         if storage is not None:
             self.param_names = storage.param_names
             self.feature_names = storage.feature_names
             self.objective_names = storage.objective_names
-            self.survivors = deepcopy(storage.survivors[-1])
+            self.survivors = storage.survivors[-1]
             self.specialists = dict()
             for i, objective in enumerate(self.objective_names):
                 self.specialists[objective] = storage.specialists[-1][i]
-        elif file_path is None or not os.path.isfile(file_path):
+        elif file_path is None or not storage_file_exists(file_path, backend):
             raise RuntimeError('get_optimization_report: problem loading optimization history from the specified path: '
                                '%s' % file_path)
         else:
-            with h5py.File(file_path, 'r') as f:
-                self.param_names = get_h5py_attr(f.attrs, 'param_names')
-                self.feature_names = get_h5py_attr(f.attrs, 'feature_names')
-                self.objective_names = get_h5py_attr(f.attrs, 'objective_names')
+            with open_storage_reader(file_path, backend, follow) as reader:
+                metadata = reader.read_metadata()
+                self.param_names = metadata['param_names']
+                self.feature_names = metadata['feature_names']
+                self.objective_names = metadata['objective_names']
+                self.sim_id = file_path
+                if reader.is_table_storage():
+                    self.load_last_generation(reader)
+                    return
+                f = reader.file
                 self.survivors = []
                 last_gen_key = str(len(f) - 1)
                 group = f[last_gen_key]['survivors']
@@ -2048,7 +3866,33 @@ class OptimizationReport(object):
                     individual.survivor = nan2None(indiv_data.attrs['survivor'])
                     self.specialists[objective] = individual
 
-                self.sim_id = f.filename
+    def load_last_generation(self, reader):
+        """
+        Loads the survivors and specialists of the last committed generation of a table-based storage file.
+        :param reader: :class:'StorageReader'
+        """
+        self.num_gen = reader.get_num_generations()
+        last_gen_index = self.num_gen - 1
+        self.survivors = columns_to_population(reader.read_generation_columns('survivors', last_gen_index),
+                                               'survivors')
+        specialists = columns_to_population(reader.read_generation_columns('specialists', last_gen_index),
+                                            'specialists')
+        self.specialists = dict(zip(self.objective_names, specialists))
+
+    def refresh(self):
+        """
+        Loads the survivors and specialists of the last generation, if new generations have been committed to the
+        storage file since the report was loaded.
+        :return: bool; True if the report was updated
+        """
+        if not self.follow or self.num_gen is None:
+            raise RuntimeError('OptimizationReport: refresh: report must be loaded from a table-based storage file '
+                               'with follow=True')
+        with open_storage_reader(self.file_path, self.backend, swmr=True) as reader:
+            if reader.get_num_generations() == self.num_gen:
+                return False
+            self.load_last_generation(reader)
+        return True
 
     def report(self, indiv, fil=sys.stdout):
         """
@@ -2089,26 +3933,55 @@ class OptimizationReport(object):
 
 
 class StorageModelReport():
-    def __init__(self, file_path):
-
-        f = h5py.File(file_path, 'r')
-        self.sim_id = f.filename
-        self.f = f
-        group0 = self.f['0']
-        self.N_gen = len(f)
-        self.N_pop = len(group0['failed']) + len(group0['population'])
-        self.param_names = self.f.attrs['param_names']
-        self.feature_names = self.f.attrs['feature_names']
-        self.objective_names = self.f.attrs['objective_names']
+    def __init__(self, file_path, backend=None):
+        """
+        Files in the table-based format of any storage backend are read through a :class:'StorageReader' (see
+        nested.storage.open_storage_reader). Files with storage_version 1 are read group by group with h5py.
+        :param file_path: str (path)
+        :param backend: str; 'hdf5', 'sqlite', or 'memory'; default is determined by the extension of the file path
+        """
+        self.sim_id = file_path
+        self.reader = open_storage_reader(file_path, backend)
+        self.tables = self.reader.is_table_storage()
+        if self.tables:
+            metadata = self.reader.read_metadata()
+            self.f = None
+            self.N_gen = self.reader.get_num_generations()
+            self.N_pop = 0
+            if self.N_gen > 0:
+                for category in indexed_categories:
+                    start, stop = self.reader.read_generation_bounds(category, 0, 1)[0]
+                    self.N_pop += stop - start
+            # names are returned as arrays of bytes, as they are read from the attrs of an .hdf5 file
+            self.param_names = np.array(metadata['param_names'], dtype='S')
+            self.feature_names = np.array(metadata['feature_names'], dtype='S')
+            self.objective_names = np.array(metadata['objective_names'], dtype='S')
+        else:
+            f = self.reader.file
+            self.f = f
+            self.N_gen = get_num_generations(f)
+            group0 = self.f['0']
+            self.N_pop = len(group0['failed']) + len(group0['population'])
+            self.param_names = self.f.attrs['param_names']
+            self.feature_names = self.f.attrs['feature_names']
+            self.objective_names = self.f.attrs['objective_names']
         self.N_params = len(self.param_names)
         self.N_features = len(self.feature_names)
         self.N_objectives = len(self.objective_names)
         self.att_size = {'x': self.N_params, 'features': self.N_features, 'objectives': self.N_objectives, 'normalized_objectives': self.N_objectives}
-        self.hier_dtype = np.dtype([('model_id', 'uint32'), ('gen', 'U3'), ('Failed', np.bool), ('group', 'U3')]) 
+        self.hier_dtype = np.dtype([('model_id', 'uint32'), ('gen', 'U3'), ('Failed', bool), ('group', 'U3')]) 
+        # generations and rows of large files do not fit in the 3 characters of hier_dtype
+        self.table_hier_dtype = np.dtype([('model_id', 'uint32'), ('gen', 'U12'), ('Failed', bool), ('group', 'U12')])
 
     def get_category_id(self, gen=None, cat='spe', lst=None):
         cat_dict = {'spe': 'specialists', 'surv': 'survivors'}
         val_gen = self.N_gen-1 if gen is None else gen 
+        if self.tables:
+            spe_arr = np.array(self.reader.read_generation_columns(cat_dict[cat], val_gen, ['model_id'])['model_id'],
+                               dtype='uint32')[:self.N_objectives]
+            if lst is not None:
+                spe_arr = spe_arr[lst]
+            return spe_arr
         spe_arr = np.empty(shape=self.N_objectives, dtype='uint32')
         group = self.f['{:d}'.format(val_gen)][cat_dict[cat]]
         for i in range(self.N_objectives):
@@ -2134,18 +4007,31 @@ class StorageModelReport():
         for i, j in enumerate(spe_inv):                                                                                                   
             tmp_lst[j].append(i)
 
+        if self.tables:
+            spe_x = self.reader.read_generation_columns('specialists', val_gen, ['x'])['x']
         for idx, i in enumerate(spe_idx):
             spe_model_arr['specialist'][idx] = self.objective_names[tmp_lst[idx]]
+            if self.tables:
+                spe_params[idx,:] = spe_x[i]
+                continue
             spe_params[idx,:] = self.f['{:d}'.format(val_gen)]['specialists']['{:d}'.format(i)]['x'] 
 
         return spe_model_arr, spe_params 
 
     def get_best_model(self):
+        if self.tables:
+            columns = self.reader.read_generation_columns('survivors', self.N_gen-1,
+                                                          ['model_id', 'x', 'features', 'objectives'])
+            return columns['model_id'][0], columns['x'][0], columns['features'][0], columns['objectives'][0]
         group = self.f['{:d}'.format(self.N_gen-1)]['survivors']['0']
         return group.attrs['id'], np.array(group['x']), np.array(group['features']), np.array(group['objectives'])
 
     def get_models_arr(self):
         if not hasattr(self, 'model_arr'):
+            if self.tables:
+                # sorted by model_id
+                self.model_arr = self.get_index_models_arr(self.get_model_index())
+                return
             N_gen = self.N_gen
             pop_size = self.N_pop 
             N_models = self.N_gen * self.N_pop
@@ -2156,6 +4042,10 @@ class StorageModelReport():
             self.model_arr = model_arr
 
     def get_gen_models_arr(self, gen):
+        if self.tables:
+            index = self.get_model_index()
+            in_gen = index['generation'] == int(gen)
+            return self.get_index_models_arr({column: data[in_gen] for column, data in viewitems(index)})
         gen_mod_arr = np.empty(shape=(self.N_pop), dtype=self.hier_dtype)
         start_idx = int(gen) * self.N_pop
         gen_str = '{!s}'.format(gen)
@@ -2171,9 +4061,31 @@ class StorageModelReport():
                 gen_mod_arr[idx] = model_id, gen_str, False, '{!s}'.format(model)
         return gen_mod_arr
 
+    def get_index_models_arr(self, locations):
+        """
+        Converts the generation, category, and row of models in a table-based storage file into the 'gen', 'Failed', and
+        'group' fields of a model hierarchy array.
+        :param locations: dict of array; see nested.storage.read_model_index
+        :return: array
+        """
+        mod_arr = np.empty(shape=(len(locations['model_id'])), dtype=self.table_hier_dtype)
+        mod_arr['model_id'] = locations['model_id']
+        mod_arr['gen'] = [str(gen) for gen in locations['generation']]
+        mod_arr['Failed'] = locations['category'] == population_categories.index('failed')
+        mod_arr['group'] = [str(row) for row in locations['row']]
+        return mod_arr
+
+    def get_model_index(self):
+        """
+        Reads the model index of a table-based storage file once (see nested.storage.StorageReader.get_model_index).
+        :return: dict of array
+        """
+        return self.reader.get_model_index()
+
     def get_model_hier(self, model_lst):
+        if self.tables:
+            return self.get_index_models_arr(self.reader.get_model_locations(model_lst))
         if hasattr(self, 'model_arr'):
-            self.get_models_arr()
             mod_arr = self.model_arr[model_lst]
         else:
             N_models = len(model_lst)
@@ -2184,10 +4096,26 @@ class StorageModelReport():
                 mod_idx = slice(gen_idx*self.N_pop, (gen_idx+1)*self.N_pop)
                 tmp_arr[mod_idx] = self.get_gen_models_arr(str(gen)) 
             mod_arr_idx = np.searchsorted(tmp_arr['model_id'], model_lst)
-            mod_arget_category_attr = tmp_arr[mod_arr_idx]
+            mod_arr = tmp_arr[mod_arr_idx]
         return mod_arr
 
+    def get_table_model_att(self, model_lst, att='x'):
+        """
+        Locate models by model_id across all generations of the population and failed tables, using the model index of
+        the storage file.
+        :param model_lst: array of int
+        :param att: str
+        :return: array
+        """
+        try:
+            att_arr = self.reader.read_models(model_lst, [att])[att]
+        except KeyError as e:
+            raise KeyError('StorageModelReport: %s' % e.args[0])
+        return np.array(att_arr, dtype='float64').reshape(len(att_arr), self.att_size[att])
+
     def get_model_att(self, model_lst, att='x'):
+        if self.tables:
+            return self.get_table_model_att(model_lst, att=att)
         popdict = {True:'failed', False:'population'}
         N_models = len(model_lst)
         model_hier = self.get_model_hier(model_lst) 
@@ -2199,6 +4127,11 @@ class StorageModelReport():
     def get_category_att(self, gen=None, cat='spe', att='x', lst=None):
         cat_dict = {'spe': 'specialists', 'surv': 'survivors'}
         val_gen = self.N_gen-1 if gen is None else gen 
+        if self.tables:
+            att_arr = self.reader.read_generation_columns(cat_dict[cat], val_gen, [att])[att][:self.N_objectives]
+            if lst is not None:
+                att_arr = att_arr[lst, :]
+            return att_arr
         att_arr = np.empty(shape=(self.N_objectives, self.att_size[att]))
         group = self.f['{:d}'.format(val_gen)][cat_dict[cat]]
         for i in range(self.N_objectives):
@@ -2237,7 +4170,7 @@ class StorageModelReport():
         return var.strip().replace('(', '').replace(')', '').replace(' ', '_')+'_{!s}'.format(suffix)
 
     def close_file(self):
-        self.f.close()
+        self.reader.close()
 
 def normalize_dynamic(vals, min_val, max_val, threshold=2.):
     """
@@ -2270,7 +4203,7 @@ def normalize_dynamic(vals, min_val, max_val, threshold=2.):
         vals = np.subtract(vals, min_val)
         vals = np.divide(vals, lin_range)
     else:
-        vals = [logmod(val, offset) for val in vals]
+        vals = logmod(np.asarray(vals, dtype='float64'), offset)
         vals = np.subtract(vals, logmin)
         vals = np.divide(vals, logmod_range)
     return vals
@@ -2279,7 +4212,7 @@ def normalize_dynamic(vals, min_val, max_val, threshold=2.):
 def get_objectives_edges(population, min_objectives=None, max_objectives=None, normalize='global'):
     """
 
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     :param min_objectives: array
     :param max_objectives: array
     :param normalize: str; 'global': normalize over entire history, 'local': normalize per iteration
@@ -2288,188 +4221,167 @@ def get_objectives_edges(population, min_objectives=None, max_objectives=None, n
     pop_size = len(population)
     if pop_size == 0:
         return min_objectives, max_objectives
-    num_objectives = [len(individual.objectives) for individual in population if individual.objectives is not None]
-    if len(num_objectives) < pop_size:
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
         raise RuntimeError('get_objectives_edges: objectives have not been stored for all Individuals in population')
     if normalize not in ['local', 'global']:
         raise ValueError('get_objectives_edges: normalize argument must be either \'global\' or \'local\'')
-    if normalize == 'local' or min_objectives is None or len(min_objectives) == 0:
-        this_min_objectives = np.array(population[0].objectives)
-    else:
-        this_min_objectives = np.array(min_objectives)
-    if normalize == 'local' or max_objectives is None or len(max_objectives) == 0:
-        this_max_objectives = np.array(population[0].objectives)
-    else:
-        this_max_objectives = np.array(max_objectives)
-    for individual in population:
-        this_min_objectives = np.minimum(this_min_objectives, individual.objectives)
-        this_max_objectives = np.maximum(this_max_objectives, individual.objectives)
+    this_min_objectives = np.min(objectives, axis=0)
+    this_max_objectives = np.max(objectives, axis=0)
+    if normalize == 'global' and min_objectives is not None and len(min_objectives) > 0:
+        this_min_objectives = np.minimum(this_min_objectives, min_objectives)
+    if normalize == 'global' and max_objectives is not None and len(max_objectives) > 0:
+        this_max_objectives = np.maximum(this_max_objectives, max_objectives)
     return this_min_objectives, this_max_objectives
 
 
-def assign_crowding_distance(population):
+def get_crowding_distance(objectives):
     """
-    Modifies in place the distance attribute of each Individual in the population.
-    :param population: list of :class:'Individual'
+    Returns the crowding distance of each row of an array of objective values.
+    :param objectives: 2d array
+    :return: array
     """
-    pop_size = len(population)
-    num_objectives = [len(individual.objectives) for individual in population if individual.objectives is not None]
-    if len(num_objectives) < pop_size:
-        raise Exception('assign_crowding_distance: objectives have not been stored for all Individuals in population')
-    num_objectives = max(num_objectives)
-    for individual in population:
-        individual.distance = 0
+    pop_size, num_objectives = objectives.shape
+    distance = np.zeros(pop_size)
     for m in range(num_objectives):
-        indexes = list(range(pop_size))
-        objective_vals = [individual.objectives[m] for individual in population]
-        indexes.sort(key=objective_vals.__getitem__)
-        new_population = list(map(population.__getitem__, indexes))
+        indexes = np.argsort(objectives[:, m], kind='stable')
+        objective_vals = objectives[indexes, m]
 
         # keep the borders
-        new_population[0].distance += 1.e15
-        new_population[-1].distance += 1.e15
+        distance[indexes[0]] += 1.e15
+        distance[indexes[-1]] += 1.e15
+
+        objective_min = objective_vals[0]
+        objective_max = objective_vals[-1]
 
-        objective_min = new_population[0].objectives[m]
-        objective_max = new_population[-1].objectives[m]
+        if objective_min != objective_max and pop_size > 2:
+            distance[indexes[1:-1]] += (objective_vals[2:] - objective_vals[:-2]) / (objective_max - objective_min)
+    return distance
 
-        if objective_min != objective_max:
-            for i in range(1, pop_size - 1):
-                new_population[i].distance += (new_population[i + 1].objectives[m] -
-                                               new_population[i - 1].objectives[m]) / \
-                                              (objective_max - objective_min)
+
+def assign_crowding_distance(population):
+    """
+    Modifies in place the distance attribute of each Individual in the population.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    """
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
+        raise Exception('assign_crowding_distance: objectives have not been stored for all Individuals in population')
+    set_population_values(population, 'distance', get_crowding_distance(objectives))
 
 
 def sort_by_crowding_distance(population):
     """
     Sorts the population by the value of the distance attribute of each Individual in the population. Returns the sorted
     population.
-    :param population: list of :class:'Individual'
-    :return: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :return: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    distance_vals = [individual.distance for individual in population if individual.distance is not None]
-    if len(distance_vals) < pop_size:
+    distances, missing = get_population_values(population, 'distance')
+    if np.any(missing):
         raise Exception('sort_by_crowding_distance: crowding distance has not been stored for all Individuals in '
                         'population')
-    indexes = list(range(pop_size))
-    distances = [individual.distance for individual in population]
-    indexes.sort(key=distances.__getitem__)
-    indexes.reverse()
-    population = list(map(population.__getitem__, indexes))
-    return population
+    indexes = np.argsort(distances, kind='stable')[::-1]
+    return take_population(population, indexes)
 
 
 def assign_absolute_energy(population):
     """
     Modifies in place the energy attribute of each Individual in the population. Energy is assigned as the sum across
     all non-normalized objectives.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    num_objectives = [len(individual.objectives) for individual in population if individual.objectives is not None]
-    if len(num_objectives) < pop_size:
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
         raise Exception('assign_absolute_energy: objectives have not been stored for all Individuals in population')
-    for individual in population:
-        individual.energy = np.sum(individual.objectives)
+    set_population_values(population, 'energy', np.sum(objectives, axis=1))
 
 
 def sort_by_energy(population):
     """
     Sorts the population by the value of the energy attribute of each Individual in the population. Returns the sorted
     population.
-    :param population: list of :class:'Individual'
-    :return: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :return: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    energy_vals = [individual.energy for individual in population if individual.energy is not None]
-    if len(energy_vals) < pop_size:
+    energy_vals, missing = get_population_values(population, 'energy')
+    if np.any(missing):
         raise Exception('sort_by_energy: energy has not been stored for all Individuals in population')
-    indexes = list(range(pop_size))
-    indexes.sort(key=energy_vals.__getitem__)
-    population = list(map(population.__getitem__, indexes))
-    return population
+    indexes = np.argsort(energy_vals, kind='stable')
+    return take_population(population, indexes)
 
 
 def assign_relative_energy(population):
     """
     Modifies in place the energy attribute of each Individual in the population with the sum across all normalized
     objectives.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     """
-    for individual in population:
-        if individual.objectives is None or individual.normalized_objectives is None or \
-                len(individual.objectives) != len(individual.normalized_objectives):
-            raise RuntimeError('assign_relative_energy: objectives have not been stored for all Individuals in '
-                               'population')
-    for individual in population:
-        individual.energy = np.sum(individual.normalized_objectives)
+    objectives, missing_objectives = get_population_values(population, 'objectives')
+    normalized_objectives, missing_normalized_objectives = get_population_values(population, 'normalized_objectives')
+    if np.any(missing_objectives) or np.any(missing_normalized_objectives) or \
+            objectives.shape[1] != normalized_objectives.shape[1]:
+        raise RuntimeError('assign_relative_energy: objectives have not been stored for all Individuals in '
+                           'population')
+    set_population_values(population, 'energy', np.sum(normalized_objectives, axis=1))
 
 
 def assign_relative_energy_by_fitness(population):
     """
     Modifies in place the energy attribute of each Individual in the population. Each objective is normalized within
     each group of Individuals with equivalent fitness. Energy is assigned as the sum across all normalized objectives.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    fitness_vals = [individual.fitness for individual in population if individual.fitness is not None]
-    if len(fitness_vals) < pop_size:
+    fitness_vals, missing = get_population_values(population, 'fitness')
+    if np.any(missing):
         raise Exception('assign_relative_energy_by_fitness: fitness has not been stored for all Individuals in '
                         'population')
-    max_fitness = max(fitness_vals)
-    for fitness in range(max_fitness + 1):
-        new_front = [individual for individual in population if individual.fitness == fitness]
-        assign_relative_energy(new_front)
+    # energy depends only on the normalized objectives of each Individual
+    assign_relative_energy(population)
 
 
 def assign_rank_by_fitness_and_energy(population):
     """
     Modifies in place the rank attribute of each Individual in the population. Within each group of Individuals with
     equivalent fitness, sorts by the value of the energy attribute of each Individual.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    fitness_vals = [individual.fitness for individual in population if individual.fitness is not None]
-    if len(fitness_vals) < pop_size:
+    fitness_vals, missing = get_population_values(population, 'fitness')
+    if np.any(missing):
         raise Exception('assign_rank_by_fitness_and_energy: fitness has not been stored for all Individuals in '
                         'population')
-    max_fitness = max(fitness_vals)
-    new_population = []
-    for fitness in range(max_fitness + 1):
-        new_front = [individual for individual in population if individual.fitness == fitness]
-        new_sorted_front = sort_by_energy(new_front)
-        new_population.extend(new_sorted_front)
-    # now that population is sorted, assign rank to Individuals
-    for rank, individual in enumerate(new_population):
-        individual.rank = rank
+    energy_vals, missing = get_population_values(population, 'energy')
+    if np.any(missing):
+        raise Exception('sort_by_energy: energy has not been stored for all Individuals in population')
+    # np.lexsort is stable, and sorts by the last key first
+    indexes = np.lexsort((energy_vals, fitness_vals))
+    set_population_values(population, 'rank', np.arange(len(indexes)), indexes)
 
 
 def assign_rank_by_energy(population):
     """
     Modifies in place the rank attribute of each Individual in the population. Sorts by the value of the energy
     attribute of each Individual in the population.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     """
-    new_population = sort_by_energy(population)
-    # now that population is sorted, assign rank to Individuals
-    for rank, individual in enumerate(new_population):
-        individual.rank = rank
+    energy_vals, missing = get_population_values(population, 'energy')
+    if np.any(missing):
+        raise Exception('sort_by_energy: energy has not been stored for all Individuals in population')
+    indexes = np.argsort(energy_vals, kind='stable')
+    set_population_values(population, 'rank', np.arange(len(indexes)), indexes)
 
 
 def sort_by_rank(population):
     """
     Sorts by the value of the rank attribute of each Individual in the population. Returns the sorted population.
-    :param population: list of :class:'Individual'
-    :return: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :return: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    rank_vals = [individual.rank for individual in population if individual.rank is not None]
-    if len(rank_vals) < pop_size:
+    rank_vals, missing = get_population_values(population, 'rank')
+    if np.any(missing):
         raise Exception('sort_by_rank: rank has not been stored for all Individuals in population')
-    indexes = list(range(pop_size))
-    indexes.sort(key=rank_vals.__getitem__)
-    new_population = list(map(population.__getitem__, indexes))
-    return new_population
+    indexes = np.argsort(rank_vals, kind='stable')
+    return take_population(population, indexes)
 
 
 def assign_rank_by_fitness_and_crowding_distance(population):
@@ -2479,226 +4391,1311 @@ def assign_rank_by_fitness_and_crowding_distance(population):
     early generations of evolutionary optimization, and helps to preserve diversity of solutions. However, once all
     members of the population have converged to a single fitness value, naive ranking by crowding distance can favor
     unique solutions over lower energy solutions. In this case, rank is assigned by total energy.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    fitness_vals = [individual.fitness for individual in population if individual.fitness is not None]
-    if len(fitness_vals) < pop_size:
+    fitness_vals, missing = get_population_values(population, 'fitness')
+    if np.any(missing):
         raise Exception('assign_rank_by_fitness_and_crowding_distance: fitness has not been stored for all Individuals '
                         'in population')
-    max_fitness = max(fitness_vals)
+    max_fitness = int(np.max(fitness_vals))
     if max_fitness > 0:
-        new_population = []
+        objectives, missing = get_population_values(population, 'objectives')
+        if np.any(missing):
+            raise Exception('assign_crowding_distance: objectives have not been stored for all Individuals in '
+                            'population')
+        indexes = []
         for fitness in range(max_fitness + 1):
-            new_front = [individual for individual in population if individual.fitness == fitness]
-            assign_crowding_distance(new_front)
-            new_sorted_front = sort_by_crowding_distance(new_front)
-            new_population.extend(new_sorted_front)
+            front = np.where(fitness_vals == fitness)[0]
+            if len(front) == 0:
+                continue
+            distance = get_crowding_distance(objectives[front])
+            set_population_values(population, 'distance', distance, front)
+            indexes.extend(front[np.argsort(distance, kind='stable')[::-1]])
+        indexes = np.array(indexes, dtype='int64')
     else:
-        new_population = sort_by_energy(population)
+        energy_vals, missing = get_population_values(population, 'energy')
+        if np.any(missing):
+            raise Exception('sort_by_energy: energy has not been stored for all Individuals in population')
+        indexes = np.argsort(energy_vals, kind='stable')
     # now that population is sorted, assign rank to Individuals
-    for rank, individual in enumerate(new_population):
-        individual.rank = rank
+    set_population_values(population, 'rank', np.arange(len(indexes)), indexes)
 
 
-def assign_fitness_by_dominance(population, disp=False):
+def get_dominated(objectives, candidates, block_size=1024):
     """
-    Modifies in place the fitness attribute of each Individual in the population.
-    :param population: list of :class:'Individual'
-    :param disp: bool
+    Returns a boolean mask of the candidate rows of an array of objective values that are dominated by at least one
+    other candidate. Row p dominates row q if each of its objective values is equal or better, and at least one of its
+    objective values is better.
+    :param objectives: 2d array
+    :param candidates: array of int
+    :param block_size: int; number of rows compared at once, to limit memory usage
+    :return: array of bool
     """
+    candidate_objectives = objectives[candidates]
+    dominated = np.zeros(len(candidates), dtype=bool)
+    for start in range(0, len(candidates), block_size):
+        block = candidate_objectives[start:start + block_size]
+        less_equal = np.all(candidate_objectives[:, None, :] <= block[None, :, :], axis=2)
+        less = np.any(candidate_objectives[:, None, :] < block[None, :, :], axis=2)
+        dominated[start:start + block_size] = np.any(less_equal & less, axis=0)
+    return dominated
 
-    def dominates(p, q):
-        """
-        Individual p dominates Individual q if each of its objective values is equal or better, and at least one of
-        its objective values is better.
-        :param p: :class:'Individual'
-        :param q: :class:'Individual'
-        :return: bool
-        """
-        diff12 = np.subtract(p.objectives, q.objectives)
-        return ((diff12 <= 0.).all()) and ((diff12 < 0.).any())
 
-    pop_size = len(population)
-    num_objectives = [len(individual.objectives) for individual in population if individual.objectives is not None]
-    if len(num_objectives) < pop_size:
+# Methods available to get_fitness_by_dominance
+dominance_methods = ['auto', 'sweep', 'sort', 'block']
+
+
+def get_fitness_by_dominance(objectives, method='auto', block_size=1024, max_fronts=None):
+    """
+    Returns the index of the non-dominated front that contains each row of an array of objective values. Row p
+    dominates row q if each of its objective values is equal or better, and at least one of its objective values is
+    better. Rows in the first front are not dominated by any row, and each subsequent front is non-dominated once all
+    previous fronts have been removed. All methods assign identical fronts:
+    'sweep': O(N log N) for 2 objectives and O(N log^2 N) for 3 objectives (see get_fitness_by_dominance_sweep);
+    'sort': vectorized comparison against the members of a few fronts per row (see get_fitness_by_dominance_sort);
+    'block': repeatedly removes the non-dominated rows, comparing all pairs of remaining rows in blocks (see
+    get_dominated);
+    'auto': 'sweep' for 2 or 3 objectives, otherwise 'sort'.
+    If max_fronts is provided, only the first max_fronts fronts are sorted, and all other rows are assigned a fitness of
+    max_fronts, without keeping track of their fronts.
+    :param objectives: 2d array
+    :param method: str
+    :param block_size: int; number of rows compared at once by the 'block' method, to limit memory usage
+    :param max_fronts: int
+    :return: array of int
+    """
+    if method not in dominance_methods:
+        raise ValueError('get_fitness_by_dominance: invalid method: %s; must be one of %s' %
+                         (method, dominance_methods))
+    objectives = np.asarray(objectives, dtype='float64')
+    pop_size, num_objectives = objectives.shape
+    if num_objectives < 2 or pop_size < 2:
+        return np.zeros(pop_size, dtype='int64')
+    if method == 'auto':
+        method = 'sweep' if num_objectives <= 3 else 'sort'
+    if method == 'sweep':
+        return get_fitness_by_dominance_sweep(objectives, max_fronts)
+    elif method == 'sort':
+        return get_fitness_by_dominance_sort(objectives, max_fronts)
+    fitness_vals = np.zeros(pop_size, dtype='int64')
+    remaining = np.arange(pop_size)
+    fitness = 0
+    while len(remaining) > 0:
+        if fitness == max_fronts:
+            fitness_vals[remaining] = fitness
+            break
+        dominated = get_dominated(objectives, remaining, block_size)
+        fitness_vals[remaining[~dominated]] = fitness
+        remaining = remaining[dominated]
+        fitness += 1
+    return fitness_vals
+
+
+def get_fitness_by_dominance_sort(objectives, max_fronts=None):
+    """
+    Returns the index of the non-dominated front that contains each row of an array of objective values, without
+    comparing every pair of rows. Rows are visited in lexicographic order of their objective values, so that no row can
+    be dominated by a row visited after it. Each row is added to the first front that does not contain a row that
+    dominates it. If a front contains a row that dominates it, so does every previous front, so this front is found by
+    binary search over the fronts, and each comparison is vectorized over the members of a front.
+    :param objectives: 2d array
+    :param max_fronts: int; see get_fitness_by_dominance
+    :return: array of int
+    """
+    pop_size, num_objectives = objectives.shape
+    fitness_vals = np.zeros(pop_size, dtype='int64')
+    # np.lexsort sorts by the last key first
+    order = np.lexsort(objectives.T[::-1])
+    # one column per row, so that the members of each front are contiguous
+    sorted_objectives = np.ascontiguousarray(objectives[order].T)
+    fronts = []  # preallocated arrays of objective values
+    sizes = []  # number of members of each front
+    for i in range(pop_size):
+        this_objectives = sorted_objectives[:, i:i + 1]
+        lo, hi = 0, len(fronts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            front = fronts[mid][:, :sizes[mid]]
+            # the first objective of every previous row is equal or better
+            candidates = np.all(front[1:] <= this_objectives[1:], axis=0)
+            if np.any(candidates) and np.any(front[:, candidates] != this_objectives):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == max_fronts:
+            fitness_vals[order[i]] = lo
+            continue
+        if lo == len(fronts):
+            fronts.append(np.empty((num_objectives, 16)))
+            sizes.append(0)
+        elif sizes[lo] == fronts[lo].shape[1]:
+            fronts[lo] = np.concatenate([fronts[lo], np.empty_like(fronts[lo])], axis=1)
+        fronts[lo][:, sizes[lo]] = this_objectives[:, 0]
+        sizes[lo] += 1
+        fitness_vals[order[i]] = lo
+    return fitness_vals
+
+
+def get_fitness_by_dominance_sweep(objectives, max_fronts=None):
+    """
+    Returns the index of the non-dominated front that contains each row of an array of 2 or 3 objective values, in the
+    style of the sweep algorithms of Kung et al. and Jensen. As in get_fitness_by_dominance_sort, rows are visited in
+    lexicographic order, and added to the first front that does not dominate them, found by binary search. A previously
+    visited row p dominates row q unless it is equal to q, or worse in one of the remaining objectives. Each front is
+    summarized so that this test takes constant time for 2 objectives, and O(log N) time for 3 objectives:
+    With 2 objectives, a front dominates q if its lowest second objective value is lower than that of q, or equal, but
+    first reached by a row with a lower first objective value. These keys increase with the index of the front, so the
+    binary search is done with bisect over a list of keys.
+    With 3 objectives, each front keeps the staircase of members that are non-dominated in the last 2 objectives, sorted
+    by the second objective, along with the lowest first objective value of each step.
+    :param objectives: 2d array
+    :param max_fronts: int; see get_fitness_by_dominance
+    :return: array of int
+    """
+    pop_size, num_objectives = objectives.shape
+    if num_objectives not in [2, 3]:
+        raise ValueError('get_fitness_by_dominance_sweep: only implemented for 2 or 3 objectives; %i provided' %
+                         num_objectives)
+    fitness_vals = np.zeros(pop_size, dtype='int64')
+    # np.lexsort sorts by the last key first
+    order = np.lexsort(objectives.T[::-1])
+    sorted_objectives = objectives[order].tolist()
+    fronts = []
+    if num_objectives == 2:
+        for i, (val0, val1) in enumerate(sorted_objectives):
+            key = (val1, val0)
+            fitness = bisect.bisect_left(fronts, key)
+            if fitness == max_fronts:
+                pass
+            elif fitness == len(fronts):
+                fronts.append(key)
+            elif key < fronts[fitness]:
+                fronts[fitness] = key
+            fitness_vals[order[i]] = fitness
+        return fitness_vals
+
+    def dominates(front, val0, val1, val2):
+        steps1, steps2, steps0 = front
+        # the last step with an equal or better second objective value has the best third objective value
+        j = bisect.bisect_right(steps1, val1) - 1
+        if j < 0 or steps2[j] > val2:
+            return False
+        return steps2[j] < val2 or steps1[j] < val1 or steps0[j] < val0
+
+    for i, (val0, val1, val2) in enumerate(sorted_objectives):
+        lo, hi = 0, len(fronts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if dominates(fronts[mid], val0, val1, val2):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == max_fronts:
+            pass
+        elif lo == len(fronts):
+            fronts.append(([val1], [val2], [val0]))
+        else:
+            steps1, steps2, steps0 = fronts[lo]
+            j = bisect.bisect_right(steps1, val1)
+            # skip rows that are equal or worse than an existing step in the last 2 objectives
+            if j == 0 or steps2[j - 1] > val2:
+                # remove the steps that are equal or worse in the last 2 objectives
+                k = j
+                while k < len(steps1) and steps2[k] >= val2:
+                    k += 1
+                if j > 0 and steps1[j - 1] == val1:
+                    j -= 1
+                steps1[j:k] = [val1]
+                steps2[j:k] = [val2]
+                steps0[j:k] = [val0]
+        fitness_vals[order[i]] = lo
+    return fitness_vals
+
+
+def assign_fitness_by_dominance(population, disp=False, method='auto'):
+    """
+    Modifies in place the fitness attribute of each Individual in the population. Individuals in the first
+    non-dominated front are assigned a fitness of 0. Each subsequent front is non-dominated once all previous fronts
+    have been removed.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param disp: bool
+    :param method: str; see get_fitness_by_dominance
+    """
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
         raise Exception('assign_fitness_by_dominance: objectives have not been stored for all Individuals in '
                         'population')
-    num_objectives = max(num_objectives)
-    if num_objectives > 1:
-        F = {0: []}  # first front of dominant Individuals
-        S = dict()
-        n = dict()
-
-        for p in range(len(population)):
-            S[p] = []  # list of Individuals that p dominates
-            n[p] = 0  # number of Individuals that dominate p
-
-            for q in range(len(population)):
-                if dominates(population[p], population[q]):
-                    S[p].append(q)
-                elif dominates(population[q], population[p]):
-                    n[p] += 1
-
-            if n[p] == 0:
-                population[p].fitness = 0  # fitness 0 indicates first dominant front
-                F[0].append(p)
-
-        # excluding the Individuals that dominated the previous front, find the next front
-        i = 0
-        while len(F[i]) > 0:
-            F[i + 1] = []  # next front
-            # take the elements from the previous front
-            for p in F[i]:
-                # take the elements that p dominates
-                for q in S[p]:
-                    # decrease domination value of all Individuals that p dominates
-                    n[q] -= 1
-                    if n[q] == 0:
-                        population[q].fitness = i + 1  # assign fitness of current front
-                        F[i + 1].append(q)
-            i += 1
-    else:
-        for individual in population:
-            individual.fitness = 0
+    fitness_vals = get_fitness_by_dominance(objectives, method=method)
+    set_population_values(population, 'fitness', fitness_vals)
     if disp:
+        F = {i: np.where(fitness_vals == i)[0].tolist() for i in range(int(np.max(fitness_vals)) + 1)}
+        F[len(F)] = []
         print(F)
 
 
+# Methods available to get_hypervolume and get_hypervolume_contributions
+hypervolume_methods = ['auto', 'exact', 'monte_carlo']
+# Default number of samples of the 'monte_carlo' method per row of objective values, and its bounds
+hypervolume_samples_per_row = 100
+hypervolume_min_samples = 10000
+hypervolume_max_samples = 100000
+# PopulationAnnealing only tracks the hypervolume of more objectives if track_hypervolume is True
+hypervolume_max_tracked_objectives = 4
+
+
+def get_hypervolume(objectives, reference_point, method='auto', num_samples=None, random=None):
+    """
+    Returns the hypervolume of the region of objective space that is dominated by the rows of an array of objective
+    values, and bounded by a reference point. Rows that are not better than the reference point in every objective
+    do not contribute. Available methods:
+    'exact': O(N log N) for 2 or 3 objectives (see get_hypervolume_exact). With more objectives, the volume is sliced
+    along the last objective, so the cost grows by up to a factor of N with each additional objective;
+    'monte_carlo': an unbiased estimate from num_samples points sampled uniformly from the bounding box of the rows
+    and the reference point (see get_hypervolume_monte_carlo);
+    'auto': 'exact' for up to 4 objectives, otherwise 'monte_carlo'.
+    :param objectives: 2d array
+    :param reference_point: array of float
+    :param method: str
+    :param num_samples: int; only for 'monte_carlo'; default depends on the number of rows (see
+        get_hypervolume_num_samples)
+    :param random: int or :class:'np.random.RandomState'; only for 'monte_carlo'
+    :return: float
+    """
+    objectives = np.asarray(objectives, dtype='float64')
+    if objectives.ndim != 2:
+        raise ValueError('get_hypervolume: objectives must be a 2d array')
+    reference_point = np.broadcast_to(np.asarray(reference_point, dtype='float64'), (objectives.shape[1],))
+    if method not in hypervolume_methods:
+        raise ValueError('get_hypervolume: invalid method: %s; must be one of: %s' % (method, hypervolume_methods))
+    if method == 'auto':
+        method = 'exact' if objectives.shape[1] <= 4 else 'monte_carlo'
+    if method == 'exact':
+        return get_hypervolume_exact(objectives, reference_point)
+    return get_hypervolume_monte_carlo(objectives, reference_point, num_samples=num_samples, random=random)
+
+
+def get_hypervolume_exact(objectives, reference_point):
+    """
+    With 2 objectives, the rows are sorted by the first objective, and the dominated area is summed one rectangle at
+    a time. With 3 objectives, the rows are swept in order of the third objective, and the area dominated in the first
+    2 objectives is updated as each row is added to a sorted front, in the style of the algorithm of Beume et al.
+    With more objectives, the non-dominated rows are sorted by the last objective, and the volume of each slice
+    between consecutive values is computed recursively from the rows below it. Only the rows below a slice that are
+    non-dominated in the remaining objectives are kept, and the volume of a slice is only recomputed if the row that
+    starts it is not dominated in the remaining objectives by those rows.
+    :param objectives: 2d array
+    :param reference_point: array of float
+    :return: float
+    """
+    objectives = objectives[np.all(objectives < reference_point, axis=1)]
+    pop_size, num_objectives = objectives.shape
+    if pop_size == 0:
+        return 0.
+    if num_objectives == 1:
+        return float(reference_point[0] - np.min(objectives))
+    if num_objectives == 2:
+        # np.lexsort sorts by the last key first
+        sorted_objectives = objectives[np.lexsort(objectives.T[::-1])].tolist()
+        ref0, ref1 = reference_point
+        volume = 0.
+        min_val1 = ref1
+        for val0, val1 in sorted_objectives:
+            if val1 < min_val1:
+                volume += (ref0 - val0) * (min_val1 - val1)
+                min_val1 = val1
+        return volume
+    if num_objectives == 3:
+        order = np.argsort(objectives[:, 2], kind='stable')
+        sorted_objectives = objectives[order].tolist()
+        front = SortedFront2D(reference_point[:2])
+        volume = 0.
+        for i, (val0, val1, val2) in enumerate(sorted_objectives):
+            front.add(val0, val1)
+            next_val2 = sorted_objectives[i + 1][2] if i + 1 < pop_size else reference_point[2]
+            volume += front.area * (next_val2 - val2)
+        return volume
+    objectives = objectives[get_fitness_by_dominance(objectives) == 0]
+    objectives = objectives[np.argsort(objectives[:, -1], kind='stable')]
+    volume = 0.
+    # the rows below each slice that are non-dominated in the remaining objectives, and the volume they dominate
+    front = objectives[:0, :-1]
+    slice_volume = 0.
+    for i in range(len(objectives)):
+        this_objectives = objectives[i, :-1]
+        if not np.any(np.all(front <= this_objectives, axis=1)):
+            front = np.vstack([front[~np.all(this_objectives <= front, axis=1)], this_objectives])
+            slice_volume = get_hypervolume_exact(front, reference_point[:-1])
+        next_val = objectives[i + 1, -1] if i + 1 < len(objectives) else reference_point[-1]
+        if next_val > objectives[i, -1]:
+            volume += slice_volume * (next_val - objectives[i, -1])
+    return volume
+
+
+class SortedFront2D(object):
+    """
+    A front of non-dominated points in 2 objectives, sorted by the first objective, that keeps track of the area it
+    dominates, bounded by a reference point. Adding a point updates the area in O(log N) time, plus the time to remove
+    any points that it dominates.
+    """
+
+    def __init__(self, reference_point):
+        """
+
+        :param reference_point: array of float
+        """
+        self.ref0, self.ref1 = [float(val) for val in reference_point]
+        self.vals0 = []
+        self.vals1 = []
+        self.area = 0.
+
+    def add(self, val0, val1):
+        """
+        Returns False if the point is dominated by, or equal to, a point in the front.
+        :param val0: float
+        :param val1: float
+        :return: bool
+        """
+        vals0, vals1 = self.vals0, self.vals1
+        j = bisect.bisect_left(vals0, val0)
+        if (j > 0 and vals1[j - 1] <= val1) or (j < len(vals0) and vals0[j] == val0 and vals1[j] <= val1):
+            return False
+        prev_val1 = vals1[j - 1] if j > 0 else self.ref1
+        k = j
+        while k < len(vals0) and vals1[k] >= val1:
+            k += 1
+        next_val0 = vals0[k] if k < len(vals0) else self.ref0
+        # the area of the new rectangle, minus the area that was already dominated by the removed points
+        area = (next_val0 - val0) * (prev_val1 - val1)
+        for i in range(j, k):
+            area -= ((vals0[i + 1] if i + 1 < k else next_val0) - vals0[i]) * (prev_val1 - vals1[i])
+        self.area += area
+        vals0[j:k] = [val0]
+        vals1[j:k] = [val1]
+        return True
+
+
+def get_hypervolume_monte_carlo(objectives, reference_point, num_samples=None, random=None, block_size=None):
+    """
+    Estimates the hypervolume from the fraction of points, sampled uniformly from the box between the lowest value of
+    each objective and the reference point, that are dominated by at least one row. The standard error of the estimate
+    decreases with the square root of num_samples. Rows are compared with the samples in order of decreasing volume of
+    the box that they dominate, and samples that are already dominated are not compared with the remaining rows.
+    :param objectives: 2d array
+    :param reference_point: array of float
+    :param num_samples: int; default depends on the number of rows (see get_hypervolume_num_samples)
+    :param random: int or :class:'np.random.RandomState'
+    :param block_size: int; number of values compared at once, to limit memory usage; default is ~1e7
+    :return: float
+    """
+    objectives = objectives[np.all(objectives < reference_point, axis=1)]
+    if len(objectives) == 0:
+        return 0.
+    if num_samples is None:
+        num_samples = get_hypervolume_num_samples(len(objectives))
+    if block_size is None:
+        block_size = 10000000
+    lower = np.min(objectives, axis=0)
+    samples = get_hypervolume_samples(lower, reference_point, num_samples, random)
+    objectives = objectives[np.argsort(-np.prod(reference_point - objectives, axis=1), kind='stable')]
+    remaining = samples
+    start = 0
+    while start < len(objectives) and len(remaining) > 0:
+        stop = start + max(1, block_size // remaining.size)
+        dominated = np.any(np.all(objectives[None, start:stop, :] <= remaining[:, None, :], axis=2), axis=1)
+        remaining = remaining[~dominated]
+        start = stop
+    return float(np.prod(reference_point - lower)) * (len(samples) - len(remaining)) / len(samples)
+
+
+def get_hypervolume_num_samples(num_rows):
+    """
+    Returns the default number of samples of the 'monte_carlo' method for an array with the specified number of rows:
+    hypervolume_samples_per_row samples per row, between hypervolume_min_samples and hypervolume_max_samples. Small
+    fronts need fewer samples to resolve the region they dominate.
+    :param num_rows: int
+    :return: int
+    """
+    return int(min(max(hypervolume_samples_per_row * num_rows, hypervolume_min_samples), hypervolume_max_samples))
+
+
+def get_hypervolume_samples(lower, reference_point, num_samples, random=None):
+    """
+    Returns points sampled uniformly from the box between lower and reference_point.
+    :param lower: array of float
+    :param reference_point: array of float
+    :param num_samples: int
+    :param random: int or :class:'np.random.RandomState'
+    :return: 2d array
+    """
+    random = check_random_state(random)
+    return lower + random.random_sample((int(num_samples), len(lower))) * (reference_point - lower)
+
+
+def iter_dominated_samples(objectives, samples, block_size=None):
+    """
+    Yields a boolean array for each block of samples, with one row per sample, and one column per row of objective
+    values, which is True if the sample is dominated by (or equal to) that row.
+    :param objectives: 2d array
+    :param samples: 2d array
+    :param block_size: int; default limits each comparison to ~1e7 values
+    :return: generator of 2d array of bool
+    """
+    if block_size is None:
+        block_size = max(1, 10000000 // max(1, objectives.size))
+    for start in range(0, len(samples), block_size):
+        block = samples[start:start + block_size]
+        yield np.all(objectives[None, :, :] <= block[:, None, :], axis=2)
+
+
+def get_hypervolume_contributions(objectives, reference_point, method='auto', num_samples=None, random=None):
+    """
+    Returns the exclusive hypervolume contribution of each row of an array of objective values: the hypervolume that
+    would be lost if it were removed. Dominated rows, and rows that are equal to another row, contribute 0.
+    With 'exact', if all rows are non-dominated in 2 objectives, contributions are computed from the neighbors of each
+    row along the sorted front. Otherwise, the contribution of each non-dominated row is the difference between the
+    hypervolume with and without it. With 'monte_carlo', each sample is credited to a row if it is dominated by that
+    row alone.
+    :param objectives: 2d array
+    :param reference_point: array of float
+    :param method: str; see get_hypervolume
+    :param num_samples: int; only for 'monte_carlo'; default depends on the number of rows (see
+        get_hypervolume_num_samples)
+    :param random: int or :class:'np.random.RandomState'; only for 'monte_carlo'
+    :return: array of float
+    """
+    objectives = np.asarray(objectives, dtype='float64')
+    pop_size, num_objectives = objectives.shape
+    reference_point = np.broadcast_to(np.asarray(reference_point, dtype='float64'), (num_objectives,))
+    if method not in hypervolume_methods:
+        raise ValueError('get_hypervolume_contributions: invalid method: %s; must be one of: %s' %
+                         (method, hypervolume_methods))
+    if method == 'auto':
+        method = 'exact' if num_objectives <= 4 else 'monte_carlo'
+    contributions = np.zeros(pop_size)
+    if pop_size == 0:
+        return contributions
+    if method == 'monte_carlo':
+        inside = np.flatnonzero(np.all(objectives < reference_point, axis=1))
+        if len(inside) == 0:
+            return contributions
+        lower = np.min(objectives[inside], axis=0)
+        if num_samples is None:
+            num_samples = get_hypervolume_num_samples(len(inside))
+        samples = get_hypervolume_samples(lower, reference_point, num_samples, random)
+        counts = np.zeros(len(inside))
+        for dominated in iter_dominated_samples(objectives[inside], samples):
+            counts += np.sum(dominated[np.sum(dominated, axis=1) == 1], axis=0)
+        contributions[inside] = float(np.prod(reference_point - lower)) * counts / len(samples)
+        return contributions
+    candidates = np.flatnonzero(get_fitness_by_dominance(objectives) == 0)
+    if num_objectives == 2 and len(candidates) == pop_size:
+        clipped = np.minimum(objectives[candidates], reference_point)
+        # np.lexsort sorts by the last key first
+        order = np.lexsort(clipped.T[::-1])
+        contributions[candidates[order]] = get_sorted_front_contributions(clipped[order], reference_point)
+        return contributions
+    volume = get_hypervolume_exact(objectives, reference_point)
+    for i in candidates:
+        contributions[i] = volume - get_hypervolume_exact(np.delete(objectives, i, axis=0), reference_point)
+    return contributions
+
+
+def get_sorted_front_contributions(objectives, reference_point):
+    """
+    Returns the exclusive hypervolume contribution of each point of a front of 2 objectives, sorted by the first
+    objective, and bounded by the reference point: the rectangle between its neighbors along the front.
+    :param objectives: 2d array
+    :param reference_point: array of float
+    :return: array of float
+    """
+    next_vals0 = np.append(objectives[1:, 0], reference_point[0])
+    prev_vals1 = np.insert(objectives[:-1, 1], 0, reference_point[1])
+    return (next_vals0 - objectives[:, 0]) * (prev_vals1 - objectives[:, 1])
+
+
+def get_hypervolume_selection(objectives, num_selected, reference_point, method='auto', num_samples=10000,
+                              random=None, priority=None):
+    """
+    Reduces a set of mutually non-dominated rows of objective values to num_selected rows by repeatedly removing the
+    row with the lowest exclusive hypervolume contribution, as in the selection of SMS-EMOA. Ties are broken by
+    removing the row with the highest priority value. Returns the indexes of the selected rows, in their original order.
+    Since the contributions of the remaining rows can only increase when a row is removed, they are updated
+    incrementally: with 2 objectives, only the 2 neighbors of the removed row along the front are updated; with 'exact',
+    stale contributions are lower bounds, so only the row with the lowest contribution needs to be recomputed before
+    it is removed; with 'monte_carlo', the same samples are reused, and the number of rows that dominate each sample is
+    updated.
+    :param objectives: 2d array
+    :param num_selected: int
+    :param reference_point: array of float
+    :param method: str; see get_hypervolume
+    :param num_samples: int; only for 'monte_carlo'
+    :param random: int or :class:'np.random.RandomState'; only for 'monte_carlo'
+    :param priority: array of float
+    :return: array of int
+    """
+    objectives = np.asarray(objectives, dtype='float64')
+    pop_size, num_objectives = objectives.shape
+    reference_point = np.broadcast_to(np.asarray(reference_point, dtype='float64'), (num_objectives,))
+    if method not in hypervolume_methods:
+        raise ValueError('get_hypervolume_selection: invalid method: %s; must be one of: %s' %
+                         (method, hypervolume_methods))
+    if method == 'auto':
+        method = 'exact' if num_objectives <= 4 else 'monte_carlo'
+    if priority is None:
+        priority = np.arange(pop_size)
+    num_selected = max(0, int(num_selected))
+    if num_selected >= pop_size:
+        return np.arange(pop_size)
+    selected = np.ones(pop_size, dtype=bool)
+
+    def remove(candidates, contributions):
+        # among the rows with the lowest contribution, remove the row with the highest priority value
+        tied = candidates[contributions == np.min(contributions)]
+        index = tied[np.argmax(priority[tied])]
+        selected[index] = False
+        return index
+
+    if method == 'monte_carlo':
+        clipped = np.minimum(objectives, reference_point)
+        lower = np.min(clipped, axis=0)
+        samples = get_hypervolume_samples(lower, reference_point, num_samples, random)
+        dominated = np.concatenate(list(iter_dominated_samples(clipped, samples)), axis=0)
+        counts = np.sum(dominated, axis=1)
+        for i in range(pop_size - num_selected):
+            candidates = np.flatnonzero(selected)
+            contributions = np.sum(dominated[counts == 1][:, candidates], axis=0)
+            counts -= dominated[:, remove(candidates, contributions)]
+        return np.flatnonzero(selected)
+
+    if num_objectives == 2:
+        clipped = np.minimum(objectives, reference_point)
+        # np.lexsort sorts by the last key first
+        order = np.lexsort(clipped.T[::-1])
+        front = clipped[order]
+        contributions = get_sorted_front_contributions(front, reference_point)
+        for i in range(pop_size - num_selected):
+            j = np.flatnonzero(order == remove(order, contributions))[0]
+            order = np.delete(order, j)
+            front = np.delete(front, j, axis=0)
+            contributions = np.delete(contributions, j)
+            for k in range(max(0, j - 1), min(len(order), j + 1)):
+                next_val0 = front[k + 1, 0] if k + 1 < len(order) else reference_point[0]
+                prev_val1 = front[k - 1, 1] if k > 0 else reference_point[1]
+                contributions[k] = (next_val0 - front[k, 0]) * (prev_val1 - front[k, 1])
+        return np.flatnonzero(selected)
+
+    contributions = get_hypervolume_contributions(objectives, reference_point, method='exact')
+    stale = np.zeros(pop_size, dtype=bool)
+    while np.count_nonzero(selected) > num_selected:
+        candidates = np.flatnonzero(selected)
+        lowest = candidates[contributions[candidates] == np.min(contributions[candidates])]
+        if np.any(stale[lowest]):
+            volume = get_hypervolume_exact(objectives[candidates], reference_point)
+            for index in lowest[stale[lowest]]:
+                contributions[index] = volume - get_hypervolume_exact(
+                    objectives[candidates[candidates != index]], reference_point)
+                stale[index] = False
+            continue
+        remove(lowest, contributions[lowest])
+        stale[:] = True
+    return np.flatnonzero(selected)
+
+
 def assign_normalized_objectives(population, min_objectives=None, max_objectives=None):
     """
     Modifies in place the normalized_objectives attributes of each Individual in the population
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     :param min_objectives: array of float
     :param max_objectives: array of float
     """
-    pop_size = len(population)
-    num_objectives = [len(individual.objectives) for individual in population if individual.objectives is not None]
-    if len(num_objectives) < pop_size:
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
         raise Exception('assign_normalized_objectives: objectives have not been stored for all Individuals in '
                         'population')
     if min_objectives is None or len(min_objectives) == 0 or max_objectives is None or len(max_objectives) == 0:
         min_objectives, max_objectives = get_objectives_edges(population)
-    num_objectives = max(num_objectives)
-    for individual in population:
-        individual.normalized_objectives = np.zeros(num_objectives, dtype='float32')
+    set_population_values(population, 'normalized_objectives',
+                          get_normalized_objectives(objectives, min_objectives, max_objectives))
+
+
+def get_normalized_objectives(objectives, min_objectives, max_objectives):
+    """
+    Normalizes each column of an array of objective values (see normalize_dynamic).
+    :param objectives: 2d array
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :return: 2d array of float32
+    """
+    pop_size, num_objectives = objectives.shape
+    normalized_objectives = np.zeros((pop_size, num_objectives), dtype='float32')
     for m in range(num_objectives):
         if min_objectives[m] != max_objectives[m]:
-            objective_vals = [individual.objectives[m] for individual in population]
-            normalized_objective_vals = normalize_dynamic(objective_vals, min_objectives[m], max_objectives[m])
-            for val, individual in zip(normalized_objective_vals, population):
-                individual.normalized_objectives[m] = val
+            normalized_objectives[:, m] = normalize_dynamic(objectives[:, m], min_objectives[m], max_objectives[m])
+    return normalized_objectives
 
 
-def evaluate_population_annealing(population, min_objectives=None, max_objectives=None, disp=False, **kwargs):
+def get_population_annealing_ranking(objectives, min_objectives, max_objectives):
     """
-    Modifies in place the fitness, energy and rank attributes of each Individual in the population.
-    :param population: list of :class:'Individual'
+    Computes the ranking attributes assigned by evaluate_population_annealing from an array of objective values, with
+    one row per model: the non-dominated front of each model (fitness), its objectives normalized by the provided
+    edges, its energy (the sum of its normalized objectives), and its rank, sorting by fitness and then by energy.
+    :param objectives: 2d array
     :param min_objectives: array of float
     :param max_objectives: array of float
-    :param disp: bool
+    :return: tuple of array; fitness, normalized_objectives, energy, rank
+    """
+    fitness_vals = get_fitness_by_dominance(objectives)
+    normalized_objectives = get_normalized_objectives(objectives, min_objectives, max_objectives)
+    energy_vals = np.sum(normalized_objectives.astype('float64'), axis=1)
+    # np.lexsort is stable, and sorts by the last key first
+    indexes = np.lexsort((energy_vals, fitness_vals))
+    rank_vals = np.empty(len(indexes), dtype='int64')
+    rank_vals[indexes] = np.arange(len(indexes))
+    return fitness_vals, normalized_objectives, energy_vals, rank_vals
+
+
+def get_archived_ranking(objectives, min_objectives, max_objectives, archived=None, ranking=None, num_ranked=None,
+                         num_fronts=None, **kwargs):
+    """
+    Computes ranking attributes for rows that include models kept in a :class:'ParetoArchive'. Archived models are not
+    dominated by any model in the history, so archived rows form the first front (fitness 0), and are ranked before
+    all other rows. The archived rows and the remaining rows are each ranked among themselves by the provided ranking
+    function, so no dominance comparisons are made between them, and the fitness of the remaining rows is offset by 1.
+    If no rows, or all rows, are archived, all rows are ranked together.
+    If num_ranked or num_fronts is provided, the remaining rows are not all sorted into fronts. Instead, only their
+    first fronts are sorted (see get_fitness_by_dominance), at least num_fronts of them, and more as needed until at
+    least num_ranked rows, including the archived rows, are ranked, which is all that selection requires. Only these
+    rows are ranked by the ranking function. The rows that are left are assigned the fitness of the next front, which
+    is a lower bound of their actual fitness, and are ranked after all other rows by energy.
+    :param objectives: 2d array
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param archived: array of bool; whether each row is archived
+    :param ranking: callable; default is get_population_annealing_ranking
+    :param num_ranked: int; minimum number of rows to rank
+    :param num_fronts: int; minimum number of fronts of the remaining rows to rank
+    :return: tuple of array; fitness, normalized_objectives, energy, rank
+    """
+    if ranking is None:
+        ranking = get_population_annealing_ranking
+    if archived is None or not np.any(archived):
+        return ranking(objectives, min_objectives, max_objectives, **kwargs)
+    if np.all(archived):
+        fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+            ranking(objectives, min_objectives, max_objectives, **kwargs)
+        return np.zeros_like(fitness_vals), normalized_objectives, energy_vals, rank_vals
+    pop_size, num_objectives = objectives.shape
+    fitness_vals = np.empty(pop_size, dtype='int64')
+    normalized_objectives = np.empty((pop_size, num_objectives), dtype='float32')
+    energy_vals = np.empty(pop_size)
+    rank_vals = np.empty(pop_size, dtype='int64')
+    archived_indexes = np.flatnonzero(archived)
+    other_indexes = np.flatnonzero(~archived)
+    _, normalized_objectives[archived_indexes], energy_vals[archived_indexes], rank_vals[archived_indexes] = \
+        ranking(objectives[archived_indexes], min_objectives, max_objectives, **kwargs)
+    fitness_vals[archived_indexes] = 0
+    if num_ranked is None and num_fronts is None:
+        unranked_indexes = np.array([], dtype='int64')
+    else:
+        num_ranked = 0 if num_ranked is None else int(num_ranked) - len(archived_indexes)
+        max_fronts = max(1, 0 if num_fronts is None else int(num_fronts))
+        while True:
+            ranked = get_fitness_by_dominance(objectives[other_indexes], max_fronts=max_fronts) < max_fronts
+            num_ranked_fronts = np.count_nonzero(ranked)
+            if num_ranked_fronts == len(ranked) or num_ranked_fronts >= num_ranked:
+                break
+            # extrapolate the number of fronts from the number of rows in the fronts sorted so far
+            max_fronts = max(2 * max_fronts, int(np.ceil(1.25 * max_fronts * num_ranked / max(1, num_ranked_fronts))))
+        other_indexes, unranked_indexes = other_indexes[ranked], other_indexes[~ranked]
+    if len(other_indexes) > 0:
+        other_fitness_vals, normalized_objectives[other_indexes], energy_vals[other_indexes], other_rank_vals = \
+            ranking(objectives[other_indexes], min_objectives, max_objectives, **kwargs)
+        fitness_vals[other_indexes] = other_fitness_vals + 1
+        rank_vals[other_indexes] = other_rank_vals + len(archived_indexes)
+    if len(unranked_indexes) > 0:
+        normalized_objectives[unranked_indexes] = \
+            get_normalized_objectives(objectives[unranked_indexes], min_objectives, max_objectives)
+        energy_vals[unranked_indexes] = np.sum(normalized_objectives[unranked_indexes].astype('float64'), axis=1)
+        fitness_vals[unranked_indexes] = np.max(fitness_vals[other_indexes]) + 1 if len(other_indexes) > 0 else 1
+        indexes = unranked_indexes[np.argsort(energy_vals[unranked_indexes], kind='stable')]
+        rank_vals[indexes] = len(archived_indexes) + len(other_indexes) + np.arange(len(indexes))
+    return fitness_vals, normalized_objectives, energy_vals, rank_vals
+
+
+def get_constrained_ranking(objectives, violation, min_objectives, max_objectives, ranking=None, archived=None,
+                            num_ranked=None, num_fronts=None, **kwargs):
+    """
+    Computes ranking attributes with constrained domination (Deb): feasible rows (violation <= 0) dominate all
+    infeasible rows, and are ranked among themselves by the provided ranking function. Infeasible rows are ranked
+    after all feasible rows, in fronts of increasing violation, and then by energy. The objectives of infeasible rows
+    are clipped to the provided edges before they are normalized, so they do not affect the normalization of feasible
+    rows, which should be excluded when the edges are computed (see get_objectives_edges).
+    :param objectives: 2d array
+    :param violation: array of float; total constraint violation of each row
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param ranking: callable; default is get_population_annealing_ranking
+    :param archived: array of bool; whether each row is kept in a :class:'ParetoArchive' (see get_archived_ranking)
+    :param num_ranked: int; only with archived; see get_archived_ranking
+    :param num_fronts: int; only with archived; see get_archived_ranking
+    :return: tuple of array; fitness, normalized_objectives, energy, rank
     """
-    if len(population) > 0:
-        assign_fitness_by_dominance(population)
-        assign_normalized_objectives(population, min_objectives, max_objectives)
-        assign_relative_energy(population)
-        assign_rank_by_fitness_and_energy(population)
+    if ranking is None:
+        ranking = get_population_annealing_ranking
+    feasible = violation <= 0.
+    if archived is not None:
+        # infeasible models are not archived
+        ranking = partial(get_archived_ranking, archived=archived[feasible], ranking=ranking, num_ranked=num_ranked,
+                          num_fronts=num_fronts)
+    if np.all(feasible):
+        return ranking(objectives, min_objectives, max_objectives, **kwargs)
+    pop_size, num_objectives = objectives.shape
+    fitness_vals = np.empty(pop_size, dtype='int64')
+    normalized_objectives = np.empty((pop_size, num_objectives), dtype='float32')
+    energy_vals = np.empty(pop_size)
+    rank_vals = np.empty(pop_size, dtype='int64')
+    feasible_indexes = np.flatnonzero(feasible)
+    infeasible_indexes = np.flatnonzero(~feasible)
+    if len(feasible_indexes) > 0:
+        fitness_vals[feasible_indexes], normalized_objectives[feasible_indexes], energy_vals[feasible_indexes], \
+            rank_vals[feasible_indexes] = ranking(objectives[feasible_indexes], min_objectives, max_objectives,
+                                                  **kwargs)
+        fitness_offset = int(np.max(fitness_vals[feasible_indexes])) + 1
     else:
+        fitness_offset = 0
+    clipped = np.clip(objectives[infeasible_indexes], min_objectives, max_objectives)
+    normalized_objectives[infeasible_indexes] = get_normalized_objectives(clipped, min_objectives, max_objectives)
+    energy_vals[infeasible_indexes] = np.sum(normalized_objectives[infeasible_indexes].astype('float64'), axis=1)
+    infeasible_violation = violation[infeasible_indexes]
+    fitness_vals[infeasible_indexes] = fitness_offset + np.unique(infeasible_violation, return_inverse=True)[1]
+    # np.lexsort sorts by the last key first
+    indexes = infeasible_indexes[np.lexsort((energy_vals[infeasible_indexes], infeasible_violation))]
+    rank_vals[indexes] = len(feasible_indexes) + np.arange(len(indexes))
+    return fitness_vals, normalized_objectives, energy_vals, rank_vals
+
+
+def get_feasible_objectives_edges(objectives, violation):
+    """
+    Returns the lowest and highest value of each objective among the feasible rows, or among all rows if none are
+    feasible.
+    :param objectives: 2d array
+    :param violation: array of float
+    :return: tuple of array
+    """
+    feasible = violation <= 0.
+    if np.any(feasible):
+        objectives = objectives[feasible]
+    return np.min(objectives, axis=0), np.max(objectives, axis=0)
+
+
+def get_constraint_violation(constraints):
+    """
+    Constraint values are satisfied when they are <= 0. Returns the total violation of each row of an array of
+    constraint values.
+    :param constraints: 2d array
+    :return: array of float
+    """
+    constraints = np.asarray(constraints, dtype='float64')
+    if constraints.shape[1] == 0:
+        return np.zeros(len(constraints))
+    return np.sum(np.maximum(constraints, 0.), axis=1)
+
+
+def evaluate_population_annealing(population, min_objectives=None, max_objectives=None, disp=False, violation=None,
+                                  archived=None, num_ranked=None, num_fronts=None, **kwargs):
+    """
+    Modifies in place the fitness, normalized_objectives, energy and rank attributes of each Individual in the
+    population. Equivalent to assign_fitness_by_dominance, assign_normalized_objectives, assign_relative_energy, and
+    assign_rank_by_fitness_and_energy, but the objectives are read once, and the results are written back in one pass.
+    If the total constraint violation of each Individual is provided, infeasible Individuals are ranked after all
+    feasible Individuals (see get_constrained_ranking). If it is provided which Individuals are kept in a
+    :class:'ParetoArchive', they form the first front (see get_archived_ranking).
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param disp: bool
+    :param violation: array of float
+    :param archived: array of bool
+    :param num_ranked: int; only with archived; see get_archived_ranking
+    :param num_fronts: int; only with archived; see get_archived_ranking
+    """
+    if len(population) == 0:
         raise RuntimeError('evaluate_population_annealing: cannot evaluate empty population.')
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
+        raise RuntimeError('evaluate_population_annealing: objectives have not been stored for all Individuals in '
+                           'population')
+    if violation is None:
+        violation = np.zeros(len(objectives))
+    if min_objectives is None or len(min_objectives) == 0 or max_objectives is None or len(max_objectives) == 0:
+        min_objectives, max_objectives = get_feasible_objectives_edges(objectives, violation)
+    fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+        get_constrained_ranking(objectives, violation, min_objectives, max_objectives, archived=archived,
+                                num_ranked=num_ranked, num_fronts=num_fronts)
+    set_population_columns(population, {'fitness': fitness_vals, 'normalized_objectives': normalized_objectives,
+                                        'energy': energy_vals, 'rank': rank_vals})
+
+
+def get_epsilon_box_ranking(objectives, min_objectives, max_objectives, epsilon=0.01):
+    """
+    Computes the same ranking attributes as get_population_annealing_ranking, but with epsilon-box dominance
+    (Laumanns et al.): normalized objective space is divided into a grid of boxes of size epsilon, and each row is
+    hashed to the box that contains it. Non-dominated fronts are computed between the occupied boxes rather than
+    between rows, and each row is assigned the front of its box. One row per box, the row closest to the lower corner
+    of the box, is its representative. All representatives are ranked before all other rows, by fitness and then by
+    energy. Only the rows provided are ranked: as the evaluate method of Pregenerated or Sobol, these are the candidates
+    of one chunk (see evaluate_population_by_epsilon_dominance), and the entire history is only ranked by
+    PopulationStorage.global_rerank.
+    :param objectives: 2d array
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param epsilon: float or array of float; size of the boxes in each normalized objective
+    :return: tuple of array; fitness, normalized_objectives, energy, rank
+    """
+    normalized_objectives = get_normalized_objectives(objectives, min_objectives, max_objectives)
+    values = normalized_objectives.astype('float64')
+    energy_vals = np.sum(values, axis=1)
+    epsilon = np.broadcast_to(np.asarray(epsilon, dtype='float64'), (objectives.shape[1],))
+    if np.any(epsilon <= 0.):
+        raise ValueError('get_epsilon_box_ranking: epsilon must be positive: %s' % str(epsilon))
+    keys = np.floor(values / epsilon)
+    boxes, box_indexes = np.unique(keys, axis=0, return_inverse=True)
+    box_indexes = box_indexes.reshape(-1)
+    distance = np.sum((values - keys * epsilon) ** 2, axis=1)
+    # np.lexsort sorts by the last key first
+    order = np.lexsort((np.arange(len(values)), distance, box_indexes))
+    sorted_box_indexes = box_indexes[order]
+    representative = np.zeros(len(values), dtype=bool)
+    representative[order[np.append(True, sorted_box_indexes[1:] != sorted_box_indexes[:-1])]] = True
+    fitness_vals = get_fitness_by_dominance(boxes)[box_indexes]
+    indexes = np.lexsort((energy_vals, fitness_vals, ~representative))
+    rank_vals = np.empty(len(indexes), dtype='int64')
+    rank_vals[indexes] = np.arange(len(indexes))
+    return fitness_vals, normalized_objectives, energy_vals, rank_vals
+
+
+def evaluate_population_by_epsilon_dominance(population, min_objectives=None, max_objectives=None, disp=False,
+                                             epsilon=0.01, violation=None, archived=None, num_ranked=None,
+                                             num_fronts=None, **kwargs):
+    """
+    Modifies in place the fitness, normalized_objectives, energy and rank attributes of each Individual in the
+    population, as in evaluate_population_annealing, but with epsilon-box dominance (see get_epsilon_box_ranking).
+    Only the Individuals in the population are ranked, and not the models of previous chunks or generations.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param disp: bool
+    :param epsilon: float or array of float; size of the boxes in each normalized objective
+    :param violation: array of float; total constraint violation of each Individual
+    :param archived: array of bool; whether each Individual is kept in a :class:'ParetoArchive'
+    :param num_ranked: int; only with archived; see get_archived_ranking
+    :param num_fronts: int; only with archived; see get_archived_ranking
+    """
+    if len(population) == 0:
+        raise RuntimeError('evaluate_population_by_epsilon_dominance: cannot evaluate empty population.')
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
+        raise RuntimeError('evaluate_population_by_epsilon_dominance: objectives have not been stored for all '
+                           'Individuals in population')
+    if violation is None:
+        violation = np.zeros(len(objectives))
+    if min_objectives is None or len(min_objectives) == 0 or max_objectives is None or len(max_objectives) == 0:
+        min_objectives, max_objectives = get_feasible_objectives_edges(objectives, violation)
+    fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+        get_constrained_ranking(objectives, violation, min_objectives, max_objectives, get_epsilon_box_ranking,
+                                archived=archived, num_ranked=num_ranked, num_fronts=num_fronts, epsilon=epsilon)
+    set_population_columns(population, {'fitness': fitness_vals, 'normalized_objectives': normalized_objectives,
+                                        'energy': energy_vals, 'rank': rank_vals})
 
 
 def evaluate_random(population, disp=False, **kwargs):
     """
-    Modifies in place the rank attribute of each Individual in the population.
-    :param population: list of :class:'Individual'
-    :param disp: bool
+    Modifies in place the rank attribute of each Individual in the population.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param disp: bool
+    """
+    rank_vals = list(range(len(population)))
+    np.random.shuffle(rank_vals)
+    set_population_values(population, 'rank', rank_vals)
+    if disp:
+        x, missing = get_population_values(population, 'x')
+        for i, rank in enumerate(rank_vals):
+            print('Individual %i: rank %i, x: %s' % (i, rank, x[i]))
+
+
+def get_selection_order(rank_vals, violation=None):
+    """
+    Returns the indexes of the members of a population in order of rank. If the total constraint violation of each
+    member is provided, feasible members (violation <= 0) are selected first, and infeasible members follow in order of
+    increasing violation, as with constrained domination (see get_constrained_ranking). The evaluate method of an
+    optimizer ranks infeasible members after feasible members only if it receives the violation, so selection applies
+    constrained domination regardless of the evaluate method.
+    :param rank_vals: array of int
+    :param violation: array of float
+    :return: array of int
     """
-    rank_vals = list(range(len(population)))
-    np.random.shuffle(rank_vals)
-    for i, individual in enumerate(population):
-        rank = rank_vals[i]
-        individual.rank = rank
-        if disp:
-            print('Individual %i: rank %i, x: %s' % (i, rank, individual.x))
+    if violation is None:
+        return np.argsort(rank_vals, kind='stable')
+    # np.lexsort is stable, and sorts by the last key first
+    return np.lexsort((rank_vals, np.maximum(violation, 0.)))
 
 
-def select_survivors_by_rank(population, num_survivors, disp=False, **kwargs):
+def select_survivors_by_rank(population, num_survivors, disp=False, violation=None, **kwargs):
     """
     Sorts the population by the rank attribute of each Individual in the population. Returns the requested number of
     top ranked Individuals.
-    :param population: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     :param num_survivors: int
     :param disp: bool
-    :return: list of :class:'Individual'
+    :param violation: array of float; feasible Individuals are selected first (see get_selection_order)
+    :return: :class:'PopulationArray' or list of :class:'Individual'
     """
-    new_population = sort_by_rank(population)
-    return new_population[:num_survivors]
+    rank_vals, missing = get_population_values(population, 'rank')
+    if np.any(missing):
+        raise Exception('sort_by_rank: rank has not been stored for all Individuals in population')
+    indexes = get_selection_order(rank_vals, violation)
+    return take_population(population, indexes[:num_survivors])
 
 
 def select_survivors_by_rank_and_fitness(population, num_survivors, num_diversity_survivors=0, fitness_range=None,
-                                         disp=False, **kwargs):
+                                         disp=False, violation=None, **kwargs):
     """
     Sorts the population by the rank attribute of each Individual in the population. Selects top ranked Individuals from
     each fitness group proportional to the size of each fitness group. Returns the requested number of Individuals.
-    :param population: list of :class:'Individual'
+    If the total constraint violation of each Individual is provided, feasible Individuals are selected first (see
+    get_selection_order), and diversity survivors are only selected among feasible Individuals.
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
     :param num_survivors: int
     :param num_diversity_survivors: int; promote additional individuals with fitness values in fitness_range
     :param fitness_range: int
     :param disp: bool
-    :return: list of :class:'Individual'
+    :param violation: array of float
+    :return: :class:'PopulationArray' or list of :class:'Individual'
     """
-    fitness_vals = np.array([individual.fitness for individual in population if individual.fitness is not None])
-    if len(fitness_vals) < len(population):
+    fitness_vals, missing = get_population_values(population, 'fitness')
+    if np.any(missing):
         raise Exception('select_survivors_by_rank_and_fitness: fitness has not been stored for all Individuals '
                         'in population')
-    sorted_population = sort_by_rank(population)
-    survivors = sorted_population[:num_survivors]
-    remaining_population = sorted_population[len(survivors):]
-    max_fitness = min(max(fitness_vals), fitness_range)
-    diversity_pool = [individual for individual in remaining_population
-                      if individual.fitness in range(1, max_fitness + 1)]
+    rank_vals, missing = get_population_values(population, 'rank')
+    if np.any(missing):
+        raise Exception('sort_by_rank: rank has not been stored for all Individuals in population')
+    sorted_indexes = get_selection_order(rank_vals, violation)
+    survivors = sorted_indexes[:num_survivors]
+    remaining_indexes = sorted_indexes[len(survivors):]
+    if violation is not None:
+        remaining_indexes = remaining_indexes[violation[remaining_indexes] <= 0.]
+    diversity_survivors = get_diversity_survivor_indexes(fitness_vals, remaining_indexes, num_diversity_survivors,
+                                                         fitness_range)
+    return take_population(population, np.append(survivors, diversity_survivors))
+
+
+def get_diversity_survivor_indexes(fitness_vals, remaining_indexes, num_diversity_survivors, fitness_range):
+    """
+    Selects additional survivors from the remaining members of a population with fitness values in fitness_range,
+    from each fitness group in turn.
+    :param fitness_vals: array of int
+    :param remaining_indexes: array of int; sorted by rank
+    :param num_diversity_survivors: int
+    :param fitness_range: int
+    :return: array of int
+    """
+    max_fitness = min(int(np.max(fitness_vals)), fitness_range)
+    remaining_fitness = fitness_vals[remaining_indexes]
+    diversity_pool = remaining_indexes[(remaining_fitness >= 1) & (remaining_fitness <= max_fitness)]
     diversity_pool_size = len(diversity_pool)
-    if diversity_pool_size == 0:
-        return survivors
     diversity_survivors = []
-    fitness_groups = defaultdict(list)
-    for individual in diversity_pool:
-        fitness_groups[individual.fitness].append(individual)
+    if diversity_pool_size == 0:
+        return np.array(diversity_survivors, dtype='int64')
     for fitness in range(1, max_fitness + 1):
         if len(diversity_survivors) >= num_diversity_survivors:
             break
-        if len(fitness_groups[fitness]) > 0:
-            this_num_survivors = max(1, len(fitness_groups[fitness]) // diversity_pool_size)
-            sorted_group = sort_by_rank(fitness_groups[fitness])
-            diversity_survivors.extend(sorted_group[:this_num_survivors])
+        # the diversity pool is already sorted by rank
+        group = diversity_pool[fitness_vals[diversity_pool] == fitness]
+        if len(group) > 0:
+            this_num_survivors = max(1, len(group) // diversity_pool_size)
+            diversity_survivors.extend(group[:this_num_survivors])
+    return np.array(diversity_survivors[:num_diversity_survivors], dtype='int64')
+
+
+def select_survivors_by_hypervolume(population, num_survivors, num_diversity_survivors=0, fitness_range=None,
+                                    disp=False, reference=1.1, hypervolume_method='auto', violation=None, **kwargs):
+    """
+    Selects whole non-dominated fronts, in order of fitness, until the next front no longer fits. The members of that
+    front are then reduced to the remaining number of survivors by their contributions to the hypervolume of the front
+    in normalized objective space (see get_hypervolume_selection). Ties in hypervolume contribution are broken by rank.
+    Additional diversity survivors are selected as in select_survivors_by_rank_and_fitness. Survivors are returned in
+    order of rank. If the total constraint violation of each Individual is provided, fronts are only selected among
+    feasible Individuals, and any remaining survivors are the infeasible Individuals with the lowest violation (see
+    get_selection_order).
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param num_survivors: int
+    :param num_diversity_survivors: int; promote additional individuals with fitness values in fitness_range
+    :param fitness_range: int
+    :param disp: bool
+    :param reference: float or array of float; reference point in normalized objective space
+    :param hypervolume_method: str; see get_hypervolume
+    :param violation: array of float
+    :return: :class:'PopulationArray' or list of :class:'Individual'
+    """
+    fitness_vals, missing = get_population_values(population, 'fitness')
+    if np.any(missing):
+        raise Exception('select_survivors_by_hypervolume: fitness has not been stored for all Individuals in '
+                        'population')
+    rank_vals, missing = get_population_values(population, 'rank')
+    if np.any(missing):
+        raise Exception('select_survivors_by_hypervolume: rank has not been stored for all Individuals in population')
+    normalized_objectives, missing = get_population_values(population, 'normalized_objectives')
+    if np.any(missing):
+        raise Exception('select_survivors_by_hypervolume: normalized_objectives have not been stored for all '
+                        'Individuals in population')
+    feasible = np.ones(len(population), dtype=bool) if violation is None else violation <= 0.
+    sorted_indexes = get_selection_order(rank_vals, violation)
+    selected = np.zeros(len(population), dtype=bool)
+    for fitness in range(int(np.max(fitness_vals)) + 1):
+        num_remaining = num_survivors - np.count_nonzero(selected)
+        if num_remaining <= 0:
+            break
+        front = np.flatnonzero((fitness_vals == fitness) & feasible)
+        if len(front) > num_remaining:
+            front = front[get_hypervolume_selection(normalized_objectives[front], num_remaining, reference,
+                                                    method=hypervolume_method, random=0,
+                                                    priority=rank_vals[front])]
+            if disp:
+                print('select_survivors_by_hypervolume: selected %i of %i Individuals with fitness %i' %
+                      (num_remaining, np.count_nonzero((fitness_vals == fitness) & feasible), fitness))
+        selected[front] = True
+    num_remaining = num_survivors - np.count_nonzero(selected)
+    if num_remaining > 0:
+        selected[sorted_indexes[~feasible[sorted_indexes]][:num_remaining]] = True
+    survivors = sorted_indexes[selected[sorted_indexes]]
+    remaining_indexes = sorted_indexes[~selected[sorted_indexes] & feasible[sorted_indexes]]
+    diversity_survivors = get_diversity_survivor_indexes(fitness_vals, remaining_indexes, num_diversity_survivors,
+                                                         fitness_range)
+    return take_population(population, np.append(survivors, diversity_survivors))
+
+
+def get_reference_directions(num_objectives, num_partitions, num_inner_partitions=0):
+    """
+    Returns the points of a simplex lattice with num_partitions divisions along each objective (Das and Dennis), with
+    one row per reference direction. Since the number of points grows as C(num_objectives + num_partitions - 1,
+    num_partitions), problems with many objectives can instead combine a coarse lattice on the boundary of the simplex
+    with a second, inner lattice shrunk by half towards its center (Deb and Jain).
+    :param num_objectives: int
+    :param num_partitions: int
+    :param num_inner_partitions: int
+    :return: 2d array
+    """
+    num_objectives = int(num_objectives)
+    num_partitions = int(num_partitions)
+    if num_objectives < 1 or num_partitions < 1:
+        raise ValueError('get_reference_directions: num_objectives and num_partitions must be positive')
+    if num_objectives == 1:
+        return np.ones((1, 1))
+    # each combination of num_objectives - 1 bar positions among num_partitions + num_objectives - 1 slots
+    bars = np.array(list(itertools.combinations(range(num_partitions + num_objectives - 1), num_objectives - 1)))
+    bars = np.hstack([np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), num_partitions + num_objectives - 1)])
+    directions = (np.diff(bars, axis=1) - 1) / float(num_partitions)
+    if num_inner_partitions:
+        inner = get_reference_directions(num_objectives, num_inner_partitions)
+        directions = np.vstack([directions, inner / 2. + 0.5 / num_objectives])
+    return directions
+
+
+def get_num_reference_partitions(num_objectives, max_directions):
+    """
+    Returns the largest number of partitions for which a simplex lattice has no more than max_directions points, and
+    at least 1.
+    :param num_objectives: int
+    :param max_directions: int
+    :return: int
+    """
+    num_partitions = 1
+    while comb(num_partitions + num_objectives, num_objectives - 1, exact=True) <= max_directions:
+        num_partitions += 1
+    return num_partitions
+
+
+def get_reference_direction_niches(normalized_objectives, directions, block_size=None):
+    """
+    Associates each row of normalized objective values with the reference direction that is nearest to it, by the
+    perpendicular distance from the row to the line through the origin along each direction.
+    :param normalized_objectives: 2d array
+    :param directions: 2d array
+    :param block_size: int; number of rows compared at once; default limits each comparison to ~1e7 values
+    :return: tuple of array; index of the nearest direction, and perpendicular distance
+    """
+    unit_directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+    if block_size is None:
+        block_size = max(1, 10000000 // len(unit_directions))
+    niches = np.empty(len(normalized_objectives), dtype='int64')
+    distance = np.empty(len(normalized_objectives))
+    for start in range(0, len(normalized_objectives), block_size):
+        block = normalized_objectives[start:start + block_size]
+        projection = np.dot(block, unit_directions.T)
+        squared_distance = np.sum(block ** 2, axis=1)[:, None] - projection ** 2
+        indexes = np.argmin(squared_distance, axis=1)
+        niches[start:start + block_size] = indexes
+        distance[start:start + block_size] = \
+            np.sqrt(np.maximum(0., squared_distance[np.arange(len(block)), indexes]))
+    return niches, distance
+
+
+def get_rank_by_reference_directions(fitness_vals, normalized_objectives, energy_vals, directions):
+    """
+    Returns a rank for each row, such that the rows with the lowest rank are those that would be selected by the
+    niching of NSGA-III (Deb and Jain), for any number of survivors. Fronts are ranked in order of fitness. Within each
+    front, rows are repeatedly taken from the reference direction (niche) associated with the fewest rows taken so
+    far, including rows from previous fronts. The rows of each niche are taken in order of their perpendicular
+    distance to the direction. Instead of random choices, ties between niches are broken by the energy of the next row
+    of each niche, and then by the index of the niche.
+    :param fitness_vals: array of int
+    :param normalized_objectives: 2d array
+    :param energy_vals: array
+    :param directions: 2d array
+    :return: array of int
+    """
+    # translate the ideal point to the origin
+    translated = normalized_objectives - np.min(normalized_objectives, axis=0)
+    niches, distance = get_reference_direction_niches(translated, directions)
+    niche_counts = np.zeros(len(directions), dtype='int64')
+    rank_vals = np.empty(len(fitness_vals), dtype='int64')
+    rank = 0
+    for fitness in np.unique(fitness_vals):
+        front = np.flatnonzero(fitness_vals == fitness)
+        # np.lexsort sorts by the last key first
+        front = front[np.lexsort((front, distance[front], niches[front]))]
+        members = collections.defaultdict(collections.deque)
+        for index in front:
+            members[niches[index]].append(index)
+        heap = [(niche_counts[niche], energy_vals[queue[0]], niche) for niche, queue in viewitems(members)]
+        heapq.heapify(heap)
+        while heap:
+            count, energy, niche = heapq.heappop(heap)
+            queue = members[niche]
+            rank_vals[queue.popleft()] = rank
+            rank += 1
+            niche_counts[niche] += 1
+            if queue:
+                heapq.heappush(heap, (niche_counts[niche], energy_vals[queue[0]], niche))
+    return rank_vals
+
+
+def get_reference_direction_ranking(objectives, min_objectives, max_objectives, num_partitions=None,
+                                    num_inner_partitions=0):
+    """
+    Computes the same ranking attributes as get_population_annealing_ranking, but ranks the members of each front by
+    reference direction niching (see get_rank_by_reference_directions).
+    :param objectives: 2d array
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param num_partitions: int; default is the largest simplex lattice with no more points than rows
+    :param num_inner_partitions: int
+    :return: tuple of array; fitness, normalized_objectives, energy, rank
+    """
+    fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+        get_population_annealing_ranking(objectives, min_objectives, max_objectives)
+    pop_size, num_objectives = objectives.shape
+    if num_partitions is None:
+        num_partitions = get_num_reference_partitions(num_objectives, max(pop_size, num_objectives))
+    directions = get_reference_directions(num_objectives, num_partitions, num_inner_partitions)
+    rank_vals = get_rank_by_reference_directions(fitness_vals, normalized_objectives.astype('float64'), energy_vals,
+                                                 directions)
+    return fitness_vals, normalized_objectives, energy_vals, rank_vals
+
+
+def evaluate_population_by_reference_directions(population, min_objectives=None, max_objectives=None, disp=False,
+                                                num_partitions=None, num_inner_partitions=0, violation=None,
+                                                archived=None, num_ranked=None, num_fronts=None, **kwargs):
+    """
+    Modifies in place the fitness, normalized_objectives, energy and rank attributes of each Individual in the
+    population, as in evaluate_population_annealing, but ranks the members of each front by reference direction
+    niching (see get_rank_by_reference_directions) rather than by energy. With many objectives, most models are
+    non-dominated, and sorting by energy favors models near the center of the front. For use as the evaluate method of
+    PopulationAnnealing, with the default select method (select_survivors_by_rank_and_fitness).
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :param min_objectives: array of float
+    :param max_objectives: array of float
+    :param disp: bool
+    :param num_partitions: int; default is the largest simplex lattice with no more points than the population
+    :param num_inner_partitions: int
+    :param violation: array of float; total constraint violation of each Individual
+    :param archived: array of bool; whether each Individual is kept in a :class:'ParetoArchive'
+    :param num_ranked: int; only with archived; see get_archived_ranking
+    :param num_fronts: int; only with archived; see get_archived_ranking
+    """
+    if len(population) == 0:
+        raise RuntimeError('evaluate_population_by_reference_directions: cannot evaluate empty population.')
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
+        raise RuntimeError('evaluate_population_by_reference_directions: objectives have not been stored for all '
+                           'Individuals in population')
+    if violation is None:
+        violation = np.zeros(len(objectives))
+    if min_objectives is None or len(min_objectives) == 0 or max_objectives is None or len(max_objectives) == 0:
+        min_objectives, max_objectives = get_feasible_objectives_edges(objectives, violation)
+    fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+        get_constrained_ranking(objectives, violation, min_objectives, max_objectives,
+                                get_reference_direction_ranking, archived=archived, num_ranked=num_ranked,
+                                num_fronts=num_fronts, num_partitions=num_partitions,
+                                num_inner_partitions=num_inner_partitions)
+    if disp:
+        print('evaluate_population_by_reference_directions: ranked %i Individuals in %i fronts' %
+              (len(population), int(np.max(fitness_vals)) + 1))
+    set_population_columns(population, {'fitness': fitness_vals, 'normalized_objectives': normalized_objectives,
+                                        'energy': energy_vals, 'rank': rank_vals})
+
 
-    return survivors + diversity_survivors[:num_diversity_survivors]
+def mark_survivors(population, survivors, specialists=None, specialists_survive=True):
+    """
+    Modifies in place the survivor attribute of each member of the population that was selected as a survivor (or as a
+    specialist, if specialists_survive), and of the corresponding members of survivors and specialists.
+    :param population: :class:'PopulationArray'
+    :param survivors: :class:'PopulationArray'
+    :param specialists: :class:'PopulationArray'
+    :param specialists_survive: bool
+    """
+    selected_ids = [survivors.columns['model_id']]
+    if specialists_survive and specialists is not None:
+        selected_ids.append(specialists.columns['model_id'])
+    selected_ids = np.concatenate(selected_ids)
+    population.columns['survivor'][np.isin(population.columns['model_id'], selected_ids)] = True
+    survivors.columns['survivor'][:] = True
+    if specialists is not None:
+        specialists.update_from(population, ['survivor'])
 
 
 def get_specialists(population):
     """
     For each objective, find the individual in the population with the lowest objective value. Return a list of
     individuals of length number of objectives.
-    :param population:
-    :return: list of :class:'Individual'
+    :param population: :class:'PopulationArray' or list of :class:'Individual'
+    :return: :class:'PopulationArray' or list of :class:'Individual'
     """
-    pop_size = len(population)
-    num_objectives = [len(individual.objectives) for individual in population if individual.objectives is not None]
-    if len(num_objectives) < pop_size:
+    objectives, missing = get_population_values(population, 'objectives')
+    if np.any(missing):
         raise RuntimeError('get_specialists: objectives have not been stored for all Individuals in population')
-    num_objectives = max(num_objectives)
+    energy_vals, missing = get_population_values(population, 'energy')
+    return take_population(population, get_specialist_indexes(objectives, energy_vals))
+
 
-    specialists = []
+def get_specialist_indexes(objectives, energy_vals):
+    """
+    For each objective, returns the index of the row of an array of objective values with the lowest value. Ties are
+    broken by energy, then by the values of the previous objectives, in reverse order, and then by index.
+    :param objectives: 2d array
+    :param energy_vals: array
+    :return: array of int
+    """
+    pop_size, num_objectives = objectives.shape
+    specialists = np.empty(num_objectives, dtype='int64')
     for m in range(num_objectives):
-        population = sorted(population, key=lambda individual: individual.objectives[m])
-        group = []
-        reference_objective_val = population[0].objectives[m]
-        for individual in population:
-            if individual.objectives[m] == reference_objective_val:
-                group.append(individual)
+        index = np.argmin(objectives[:, m])
+        group = np.flatnonzero(objectives[:, m] == objectives[index, m])
         if len(group) > 1:
-            group = sorted(group, key=lambda individual: individual.energy)
-        specialists.append(group[0])
+            # np.lexsort sorts by the last key first
+            keys = [group] + [objectives[group, i] for i in range(m)] + [energy_vals[group]]
+            index = group[np.lexsort(keys)[0]]
+        specialists[m] = index
     return specialists
 
 
@@ -2748,6 +5745,14 @@ def init_optimize_controller_context(config_file_path=None, storage_file_path=No
         missing_config.append('objective_names')
     else:
         context.objective_names = config_dict['objective_names']
+    if 'constraint_names' not in config_dict or config_dict['constraint_names'] is None:
+        context.constraint_names = []
+    else:
+        context.constraint_names = config_dict['constraint_names']
+    if 'max_constraint_violation' in config_dict and config_dict['max_constraint_violation'] is not None:
+        context.max_constraint_violation = float(config_dict['max_constraint_violation'])
+    else:
+        context.max_constraint_violation = None
     if 'target_val' in config_dict:
         context.target_val = config_dict['target_val']
     else:
@@ -2853,9 +5858,10 @@ def init_optimize_controller_context(config_file_path=None, storage_file_path=No
         context.storage_file_path = storage_file_path
     timestamp = datetime.datetime.today().strftime('%Y%m%d_%H%M%S')
     if 'storage_file_path' not in context() or context.storage_file_path is None:
-        context.storage_file_path = '%s%s_%s%s_%s_optimization_history.hdf5' % \
-                                    (output_dir_str, timestamp,
-                                     context.optimization_title, context.label, context.ParamGenClassName)
+        context.storage_file_path = get_storage_file_path(
+            '%s%s_%s%s_%s_optimization_history' % (output_dir_str, timestamp, context.optimization_title,
+                                                   context.label, context.ParamGenClassName),
+            context.storage_backend if 'storage_backend' in context() else None)
 
     # save config_file copy
     config_file_name = context.config_file_path.split('/')[-1]
@@ -3018,6 +6024,14 @@ def init_analyze_controller_context(config_file_path=None, storage_file_path=Non
         missing_config.append('objective_names')
     else:
         context.objective_names = config_dict['objective_names']
+    if 'constraint_names' not in config_dict or config_dict['constraint_names'] is None:
+        context.constraint_names = []
+    else:
+        context.constraint_names = config_dict['constraint_names']
+    if 'max_constraint_violation' in config_dict and config_dict['max_constraint_violation'] is not None:
+        context.max_constraint_violation = float(config_dict['max_constraint_violation'])
+    else:
+        context.max_constraint_violation = None
     if 'target_val' in config_dict:
         context.target_val = config_dict['target_val']
     else:
@@ -3069,7 +6083,7 @@ def init_analyze_controller_context(config_file_path=None, storage_file_path=Non
                     sys.stdout.flush()
 
     elif 'storage_file_path' in context() and context.storage_file_path is not None:
-        if not os.path.isfile(context.storage_file_path):
+        if not storage_file_exists(context.storage_file_path):
             raise Exception('nested.analyze: invalid storage_file_path: %s' % context.storage_file_path)
         if 'model_key' in context() and context.model_key is not None and len(context.model_key) > 0:
             valid_model_keys = set(context.objective_names)
@@ -3082,11 +6096,15 @@ def init_analyze_controller_context(config_file_path=None, storage_file_path=Non
                     #TODO: set x0_dict based on first requested model_key
                     pass
         elif 'model_id' in context() and context.model_id is not None and len(context.model_id) > 0:
-            with h5py.File(context.storage_file_path, 'r') as f:
+            with open_storage_reader(context.storage_file_path) as reader:
                 count = 0
-                for group in f.values():
-                    if 'count' in group.attrs:
-                        count = max(count, group.attrs['count'])
+                if reader.is_table_storage():
+                    if reader.get_num_generations() > 0:
+                        count = int(np.max(reader.read_generation_values('count')))
+                else:
+                    for group in reader.file.values():
+                        if 'count' in group.attrs:
+                            count = max(count, group.attrs['count'])
             for this_model_id in context.model_id:
                 if int(this_model_id) >= count:
                     raise RuntimeError('nested.analyze: invalid model_id: %i' % int(this_model_id))
@@ -3261,8 +6279,28 @@ def init_analyze_controller_context(config_file_path=None, storage_file_path=Non
         context.get_objectives_funcs.append(func)
 
 
+def get_export_temp_dir(temp_dir=None, output_dir=None):
+    """
+    Returns the directory in which exported data is staged in 'parallel' and 'aggregate' export modes. Staging on
+    node-local storage (e.g. a local scratch disk) avoids writing exported data twice to a shared filesystem, but holds
+    the entire export of each worker on its node, so it is opt-in: unless temp_dir is specified, output_dir is used, or
+    the default temp directory of the operating system ($TMPDIR) if output_dir is not specified.
+    :param temp_dir: str (dir path)
+    :param output_dir: str (dir path)
+    :return: str (dir path)
+    """
+    if temp_dir is not None:
+        if not os.path.isdir(temp_dir):
+            raise RuntimeError('get_export_temp_dir: invalid temp_dir: %s' % str(temp_dir))
+        return temp_dir
+    if output_dir is not None:
+        return output_dir
+    return tempfile.gettempdir()
+
+
 def init_worker_contexts(sources, update_context_funcs, param_names, default_params, feature_names, objective_names,
-                         target_val, target_range, output_dir, disp, optimization_title=None, label=None, **kwargs):
+                         target_val, target_range, output_dir, disp, optimization_title=None, label=None,
+                         export_mode=None, export_temp_dir=None, **kwargs):
     """
 
     :param sources: set of str (source names)
@@ -3277,6 +6315,10 @@ def init_worker_contexts(sources, update_context_funcs, param_names, default_par
     :param disp: bool
     :param optimization_title: str
     :param label: str
+    :param export_mode: str; see merge_exported_data
+    :param export_temp_dir: str (dir path); in 'parallel' and 'aggregate' modes, temp output files are staged in this
+        node-local directory, if a global communicator spans the workers (see get_export_temp_dir); default is
+        output_dir
     """
     context = find_context()
 
@@ -3294,9 +6336,6 @@ def init_worker_contexts(sources, update_context_funcs, param_names, default_par
         output_dir_str = ''
     else:
         output_dir_str = context.output_dir + '/'
-    temp_output_path = '%snested_optimize_temp_output_%s%s_pid%i_uuid%i.hdf5' % \
-                       (output_dir_str, datetime.datetime.today().strftime('%Y%m%d_%H%M%S'), label, os.getpid(),
-                        uuid.uuid1())
     context.update(locals())
     context.update(kwargs)
     if 'interface' in context():
@@ -3314,6 +6353,21 @@ def init_worker_contexts(sources, update_context_funcs, param_names, default_par
             context.comm = MPI.COMM_WORLD
         except Exception:
             pass
+    temp_dir_str = output_dir_str
+    if export_temp_dir is not None and \
+            (export_mode == 'aggregate' or (export_mode == 'parallel' and h5py.get_config().mpi)):
+        if 'global_comm' in context():
+            # exports are staged on the local node, and only written to the shared filesystem by
+            # parallel_merge_temp_output_file or aggregate_temp_output_files
+            temp_dir_str = get_export_temp_dir(export_temp_dir) + '/'
+        elif disp:
+            # without a communicator, merge_exported_data falls back to 'merge' mode, in which the master process
+            # reads the temp output files of all workers
+            print('init_worker_contexts: no global communicator; export_temp_dir: %s is ignored' % export_temp_dir)
+            sys.stdout.flush()
+    context.temp_output_path = '%snested_optimize_temp_output_%s%s_pid%i_uuid%i.hdf5' % \
+                               (temp_dir_str, datetime.datetime.today().strftime('%Y%m%d_%H%M%S'), label,
+                                os.getpid(), uuid.uuid1())
     for source in sources:
         m = importlib.import_module(source)
         m_context_name = find_context_name(source)
@@ -3672,10 +6726,29 @@ def config_parallel_interface(source_file_name, config_file_path=None, output_di
             config_func()
 
 
+# maximum size in bytes of each message that sends a temp output file to an aggregator in 'aggregate' export mode
+export_aggregate_chunk_size = 2 ** 26
+# Modes available to merge_exported_data for collecting the temp output files exported by workers into one file
+export_merge_modes = ['merge', 'parallel', 'link', 'tree', 'aggregate']
+
+
 def merge_exported_data(context, param_arrays=None, model_ids=None, model_labels=None, features=None, 
-                        objectives=None, export_file_path=None, output_dir=None, verbose=False):
+                        objectives=None, export_file_path=None, output_dir=None, verbose=False, compression='source',
+                        compression_level=None, mode='merge', num_aggregators=1):
     """
-
+    Collects the data exported by each worker during model evaluation into a single file. In the default 'merge' mode,
+    the master process merges the temp output files of all workers serially (see merge_hdf5_temp_output_files). In
+    'parallel' mode, workers collectively write their temp output files into one shared file with the parallel HDF5
+    (mpio) driver (see parallel_merge_temp_output_file), so that no serial merge is performed. If h5py was not built
+    with MPI support, 'parallel' mode falls back to 'merge' mode. In 'link' mode, the temp output files are kept, and
+    the merged file only contains external links to their datasets (see link_hdf5_temp_output_files and
+    consolidate_hdf5_export_file). In 'tree' mode, the workers merge the temp output files pairwise in parallel (see
+    tree_merge_hdf5_temp_output_files). In 'aggregate' mode, workers stream their temp output files in bounded chunks to
+    num_aggregators workers, which write them into one file each (see aggregate_temp_output_files). A single aggregator
+    writes directly into export_file_path. Otherwise, the aggregated files are kept, and linked into export_file_path.
+    In 'parallel' and 'aggregate' modes, temp output files can be staged on node-local storage (see
+    init_worker_contexts), so that exported data is only written once to the shared filesystem. Both modes require a
+    communicator that spans the workers, and otherwise fall back to 'merge' mode (see has_export_comm).
     :param context: :class:'Context'
     :param param_arrays: list of array
     :param model_ids: list of int
@@ -3685,14 +6758,89 @@ def merge_exported_data(context, param_arrays=None, model_ids=None, model_labels
     :param export_file_path: str (path)
     :param output_dir: str (dir)
     :param verbose: bool
+    :param compression: str or None; see merge_hdf5_temp_output_files
+    :param compression_level: int
+    :param mode: str; 'merge', 'parallel', 'link', 'tree', or 'aggregate'
+    :param num_aggregators: int; only for aggregate mode
     :return: str (path)
     """
+    if mode not in export_merge_modes:
+        raise ValueError('merge_exported_data: invalid mode: %s; must be one of %s' % (mode, export_merge_modes))
+    if mode in ['parallel', 'link'] and compression != 'source' and \
+            get_compression_kwargs(compression, compression_level):
+        raise ValueError('merge_exported_data: compression: %s not supported in %s mode' % (compression, mode))
+    if mode in ['parallel', 'aggregate'] and not has_export_comm(context.interface):
+        if verbose:
+            print('merge_exported_data: no communicator spans the ranks that hold exported data; falling back to merge '
+                  'mode')
+            sys.stdout.flush()
+        mode = 'merge'
+    if mode == 'parallel':
+        if context.interface.global_size > 1 and not h5py.get_config().mpi:
+            if verbose:
+                print('merge_exported_data: h5py was built without MPI support; falling back to merge mode')
+                sys.stdout.flush()
+            mode = 'merge'
+    if mode in ['parallel', 'aggregate'] and export_file_path is None:
+        if output_dir is None or not os.path.isdir(output_dir):
+            raise RuntimeError('merge_exported_data: invalid output_dir: %s' % str(output_dir))
+        export_file_path = '%s/merged_exported_data_%s_%i.hdf5' % \
+                           (output_dir, datetime.datetime.today().strftime('%Y%H%M%S_%m%d'), os.getpid())
+    if mode == 'aggregate':
+        start_time = time.time()
+        ranks = get_export_ranks(context.interface)
+        num_aggregators = max(1, min(int(num_aggregators), len(ranks)))
+        if num_aggregators == 1:
+            file_paths = [export_file_path]
+        else:
+            root, ext = os.path.splitext(export_file_path)
+            file_paths = ['%s_aggregate%i%s' % (root, i, ext) for i in range(num_aggregators)]
+        context.interface.synchronize(aggregate_temp_output_files, file_paths, ranks, compression, compression_level,
+                                      verbose)
+        if num_aggregators > 1:
+            file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+            link_hdf5_temp_output_files(file_paths, export_file_path, verbose=verbose)
+        if not os.path.isfile(export_file_path):
+            if verbose:
+                print('merge_exported_data: no data exported; empty temp output files')
+                sys.stdout.flush()
+            return None
+        if verbose:
+            print('merge_exported_data: aggregating temp output files into %s took %.1f s' %
+                  (export_file_path, time.time() - start_time))
+            sys.stdout.flush()
+        return export_file_path
+    if mode == 'parallel':
+        start_time = time.time()
+        context.interface.synchronize(parallel_merge_temp_output_file, export_file_path,
+                                      get_export_ranks(context.interface), verbose)
+        if not os.path.isfile(export_file_path):
+            if verbose:
+                print('merge_exported_data: no data exported; empty temp output files')
+                sys.stdout.flush()
+            return None
+        if verbose:
+            print('merge_exported_data: parallel export of temp output files into %s took %.1f s' %
+                  (export_file_path, time.time() - start_time))
+            sys.stdout.flush()
+        return export_file_path
+
     temp_output_path_list = [temp_output_path for temp_output_path in context.interface.get('context.temp_output_path')
                              if os.path.isfile(temp_output_path)]
+    if mode == 'link':
+        return link_hdf5_temp_output_files(temp_output_path_list, export_file_path, output_dir=output_dir,
+                                           verbose=verbose)
     if len(temp_output_path_list) > 0:
-        export_file_path = \
-            merge_hdf5_temp_output_files(temp_output_path_list, export_file_path, output_dir=output_dir,
-                                         verbose=verbose)
+        if mode == 'tree':
+            export_file_path = \
+                tree_merge_hdf5_temp_output_files(context.interface, temp_output_path_list, export_file_path,
+                                                  output_dir=output_dir, verbose=verbose, compression=compression,
+                                                  compression_level=compression_level)
+        else:
+            export_file_path = \
+                merge_hdf5_temp_output_files(temp_output_path_list, export_file_path, output_dir=output_dir,
+                                             verbose=verbose, compression=compression,
+                                             compression_level=compression_level)
         for temp_output_path in temp_output_path_list:
             os.remove(temp_output_path)
     # TODO: add param, feature, and objective arrays and model_label legend to export_file_path
@@ -3729,7 +6877,8 @@ def write_merge_path_list_to_yaml(context, export_file_path=None, output_dir=Non
             sys.stdout.flush()
 
 
-def merge_hdf5_temp_output_files(file_path_list, export_file_path=None, output_dir=None, verbose=False, debug=False):
+def merge_hdf5_temp_output_files(file_path_list, export_file_path=None, output_dir=None, verbose=False, debug=False,
+                                 compression='source', compression_level=None):
     """
     When evaluating models with nested.analyze, each worker can export data to its own unique .hdf5 file
     (temp_output_path). Then the master process collects and merges these files into a single file (export_file_path).
@@ -3738,13 +6887,18 @@ def merge_hdf5_temp_output_files(file_path_list, export_file_path=None, output_d
     expects data to be nested in groups enumerated with str(int) as keys. These data structures will be re-enumerated
     during the merge. Otherwise, groups containing nested data are expected to be labeled with unique keys, and nested
     structures are only copied once.
+    By default, datasets keep the compression of the temp output file they are copied from. Otherwise, each copied
+    dataset is rewritten with the specified compression filter (see nested.storage.get_compression_kwargs).
     :param file_path_list: list of str (paths)
     :param export_file_path: str (path)
     :param output_dir: str (dir)
     :param verbose: bool
     :param debug: bool
+    :param compression: str or None; 'source', 'gzip', 'lzf', or None
+    :param compression_level: int; only for gzip compression
     :return str (path)
     """
+    compression_kwargs = None if compression == 'source' else get_compression_kwargs(compression, compression_level)
     if export_file_path is None:
         if output_dir is None or not os.path.isdir(output_dir):
             raise RuntimeError('merge_hdf5_temp_output_files: invalid output_dir: %s' % str(output_dir))
@@ -3762,7 +6916,8 @@ def merge_hdf5_temp_output_files(file_path_list, export_file_path=None, output_d
             current_time = time.time()
             with h5py.File(old_file_path, 'r') as old_f:
                 for group in old_f:
-                    nested_merge_hdf5_groups(old_f[group], group, new_f, debug=debug)
+                    nested_merge_hdf5_groups(old_f[group], group, new_f, debug=debug,
+                                             compression_kwargs=compression_kwargs)
             if verbose:
                 print('merge_hdf5_temp_output_files: merging %s into %s took %.1f s' % 
                       (old_file_path, export_file_path, time.time() - current_time))
@@ -3775,17 +6930,662 @@ def merge_hdf5_temp_output_files(file_path_list, export_file_path=None, output_d
     return export_file_path
 
 
-def nested_merge_hdf5_groups(source, target_key, target, debug=False):
+def link_hdf5_temp_output_files(file_path_list, export_file_path=None, output_dir=None, verbose=False):
+    """
+    Alternative to merge_hdf5_temp_output_files that does not copy any data. The merged file (export_file_path) is built
+    with the same groups, attributes, and re-enumeration as a copied merge, but each dataset is an HDF5 external link to
+    the dataset in the temp output file it came from. The cost of the merge therefore only depends on the number of
+    exported objects, not on their size. The temp output files must be kept alongside the merged file. Links are stored
+    relative to the directory of the merged file, so the files can be moved together. The linked data can later be
+    copied into the merged file with consolidate_hdf5_export_file.
+    :param file_path_list: list of str (paths)
+    :param export_file_path: str (path)
+    :param output_dir: str (dir)
+    :param verbose: bool
+    :return str (path)
+    """
+    if export_file_path is None:
+        if output_dir is None or not os.path.isdir(output_dir):
+            raise RuntimeError('link_hdf5_temp_output_files: invalid output_dir: %s' % str(output_dir))
+        export_file_path = '%s/merged_exported_data_%s_%i.hdf5' % \
+                           (output_dir, datetime.datetime.today().strftime('%Y%H%M%S_%m%d'), os.getpid())
+    if not len(file_path_list) > 0:
+        if verbose:
+            print('link_hdf5_temp_output_files: no data exported; empty file_path_list')
+            sys.stdout.flush()
+        return None
+
+    start_time = time.time()
+    if os.path.isfile(export_file_path):
+        target_layout = get_hdf5_file_layout(export_file_path, exists=True)
+    else:
+        target_layout = get_empty_hdf5_layout()
+    export_dir = os.path.dirname(os.path.abspath(export_file_path))
+    link_file_paths = []
+    for i, file_path in enumerate(file_path_list):
+        link_file_paths.append(os.path.relpath(os.path.abspath(file_path), export_dir))
+        layout = get_hdf5_file_layout(file_path)
+        for key, node in viewitems(layout['children']):
+            merge_hdf5_layouts(node, key, target_layout, i)
+    with h5py.File(export_file_path, 'a') as f:
+        create_hdf5_layout(f, target_layout, link_file_paths)
+
+    if verbose:
+        print('link_hdf5_temp_output_files: linking %i temp output files into %s took %.1f s' %
+              (len(file_path_list), export_file_path, time.time() - start_time))
+        sys.stdout.flush()
+    return export_file_path
+
+
+def consolidate_hdf5_export_file(export_file_path, compression='source', compression_level=None,
+                                 remove_sources=True, verbose=False):
+    """
+    Replaces every external link in an export file built by link_hdf5_temp_output_files with a copy of the linked
+    dataset, so that the export file becomes self-contained. This can be run at any time after the export, e.g. in a
+    separate job. By default, datasets keep the compression of the file they are copied from. Otherwise, each copied
+    dataset is rewritten with the specified compression filter (see nested.storage.get_compression_kwargs).
+    :param export_file_path: str (path)
+    :param compression: str or None; 'source', 'gzip', 'lzf', or None
+    :param compression_level: int; only for gzip compression
+    :param remove_sources: bool; whether to delete the linked files once they have been consolidated
+    :param verbose: bool
+    :return: int; number of consolidated links
+    """
+    compression_kwargs = None if compression == 'source' else get_compression_kwargs(compression, compression_level)
+    if not os.path.isfile(export_file_path):
+        raise IOError('consolidate_hdf5_export_file: invalid export_file_path: %s' % export_file_path)
+    export_dir = os.path.dirname(os.path.abspath(export_file_path))
+    start_time = time.time()
+    source_files = dict()
+    count = 0
+    try:
+        with h5py.File(export_file_path, 'a') as f:
+            links = []
+            groups = [f]
+            while groups:
+                group = groups.pop()
+                for key in group:
+                    link = group.get(key, getlink=True)
+                    if isinstance(link, h5py.ExternalLink):
+                        links.append((group, key, link))
+                    elif isinstance(link, h5py.HardLink) and isinstance(group[key], h5py.Group):
+                        groups.append(group[key])
+            for group, key, link in links:
+                source_path = link.filename
+                if not os.path.isabs(source_path):
+                    source_path = os.path.join(export_dir, source_path)
+                if source_path not in source_files:
+                    source_files[source_path] = h5py.File(source_path, 'r')
+                source = source_files[source_path][link.path]
+                del group[key]
+                if compression_kwargs is None:
+                    group.copy(source, key)
+                else:
+                    h5_compressed_copy(source, key, group, compression_kwargs)
+                count += 1
+    finally:
+        for source_file in viewvalues(source_files):
+            source_file.close()
+    if remove_sources:
+        for source_path in source_files:
+            os.remove(source_path)
+    if verbose:
+        print('consolidate_hdf5_export_file: consolidating %i links from %i files into %s took %.1f s' %
+              (count, len(source_files), export_file_path, time.time() - start_time))
+        sys.stdout.flush()
+    return count
+
+
+def tree_merge_hdf5_temp_output_files(interface, file_path_list, export_file_path=None, output_dir=None, verbose=False,
+                                      compression='source', compression_level=None):
+    """
+    Parallel alternative to merge_hdf5_temp_output_files that produces an identical file. First, the layouts of all
+    temp output files are read by the workers, and merged by the master process in the same order and with the same
+    rules as nested_merge_hdf5_groups, which determines the final location of every exported dataset, including the
+    re-enumeration of enumerated groups. Then the workers copy pairs of temp output files into intermediate files
+    that already use the final locations, and these are merged pairwise in a tree, so that N files are merged in
+    log2(N) rounds of the interface map operation instead of N serial steps.
+    :param interface: :class: 'IpypInterface', 'MPIFuturesInterface', 'ParallelContextInterface', or 'SerialInterface'
+    :param file_path_list: list of str (paths)
+    :param export_file_path: str (path)
+    :param output_dir: str (dir)
+    :param verbose: bool
+    :param compression: str or None; see merge_hdf5_temp_output_files
+    :param compression_level: int; only for gzip compression
+    :return str (path)
+    """
+    compression_kwargs = None if compression == 'source' else get_compression_kwargs(compression, compression_level)
+    if export_file_path is None:
+        if output_dir is None or not os.path.isdir(output_dir):
+            raise RuntimeError('tree_merge_hdf5_temp_output_files: invalid output_dir: %s' % str(output_dir))
+        export_file_path = '%s/merged_exported_data_%s_%i.hdf5' % \
+                           (output_dir, datetime.datetime.today().strftime('%Y%H%M%S_%m%d'), os.getpid())
+    if not len(file_path_list) > 0:
+        if verbose:
+            print('tree_merge_hdf5_temp_output_files: no data exported; empty file_path_list')
+            sys.stdout.flush()
+        return None
+
+    start_time = time.time()
+    if os.path.isfile(export_file_path):
+        target_layout = get_hdf5_file_layout(export_file_path, exists=True)
+    else:
+        target_layout = get_empty_hdf5_layout()
+    layouts = interface.map(get_hdf5_file_layout, file_path_list)
+    for i, layout in enumerate(layouts):
+        for key, node in viewitems(layout['children']):
+            merge_hdf5_layouts(node, key, target_layout, i)
+
+    sequences = [[], [], [], []]
+    for i in range(0, len(file_path_list), 2):
+        owners = set(range(i, min(i + 2, len(file_path_list))))
+        sequences[0].append(get_temp_storage_file_path(export_file_path, 'tree%i' % i))
+        sequences[1].append(select_hdf5_layout(target_layout, owners))
+        sequences[2].append(dict((owner, file_path_list[owner]) for owner in owners))
+        sequences[3].append(compression_kwargs)
+    file_paths = interface.map(write_hdf5_layout_file, *sequences)
+    if os.path.isfile(export_file_path):
+        file_paths.insert(0, export_file_path)
+    num_rounds = 1
+    while len(file_paths) > 1:
+        file_paths = interface.map(merge_hdf5_file_pair, file_paths[0::2], file_paths[1::2]) + \
+                     file_paths[len(file_paths) // 2 * 2:]
+        num_rounds += 1
+    if file_paths[0] != export_file_path:
+        os.rename(file_paths[0], export_file_path)
+
+    if verbose:
+        print('tree_merge_hdf5_temp_output_files: merging %i temp output files into %s in %i rounds took %.1f s' %
+              (len(file_path_list), export_file_path, num_rounds, time.time() - start_time))
+        sys.stdout.flush()
+    return export_file_path
+
+
+def write_hdf5_layout_file(file_path, layout, source_file_paths, compression_kwargs=None):
+    """
+    Executed by a worker during tree_merge_hdf5_temp_output_files. Creates a new .hdf5 file with the groups and datasets
+    described by a layout (see get_hdf5_file_layout), copying each dataset from the file source_file_paths[owner].
+    :param file_path: str (path)
+    :param layout: dict
+    :param source_file_paths: dict of str (paths)
+    :param compression_kwargs: dict; see nested.storage.get_compression_kwargs; default is to copy datasets with their
+        original compression
+    :return: str (path)
+    """
+    source_files = dict()
+
+    def write_layout(target, layout):
+        for key, node in viewitems(layout['children']):
+            if node['type'] == 'group':
+                if key in target:
+                    group = target[key]
+                else:
+                    group = target.create_group(key)
+                    for attr_key, val in viewitems(node['attrs']):
+                        group.attrs[attr_key] = val
+                write_layout(group, node)
+            else:
+                if node['owner'] not in source_files:
+                    source_files[node['owner']] = h5py.File(source_file_paths[node['owner']], 'r')
+                source = source_files[node['owner']][node['source']]
+                if compression_kwargs is None:
+                    target.copy(source, key)
+                else:
+                    h5_compressed_copy(source, key, target, compression_kwargs)
+
+    try:
+        with h5py.File(file_path, 'w') as f:
+            write_layout(f, layout)
+    finally:
+        for source_file in viewvalues(source_files):
+            source_file.close()
+    return file_path
+
+
+def merge_hdf5_file_pair(target_file_path, source_file_path):
+    """
+    Executed by a worker during tree_merge_hdf5_temp_output_files. Copies the contents of an intermediate file into
+    another, and removes it. The datasets of both files must already have their final, distinct locations.
+    :param target_file_path: str (path)
+    :param source_file_path: str (path)
+    :return: str (path)
+    """
+    with h5py.File(target_file_path, 'a') as target:
+        with h5py.File(source_file_path, 'r') as source:
+            h5_nested_copy(source, target)
+    os.remove(source_file_path)
+    return target_file_path
+
+
+def get_export_ranks(interface):
+    """
+    Returns the ranks of interface.global_comm that hold exported data, and that participate in the collective export
+    operations executed with interface.synchronize.
+    :param interface: :class: 'IpypInterface', 'MPIFuturesInterface', 'ParallelContextInterface', or 'SerialInterface'
+    :return: list of int
+    """
+    if interface.controller_is_worker:
+        return list(range(interface.global_size))
+    return list(range(1, interface.global_size))
+
+
+def has_export_comm(interface):
+    """
+    Returns True if the ranks that hold exported data (see get_export_ranks) can coordinate the collective export
+    operations of 'parallel' and 'aggregate' modes through a global communicator, or if there is only one such rank.
+    Workers of an :class:'IpypInterface' do not share a communicator.
+    :param interface: :class: 'IpypInterface', 'MPIFuturesInterface', 'ParallelContextInterface', or 'SerialInterface'
+    :return: bool
+    """
+    return len(get_export_ranks(interface)) <= 1 or getattr(interface, 'global_comm', None) is not None
+
+
+def get_export_comm(ranks=None):
+    """
+    Executed collectively by the specified ranks of the global communicator in the local Context. Returns a new
+    communicator that contains only these ranks, or None when operating on a single process.
+    :param ranks: list of int
+    :return: :class:'MPI.Comm' or None
+    """
+    context = find_context()
+    if ranks is not None and len(ranks) > 1 and 'global_comm' in context():
+        return context.global_comm.Create_group(context.global_comm.Get_group().Incl(ranks))
+    return None
+
+
+def send_temp_output_file(comm, file_path, dest, chunk_size=None):
+    """
+    Sends the contents of a file to another rank as a size message followed by chunks of at most chunk_size bytes, with
+    buffer-based non-blocking sends. At most two chunks are held in memory at a time, and no single message exceeds the
+    size limits of MPI. A missing file is sent with a size of zero. Must be matched by recv_temp_output_file.
+    :param comm: :class:'MPI.Comm'
+    :param file_path: str (path) or None
+    :param dest: int
+    :param chunk_size: int; default is export_aggregate_chunk_size
+    """
+    if chunk_size is None:
+        chunk_size = export_aggregate_chunk_size
+    size = os.path.getsize(file_path) if file_path is not None and os.path.isfile(file_path) else 0
+    comm.Send(np.array([size], dtype='int64'), dest=dest)
+    if size == 0:
+        return
+    buffers = [np.empty(min(chunk_size, size), dtype='uint8') for i in range(2)]
+    requests = [None, None]
+    with open(file_path, 'rb') as f:
+        for i, start in enumerate(range(0, size, chunk_size)):
+            j = i % 2
+            if requests[j] is not None:
+                requests[j].Wait()
+            count = f.readinto(memoryview(buffers[j])[:min(chunk_size, size - start)])
+            requests[j] = comm.Isend(buffers[j][:count], dest=dest)
+    for request in requests:
+        if request is not None:
+            request.Wait()
+
+
+def recv_temp_output_file(comm, file_path, source, chunk_size=None):
+    """
+    Receives the contents of a file sent by send_temp_output_file, and writes them to file_path chunk by chunk.
+    :param comm: :class:'MPI.Comm'
+    :param file_path: str (path)
+    :param source: int
+    :param chunk_size: int; must match the chunk_size of the sender
+    :return: bool; whether any data was received
+    """
+    if chunk_size is None:
+        chunk_size = export_aggregate_chunk_size
+    size = np.empty(1, dtype='int64')
+    comm.Recv(size, source=source)
+    size = int(size[0])
+    if size == 0:
+        return False
+    buffer = np.empty(min(chunk_size, size), dtype='uint8')
+    with open(file_path, 'wb') as f:
+        for start in range(0, size, chunk_size):
+            count = min(chunk_size, size - start)
+            comm.Recv(buffer[:count], source=source)
+            f.write(buffer[:count].tobytes())
+    return True
+
+
+def aggregate_temp_output_files(file_paths, ranks=None, compression='source', compression_level=None,
+                                verbose=False, chunk_size=None):
+    """
+    Executed collectively by all worker ranks in 'aggregate' export mode, in which each worker can stage its temp
+    output file on node-local storage (see init_worker_contexts). The ranks are divided into contiguous blocks, and the
+    first rank of each block acts as an aggregator. All other ranks stream their temp output files to their aggregator
+    in bounded chunks (see send_temp_output_file). Each aggregator receives the files of its block in rank order into a
+    staging file (see get_export_temp_dir), and merges each one into a single output file with the same rules as
+    merge_hdf5_temp_output_files, so that only one file per aggregator is created on the shared filesystem, and written
+    sequentially. Temp output files are removed once they have been aggregated.
+    :param file_paths: list of str (paths); one file per aggregator
+    :param ranks: list of int; ranks of interface.global_comm that participate
+    :param compression: str or None; see merge_hdf5_temp_output_files
+    :param compression_level: int; only for gzip compression
+    :param verbose: bool
+    :param chunk_size: int; maximum size in bytes of each message; default is export_aggregate_chunk_size
+    """
+    context = find_context()
+    temp_output_path = context.temp_output_path if 'temp_output_path' in context() else None
+    if temp_output_path is not None and not os.path.isfile(temp_output_path):
+        temp_output_path = None
+    comm = get_export_comm(ranks)
+    if comm is None and ranks is not None and len(ranks) > 1:
+        # every rank would otherwise act as the only aggregator, and write to the same file
+        raise RuntimeError('aggregate_temp_output_files: no communicator spans ranks: %s; use merge mode (see '
+                           'has_export_comm)' % str(ranks))
+    rank, size = (0, 1) if comm is None else (comm.rank, comm.size)
+    num_aggregators = min(len(file_paths), size)
+    aggregators = [i * size // num_aggregators for i in range(num_aggregators)]
+    index = bisect.bisect_right(aggregators, rank) - 1
+    aggregator = aggregators[index]
+
+    try:
+        if rank != aggregator:
+            send_temp_output_file(comm, temp_output_path, aggregator, chunk_size)
+        else:
+            start_time = time.time()
+            compression_kwargs = \
+                None if compression == 'source' else get_compression_kwargs(compression, compression_level)
+            stop = aggregators[index + 1] if index + 1 < num_aggregators else size
+            export_temp_dir = get_export_temp_dir(
+                context.export_temp_dir if 'export_temp_dir' in context() else None,
+                context.output_dir if 'output_dir' in context() else None)
+            staging_file_path = '%s/nested_optimize_aggregate_%s_pid%i_uuid%i.hdf5' % \
+                                (export_temp_dir, datetime.datetime.today().strftime('%Y%m%d_%H%M%S'), os.getpid(),
+                                 uuid.uuid1())
+            count = 0
+            new_f = None
+            try:
+                for member in range(aggregator, stop):
+                    if member == rank:
+                        source_file_path = temp_output_path
+                    elif recv_temp_output_file(comm, staging_file_path, member, chunk_size):
+                        source_file_path = staging_file_path
+                    else:
+                        source_file_path = None
+                    if source_file_path is None:
+                        continue
+                    if new_f is None:
+                        new_f = h5py.File(file_paths[index], 'a')
+                    with h5py.File(source_file_path, 'r') as old_f:
+                        for group in old_f:
+                            nested_merge_hdf5_groups(old_f[group], group, new_f,
+                                                     compression_kwargs=compression_kwargs)
+                    count += 1
+            finally:
+                if new_f is not None:
+                    new_f.close()
+                if os.path.isfile(staging_file_path):
+                    os.remove(staging_file_path)
+            if verbose and count > 0:
+                print('aggregate_temp_output_files: aggregating %i temp output files into %s took %.1f s' %
+                      (count, file_paths[index], time.time() - start_time))
+                sys.stdout.flush()
+    finally:
+        if temp_output_path is not None and os.path.isfile(temp_output_path):
+            os.remove(temp_output_path)
+        if comm is not None:
+            comm.Free()
+
+
+def parallel_merge_temp_output_file(export_file_path, ranks=None, verbose=False):
+    """
+    Executed collectively by all worker ranks. Instead of a serial merge on the master process, each worker writes the
+    contents of its own temp output file into a single shared export file opened with the parallel HDF5 (mpio) driver.
+    First, the group and dataset layouts of all temp output files are gathered, and each rank merges them in rank order
+    with the same rules as nested_merge_hdf5_groups (shared_context is copied once, and enumerated groups are
+    re-enumerated). Then all groups, attributes and datasets are created collectively, which pre-allocates a slot for
+    each exported dataset. Finally, each rank writes its own data into its slots with independent I/O.
+    Workers cannot write into slots of the shared file as each model is evaluated, since model code exports to an
+    .hdf5 file path with arbitrary groups and datasets, and the layout of the shared file, which must be created
+    collectively, is only known once all models have been evaluated. So each worker still writes its exports to a temp
+    output file first, which can be staged on node-local storage (see init_worker_contexts), so that exported data is
+    only written once to the shared filesystem. Each temp output file is removed once its data has been written, or if
+    the export fails.
+    Datasets are written contiguous and uncompressed, since parallel HDF5 only supports filters with collective writes.
+    Variable-length and object datasets are not supported by parallel HDF5, and are instead copied by their owner ranks
+    in turn after the shared file is closed.
+    :param export_file_path: str (path)
+    :param ranks: list of int; ranks of interface.global_comm that participate
+    :param verbose: bool
+    """
+    context = find_context()
+    temp_output_path = context.temp_output_path if 'temp_output_path' in context() else None
+    comm = get_export_comm(ranks)
+    if comm is None and ranks is not None and len(ranks) > 1:
+        # every rank would otherwise open the export file as rank 0
+        raise RuntimeError('parallel_merge_temp_output_file: no communicator spans ranks: %s; use merge mode (see '
+                           'has_export_comm)' % str(ranks))
+    rank = 0 if comm is None else comm.rank
+
+    try:
+        if temp_output_path is not None and os.path.isfile(temp_output_path):
+            layout = get_hdf5_file_layout(temp_output_path)
+        else:
+            layout = None
+        if rank == 0 and os.path.isfile(export_file_path):
+            target_layout = get_hdf5_file_layout(export_file_path, exists=True)
+        else:
+            target_layout = None
+        if comm is None:
+            layouts = [layout]
+        else:
+            layouts = comm.allgather(layout)
+            target_layout = comm.bcast(target_layout, root=0)
+        if all(this_layout is None for this_layout in layouts):
+            return
+
+        start_time = time.time()
+        if target_layout is None:
+            target_layout = get_empty_hdf5_layout()
+        for i, this_layout in enumerate(layouts):
+            if this_layout is not None:
+                for key, node in viewitems(this_layout['children']):
+                    merge_hdf5_layouts(node, key, target_layout, i)
+
+        if comm is None:
+            export_file = h5py.File(export_file_path, 'a')
+        else:
+            export_file = h5py.File(export_file_path, 'a', driver='mpio', comm=comm)
+        deferred = []
+        with export_file:
+            create_hdf5_layout(export_file, target_layout)
+            if layout is not None:
+                with h5py.File(temp_output_path, 'r') as source_file:
+                    for target_path, node in iter_hdf5_layout_datasets(target_layout):
+                        if node['owner'] != rank:
+                            continue
+                        if node['deferred']:
+                            deferred.append((target_path, node['source']))
+                        elif node['shape'] is not None and np.prod(node['shape']) > 0:
+                            export_file[target_path][()] = source_file[node['source']][()]
+        num_deferred = len(deferred) if comm is None else comm.allreduce(len(deferred))
+        for i in range(0 if num_deferred == 0 else 1 if comm is None else comm.size):
+            if i == rank and len(deferred) > 0:
+                with h5py.File(export_file_path, 'a') as export_file:
+                    with h5py.File(temp_output_path, 'r') as source_file:
+                        for target_path, source_path in deferred:
+                            parent_path, key = target_path.rsplit('/', 1)
+                            export_file[parent_path or '/'].copy(source_file[source_path], key)
+            if comm is not None:
+                comm.barrier()
+        if verbose and rank == 0:
+            print('parallel_merge_temp_output_file: writing %i temp output files into %s took %.1f s' %
+                  (sum(this_layout is not None for this_layout in layouts), export_file_path,
+                   time.time() - start_time))
+            sys.stdout.flush()
+    finally:
+        if temp_output_path is not None and os.path.isfile(temp_output_path):
+            os.remove(temp_output_path)
+        if comm is not None:
+            comm.Free()
+
+
+def get_hdf5_file_layout(file_path, exists=False):
+    """
+    Returns the nested layout of the groups and datasets in an .hdf5 file, without reading any data. Each group is
+    represented by a dict with keys 'type', 'attrs', 'children', 'exists', and 'owner', and each dataset by a dict with
+    keys 'type', 'attrs', 'dtype', 'shape', 'deferred', 'source', and 'owner'. The root attributes are not included.
+    :param file_path: str (path)
+    :param exists: bool; whether the layout describes objects that already exist in a target file
+    :return: dict
+    """
+    def get_layout(source):
+        if isinstance(source, h5py.Dataset):
+            return {'type': 'dataset', 'attrs': dict(source.attrs), 'dtype': source.dtype, 'shape': source.shape,
+                    'deferred': source.dtype.hasobject, 'source': source.name, 'owner': None}
+        children = collections.OrderedDict()
+        for key in source:
+            children[key] = get_layout(source[key])
+        return {'type': 'group', 'attrs': dict(source.attrs), 'children': children, 'exists': exists, 'owner': None}
+
+    with h5py.File(file_path, 'r') as f:
+        layout = get_layout(f)
+    layout['exists'] = True
+    return layout
+
+
+def get_empty_hdf5_layout():
+    """
+    Returns the layout of an empty target file (see get_hdf5_file_layout).
+    :return: dict
+    """
+    return {'type': 'group', 'attrs': {}, 'children': collections.OrderedDict(), 'exists': True, 'owner': None}
+
+
+def select_hdf5_layout(layout, owners):
+    """
+    Returns the part of a layout (see get_hdf5_file_layout) that contains the groups and datasets assigned to any of
+    the specified owners, and the groups that contain them.
+    :param layout: dict
+    :param owners: set of int
+    :return: dict or None
+    """
+    if layout['type'] == 'dataset':
+        return layout if layout['owner'] in owners else None
+    children = collections.OrderedDict()
+    for key, node in viewitems(layout['children']):
+        selected = select_hdf5_layout(node, owners)
+        if selected is not None:
+            children[key] = selected
+    if len(children) > 0 or layout['owner'] in owners:
+        selected = dict(layout)
+        selected['children'] = children
+        return selected
+    return None
+
+
+def merge_hdf5_layouts(source, target_key, target, owner):
+    """
+    Merges a source layout (see get_hdf5_file_layout) into a target layout, following the same rules that
+    nested_merge_hdf5_groups applies to h5py objects. Datasets added to the target are assigned to the specified owner.
+    :param source: dict
+    :param target_key: str
+    :param target: dict
+    :param owner: int
+    """
+    if target_key not in target['children']:
+        target['children'][target_key] = copy_hdf5_layout(source, owner)
+        return
+    elif source['type'] == 'dataset' or target_key == 'shared_context':
+        return
+    target = target['children'][target_key]
+    if target['type'] == 'dataset':
+        return
+    if 'enumerated' in source['attrs'] and source['attrs']['enumerated']:
+        count = len(target['children'])
+        for node in viewvalues(source['children']):
+            merge_hdf5_layouts(node, str(count), target, owner)
+            count += 1
+    else:
+        for key, node in viewitems(source['children']):
+            merge_hdf5_layouts(node, key, target, owner)
+
+
+def copy_hdf5_layout(source, owner):
+    """
+    Returns a copy of a layout (see get_hdf5_file_layout) that describes new objects, with all groups and datasets
+    assigned to the specified owner.
+    :param source: dict
+    :param owner: int
+    :return: dict
+    """
+    if source['type'] == 'dataset':
+        node = dict(source)
+        node['owner'] = owner
+        return node
+    children = collections.OrderedDict()
+    for key, node in viewitems(source['children']):
+        children[key] = copy_hdf5_layout(node, owner)
+    return {'type': 'group', 'attrs': source['attrs'], 'children': children, 'exists': False, 'owner': owner}
+
+
+def create_hdf5_layout(target, layout, link_file_paths=None):
+    """
+    Creates all new groups, attributes, and datasets described by a layout (see get_hdf5_file_layout), without writing
+    any data. When target belongs to a file opened with the mpio driver, this must be called collectively by all ranks
+    with the same layout. Deferred datasets are not created.
+    If a list of link_file_paths is provided, each new dataset is instead created as an external link to its source
+    dataset in the file link_file_paths[owner], and deferred datasets are linked as well.
+    :param target: :class: in ['h5py.File', 'h5py.Group']
+    :param layout: dict
+    :param link_file_paths: list of str (paths)
+    """
+    for key, node in viewitems(layout['children']):
+        if node['type'] == 'group':
+            if node['exists']:
+                group = target[key]
+            else:
+                group = target.create_group(key)
+                for attr_key, val in viewitems(node['attrs']):
+                    group.attrs[attr_key] = val
+            create_hdf5_layout(group, node, link_file_paths)
+        elif node['owner'] is None:
+            continue
+        elif link_file_paths is not None:
+            target[key] = h5py.ExternalLink(link_file_paths[node['owner']], node['source'])
+        elif not node['deferred']:
+            if node['shape'] is None:
+                dataset = target.create_dataset(key, data=h5py.Empty(node['dtype']))
+            else:
+                dataset = target.create_dataset(key, shape=node['shape'], dtype=node['dtype'])
+            for attr_key, val in viewitems(node['attrs']):
+                dataset.attrs[attr_key] = val
+
+
+def iter_hdf5_layout_datasets(layout, path=''):
+    """
+    Yields the path and layout of every dataset in a layout (see get_hdf5_file_layout).
+    :param layout: dict
+    :param path: str
+    :return: generator of tuple of (str, dict)
+    """
+    for key, node in viewitems(layout['children']):
+        this_path = '%s/%s' % (path, key)
+        if node['type'] == 'group':
+            for item in iter_hdf5_layout_datasets(node, this_path):
+                yield item
+        else:
+            yield this_path, node
+
+
+def nested_merge_hdf5_groups(source, target_key, target, debug=False, compression_kwargs=None):
     """
 
     :param source: :class: in ['h5py.File', 'h5py.Group', 'h5py.Dataset']
     :param target_key: str
     :param target: :class: in ['h5py.File', 'h5py.Group']
     :param debug: bool
+    :param compression_kwargs: dict; see nested.storage.get_compression_kwargs; default is to copy datasets with their
+        original compression
     """
     if target_key not in target:
         try:
-            target.copy(source, target_key)
+            if compression_kwargs is None:
+                target.copy(source, target_key)
+            else:
+                h5_compressed_copy(source, target_key, target, compression_kwargs)
         except (IOError, AttributeError):
             pass
         return
@@ -3800,14 +7600,40 @@ def nested_merge_hdf5_groups(source, target_key, target, debug=False):
         if 'enumerated' in source.attrs and source.attrs['enumerated']:
             count = len(target)
             for key in source:
-                nested_merge_hdf5_groups(source[key], str(count), target, debug=debug)
+                nested_merge_hdf5_groups(source[key], str(count), target, debug=debug,
+                                         compression_kwargs=compression_kwargs)
                 count += 1
             if debug:
                 print('nested_merge_hdf5_groups: merged enumerated groups to target: %s' % target)
                 sys.stdout.flush()
         else:
             for key in source:
-                nested_merge_hdf5_groups(source[key], key, target, debug=debug)
+                nested_merge_hdf5_groups(source[key], key, target, debug=debug, compression_kwargs=compression_kwargs)
+
+
+def h5_compressed_copy(source, target_key, target, compression_kwargs):
+    """
+    Recursively copies a group or dataset, like h5py.Group.copy, but rewrites each dataset with the specified
+    compression filter. Scalar and empty datasets cannot be compressed, and are copied unchanged.
+    :param source: :class: in ['h5py.Group', 'h5py.Dataset']
+    :param target_key: str
+    :param target: :class: in ['h5py.File', 'h5py.Group']
+    :param compression_kwargs: dict; see nested.storage.get_compression_kwargs
+    """
+    if isinstance(source, h5py.Dataset):
+        if not compression_kwargs or source.shape == () or source.size == 0:
+            target.copy(source, target_key)
+            return
+        dataset = target.create_dataset(target_key, data=source[()], dtype=source.dtype, chunks=True,
+                                        **compression_kwargs)
+        for key, val in viewitems(source.attrs):
+            dataset.attrs[key] = val
+        return
+    group = target.create_group(target_key)
+    for key, val in viewitems(source.attrs):
+        group.attrs[key] = val
+    for key in source:
+        h5_compressed_copy(source[key], key, group, compression_kwargs)
 
 
 def h5_nested_copy(source, target):
@@ -3909,7 +7735,7 @@ def sobol_analysis_helper(y_str, storage, param_names, output_names, problem):
     second_order_conf = {}
 
     X, y = pop_to_matrix(storage, 'p', y_str, ['p'], ['o'])
-    num_failed = sum([len(gen) for gen in storage.failed])
+    num_failed = int(np.sum(storage.get_generation_sizes('failed')))
     if storage.total_models == 0:
         warnings.warn("Sobol analysis: All models failed and were not evaluated. Skipping "
                       "analysis of %s." % ('features' if y_str == 'f' else 'objectives'), Warning)
@@ -3974,10 +7800,9 @@ def default_failed_to_max(X, y, storage):
     for possible in storage.max_objectives:
         max_objective = np.maximum(max_objective, possible)
 
-    for pop in storage.failed:
-        for indiv in pop:
-            X = np.vstack((X, indiv.x))
-            y = np.vstack((y, max_objective))
+    failed_x = storage.get_history_matrix('x', 'failed')
+    X = np.vstack((X, failed_x))
+    y = np.vstack((y, np.tile(max_objective, (len(failed_x), 1))))
     return X, y
 
 
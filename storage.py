@@ -0,0 +1,3071 @@
+"""
+Library of classes and functions to support incremental storage of optimization history to .hdf5 files, or through
+other storage backends (see below).
+
+Each generation stored by a :class:'PopulationStorage' contains several categories of models ('population', 'survivors',
+'specialists', 'prev_survivors', 'prev_specialists', 'failed'). Rather than create a new group hierarchy for every model
+in every generation, each category is stored as a table of resizable, chunked datasets (one row per model). Rows are
+appended to the end of these tables as new generations are saved, and the rows belonging to each generation are recorded
+in a 'generation_bounds' dataset. Per-generation metadata ('count', 'min_objectives', 'max_objectives', and user-defined
+attributes) are stored in resizable datasets in the 'generations' group.
+
+A generation is only committed once its entry in 'generations/count' has been written. Rows appended to the category
+tables by an interrupted save are discarded the next time the file is opened for writing.
+
+Models in the 'survivors', 'specialists', 'prev_survivors' and 'prev_specialists' categories are always also members of
+the 'population' category of the same or an earlier generation. Since storage_version 3, these reference categories
+only store the model_id and the ranking attributes of each model, along with a 'population_row' column that points to
+the row of the 'population' table that contains the rest of its attributes. Files written with an earlier
+storage_version can be converted with:
+
+    python -m nested.storage compact <file_path>
+
+Every stored model is contained in exactly one row of either the 'population' or the 'failed' table. The 'model_index'
+group maps the model_id of each stored model to its generation, category, and row, so that models can be read by
+model_id without scanning the category tables (see read_models).
+
+Tables with one row per model are chunked along rows, and compressed with the filter selected by the compression and
+compression_level options of the writer (see get_compression_kwargs). Tables with one row per generation are small, and
+are never compressed. Settings can be compared on a particular filesystem with:
+
+    python -m nested.storage benchmark --output-dir <dir>
+
+Compression and file I/O can be moved off of the critical path of an optimization with an
+:class:'AsyncPopulationStorageWriter', which converts each generation to an immutable snapshot of column arrays, and
+hands it to a dedicated writer thread through a bounded queue.
+
+While a file is being written, it can be kept in HDF5 single-writer/multiple-reader (SWMR) mode, so that other processes
+can open it with swmr=True (see open_storage_file) and follow newly committed generations. SWMR mode requires all groups
+and datasets to be created before it is started, so the datasets of the known user-defined attributes (see
+swmr_attribute_dtypes) are created in advance, and other attributes are not saved while the file is in SWMR mode.
+
+Stored generations can also be accessed lazily through a :class:'LazyGenerationList', which only reads the rows of a
+generation from file when that generation is accessed, or streamed in blocks of column arrays with
+iter_generation_blocks.
+
+The same tables can also be stored by other backends, which each provide a :class:'StorageWriter' and a
+:class:'StorageReader' (see storage_backends). The backend is selected by the extension of the file path, or explicitly
+(e.g. with the --storage-backend option of nested.optimize):
+    'hdf5': .hdf5 files, as described above
+    'sqlite': SQLite databases (.sqlite, .db) in write-ahead log mode, which can be read by any number of processes
+        while they are being written, and which index columns of the 'population' table, so that models can be selected
+        with filtered queries, e.g. StorageReader.query_models([('f1', '<', 0.1)])
+    'memory': tables kept in memory by the current process (paths that start with 'memory://'), for unit tests and
+        benchmarks
+"""
+__author__ = 'Aaron D. Milstein, Grace Ng, and Prannath Moolchand'
+from nested.utils import *
+import click
+import signal as system_signal
+import threading
+import atexit
+import operator
+import sqlite3
+import json
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+storage_version = 3
+population_categories = ['population', 'survivors', 'specialists', 'prev_survivors', 'prev_specialists', 'failed']
+# categories that only contain models that are also stored in the 'population' category
+reference_categories = ['survivors', 'specialists', 'prev_survivors', 'prev_specialists']
+# columns stored for each category; models in the 'failed' category only store 'model_id' and 'x'
+scalar_columns = ['energy', 'rank', 'distance', 'fitness']
+failed_columns = ['model_id', 'x']
+# attributes assigned to a model during evaluation and selection of a population
+ranking_columns = ['normalized_objectives'] + scalar_columns + ['survivor']
+# since storage_version 3, models in reference categories only store these columns
+reference_columns = ['model_id', 'population_row'] + ranking_columns
+# categories that together contain every stored model exactly once
+indexed_categories = ['population', 'failed']
+# columns of the 'model_index' group; category is stored as an index into population_categories
+model_index_columns = ['model_id', 'generation', 'category', 'row']
+# file extensions that select each storage backend; paths that start with memory_path_prefix select the 'memory' backend
+storage_backend_extensions = {'hdf5': ['.hdf5', '.h5', '.hdf'], 'sqlite': ['.sqlite', '.sqlite3', '.db'],
+                              'memory': []}
+memory_path_prefix = 'memory://'
+# comparisons supported by filtered queries (see query_generation_blocks)
+filter_operators = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq,
+                    '!=': operator.ne}
+# columns of the 'population' table that are indexed by the 'sqlite' backend
+sqlite_indexed_columns = ['model_id', 'generation', 'objectives', 'rank']
+# compression filters that can be applied to the tables of .hdf5 files (see get_compression_kwargs)
+compression_filters = [None, 'gzip', 'lzf']
+# user-defined attributes saved by the generators of nested.optimize_utils; their datasets are created before an .hdf5
+# file enters SWMR mode, and are ignored by readers until a value has been saved (see is_attribute_saved)
+swmr_attribute_dtypes = {'step_size': 'float64', 'hypervolume': 'float64', 'termination': 'str'}
+
+
+def get_compression_kwargs(compression='gzip', compression_level=None):
+    """
+    Returns the keyword arguments of h5py.Group.create_dataset that apply a compression filter. gzip accepts a
+    compression_level from 0 (fastest) to 9 (smallest). lzf is much faster than gzip, but compresses less, does not
+    accept a level, and is only available where h5py is installed.
+    :param compression: str or None; 'gzip' or 'lzf'
+    :param compression_level: int
+    :return: dict
+    """
+    if compression in ['None', 'none', '', False]:
+        compression = None
+    if compression not in compression_filters:
+        raise ValueError('get_compression_kwargs: invalid compression: %s; must be one of: %s' %
+                         (compression, str(compression_filters)))
+    if compression is None:
+        return dict()
+    kwargs = {'compression': compression}
+    if compression_level is not None and compression_level not in ['None', 'none']:
+        if compression != 'gzip':
+            raise ValueError('get_compression_kwargs: compression_level can only be specified for gzip compression')
+        compression_level = int(compression_level)
+        if not 0 <= compression_level <= 9:
+            raise ValueError('get_compression_kwargs: invalid compression_level for gzip compression: %i; must be '
+                             'between 0 and 9' % compression_level)
+        kwargs['compression_opts'] = compression_level
+    return kwargs
+
+
+def get_storage_backend(file_path, backend=None):
+    """
+    Returns the name of the backend used to read and write a storage file. Unless a backend is specified, it is selected
+    by the extension of the file path (see storage_backend_extensions). Files with any other extension are .hdf5 files.
+    :param file_path: str (path)
+    :param backend: str; 'hdf5', 'sqlite', or 'memory'
+    :return: str
+    """
+    if backend is not None:
+        if backend not in storage_backends:
+            raise ValueError('get_storage_backend: invalid storage backend: %s; must be one of: %s' %
+                             (backend, str(list(storage_backends))))
+        return backend
+    if str(file_path).startswith(memory_path_prefix):
+        return 'memory'
+    ext = os.path.splitext(str(file_path))[1].lower()
+    for backend, extensions in viewitems(storage_backend_extensions):
+        if ext in extensions:
+            return backend
+    return 'hdf5'
+
+
+def get_storage_file_path(file_path, backend=None):
+    """
+    Adds the file extension (or, for the 'memory' backend, the prefix) that selects a storage backend to a file path
+    without an extension.
+    :param file_path: str (path)
+    :param backend: str; default is 'hdf5'
+    :return: str (path)
+    """
+    backend = get_storage_backend(None, 'hdf5' if backend is None else backend)
+    if backend == 'memory':
+        return memory_path_prefix + file_path
+    return file_path + storage_backend_extensions[backend][0]
+
+
+def storage_file_exists(file_path, backend=None):
+    """
+
+    :param file_path: str (path)
+    :param backend: str
+    :return: bool
+    """
+    if get_storage_backend(file_path, backend) == 'memory':
+        return file_path in memory_storage_files
+    return os.path.isfile(file_path)
+
+
+def is_same_storage_file(file_path, other_file_path, backend=None):
+    """
+
+    :param file_path: str (path)
+    :param other_file_path: str (path)
+    :param backend: str
+    :return: bool
+    """
+    if get_storage_backend(file_path, backend) == 'memory':
+        return file_path == other_file_path
+    if os.path.isfile(file_path) and os.path.isfile(other_file_path):
+        return os.path.samefile(file_path, other_file_path)
+    return os.path.abspath(file_path) == os.path.abspath(other_file_path)
+
+
+def get_temp_storage_file_path(file_path, label):
+    """
+    Returns the path of a temporary file in the same directory, with the same extension, so that it is written by the
+    same storage backend.
+    :param file_path: str (path)
+    :param label: str
+    :return: str (path)
+    """
+    root, ext = os.path.splitext(file_path)
+    return '%s.%s.tmp%s' % (root, label, ext)
+
+
+def replace_storage_file(source_file_path, file_path, backend=None):
+    """
+    Replaces a storage file with another, e.g. a temporary file that has been completely written. The source file must
+    have been closed by any writer.
+    :param source_file_path: str (path)
+    :param file_path: str (path)
+    :param backend: str
+    """
+    backend = get_storage_backend(file_path, backend)
+    if backend == 'memory':
+        memory_storage_files[file_path] = memory_storage_files.pop(source_file_path)
+        return
+    if backend == 'sqlite':
+        # a write-ahead log left behind for the replaced file must not be applied to the new file
+        for suffix in ['-wal', '-shm']:
+            if os.path.isfile(file_path + suffix):
+                os.remove(file_path + suffix)
+    os.rename(source_file_path, file_path)
+
+
+def open_storage_reader(file_path, backend=None, swmr=False):
+    """
+    Returns a :class:'StorageReader' for the backend of a storage file (see get_storage_backend).
+    :param file_path: str (path)
+    :param backend: str
+    :param swmr: bool; open an .hdf5 file in SWMR mode (see open_storage_file)
+    :return: :class:'StorageReader'
+    """
+    return storage_backends[get_storage_backend(file_path, backend)]['reader'](file_path, swmr=swmr)
+
+
+def get_storage_writer(file_path, param_names, feature_names, objective_names, path_length, normalize, backend=None,
+                       **kwargs):
+    """
+    Returns a :class:'StorageWriter' for the backend of a storage file (see get_storage_backend). Options that do not
+    apply to the selected backend (e.g. chunk_size, compression or swmr) are ignored.
+    :param file_path: str (path)
+    :param param_names: list of str
+    :param feature_names: list of str
+    :param objective_names: list of str
+    :param path_length: int
+    :param normalize: str
+    :param backend: str
+    :return: :class:'StorageWriter'
+    """
+    WriterClass = storage_backends[get_storage_backend(file_path, backend)]['writer']
+    return WriterClass(file_path, param_names, feature_names, objective_names, path_length, normalize, **kwargs)
+
+
+def open_storage_file(file_path, swmr=False):
+    """
+    Opens a storage file for reading. Files that are being written in SWMR mode can be read while they are being
+    written if swmr is True.
+    :param file_path: str (path)
+    :param swmr: bool
+    :return: :class:'h5py.File'
+    """
+    if swmr:
+        return h5py.File(file_path, 'r', libver='latest', swmr=True)
+    return h5py.File(file_path, 'r')
+
+
+def get_storage_version(f):
+    """
+    Files written before the introduction of table-based storage contain one group per generation and do not specify a
+    storage_version.
+    :param f: :class:'h5py.File'
+    :return: int
+    """
+    if 'storage_version' in f.attrs:
+        return int(f.attrs['storage_version'])
+    return 1
+
+
+def is_table_storage(f):
+    """
+
+    :param f: :class:'h5py.File'
+    :return: bool
+    """
+    return get_storage_version(f) >= 2
+
+
+def get_num_generations(f):
+    """
+    Returns the number of committed generations stored in a file.
+    :param f: :class:'h5py.File'
+    :return: int
+    """
+    if is_table_storage(f):
+        return len(f['generations']['count'])
+    return len(f)
+
+
+def get_column_names(category):
+    """
+
+    :param category: str
+    :return: list of str
+    """
+    if category == 'failed':
+        return list(failed_columns)
+    return ['model_id', 'x', 'features', 'objectives'] + ranking_columns
+
+
+def get_stored_column_names(category, version=storage_version):
+    """
+    Returns the columns that are actually stored in the table of each category, which depends on the storage_version of
+    the file (see get_storage_version).
+    :param category: str
+    :param version: int
+    :return: list of str
+    """
+    if version >= 3 and category in reference_categories:
+        return list(reference_columns)
+    return get_column_names(category)
+
+
+def get_column_widths(param_names, feature_names, objective_names):
+    """
+    Returns the number of elements per row of each column. Scalar columns have a width of None.
+    :param param_names: list of str
+    :param feature_names: list of str
+    :param objective_names: list of str
+    :return: dict
+    """
+    widths = {'model_id': None, 'population_row': None, 'x': len(param_names), 'features': len(feature_names),
+              'objectives': len(objective_names), 'normalized_objectives': len(objective_names), 'survivor': None}
+    for column in scalar_columns:
+        widths[column] = None
+    return widths
+
+
+def get_column_dtype(column):
+    """
+
+    :param column: str
+    :return: :class:'np.dtype'
+    """
+    if column in ['model_id', 'population_row']:
+        return np.dtype('int64')
+    elif column == 'survivor':
+        return np.dtype('bool')
+    return np.dtype('float64')
+
+
+def get_column_fillvalue(column):
+    """
+    Value used to indicate missing data (None) in a column.
+    :param column: str
+    :return: scalar
+    """
+    if column in ['model_id', 'population_row']:
+        return -1
+    elif column == 'survivor':
+        return False
+    return np.nan
+
+
+def get_model_index_dtype(column):
+    """
+
+    :param column: str
+    :return: :class:'np.dtype'
+    """
+    if column == 'category':
+        return np.dtype('int8')
+    return np.dtype('int64')
+
+
+def get_num_indexed_rows(f):
+    """
+    Returns the number of models in committed generations of the 'population' and 'failed' tables.
+    :param f: :class:'h5py.File'
+    :return: int
+    """
+    num_gen = get_num_generations(f)
+    if num_gen == 0:
+        return 0
+    return int(sum([f[category]['generation_bounds'][num_gen - 1, 1] for category in indexed_categories]))
+
+
+def build_model_index(f):
+    """
+    Builds the 'model_index' of a table-based storage file from the 'population' and 'failed' tables.
+    :param f: :class:'h5py.File'
+    :return: dict of array
+    """
+    num_gen = get_num_generations(f)
+    index = {column: [] for column in model_index_columns}
+    for category in indexed_categories:
+        bounds = f[category]['generation_bounds'][:num_gen]
+        num_rows = int(bounds[-1, 1]) if num_gen > 0 else 0
+        index['model_id'].append(f[category]['model_id'][:num_rows])
+        index['generation'].append(np.repeat(np.arange(num_gen, dtype='int64'), bounds[:, 1] - bounds[:, 0]))
+        index['category'].append(np.full(num_rows, population_categories.index(category), dtype='int8'))
+        index['row'].append(np.arange(num_rows, dtype='int64'))
+    return {column: np.concatenate(index[column]).astype(get_model_index_dtype(column))
+            for column in model_index_columns}
+
+
+def read_model_index(f):
+    """
+    Returns the 'model_index' of a table-based storage file, sorted by model_id. Only committed generations are
+    included. If the file does not contain a complete 'model_index', it is built from the category tables.
+    :param f: :class:'h5py.File'
+    :return: dict of array
+    """
+    num_gen = get_num_generations(f)
+    if 'model_index' in f and len(f['model_index']['model_id']) >= get_num_indexed_rows(f):
+        index = {column: f['model_index'][column][:] for column in model_index_columns}
+        committed = index['generation'] < num_gen
+        if not np.all(committed):
+            index = {column: data[committed] for column, data in viewitems(index)}
+    else:
+        index = build_model_index(f)
+    if np.any(np.diff(index['model_id']) < 0):
+        order = np.argsort(index['model_id'], kind='stable')
+        index = {column: data[order] for column, data in viewitems(index)}
+    return index
+
+
+def get_model_locations(f, model_ids, index=None):
+    """
+    Returns the generation, category, and row of each of the specified models.
+    :param f: :class:'h5py.File'; only read if an index is not specified
+    :param model_ids: array of int
+    :param index: dict of array; see read_model_index
+    :return: dict of array
+    """
+    if index is None:
+        index = read_model_index(f)
+    model_ids = np.asarray(model_ids, dtype='int64').reshape(-1)
+    if len(index['model_id']) == 0:
+        found = np.zeros(len(model_ids), dtype=bool)
+        pos = np.zeros(len(model_ids), dtype='int64')
+    else:
+        pos = np.minimum(np.searchsorted(index['model_id'], model_ids), len(index['model_id']) - 1)
+        found = index['model_id'][pos] == model_ids
+    if not np.all(found):
+        raise KeyError('get_model_locations: model_ids not found in storage: %s' % str(model_ids[~found]))
+    return {column: index[column][pos] for column in model_index_columns}
+
+
+def population_to_columns(population, category, widths):
+    """
+    Converts a list of :class:'Individual' into a dict of arrays, one per stored column. Missing (None) values are
+    replaced by the fill value of each column. The columns of a :class:'PopulationArray' are copied directly, or, if
+    the population is frozen (read-only), are returned without copying.
+    :param population: list of :class:'Individual' or :class:'PopulationArray'
+    :param category: str
+    :param widths: dict
+    :return: dict of array
+    """
+    if isinstance(getattr(population, 'columns', None), dict):
+        if getattr(population, 'frozen', False):
+            return {column: np.asarray(population.columns[column], dtype=get_column_dtype(column))
+                    for column in get_column_names(category)}
+        return {column: np.array(population.columns[column], dtype=get_column_dtype(column))
+                for column in get_column_names(category)}
+    num_rows = len(population)
+    columns = dict()
+    for column in get_column_names(category):
+        width = widths[column]
+        shape = (num_rows,) if width is None else (num_rows, width)
+        data = np.full(shape, get_column_fillvalue(column), dtype=get_column_dtype(column))
+        for i, individual in enumerate(population):
+            val = getattr(individual, column)
+            if val is None:
+                continue
+            if width is None:
+                data[i] = val
+            elif len(val) > 0:
+                data[i, :] = [None2nan(this_val) for this_val in val]
+        columns[column] = data
+    return columns
+
+
+def get_filter_column(name, param_names, feature_names, objective_names):
+    """
+    Resolves the name used in a filter to a column, and to an element of that column. Scalar columns (e.g. 'model_id',
+    'rank', or 'generation') are referred to by name. Elements of array columns are referred to by the name of an
+    objective, feature, or parameter (in that order of precedence), or by a name qualified with the column, e.g.
+    'normalized_objectives.f1' or 'x.p1'.
+    :param name: str
+    :param param_names: list of str
+    :param feature_names: list of str
+    :param objective_names: list of str
+    :return: tuple; (str, int or None)
+    """
+    if name in ['model_id', 'generation', 'survivor'] + scalar_columns:
+        return name, None
+    names = {'objectives': list(objective_names), 'features': list(feature_names), 'x': list(param_names),
+             'normalized_objectives': list(objective_names)}
+    if '.' in name:
+        column, element = name.split('.', 1)
+        if column in names and element in names[column]:
+            return column, names[column].index(element)
+    else:
+        for column in ['objectives', 'features', 'x']:
+            if name in names[column]:
+                return column, names[column].index(name)
+    raise KeyError('get_filter_column: invalid filter: %s' % name)
+
+
+def get_filter_mask(data, filters, param_names, feature_names, objective_names):
+    """
+    Returns a boolean mask of the rows that satisfy all of the specified filters. Comparisons with missing (nan) values
+    are False, except for '!='.
+    :param data: dict of array
+    :param filters: list of tuple; (name, operator, value), e.g. ('f1', '<', 0.1); see get_filter_column
+    :param param_names: list of str
+    :param feature_names: list of str
+    :param objective_names: list of str
+    :return: array of bool
+    """
+    mask = np.ones(len(data['model_id']), dtype=bool)
+    for name, op, value in filters:
+        if op not in filter_operators:
+            raise ValueError('get_filter_mask: invalid operator: %s; must be one of: %s' %
+                             (op, str(list(filter_operators))))
+        column, index = get_filter_column(name, param_names, feature_names, objective_names)
+        if column not in data:
+            raise KeyError('get_filter_mask: invalid filter: %s' % name)
+        values = data[column] if index is None else data[column][:, index]
+        mask &= filter_operators[op](values, value)
+    return mask
+
+
+def get_query_columns(filters, columns, category, param_names, feature_names, objective_names):
+    """
+    Returns the columns that must be read to select models with the specified filters.
+    :param filters: list of tuple; see get_filter_mask
+    :param columns: list of str; requested columns
+    :param category: str
+    :param param_names: list of str
+    :param feature_names: list of str
+    :param objective_names: list of str
+    :return: list of str
+    """
+    read_columns = list(columns)
+    for name, op, value in filters:
+        column = get_filter_column(name, param_names, feature_names, objective_names)[0]
+        if column not in read_columns and column != 'generation':
+            if column not in get_column_names(category):
+                raise KeyError('get_query_columns: invalid filter for category: %s: %s' % (category, name))
+            read_columns.append(column)
+    return read_columns
+
+
+def query_generation_blocks(blocks, filters, param_names, feature_names, objective_names, columns=None,
+                            category='population'):
+    """
+    Selects the models of one category that satisfy all of the specified filters from blocks of generations (see
+    iter_generation_blocks), e.g. all models with objective 'f1' < 0.1: [('f1', '<', 0.1)].
+    :param blocks: iterable of tuple; (first generation, last generation + 1, block)
+    :param filters: list of tuple; see get_filter_mask
+    :param param_names: list of str
+    :param feature_names: list of str
+    :param objective_names: list of str
+    :param columns: list of str; default is all columns of the category
+    :param category: str
+    :return: dict of array; the requested columns, and the 'generation' of each selected model
+    """
+    if columns is None:
+        columns = get_column_names(category)
+    widths = get_column_widths(param_names, feature_names, objective_names)
+    widths['generation'] = None
+    selected = {column: [] for column in list(columns) + ['generation']}
+    for gen_start, gen_stop, block in blocks:
+        data = block[category]
+        mask = get_filter_mask(data, filters, param_names, feature_names, objective_names)
+        for column in selected:
+            selected[column].append(data[column][mask])
+    for column in selected:
+        if selected[column]:
+            selected[column] = np.concatenate(selected[column])
+        else:
+            width = widths[column]
+            dtype = np.dtype('int64') if column == 'generation' else get_column_dtype(column)
+            selected[column] = np.empty((0,) if width is None else (0, width), dtype=dtype)
+    return selected
+
+
+class StorageWriter(object):
+    """
+    Functionality shared by the writers of all storage backends (see get_storage_backend). Each saved generation is
+    converted to a snapshot of column arrays (see get_generation_snapshot), which a backend appends to its storage file
+    by implementing write_snapshot. A generation must be committed atomically, so that readers, and writers that later
+    append to the same file, never observe a partially written generation. Data is flushed to disk every
+    flush_interval generations, or on receipt of the (optional) flush_signal.
+    """
+
+    def __init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize,
+                 flush_interval=1):
+        """
+
+        :param file_path: str (path)
+        :param param_names: list of str
+        :param feature_names: list of str
+        :param objective_names: list of str
+        :param path_length: int
+        :param normalize: str
+        :param flush_interval: int; number of generations between flushes to disk
+        """
+        self.file_path = file_path
+        self.param_names = list(param_names)
+        self.feature_names = list(feature_names)
+        self.objective_names = list(objective_names)
+        self.path_length = int(path_length)
+        self.normalize = normalize
+        self.widths = get_column_widths(self.param_names, self.feature_names, self.objective_names)
+        self.flush_interval = max(1, int(flush_interval))
+        self.unflushed = 0
+        self._flush_requested = False
+        self._writing = False
+
+    def get_metadata(self):
+        """
+
+        :return: dict
+        """
+        return {'storage_version': storage_version, 'param_names': self.param_names,
+                'feature_names': self.feature_names, 'objective_names': self.objective_names,
+                'path_length': self.path_length, 'normalize': self.normalize}
+
+    def init_population_index(self, model_ids=()):
+        """
+        Models in reference categories are stored as pointers to rows of the 'population' table. An index of the
+        model_ids already stored in the 'population' table is kept in memory, sorted by model_id.
+        :param model_ids: array of int; model_ids already stored in the 'population' table
+        """
+        self.index_model_ids = np.empty(0, dtype='int64')
+        self.index_rows = np.empty(0, dtype='int64')
+        self.update_population_index(model_ids, 0)
+
+    def update_population_index(self, model_ids, start):
+        """
+        Adds rows appended to the 'population' table to the index. Since model_ids are usually assigned in increasing
+        order, new rows can usually be appended to the end of the index without sorting.
+        :param model_ids: array of int
+        :param start: int; row of the 'population' table that contains the first model
+        """
+        model_ids = np.asarray(model_ids, dtype='int64')
+        if len(model_ids) == 0:
+            return
+        order = np.argsort(model_ids, kind='stable')
+        model_ids = model_ids[order]
+        rows = order + start
+        if len(self.index_model_ids) > 0 and model_ids[0] <= self.index_model_ids[-1]:
+            model_ids = np.concatenate([self.index_model_ids, model_ids])
+            rows = np.concatenate([self.index_rows, rows])
+            order = np.argsort(model_ids, kind='stable')
+            self.index_model_ids = model_ids[order]
+            self.index_rows = rows[order]
+        else:
+            self.index_model_ids = np.concatenate([self.index_model_ids, model_ids])
+            self.index_rows = np.concatenate([self.index_rows, rows])
+
+    def get_population_rows(self, model_ids, category):
+        """
+        Returns the row of the 'population' table that contains each of the specified models.
+        :param model_ids: array of int
+        :param category: str
+        :return: array of int
+        """
+        model_ids = np.asarray(model_ids, dtype='int64')
+        if len(model_ids) == 0:
+            return np.empty(0, dtype='int64')
+        pos = np.minimum(np.searchsorted(self.index_model_ids, model_ids), max(0, len(self.index_model_ids) - 1))
+        found = (model_ids >= 0) & (self.index_model_ids[pos] == model_ids) if len(self.index_model_ids) > 0 else \
+            np.zeros(len(model_ids), dtype=bool)
+        if not np.all(found):
+            raise ValueError('%s: models in category: %s are not stored in any population: %s' %
+                             (self.__class__.__name__, category, str(model_ids[~found])))
+        return self.index_rows[pos]
+
+    def get_generation_snapshot(self, populations, count, min_objectives=None, max_objectives=None, attributes=None):
+        """
+        Converts one generation into arrays that no longer reference any :class:'Individual', so that they can be
+        written after the population has been modified by subsequent generations. Frozen populations cannot be
+        modified, so their arrays are referenced rather than copied.
+        :param populations: dict: {category: list of :class:'Individual' or :class:'PopulationArray'}
+        :param count: int
+        :param min_objectives: array
+        :param max_objectives: array
+        :param attributes: dict
+        :return: dict
+        """
+        snapshot = {'count': int(count), 'populations': dict(), 'attributes': dict()}
+        for category in population_categories:
+            snapshot['populations'][category] = \
+                population_to_columns(populations.get(category, []), category, self.widths)
+        for key, val in zip(['min_objectives', 'max_objectives'], [min_objectives, max_objectives]):
+            row = np.full(len(self.objective_names), np.nan)
+            if val is not None and len(val) > 0:
+                row[:] = [None2nan(this_val) for this_val in val]
+            snapshot[key] = row
+        if attributes is not None:
+            snapshot['attributes'] = dict(attributes)
+        return snapshot
+
+    def append_generation(self, populations, count, min_objectives=None, max_objectives=None, attributes=None):
+        """
+        Appends one generation to the file.
+        :param populations: dict: {category: list of :class:'Individual'}
+        :param count: int
+        :param min_objectives: array
+        :param max_objectives: array
+        :param attributes: dict
+        """
+        self.write_generation(self.get_generation_snapshot(populations, count, min_objectives, max_objectives,
+                                                           attributes))
+
+    def write_generation(self, snapshot):
+        """
+
+        :param snapshot: dict; see get_generation_snapshot
+        """
+        self._writing = True
+        try:
+            self.write_snapshot(snapshot)
+        finally:
+            self._writing = False
+        self.unflushed += 1
+        if self._flush_requested or self.unflushed >= self.flush_interval:
+            self.flush()
+
+    def write_snapshot(self, snapshot):
+        """
+        Appends one generation to the file, and commits it.
+        :param snapshot: dict; see get_generation_snapshot
+        """
+        raise NotImplementedError('%s: write_snapshot is not implemented' % self.__class__.__name__)
+
+    def flush(self):
+        """
+        Flushes buffered data to disk.
+        """
+        self.unflushed = 0
+        self._flush_requested = False
+
+    def register_flush_signal(self, flush_signal):
+        """
+        Upon receipt of the specified signal, flush immediately if idle, otherwise flush after the current generation
+        has been written.
+        :param flush_signal: int or str
+        """
+        if isinstance(flush_signal, basestring):
+            flush_signal = getattr(system_signal, flush_signal)
+
+        def handler(signum, frame):
+            if self._writing:
+                self._flush_requested = True
+            else:
+                self.flush()
+
+        system_signal.signal(flush_signal, handler)
+
+
+    def close(self):
+        """
+
+        """
+        self.flush()
+
+
+class PopulationStorageWriter(StorageWriter):
+    """
+    Keeps an .hdf5 file open for the duration of an optimization, and appends each saved generation as rows of
+    resizable, chunked datasets. The cost of saving a generation depends only on the number of models in that
+    generation, not on the number of generations already stored. Data is flushed to disk every flush_interval
+    generations, or on receipt of the (optional) flush_signal. New files are written with the current storage_version,
+    and existing files are appended to with the layout of their original storage_version. If swmr is True, the file is
+    kept in SWMR mode, so that other processes can read committed generations while the file is being written. Files
+    created without SWMR support are appended to without SWMR. Since datasets cannot be created in SWMR mode, the
+    datasets of the attributes in attribute_dtypes are created before it is started, and any other attribute is not
+    saved while the file is in SWMR mode.
+    """
+
+    def __init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize,
+                 mode='a', flush_interval=1, flush_signal=None, chunk_size=256, swmr=False, compression='gzip',
+                 compression_level=None, attribute_dtypes=None):
+        """
+
+        :param file_path: str (path)
+        :param param_names: list of str
+        :param feature_names: list of str
+        :param objective_names: list of str
+        :param path_length: int
+        :param normalize: str
+        :param mode: str; 'a': append to an existing file, 'w': overwrite
+        :param flush_interval: int; number of generations between flushes to disk
+        :param flush_signal: int or str; e.g. 'SIGUSR1'; request a flush upon receipt of this signal
+        :param chunk_size: int; number of rows per chunk
+        :param swmr: bool; allow other processes to read the file while it is being written
+        :param compression: str or None; compression filter of tables with one row per model; 'gzip' or 'lzf'
+        :param compression_level: int; only for gzip compression; default is 4
+        :param attribute_dtypes: dict; {name: 'float64' or 'str'}; datasets of user-defined attributes to create before
+            SWMR mode is started; default is swmr_attribute_dtypes
+        """
+        StorageWriter.__init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize,
+                               flush_interval=flush_interval)
+        self.chunk_size = int(chunk_size)
+        self.attribute_dtypes = swmr_attribute_dtypes if attribute_dtypes is None else attribute_dtypes
+        # attributes that were not saved because their datasets did not exist when SWMR mode was started
+        self.skipped_attributes = set()
+        # tables that already exist in an appended file keep their original compression
+        self.compression_kwargs = get_compression_kwargs(compression, compression_level)
+        self.swmr = swmr
+        # SWMR requires the latest file format
+        libver = 'latest' if swmr else None
+        if mode not in ['a', 'w']:
+            raise ValueError('PopulationStorageWriter: mode must be either \'a\' or \'w\'')
+        if mode == 'a' and os.path.isfile(file_path):
+            self.file = h5py.File(file_path, 'a', libver=libver)
+            if len(self.file) > 0 and not is_table_storage(self.file):
+                self.file.close()
+                raise IOError('PopulationStorageWriter: cannot append to file with storage_version: 1: %s' %
+                              file_path)
+        else:
+            self.file = h5py.File(file_path, 'w', libver=libver)
+        self.version = get_storage_version(self.file) if len(self.file) > 0 else storage_version
+        self.init_file()
+        self.truncate_uncommitted()
+        self.init_population_index(self.file['population']['model_id'][:] if self.version >= 3 else ())
+        self.init_model_index()
+        if self.swmr:
+            for key, dtype in viewitems(self.attribute_dtypes):
+                self.create_attribute_dataset(key, dtype, preallocated=True)
+            self.start_swmr()
+        if flush_signal is not None:
+            self.register_flush_signal(flush_signal)
+
+    def start_swmr(self):
+        """
+        Starts SWMR mode. After this, groups, datasets and attributes can no longer be created.
+        """
+        try:
+            self.file.swmr_mode = True
+        except (ValueError, RuntimeError, OSError) as e:
+            print('PopulationStorageWriter: file: %s does not support SWMR mode, and cannot be read while it is being '
+                  'written: %s' % (self.file_path, e))
+            sys.stdout.flush()
+            self.swmr = False
+
+    def init_file(self):
+        """
+        Writes file-level metadata and creates empty tables, if they do not already exist.
+        """
+        f = self.file
+        if 'storage_version' not in f.attrs:
+            f.attrs['storage_version'] = self.version
+        if 'param_names' not in f.attrs:
+            set_h5py_attr(f.attrs, 'param_names', self.param_names)
+        if 'feature_names' not in f.attrs:
+            set_h5py_attr(f.attrs, 'feature_names', self.feature_names)
+        if 'objective_names' not in f.attrs:
+            set_h5py_attr(f.attrs, 'objective_names', self.objective_names)
+        if 'path_length' not in f.attrs:
+            f.attrs['path_length'] = self.path_length
+        if 'normalize' not in f.attrs:
+            set_h5py_attr(f.attrs, 'normalize', self.normalize)
+        group = get_h5py_group(f, ['generations'], create=True)
+        self.create_table_column(group, 'count', None, np.dtype('int64'), -1, compress=False)
+        for column in ['min_objectives', 'max_objectives']:
+            self.create_table_column(group, column, len(self.objective_names), np.dtype('float64'), np.nan,
+                                     compress=False)
+        get_h5py_group(group, ['attributes'], create=True)
+        for category in population_categories:
+            group = get_h5py_group(f, [category], create=True)
+            self.create_table_column(group, 'generation_bounds', 2, np.dtype('int64'), 0, compress=False)
+            for column in get_stored_column_names(category, self.version):
+                self.create_table_column(group, column, self.widths[column], get_column_dtype(column),
+                                         get_column_fillvalue(column))
+        group = get_h5py_group(f, ['model_index'], create=True)
+        for column in model_index_columns:
+            self.create_table_column(group, column, None, get_model_index_dtype(column), -1)
+
+    def create_table_column(self, group, name, width, dtype, fillvalue, compress=True):
+        """
+        Creates an empty, resizable, chunked dataset with one row per entry.
+        :param group: :class:'h5py.Group'
+        :param name: str
+        :param width: int or None
+        :param dtype: :class:'np.dtype'
+        :param fillvalue: scalar
+        :param compress: bool; apply the compression filter of this writer
+        :return: :class:'h5py.Dataset'
+        """
+        if name in group:
+            return group[name]
+        if width is None:
+            shape, maxshape, chunks = (0,), (None,), (self.chunk_size,)
+        else:
+            shape, maxshape, chunks = (0, width), (None, width), (self.chunk_size, max(1, width))
+        compression_kwargs = self.compression_kwargs if compress else dict()
+        return group.create_dataset(name, shape=shape, maxshape=maxshape, chunks=chunks, dtype=dtype,
+                                    fillvalue=fillvalue, **compression_kwargs)
+
+    @property
+    def num_generations(self):
+        """
+
+        :return: int
+        """
+        return len(self.file['generations']['count'])
+
+    def truncate_uncommitted(self):
+        """
+        If a previous save was interrupted, rows may have been appended to the category tables for a generation that
+        was never committed. Those rows are discarded.
+        """
+        num_gen = self.num_generations
+        generations = self.file['generations']
+        for key in ['min_objectives', 'max_objectives']:
+            if len(generations[key]) > num_gen:
+                generations[key].resize(num_gen, axis=0)
+        for key in generations['attributes']:
+            if len(generations['attributes'][key]) > num_gen:
+                generations['attributes'][key].resize(num_gen, axis=0)
+        for category in population_categories:
+            group = self.file[category]
+            if len(group['generation_bounds']) > num_gen:
+                group['generation_bounds'].resize(num_gen, axis=0)
+            num_rows = int(group['generation_bounds'][-1, 1]) if num_gen > 0 else 0
+            for column in get_stored_column_names(category, self.version):
+                if len(group[column]) != num_rows:
+                    group[column].resize(num_rows, axis=0)
+
+    def init_model_index(self):
+        """
+        Discards any entries of the 'model_index' that were appended by an interrupted save. Files written before the
+        introduction of the 'model_index' are indexed when first opened for writing.
+        """
+        group = self.file['model_index']
+        num_rows = get_num_indexed_rows(self.file)
+        num_indexed = len(group['model_id'])
+        if num_indexed == num_rows:
+            return
+        if num_indexed > num_rows:
+            for column in model_index_columns:
+                group[column].resize(num_rows, axis=0)
+        else:
+            index = build_model_index(self.file)
+            for column in model_index_columns:
+                group[column].resize(0, axis=0)
+                self.append_rows(group[column], index[column])
+
+    def append_model_index(self, gen_index, model_ids, category, start):
+        """
+
+        :param gen_index: int
+        :param model_ids: array of int
+        :param category: str
+        :param start: int; row of the category table that contains the first model
+        """
+        num_rows = len(model_ids)
+        if num_rows == 0:
+            return
+        group = self.file['model_index']
+        self.append_rows(group['model_id'], model_ids)
+        self.append_rows(group['generation'], np.full(num_rows, gen_index, dtype='int64'))
+        self.append_rows(group['category'], np.full(num_rows, population_categories.index(category), dtype='int8'))
+        self.append_rows(group['row'], np.arange(start, start + num_rows, dtype='int64'))
+
+    def append_rows(self, dataset, data):
+        """
+
+        :param dataset: :class:'h5py.Dataset'
+        :param data: array
+        """
+        start = len(dataset)
+        num_rows = len(data)
+        if num_rows == 0:
+            return
+        dataset.resize(start + num_rows, axis=0)
+        dataset[start:start + num_rows] = data
+
+    def create_attribute_dataset(self, key, dtype, preallocated=False):
+        """
+        Creates the resizable dataset of a user-defined attribute, with one row per committed generation. Unless it is
+        preallocated before SWMR mode is started, the attribute is also added to the 'user_attribute_names' of the file.
+        :param key: str
+        :param dtype: str; 'float64' or 'str'
+        :param preallocated: bool
+        :return: :class:'h5py.Dataset'
+        """
+        group = self.file['generations']['attributes']
+        if key in group:
+            return group[key]
+        num_gen = self.num_generations
+        if dtype == 'str':
+            dset = group.create_dataset(key, shape=(num_gen,), maxshape=(None,), chunks=(self.chunk_size,),
+                                        dtype=h5py.string_dtype())
+        else:
+            dset = group.create_dataset(key, shape=(num_gen,), maxshape=(None,), chunks=(self.chunk_size,),
+                                        dtype=dtype, fillvalue=np.nan)
+        if preallocated:
+            dset.attrs['preallocated'] = True
+        else:
+            user_attribute_names = list(get_h5py_attr(self.file.attrs, 'user_attribute_names')) \
+                if 'user_attribute_names' in self.file.attrs else []
+            user_attribute_names.append(key)
+            set_h5py_attr(self.file.attrs, 'user_attribute_names', user_attribute_names)
+        return dset
+
+    def append_attribute(self, key, val):
+        """
+        User-defined attributes are stored as float datasets, unless a str value is provided. In SWMR mode, datasets
+        cannot be created, so an attribute without a dataset is not saved.
+        :param key: str
+        :param val: any
+        """
+        group = self.file['generations']['attributes']
+        num_gen = self.num_generations
+        if key not in group:
+            if val is None:
+                return
+            if self.file.swmr_mode:
+                if key not in self.skipped_attributes:
+                    self.skipped_attributes.add(key)
+                    print('PopulationStorageWriter: attribute: %s is not saved to file: %s, since its dataset was not '
+                          'created before SWMR mode was started (see swmr_attribute_dtypes)' % (key, self.file_path))
+                    sys.stdout.flush()
+                return
+            self.create_attribute_dataset(key, 'str' if isinstance(val, basestring) else 'float64')
+        dset = group[key]
+        if len(dset) < num_gen:
+            dset.resize(num_gen, axis=0)
+        if dset.dtype.kind in ['O', 'S', 'U']:
+            val = '' if val is None else str(val)
+        else:
+            val = None2nan(val)
+        self.append_rows(dset, [val])
+
+    def write_snapshot(self, snapshot):
+        """
+        The generation is committed last by appending to 'generations/count'.
+        :param snapshot: dict; see get_generation_snapshot
+        """
+        gen_index = self.num_generations
+        for category in population_categories:
+            group = self.file[category]
+            columns = snapshot['populations'][category]
+            start = len(group['model_id'])
+            num_rows = len(columns['model_id'])
+            if self.version >= 3 and category in reference_categories:
+                columns = dict(columns)
+                columns['population_row'] = self.get_population_rows(columns['model_id'], category)
+            for column in get_stored_column_names(category, self.version):
+                self.append_rows(group[column], columns[column])
+            self.append_rows(group['generation_bounds'], [[start, start + num_rows]])
+            if self.version >= 3 and category == 'population':
+                self.update_population_index(columns['model_id'], start)
+            if category in indexed_categories:
+                self.append_model_index(gen_index, columns['model_id'], category, start)
+        generations = self.file['generations']
+        for key in ['min_objectives', 'max_objectives']:
+            self.append_rows(generations[key], [snapshot[key]])
+        for key, val in viewitems(snapshot['attributes']):
+            self.append_attribute(key, val)
+        self.append_rows(generations['count'], [snapshot['count']])
+
+    def flush(self):
+        """
+        Flushes buffered data to disk.
+        """
+        if self.file is not None:
+            self.file.flush()
+        StorageWriter.flush(self)
+
+    def close(self):
+        """
+
+        """
+        if self.file is not None:
+            self.file.flush()
+            self.file.close()
+            self.file = None
+
+
+class AsyncPopulationStorageWriter(object):
+    """
+    Wraps a :class:'StorageWriter' of any storage backend (by default, a :class:'PopulationStorageWriter') so that
+    compression and file I/O happen in a dedicated writer thread.
+    Generations are converted to snapshots by the calling thread and passed to the writer thread through a bounded
+    queue. If the writer falls more than max_queued generations behind, append_generation blocks until space is
+    available. flush() and close() block until all queued generations have been written, and any exception raised in
+    the writer thread is re-raised in the calling thread by the next call to append_generation, flush, or close.
+    """
+
+    def __init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize,
+                 mode='a', flush_interval=1, flush_signal=None, chunk_size=256, max_queued=2, swmr=False,
+                 backend=None, compression='gzip', compression_level=None):
+        """
+
+        :param file_path: str (path)
+        :param param_names: list of str
+        :param feature_names: list of str
+        :param objective_names: list of str
+        :param path_length: int
+        :param normalize: str
+        :param mode: str; 'a': append to an existing file, 'w': overwrite
+        :param flush_interval: int; number of generations between flushes to disk
+        :param flush_signal: int or str; e.g. 'SIGUSR1'; request a flush upon receipt of this signal
+        :param chunk_size: int; number of rows per chunk
+        :param max_queued: int; maximum number of generations waiting to be written
+        :param swmr: bool; allow other processes to read the file while it is being written
+        :param backend: str; 'hdf5', 'sqlite', or 'memory'; default is determined by the file extension
+        :param compression: str or None; see get_compression_kwargs
+        :param compression_level: int
+        """
+        self.writer = get_storage_writer(file_path, param_names, feature_names, objective_names, path_length,
+                                         normalize, backend=backend, mode=mode, flush_interval=flush_interval,
+                                         chunk_size=chunk_size, swmr=swmr, compression=compression,
+                                         compression_level=compression_level)
+        self.file_path = self.writer.file_path
+        self._num_generations = self.writer.num_generations
+        self._queue = queue.Queue(maxsize=max(1, int(max_queued)))
+        self._exception = None
+        self._thread = threading.Thread(target=self.run, name='PopulationStorageWriter')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+        if flush_signal is not None:
+            self.register_flush_signal(flush_signal)
+
+    @property
+    def num_generations(self):
+        """
+        Includes generations that have been queued, but not yet written.
+        :return: int
+        """
+        return self._num_generations
+
+    def run(self):
+        """
+        Target of the writer thread. Processes queued requests in order until a request to stop is received.
+        """
+        while True:
+            request, snapshot = self._queue.get()
+            try:
+                if self._exception is None:
+                    if request == 'write':
+                        self.writer.write_generation(snapshot)
+                    elif request == 'flush':
+                        self.writer.flush()
+            except Exception as e:
+                self._exception = e
+                traceback.print_exc(file=sys.stdout)
+                sys.stdout.flush()
+            finally:
+                self._queue.task_done()
+            if request == 'stop':
+                return
+
+    def check_exception(self):
+        """
+
+        """
+        if self._exception is not None:
+            e = self._exception
+            self._exception = None
+            raise IOError('AsyncPopulationStorageWriter: writing to file: %s failed: %s' % (self.file_path, e))
+
+    def append_generation(self, populations, count, min_objectives=None, max_objectives=None, attributes=None):
+        """
+        Queues one generation to be appended to the file.
+        :param populations: dict: {category: list of :class:'Individual'}
+        :param count: int
+        :param min_objectives: array
+        :param max_objectives: array
+        :param attributes: dict
+        """
+        self.check_exception()
+        if self._thread is None:
+            raise IOError('AsyncPopulationStorageWriter: cannot append to closed file: %s' % self.file_path)
+        snapshot = self.writer.get_generation_snapshot(populations, count, min_objectives, max_objectives,
+                                                       attributes)
+        self._queue.put(('write', snapshot))
+        self._num_generations += 1
+
+    def flush(self):
+        """
+        Blocks until all queued generations have been written and flushed to disk.
+        """
+        if self._thread is not None:
+            self._queue.put(('flush', None))
+            self._queue.join()
+        self.check_exception()
+
+    def register_flush_signal(self, flush_signal):
+        """
+        Upon receipt of the specified signal, request that the writer thread flush to disk after writing any
+        generations that are already queued.
+        :param flush_signal: int or str
+        """
+        if isinstance(flush_signal, basestring):
+            flush_signal = getattr(system_signal, flush_signal)
+
+        def handler(signum, frame):
+            try:
+                self._queue.put_nowait(('flush', None))
+            except queue.Full:
+                self.writer._flush_requested = True
+
+        system_signal.signal(flush_signal, handler)
+
+    def close(self):
+        """
+        Blocks until all queued generations have been written, then closes the file.
+        """
+        if self._thread is not None:
+            self._queue.put(('stop', None))
+            self._thread.join()
+            self._thread = None
+            self.writer.close()
+            try:
+                atexit.unregister(self.close)
+            except AttributeError:
+                pass
+        self.check_exception()
+
+
+def read_table_rows(f, category, rows, columns):
+    """
+    Reads the specified (not necessarily sorted or unique) rows of a category table.
+    :param f: :class:'h5py.File'
+    :param category: str
+    :param rows: array of int
+    :param columns: list of str
+    :return: dict of array
+    """
+    rows = np.asarray(rows, dtype='int64')
+    group = f[category]
+    # h5py fancy indexing requires increasing indices
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    data = dict()
+    for column in columns:
+        dset = group[column]
+        if len(unique_rows) == 0:
+            data[column] = np.empty((0,) + dset.shape[1:], dtype=dset.dtype)
+        else:
+            data[column] = dset[unique_rows][inverse]
+    return data
+
+
+def read_category_rows(f, category, start, stop, columns=None):
+    """
+    Reads a range of rows of a category table. Columns that are not stored in a reference category (see
+    get_stored_column_names) are read from the referenced rows of the 'population' table.
+    :param f: :class:'h5py.File'
+    :param category: str
+    :param start: int
+    :param stop: int
+    :param columns: list of str; default is all columns of the category
+    :return: dict of array
+    """
+    if columns is None:
+        columns = get_column_names(category)
+    group = f[category]
+    stored_columns = get_stored_column_names(category, get_storage_version(f))
+    data = {column: group[column][start:stop] for column in columns if column in stored_columns}
+    referenced_columns = [column for column in columns if column not in stored_columns]
+    if referenced_columns:
+        if 'population_row' not in stored_columns:
+            raise KeyError('read_category_rows: invalid columns for category: %s: %s' %
+                           (category, str(referenced_columns)))
+        data.update(read_table_rows(f, 'population', group['population_row'][start:stop], referenced_columns))
+    return data
+
+
+def iter_generation_blocks(f, columns=None, categories=None, chunk=1, start=0, stop=None):
+    """
+    Iterates over the committed generations of a table-based storage file, reading chunk generations at a time. Each
+    block contains the rows of all generations in the chunk as a dict: {category: {column: array}}. Requested columns
+    that are not stored for a category (e.g. 'objectives' of 'failed' models) are omitted. An additional 'generation'
+    column contains the generation of each row.
+    :param f: :class:'h5py.File'
+    :param columns: list of str; default is all columns of each category
+    :param categories: list of str; default is all categories
+    :param chunk: int; number of generations per block
+    :param start: int; first generation
+    :param stop: int; last generation + 1; default is the number of committed generations
+    :return: generator of tuple; (first generation, last generation + 1, block)
+    """
+    if categories is None:
+        categories = population_categories
+    num_gen = get_num_generations(f)
+    if stop is not None:
+        num_gen = min(num_gen, int(stop))
+    chunk = max(1, int(chunk))
+    bounds = {category: f[category]['generation_bounds'][:num_gen] for category in categories}
+    for gen_start in range(start, num_gen, chunk):
+        gen_stop = min(gen_start + chunk, num_gen)
+        block = dict()
+        for category in categories:
+            category_columns = get_column_names(category) if columns is None else \
+                [column for column in columns if column in get_column_names(category)]
+            this_bounds = bounds[category][gen_start:gen_stop]
+            data = read_category_rows(f, category, this_bounds[0, 0], this_bounds[-1, 1], category_columns)
+            data['generation'] = np.repeat(np.arange(gen_start, gen_stop), this_bounds[:, 1] - this_bounds[:, 0])
+            block[category] = data
+        yield gen_start, gen_stop, block
+
+
+def read_models(f, model_ids, columns=None, index=None):
+    """
+    Reads the specified models from a table-based storage file, in the requested order, using the 'model_index' to
+    locate each model. Columns that are not stored for failed models are filled with missing values.
+    :param f: :class:'h5py.File'
+    :param model_ids: array of int
+    :param columns: list of str; default is all columns of the 'population' category
+    :param index: dict of array; see read_model_index
+    :return: dict of array
+    """
+    if columns is None:
+        columns = get_column_names('population')
+    locations = get_model_locations(f, model_ids, index)
+    num_models = len(locations['model_id'])
+    data = dict()
+    for column in columns:
+        dset = f['population'][column]
+        data[column] = np.full((num_models,) + dset.shape[1:], get_column_fillvalue(column), dtype=dset.dtype)
+    for category in indexed_categories:
+        match = locations['category'] == population_categories.index(category)
+        if not np.any(match):
+            continue
+        stored_columns = [column for column in columns if column in get_column_names(category)]
+        values = read_table_rows(f, category, locations['row'][match], stored_columns)
+        for column in stored_columns:
+            data[column][match] = values[column]
+    return data
+
+
+def read_generation_columns(f, category, gen_index, columns=None):
+    """
+    Reads the rows of the specified category that belong to a single generation.
+    :param f: :class:'h5py.File'
+    :param category: str
+    :param gen_index: int
+    :param columns: list of str; default is all columns of the category
+    :return: dict of array
+    """
+    start, stop = f[category]['generation_bounds'][gen_index]
+    return read_category_rows(f, category, start, stop, columns)
+
+
+def is_attribute_saved(dset):
+    """
+    The dataset of an attribute that was preallocated before SWMR mode was started (see PopulationStorageWriter) is
+    ignored unless a value has been saved in any generation.
+    :param dset: :class:'h5py.Dataset'
+    :return: bool
+    """
+    if not dset.attrs.get('preallocated', False):
+        return True
+    data = dset[:]
+    if dset.dtype.kind in ['O', 'S', 'U']:
+        return any([len(val) > 0 for val in data])
+    return bool(np.any(~np.isnan(data)))
+
+
+def read_generation_attributes(f, gen_index):
+    """
+
+    :param f: :class:'h5py.File'
+    :param gen_index: int
+    :return: dict
+    """
+    attributes = dict()
+    group = f['generations']['attributes']
+    for key in group:
+        if not is_attribute_saved(group[key]):
+            continue
+        if gen_index < len(group[key]):
+            val = group[key][gen_index]
+            if isinstance(val, bytes):
+                val = val.decode()
+            elif isinstance(val, float) or isinstance(val, np.floating):
+                val = nan2None(val)
+            attributes[key] = val
+    return attributes
+
+
+def read_generation_attribute_values(f, start=0, stop=None):
+    """
+    Reads the user-defined attributes of a range of generations, with one read per attribute.
+    :param f: :class:'h5py.File'
+    :param start: int; first generation
+    :param stop: int; last generation + 1; default is the number of committed generations
+    :return: dict of list; values of each attribute, or None for generations in which it was not specified
+    """
+    if stop is None:
+        stop = get_num_generations(f)
+    attribute_values = dict()
+    group = f['generations']['attributes']
+    for key in group:
+        if not is_attribute_saved(group[key]):
+            continue
+        data = group[key][start:min(stop, len(group[key]))]
+        values = []
+        for val in data:
+            if isinstance(val, bytes):
+                val = val.decode()
+            elif isinstance(val, float) or isinstance(val, np.floating):
+                val = nan2None(val)
+            values.append(val)
+        values.extend([None] * (stop - start - len(values)))
+        attribute_values[key] = values
+    return attribute_values
+
+
+def get_column_matrix(f, category, column, start=0, stop=None):
+    """
+    Returns the requested rows of a single column of a category table. If the dataset is stored contiguously and
+    without compression, a read-only memory map is returned instead of reading the data into memory.
+    :param f: :class:'h5py.File'
+    :param category: str
+    :param column: str
+    :param start: int
+    :param stop: int
+    :return: array
+    """
+    dset = f[category][column]
+    if stop is None:
+        stop = len(dset)
+    if dset.chunks is None and dset.compression is None and dset.dtype.kind in ['b', 'i', 'u', 'f'] and \
+            dset.size > 0:
+        offset = dset.id.get_offset()
+        if offset is not None:
+            data = np.memmap(f.filename, mode='r', dtype=dset.dtype, offset=offset, shape=dset.shape)
+            return data[start:stop]
+    return dset[start:stop]
+
+
+class StorageReader(object):
+    """
+    Reads a table-based storage file independently of the storage backend (see get_storage_backend). Each backend
+    implements reading of file-level metadata, per-generation values, and ranges of rows of each category table. Reading
+    of single generations, iteration over blocks of generations, and filtered queries are implemented here in terms of
+    those methods, but can be overridden by backends that support them more efficiently.
+    """
+
+    def __init__(self, file_path, swmr=False):
+        """
+
+        :param file_path: str (path)
+        :param swmr: bool
+        """
+        self.file_path = file_path
+        self._metadata = None
+        self._model_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """
+
+        """
+        pass
+
+    def is_table_storage(self):
+        """
+
+        :return: bool
+        """
+        return True
+
+    def read_metadata(self):
+        """
+        Returns file-level metadata: 'storage_version', 'param_names', 'feature_names', 'objective_names',
+        'path_length', 'normalize', and 'user_attribute_names'.
+        :return: dict
+        """
+        if self._metadata is None:
+            self._metadata = self.load_metadata()
+        return self._metadata
+
+    def load_metadata(self):
+        """
+
+        :return: dict
+        """
+        raise NotImplementedError('%s: load_metadata is not implemented' % self.__class__.__name__)
+
+    def get_widths(self):
+        """
+        See get_column_widths.
+        :return: dict
+        """
+        metadata = self.read_metadata()
+        return get_column_widths(metadata['param_names'], metadata['feature_names'], metadata['objective_names'])
+
+    def get_num_generations(self):
+        """
+        Returns the number of committed generations.
+        :return: int
+        """
+        raise NotImplementedError('%s: get_num_generations is not implemented' % self.__class__.__name__)
+
+    def read_generation_bounds(self, category, start=0, stop=None):
+        """
+        Returns the rows of the category table that belong to each of the specified generations.
+        :param category: str
+        :param start: int; first generation
+        :param stop: int; last generation + 1; default is the number of committed generations
+        :return: array of int; (num_generations, 2)
+        """
+        raise NotImplementedError('%s: read_generation_bounds is not implemented' % self.__class__.__name__)
+
+    def read_generation_values(self, key, start=0, stop=None):
+        """
+        Returns per-generation values of 'count', 'min_objectives', or 'max_objectives'.
+        :param key: str
+        :param start: int; first generation
+        :param stop: int; last generation + 1; default is the number of committed generations
+        :return: array
+        """
+        raise NotImplementedError('%s: read_generation_values is not implemented' % self.__class__.__name__)
+
+    def read_generation_attributes(self, gen_index):
+        """
+        Returns the user-defined attributes of a single generation.
+        :param gen_index: int
+        :return: dict
+        """
+        raise NotImplementedError('%s: read_generation_attributes is not implemented' % self.__class__.__name__)
+
+    def read_generation_attribute_values(self, start=0, stop=None):
+        """
+        Returns the user-defined attributes of a range of generations.
+        :param start: int; first generation
+        :param stop: int; last generation + 1; default is the number of committed generations
+        :return: dict of list; values of each attribute, or None for generations in which it was not specified
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        attribute_values = {key: [] for key in self.read_metadata()['user_attribute_names']}
+        for gen_index in range(start, stop):
+            attributes = self.read_generation_attributes(gen_index)
+            for key in attributes:
+                if key not in attribute_values:
+                    attribute_values[key] = [None] * (gen_index - start)
+            for key in attribute_values:
+                attribute_values[key].append(attributes.get(key, None))
+        return attribute_values
+
+    def read_category_rows(self, category, start, stop, columns=None):
+        """
+        Reads a range of rows of a category table (see read_category_rows).
+        :param category: str
+        :param start: int
+        :param stop: int
+        :param columns: list of str; default is all columns of the category
+        :return: dict of array
+        """
+        raise NotImplementedError('%s: read_category_rows is not implemented' % self.__class__.__name__)
+
+    def read_models(self, model_ids, columns=None):
+        """
+        Reads the specified models, in the requested order (see read_models).
+        :param model_ids: array of int
+        :param columns: list of str; default is all columns of the 'population' category
+        :return: dict of array
+        """
+        raise NotImplementedError('%s: read_models is not implemented' % self.__class__.__name__)
+
+    def get_model_index(self):
+        """
+        Returns the generation, category, and row of every model in committed generations of the 'population' and
+        'failed' tables, sorted by model_id (see read_model_index). The index is built once per reader.
+        :return: dict of array
+        """
+        if self._model_index is None:
+            num_gen = self.get_num_generations()
+            index = {column: [] for column in model_index_columns}
+            for category in indexed_categories:
+                bounds = self.read_generation_bounds(category, 0, num_gen)
+                num_rows = int(bounds[-1, 1]) if num_gen > 0 else 0
+                index['model_id'].append(self.get_column(category, 'model_id', 0, num_rows))
+                index['generation'].append(np.repeat(np.arange(num_gen, dtype='int64'), bounds[:, 1] - bounds[:, 0]))
+                index['category'].append(np.full(num_rows, population_categories.index(category), dtype='int8'))
+                index['row'].append(np.arange(num_rows, dtype='int64'))
+            index = {column: np.concatenate(index[column]).astype(get_model_index_dtype(column))
+                     for column in model_index_columns}
+            order = np.argsort(index['model_id'], kind='stable')
+            self._model_index = {column: data[order] for column, data in viewitems(index)}
+        return self._model_index
+
+    def get_model_locations(self, model_ids):
+        """
+        Returns the generation, category, and row of each of the specified models (see get_model_locations).
+        :param model_ids: array of int
+        :return: dict of array
+        """
+        return get_model_locations(None, model_ids, index=self.get_model_index())
+
+    def get_column(self, category, column, start=0, stop=None):
+        """
+        Returns a range of rows of a single column of a category table.
+        :param category: str
+        :param column: str
+        :param start: int
+        :param stop: int; default is the number of rows in committed generations
+        :return: array
+        """
+        if stop is None:
+            num_gen = self.get_num_generations()
+            stop = int(self.read_generation_bounds(category, num_gen - 1, num_gen)[0, 1]) if num_gen > 0 else 0
+        return self.read_category_rows(category, start, stop, [column])[column]
+
+    def read_generation_columns(self, category, gen_index, columns=None):
+        """
+        Reads the rows of the specified category that belong to a single generation.
+        :param category: str
+        :param gen_index: int
+        :param columns: list of str; default is all columns of the category
+        :return: dict of array
+        """
+        start, stop = self.read_generation_bounds(category, gen_index, gen_index + 1)[0]
+        return self.read_category_rows(category, start, stop, columns)
+
+    def iter_generation_blocks(self, columns=None, categories=None, chunk=1, start=0, stop=None):
+        """
+        See iter_generation_blocks.
+        :param columns: list of str; default is all columns of each category
+        :param categories: list of str; default is all categories
+        :param chunk: int; number of generations per block
+        :param start: int; first generation
+        :param stop: int; last generation + 1; default is the number of committed generations
+        :return: generator of tuple; (first generation, last generation + 1, block)
+        """
+        if categories is None:
+            categories = population_categories
+        num_gen = self.get_num_generations()
+        if stop is not None:
+            num_gen = min(num_gen, int(stop))
+        chunk = max(1, int(chunk))
+        bounds = {category: self.read_generation_bounds(category, 0, num_gen) for category in categories}
+        for gen_start in range(start, num_gen, chunk):
+            gen_stop = min(gen_start + chunk, num_gen)
+            block = dict()
+            for category in categories:
+                category_columns = get_column_names(category) if columns is None else \
+                    [column for column in columns if column in get_column_names(category)]
+                this_bounds = bounds[category][gen_start:gen_stop]
+                data = self.read_category_rows(category, this_bounds[0, 0], this_bounds[-1, 1], category_columns)
+                data['generation'] = np.repeat(np.arange(gen_start, gen_stop), this_bounds[:, 1] - this_bounds[:, 0])
+                block[category] = data
+            yield gen_start, gen_stop, block
+
+    def query_models(self, filters, columns=None, category='population', stop=None):
+        """
+        Returns the models of one category that satisfy all of the specified filters (see query_generation_blocks).
+        Generations are streamed from file path_length at a time.
+        :param filters: list of tuple; (name, operator, value), e.g. ('f1', '<', 0.1); see get_filter_column
+        :param columns: list of str; default is all columns of the category
+        :param category: str
+        :param stop: int; last generation + 1; default is the number of committed generations
+        :return: dict of array
+        """
+        metadata = self.read_metadata()
+        names = [metadata['param_names'], metadata['feature_names'], metadata['objective_names']]
+        if columns is None:
+            columns = get_column_names(category)
+        read_columns = get_query_columns(filters, columns, category, *names)
+        blocks = self.iter_generation_blocks(read_columns, [category], chunk=metadata['path_length'], stop=stop)
+        return query_generation_blocks(blocks, filters, *names, columns=columns, category=category)
+
+
+class HDF5StorageReader(StorageReader):
+    """
+    Reads an .hdf5 storage file (see PopulationStorageWriter). Files with storage_version 1 can only be read through
+    the h5py.File object, which is available as the file attribute.
+    """
+
+    def __init__(self, file_path, swmr=False):
+        """
+
+        :param file_path: str (path)
+        :param swmr: bool; open the file in SWMR mode (see open_storage_file)
+        """
+        StorageReader.__init__(self, file_path)
+        self.file = open_storage_file(file_path, swmr)
+
+    def close(self):
+        """
+
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def is_table_storage(self):
+        """
+
+        :return: bool
+        """
+        return is_table_storage(self.file)
+
+    def load_metadata(self):
+        """
+
+        :return: dict
+        """
+        attrs = self.file.attrs
+        metadata = {'storage_version': get_storage_version(self.file),
+                    'param_names': list(get_h5py_attr(attrs, 'param_names')),
+                    'feature_names': list(get_h5py_attr(attrs, 'feature_names')),
+                    'objective_names': list(get_h5py_attr(attrs, 'objective_names')),
+                    'path_length': int(attrs['path_length']), 'normalize': get_h5py_attr(attrs, 'normalize'),
+                    'user_attribute_names': []}
+        if 'user_attribute_names' in attrs and len(attrs['user_attribute_names']) > 0:
+            metadata['user_attribute_names'] = list(get_h5py_attr(attrs, 'user_attribute_names'))
+        if 'generations' in self.file:
+            # preallocated attributes are not listed in the file attributes, which cannot be modified in SWMR mode
+            group = self.file['generations']['attributes']
+            for key in group:
+                if key not in metadata['user_attribute_names'] and is_attribute_saved(group[key]):
+                    metadata['user_attribute_names'].append(key)
+        return metadata
+
+    def get_num_generations(self):
+        """
+
+        :return: int
+        """
+        return get_num_generations(self.file)
+
+    def read_generation_bounds(self, category, start=0, stop=None):
+        """
+
+        :param category: str
+        :param start: int
+        :param stop: int
+        :return: array of int
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        return self.file[category]['generation_bounds'][start:stop]
+
+    def read_generation_values(self, key, start=0, stop=None):
+        """
+
+        :param key: str
+        :param start: int
+        :param stop: int
+        :return: array
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        return self.file['generations'][key][start:stop]
+
+    def read_generation_attributes(self, gen_index):
+        """
+
+        :param gen_index: int
+        :return: dict
+        """
+        return read_generation_attributes(self.file, gen_index)
+
+    def read_generation_attribute_values(self, start=0, stop=None):
+        """
+
+        :param start: int
+        :param stop: int
+        :return: dict of list
+        """
+        return read_generation_attribute_values(self.file, start, stop)
+
+    def read_category_rows(self, category, start, stop, columns=None):
+        """
+
+        :param category: str
+        :param start: int
+        :param stop: int
+        :param columns: list of str
+        :return: dict of array
+        """
+        return read_category_rows(self.file, category, start, stop, columns)
+
+    def get_model_index(self):
+        """
+        The 'model_index' is read once per reader (see read_model_index).
+        :return: dict of array
+        """
+        if self._model_index is None:
+            self._model_index = read_model_index(self.file)
+        return self._model_index
+
+    def read_models(self, model_ids, columns=None):
+        """
+
+        :param model_ids: array of int
+        :param columns: list of str
+        :return: dict of array
+        """
+        return read_models(self.file, model_ids, columns, index=self.get_model_index())
+
+    def get_column(self, category, column, start=0, stop=None):
+        """
+        Stored columns may be returned as a memory map (see get_column_matrix).
+        :param category: str
+        :param column: str
+        :param start: int
+        :param stop: int
+        :return: array
+        """
+        if column in get_stored_column_names(category, get_storage_version(self.file)):
+            if stop is None:
+                num_gen = self.get_num_generations()
+                stop = int(self.read_generation_bounds(category, num_gen - 1, num_gen)[0, 1]) if num_gen > 0 else 0
+            return get_column_matrix(self.file, category, column, start, stop)
+        return StorageReader.get_column(self, category, column, start, stop)
+
+    def iter_generation_blocks(self, columns=None, categories=None, chunk=1, start=0, stop=None):
+        """
+
+        :param columns: list of str
+        :param categories: list of str
+        :param chunk: int
+        :param start: int
+        :param stop: int
+        :return: generator of tuple
+        """
+        return iter_generation_blocks(self.file, columns, categories, chunk, start, stop)
+
+
+def get_sqlite_column_names(column, width):
+    """
+    Array columns are stored as one SQL column per element, e.g. 'objectives_0'.
+    :param column: str
+    :param width: int or None
+    :return: list of str
+    """
+    if width is None:
+        return [column]
+    return ['%s_%i' % (column, i) for i in range(width)]
+
+
+def get_sqlite_column_type(column):
+    """
+
+    :param column: str
+    :return: str
+    """
+    if column == 'generation' or get_column_dtype(column).kind in ['i', 'b']:
+        return 'INTEGER'
+    return 'REAL'
+
+
+def columns_to_sqlite_rows(columns, column_names, widths):
+    """
+    Converts a dict of column arrays into a list of tuples, one per row, with one item per SQL column.
+    :param columns: dict of array
+    :param column_names: list of str
+    :param widths: dict
+    :return: list of tuple
+    """
+    fields = []
+    for column in column_names:
+        data = np.asarray(columns[column])
+        if widths.get(column) is None:
+            fields.append(data.tolist())
+        else:
+            fields.extend(data.T.tolist())
+    return list(zip(*fields))
+
+
+def sqlite_rows_to_columns(rows, column_names, widths):
+    """
+    Converts a list of tuples returned by an SQL query into a dict of column arrays. NULL values are read as nan.
+    :param rows: list of tuple
+    :param column_names: list of str
+    :param widths: dict
+    :return: dict of array
+    """
+    fields = list(zip(*rows))
+    columns = dict()
+    pos = 0
+    for column in column_names:
+        width = widths.get(column)
+        dtype = np.dtype('int64') if column == 'generation' else get_column_dtype(column)
+        num_fields = 1 if width is None else width
+        if not rows:
+            data = np.empty((0,) if width is None else (0, width), dtype=dtype)
+        elif width is None:
+            data = np.array(fields[pos], dtype='float64' if dtype.kind == 'f' else dtype)
+        elif width == 0:
+            data = np.empty((len(rows), 0), dtype=dtype)
+        else:
+            data = np.array(fields[pos:pos + num_fields], dtype='float64').T.astype(dtype)
+        columns[column] = data
+        pos += num_fields
+    return columns
+
+
+class SQLitePopulationStorageWriter(StorageWriter):
+    """
+    Appends each saved generation to an SQLite database in write-ahead log (WAL) mode, so that any number of processes
+    can read committed generations while the database is being written. Each category is stored as a table with one row
+    per model, and one SQL column per element of each array column (see get_sqlite_column_names). As with the current
+    storage_version of .hdf5 files, models in reference categories only store a pointer to a row of the 'population'
+    table, and their ranking attributes. The columns of the 'population' table listed in sqlite_indexed_columns are
+    indexed, so that models can be read by model_id, or selected by filtered queries (see SQLiteStorageReader), without
+    scanning the table. Each generation is written within a savepoint, and generations are committed every
+    flush_interval generations, so a generation is never partially visible.
+    """
+
+    def __init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize, mode='a',
+                 flush_interval=1, flush_signal=None, **kwargs):
+        """
+
+        :param file_path: str (path)
+        :param param_names: list of str
+        :param feature_names: list of str
+        :param objective_names: list of str
+        :param path_length: int
+        :param normalize: str
+        :param mode: str; 'a': append to an existing file, 'w': overwrite
+        :param flush_interval: int; number of generations between commits
+        :param flush_signal: int or str; e.g. 'SIGUSR1'; request a commit upon receipt of this signal
+        :param kwargs: options of other storage backends are ignored
+        """
+        StorageWriter.__init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize,
+                               flush_interval=flush_interval)
+        if mode not in ['a', 'w']:
+            raise ValueError('SQLitePopulationStorageWriter: mode must be either \'a\' or \'w\'')
+        if mode == 'w':
+            for suffix in ['', '-wal', '-shm']:
+                if os.path.isfile(file_path + suffix):
+                    os.remove(file_path + suffix)
+        # transactions are managed explicitly; the connection is used by the writer thread of an
+        # AsyncPopulationStorageWriter
+        self.connection = sqlite3.connect(file_path, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.init_file()
+        self.num_rows = {category: self.connection.execute('SELECT COUNT(*) FROM %s' % category).fetchone()[0]
+                         for category in population_categories}
+        self._num_generations = self.connection.execute('SELECT COUNT(*) FROM generations').fetchone()[0]
+        self.init_population_index(
+            [row[0] for row in self.connection.execute('SELECT model_id FROM population ORDER BY row')])
+        if flush_signal is not None:
+            self.register_flush_signal(flush_signal)
+
+    def init_file(self):
+        """
+        Writes file-level metadata and creates empty tables and indexes, if they do not already exist.
+        """
+        execute = self.connection.execute
+        execute('BEGIN')
+        execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        for name, value in viewitems(self.get_metadata()):
+            execute('INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)', (name, json.dumps(value)))
+        execute('INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)', ('user_attribute_names', '[]'))
+        self.user_attribute_names = \
+            json.loads(execute('SELECT value FROM metadata WHERE name = ?', ('user_attribute_names',)).fetchone()[0])
+        sql_columns = ['count INTEGER NOT NULL']
+        for key in ['min_objectives', 'max_objectives']:
+            sql_columns.extend(['%s REAL' % name for name in get_sqlite_column_names(key, len(self.objective_names))])
+        execute('CREATE TABLE IF NOT EXISTS generations (generation INTEGER PRIMARY KEY, %s)' % ', '.join(sql_columns))
+        execute('CREATE TABLE IF NOT EXISTS generation_bounds (category TEXT NOT NULL, generation INTEGER NOT NULL, '
+                'start INTEGER NOT NULL, stop INTEGER NOT NULL, PRIMARY KEY (category, generation))')
+        execute('CREATE TABLE IF NOT EXISTS attributes (name TEXT NOT NULL, generation INTEGER NOT NULL, value, '
+                'PRIMARY KEY (name, generation))')
+        for category in population_categories:
+            sql_columns = ['row INTEGER PRIMARY KEY', 'generation INTEGER NOT NULL']
+            for column in get_stored_column_names(category):
+                sql_columns.extend(['%s %s' % (name, get_sqlite_column_type(column))
+                                    for name in get_sqlite_column_names(column, self.widths[column])])
+            execute('CREATE TABLE IF NOT EXISTS %s (%s)' % (category, ', '.join(sql_columns)))
+        for category in indexed_categories:
+            for column in sqlite_indexed_columns:
+                if column != 'generation' and column not in get_column_names(category):
+                    continue
+                for name in get_sqlite_column_names(column, self.widths.get(column)):
+                    execute('CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)' % (category, name, category, name))
+        execute('COMMIT')
+
+    @property
+    def num_generations(self):
+        """
+
+        :return: int
+        """
+        return self._num_generations
+
+    def write_snapshot(self, snapshot):
+        """
+
+        :param snapshot: dict; see get_generation_snapshot
+        """
+        gen_index = self._num_generations
+        execute = self.connection.execute
+        if not self.connection.in_transaction:
+            execute('BEGIN')
+        execute('SAVEPOINT generation')
+        population_index = (self.index_model_ids, self.index_rows)
+        try:
+            num_rows = dict()
+            new_attribute_names = []
+            for category in population_categories:
+                columns = dict(snapshot['populations'][category])
+                start = self.num_rows[category]
+                num_rows[category] = len(columns['model_id'])
+                columns['row'] = np.arange(start, start + num_rows[category])
+                columns['generation'] = np.full(num_rows[category], gen_index, dtype='int64')
+                if category in reference_categories:
+                    columns['population_row'] = self.get_population_rows(columns['model_id'], category)
+                column_names = ['row', 'generation'] + get_stored_column_names(category)
+                sql_columns = [name for column in column_names
+                               for name in get_sqlite_column_names(column, self.widths.get(column))]
+                self.connection.executemany(
+                    'INSERT INTO %s (%s) VALUES (%s)' % (category, ', '.join(sql_columns),
+                                                         ', '.join(['?'] * len(sql_columns))),
+                    columns_to_sqlite_rows(columns, column_names, self.widths))
+                execute('INSERT INTO generation_bounds (category, generation, start, stop) VALUES (?, ?, ?, ?)',
+                        (category, gen_index, start, start + num_rows[category]))
+                if category == 'population':
+                    self.update_population_index(columns['model_id'], start)
+            for key, val in viewitems(snapshot['attributes']):
+                if key not in self.user_attribute_names:
+                    if val is None:
+                        continue
+                    new_attribute_names.append(key)
+                if val is not None:
+                    val = str(val) if isinstance(val, basestring) else float(val)
+                    execute('INSERT INTO attributes (name, generation, value) VALUES (?, ?, ?)', (key, gen_index, val))
+            if new_attribute_names:
+                execute('UPDATE metadata SET value = ? WHERE name = ?',
+                        (json.dumps(self.user_attribute_names + new_attribute_names), 'user_attribute_names'))
+            values = [gen_index, int(snapshot['count'])] + \
+                [val for key in ['min_objectives', 'max_objectives'] for val in snapshot[key].tolist()]
+            execute('INSERT INTO generations VALUES (%s)' % ', '.join(['?'] * len(values)), values)
+            execute('RELEASE generation')
+        except Exception:
+            execute('ROLLBACK TO generation')
+            execute('RELEASE generation')
+            self.index_model_ids, self.index_rows = population_index
+            raise
+        for category in population_categories:
+            self.num_rows[category] += num_rows[category]
+        self.user_attribute_names.extend(new_attribute_names)
+        self._num_generations += 1
+
+    def flush(self):
+        """
+        Commits all generations written since the last commit.
+        """
+        if self.connection is not None and self.connection.in_transaction:
+            self.connection.execute('COMMIT')
+        StorageWriter.flush(self)
+
+    def close(self):
+        """
+
+        """
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+
+class SQLiteStorageReader(StorageReader):
+    """
+    Reads an SQLite storage file (see SQLitePopulationStorageWriter). Since the file is written in WAL mode, it can be
+    read while it is being written. Filtered queries are translated into SQL, so that they use the indexed columns of
+    the 'population' table.
+    """
+
+    def __init__(self, file_path, swmr=False):
+        """
+
+        :param file_path: str (path)
+        :param swmr: bool; ignored, since SQLite files can always be read while they are being written
+        """
+        StorageReader.__init__(self, file_path)
+        if not os.path.isfile(file_path):
+            raise IOError('SQLiteStorageReader: invalid file path: %s' % file_path)
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+
+    def close(self):
+        """
+
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def load_metadata(self):
+        """
+
+        :return: dict
+        """
+        metadata = {name: json.loads(value)
+                    for name, value in self.connection.execute('SELECT name, value FROM metadata')}
+        metadata['path_length'] = int(metadata['path_length'])
+        return metadata
+
+    def get_num_generations(self):
+        """
+
+        :return: int
+        """
+        return self.connection.execute('SELECT COUNT(*) FROM generations').fetchone()[0]
+
+    def read_generation_bounds(self, category, start=0, stop=None):
+        """
+
+        :param category: str
+        :param start: int
+        :param stop: int
+        :return: array of int
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        rows = self.connection.execute(
+            'SELECT start, stop FROM generation_bounds WHERE category = ? AND generation >= ? AND generation < ? '
+            'ORDER BY generation', (category, int(start), int(stop))).fetchall()
+        return np.array(rows, dtype='int64').reshape(-1, 2)
+
+    def read_generation_values(self, key, start=0, stop=None):
+        """
+
+        :param key: str
+        :param start: int
+        :param stop: int
+        :return: array
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        if key == 'count':
+            widths = {'count': None}
+            sql_columns = ['count']
+        else:
+            widths = {key: len(self.read_metadata()['objective_names'])}
+            sql_columns = get_sqlite_column_names(key, widths[key])
+        rows = self.connection.execute(
+            'SELECT %s FROM generations WHERE generation >= ? AND generation < ? ORDER BY generation' %
+            ', '.join(sql_columns), (int(start), int(stop))).fetchall()
+        if key == 'count':
+            return np.array([row[0] for row in rows], dtype='int64')
+        return sqlite_rows_to_columns(rows, [key], widths)[key]
+
+    def read_generation_attributes(self, gen_index):
+        """
+
+        :param gen_index: int
+        :return: dict
+        """
+        return {name: value for name, value in self.connection.execute(
+            'SELECT name, value FROM attributes WHERE generation = ?', (int(gen_index),))}
+
+    def read_generation_attribute_values(self, start=0, stop=None):
+        """
+        Reads all attributes of the range of generations with a single query.
+        :param start: int
+        :param stop: int
+        :return: dict of list
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        attribute_values = {key: [None] * max(0, stop - start) for key in self.read_metadata()['user_attribute_names']}
+        for name, gen_index, value in self.connection.execute(
+                'SELECT name, generation, value FROM attributes WHERE generation >= ? AND generation < ?',
+                (int(start), int(stop))):
+            if name not in attribute_values:
+                attribute_values[name] = [None] * (stop - start)
+            attribute_values[name][gen_index - start] = value
+        return attribute_values
+
+    def select_rows(self, category, columns, where, params):
+        """
+        Selects rows of a category table. Columns that are not stored in a reference category are read from the
+        referenced rows of the 'population' table.
+        :param category: str
+        :param columns: list of str
+        :param where: str; SQL condition on the columns of the category table (c) or the 'population' table (p)
+        :param params: tuple
+        :return: dict of array
+        """
+        widths = self.get_widths()
+        widths['generation'] = None
+        stored_columns = ['generation'] + get_stored_column_names(category)
+        sql_columns = []
+        join = False
+        for column in columns:
+            if column in stored_columns:
+                table = 'c'
+            elif 'population_row' in stored_columns and column in get_column_names('population'):
+                table = 'p'
+                join = True
+            else:
+                raise KeyError('SQLiteStorageReader: invalid columns for category: %s: %s' % (category, column))
+            sql_columns.extend(['%s.%s' % (table, name) for name in get_sqlite_column_names(column, widths[column])])
+        if not sql_columns:
+            sql_columns = ['c.row']
+        sql = 'SELECT %s FROM %s AS c' % (', '.join(sql_columns), category)
+        if join or 'p.' in where:
+            sql += ' LEFT JOIN population AS p ON p.row = c.population_row'
+        sql += ' WHERE %s ORDER BY c.row' % where
+        rows = self.connection.execute(sql, params).fetchall()
+        return sqlite_rows_to_columns(rows, columns, widths)
+
+    def read_category_rows(self, category, start, stop, columns=None):
+        """
+
+        :param category: str
+        :param start: int
+        :param stop: int
+        :param columns: list of str
+        :return: dict of array
+        """
+        if columns is None:
+            columns = get_column_names(category)
+        return self.select_rows(category, list(columns), 'c.row >= ? AND c.row < ?', (int(start), int(stop)))
+
+    def read_models(self, model_ids, columns=None):
+        """
+        Models are located with the index on the 'model_id' column of the 'population' and 'failed' tables.
+        :param model_ids: array of int
+        :param columns: list of str
+        :return: dict of array
+        """
+        if columns is None:
+            columns = get_column_names('population')
+        model_ids = np.asarray(model_ids, dtype='int64').reshape(-1)
+        widths = self.get_widths()
+        num_gen = self.get_num_generations()
+        data = dict()
+        for column in columns:
+            width = widths[column]
+            data[column] = np.full((len(model_ids),) if width is None else (len(model_ids), width),
+                                   get_column_fillvalue(column), dtype=get_column_dtype(column))
+        found = np.zeros(len(model_ids), dtype=bool)
+        unique_ids = np.unique(model_ids).tolist()
+        # limit the number of parameters of each query
+        batch_size = 500
+        for category in indexed_categories:
+            category_columns = [column for column in columns if column in get_column_names(category)]
+            for i in range(0, len(unique_ids), batch_size):
+                batch = unique_ids[i:i + batch_size]
+                values = self.select_rows(
+                    category, ['model_id'] + category_columns,
+                    'c.generation < ? AND c.model_id IN (%s)' % ', '.join(['?'] * len(batch)), [num_gen] + batch)
+                if len(values['model_id']) == 0:
+                    continue
+                order = np.argsort(values['model_id'], kind='stable')
+                pos = np.minimum(np.searchsorted(values['model_id'][order], model_ids), len(order) - 1)
+                match = values['model_id'][order][pos] == model_ids
+                for column in category_columns:
+                    data[column][match] = values[column][order][pos][match]
+                found |= match
+        if not np.all(found):
+            raise KeyError('SQLiteStorageReader: model_ids not found in storage: %s' % str(model_ids[~found]))
+        return data
+
+    def query_models(self, filters, columns=None, category='population', stop=None):
+        """
+        Filters are evaluated by SQLite, using any indexed columns.
+        :param filters: list of tuple; (name, operator, value), e.g. ('f1', '<', 0.1); see get_filter_column
+        :param columns: list of str; default is all columns of the category
+        :param category: str
+        :param stop: int; last generation + 1; default is the number of committed generations
+        :return: dict of array
+        """
+        metadata = self.read_metadata()
+        if columns is None:
+            columns = get_column_names(category)
+        stored_columns = ['generation'] + get_stored_column_names(category)
+        conditions = ['c.generation < ?']
+        params = [self.get_num_generations() if stop is None else int(stop)]
+        for name, op, value in filters:
+            if op not in filter_operators:
+                raise ValueError('SQLiteStorageReader: invalid operator: %s; must be one of: %s' %
+                                 (op, str(list(filter_operators))))
+            column, index = get_filter_column(name, metadata['param_names'], metadata['feature_names'],
+                                              metadata['objective_names'])
+            if column not in stored_columns and column not in get_column_names(category):
+                raise KeyError('SQLiteStorageReader: invalid filter for category: %s: %s' % (category, name))
+            sql_column = '%s.%s' % ('c' if column in stored_columns else 'p',
+                                    column if index is None else '%s_%i' % (column, index))
+            if op == '!=':
+                # missing values are stored as NULL, and only satisfy '!='
+                conditions.append('(%s IS NULL OR %s != ?)' % (sql_column, sql_column))
+            else:
+                conditions.append('%s %s ?' % (sql_column, '=' if op == '==' else op))
+            params.append(value.item() if isinstance(value, np.generic) else value)
+        return self.select_rows(category, list(columns) + ['generation'], ' AND '.join(conditions), params)
+
+
+# contents of storage files written with the 'memory' backend, by file path
+memory_storage_files = dict()
+
+
+class MemoryStorageFile(object):
+    """
+    Contents of a storage file that is only kept in memory, for unit tests and benchmarks. Each column of each category
+    table is stored as a list of arrays, one per generation.
+    """
+
+    def __init__(self, metadata):
+        """
+
+        :param metadata: dict; see StorageReader.read_metadata
+        """
+        self.metadata = dict(metadata)
+        self.metadata['user_attribute_names'] = []
+        self.widths = get_column_widths(metadata['param_names'], metadata['feature_names'],
+                                        metadata['objective_names'])
+        self.tables = {category: {column: [] for column in get_stored_column_names(category)}
+                       for category in population_categories}
+        self.generation_bounds = {category: [] for category in population_categories}
+        self.generations = {'count': [], 'min_objectives': [], 'max_objectives': []}
+        self.attributes = dict()
+        self._cache = dict()
+
+    def get_column(self, category, column):
+        """
+        Returns all rows of a stored column. Columns are only concatenated again after new generations are appended.
+        :param category: str
+        :param column: str
+        :return: array
+        """
+        chunks = self.tables[category][column]
+        num_chunks = len(chunks)
+        key = (category, column)
+        if key not in self._cache or self._cache[key][0] != num_chunks:
+            if num_chunks == 0:
+                width = self.widths[column]
+                data = np.empty((0,) if width is None else (0, width), dtype=get_column_dtype(column))
+            else:
+                data = np.concatenate(chunks[:num_chunks])
+            self._cache[key] = (num_chunks, data)
+        return self._cache[key][1]
+
+
+class MemoryPopulationStorageWriter(StorageWriter):
+    """
+    Appends each saved generation to a :class:'MemoryStorageFile' that is registered in memory_storage_files under
+    the file path, so that it can later be loaded by a :class:'PopulationStorage' in the same process. Frozen
+    populations are stored by reference.
+    """
+
+    def __init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize, mode='a',
+                 flush_interval=1, flush_signal=None, **kwargs):
+        """
+
+        :param file_path: str (path)
+        :param param_names: list of str
+        :param feature_names: list of str
+        :param objective_names: list of str
+        :param path_length: int
+        :param normalize: str
+        :param mode: str; 'a': append to an existing file, 'w': overwrite
+        :param flush_interval: int
+        :param flush_signal: int or str
+        :param kwargs: options of other storage backends are ignored
+        """
+        StorageWriter.__init__(self, file_path, param_names, feature_names, objective_names, path_length, normalize,
+                               flush_interval=flush_interval)
+        if mode not in ['a', 'w']:
+            raise ValueError('MemoryPopulationStorageWriter: mode must be either \'a\' or \'w\'')
+        if mode == 'w' or file_path not in memory_storage_files:
+            memory_storage_files[file_path] = MemoryStorageFile(self.get_metadata())
+        self.file = memory_storage_files[file_path]
+        self.init_population_index(self.file.get_column('population', 'model_id'))
+        if flush_signal is not None:
+            self.register_flush_signal(flush_signal)
+
+    @property
+    def num_generations(self):
+        """
+
+        :return: int
+        """
+        return len(self.file.generations['count'])
+
+    def write_snapshot(self, snapshot):
+        """
+        The generation is committed last by appending to 'count'.
+        :param snapshot: dict; see get_generation_snapshot
+        """
+        f = self.file
+        gen_index = self.num_generations
+        starts = {category: f.generation_bounds[category][-1][1] if f.generation_bounds[category] else 0
+                  for category in population_categories}
+        # models in reference categories can be members of the 'population' of the same generation
+        population_index = (self.index_model_ids, self.index_rows)
+        self.update_population_index(snapshot['populations']['population']['model_id'], starts['population'])
+        populations = dict()
+        try:
+            for category in population_categories:
+                columns = snapshot['populations'][category]
+                if category in reference_categories:
+                    columns = dict(columns)
+                    columns['population_row'] = self.get_population_rows(columns['model_id'], category)
+                populations[category] = columns
+        except Exception:
+            self.index_model_ids, self.index_rows = population_index
+            raise
+        for category in population_categories:
+            columns = populations[category]
+            for column in get_stored_column_names(category):
+                f.tables[category][column].append(columns[column])
+            f.generation_bounds[category].append((starts[category], starts[category] + len(columns['model_id'])))
+        for key in ['min_objectives', 'max_objectives']:
+            f.generations[key].append(snapshot[key])
+        for key, val in viewitems(snapshot['attributes']):
+            if key not in f.attributes:
+                if val is None:
+                    continue
+                f.attributes[key] = [None] * gen_index
+                f.metadata['user_attribute_names'].append(key)
+            f.attributes[key].append(val)
+        f.generations['count'].append(int(snapshot['count']))
+
+    def close(self):
+        """
+
+        """
+        self.flush()
+        self.file = None
+
+
+class MemoryStorageReader(StorageReader):
+    """
+    Reads a storage file written with the 'memory' backend (see MemoryPopulationStorageWriter).
+    """
+
+    def __init__(self, file_path, swmr=False):
+        """
+
+        :param file_path: str
+        :param swmr: bool; ignored
+        """
+        StorageReader.__init__(self, file_path)
+        if file_path not in memory_storage_files:
+            raise IOError('MemoryStorageReader: invalid file path: %s' % file_path)
+        self.file = memory_storage_files[file_path]
+
+    def load_metadata(self):
+        """
+
+        :return: dict
+        """
+        return dict(self.file.metadata, user_attribute_names=list(self.file.metadata['user_attribute_names']))
+
+    def get_num_generations(self):
+        """
+
+        :return: int
+        """
+        return len(self.file.generations['count'])
+
+    def read_generation_bounds(self, category, start=0, stop=None):
+        """
+
+        :param category: str
+        :param start: int
+        :param stop: int
+        :return: array of int
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        return np.array(self.file.generation_bounds[category][start:stop], dtype='int64').reshape(-1, 2)
+
+    def read_generation_values(self, key, start=0, stop=None):
+        """
+
+        :param key: str
+        :param start: int
+        :param stop: int
+        :return: array
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        values = self.file.generations[key][start:stop]
+        if key == 'count':
+            return np.array(values, dtype='int64')
+        return np.array(values, dtype='float64').reshape(-1, len(self.file.metadata['objective_names']))
+
+    def read_generation_attributes(self, gen_index):
+        """
+
+        :param gen_index: int
+        :return: dict
+        """
+        return {key: values[gen_index] for key, values in viewitems(self.file.attributes)
+                if gen_index < len(values)}
+
+    def read_generation_attribute_values(self, start=0, stop=None):
+        """
+
+        :param start: int
+        :param stop: int
+        :return: dict of list
+        """
+        if stop is None:
+            stop = self.get_num_generations()
+        return {key: list(values[start:stop]) + [None] * (stop - start - len(values[start:stop]))
+                for key, values in viewitems(self.file.attributes)}
+
+    def read_category_rows(self, category, start, stop, columns=None):
+        """
+        Returns copies, so that the contents of the file cannot be modified.
+        :param category: str
+        :param start: int
+        :param stop: int
+        :param columns: list of str
+        :return: dict of array
+        """
+        if columns is None:
+            columns = get_column_names(category)
+        stored_columns = get_stored_column_names(category)
+        data = dict()
+        for column in columns:
+            if column in stored_columns:
+                data[column] = np.array(self.file.get_column(category, column)[start:stop])
+            elif 'population_row' in stored_columns:
+                rows = self.file.get_column(category, 'population_row')[start:stop]
+                data[column] = self.file.get_column('population', column)[rows]
+            else:
+                raise KeyError('MemoryStorageReader: invalid columns for category: %s: %s' % (category, column))
+        return data
+
+    def read_models(self, model_ids, columns=None):
+        """
+
+        :param model_ids: array of int
+        :param columns: list of str
+        :return: dict of array
+        """
+        if columns is None:
+            columns = get_column_names('population')
+        model_ids = np.asarray(model_ids, dtype='int64').reshape(-1)
+        num_gen = self.get_num_generations()
+        widths = self.get_widths()
+        data = dict()
+        for column in columns:
+            width = widths[column]
+            data[column] = np.full((len(model_ids),) if width is None else (len(model_ids), width),
+                                   get_column_fillvalue(column), dtype=get_column_dtype(column))
+        found = np.zeros(len(model_ids), dtype=bool)
+        for category in indexed_categories:
+            num_rows = self.read_generation_bounds(category, num_gen - 1, num_gen)[0, 1] if num_gen > 0 else 0
+            stored_ids = self.file.get_column(category, 'model_id')[:num_rows]
+            if num_rows == 0:
+                continue
+            order = np.argsort(stored_ids, kind='stable')
+            pos = np.minimum(np.searchsorted(stored_ids[order], model_ids), num_rows - 1)
+            match = stored_ids[order][pos] == model_ids
+            rows = order[pos][match]
+            for column in columns:
+                if column in get_column_names(category):
+                    data[column][match] = self.file.get_column(category, column)[rows]
+            found |= match
+        if not np.all(found):
+            raise KeyError('MemoryStorageReader: model_ids not found in storage: %s' % str(model_ids[~found]))
+        return data
+
+
+# writer and reader classes of each storage backend (see get_storage_backend)
+storage_backends = {'hdf5': {'writer': PopulationStorageWriter, 'reader': HDF5StorageReader},
+                    'sqlite': {'writer': SQLitePopulationStorageWriter, 'reader': SQLiteStorageReader},
+                    'memory': {'writer': MemoryPopulationStorageWriter, 'reader': MemoryStorageReader}}
+
+
+class LazyGenerationList(object):
+    """
+    A list-like container of the generations of one category stored in a table-based storage file (see
+    get_storage_version). Each stored generation is read from file and converted into a population (e.g. a
+    :class:'PopulationArray') only when it is accessed. The most recently accessed generations are cached, so that
+    repeated access returns the same objects. Generations can also be appended or replaced in memory; these are never
+    evicted from the cache, and take precedence over the contents of the file. If swmr is True, the file is opened in
+    SWMR mode, so that it can be read while it is being written (see open_storage_file).
+    """
+
+    def __init__(self, file_path, category, bounds, widths, to_population, cache_size=4, swmr=False, backend=None):
+        """
+
+        :param file_path: str (path)
+        :param category: str
+        :param bounds: array of int; (num_generations, 2) table rows that belong to each stored generation
+        :param widths: dict; see get_column_widths
+        :param to_population: callable; converts a dict of column arrays, a category, and a dict of column widths into
+            a population
+        :param cache_size: int; number of stored generations to keep in memory after they have been accessed
+        :param swmr: bool
+        :param backend: str; see get_storage_backend
+        """
+        self.file_path = file_path
+        self.swmr = swmr
+        self.backend = get_storage_backend(file_path, backend)
+        self.category = category
+        self.bounds = np.array(bounds, dtype='int64').reshape(-1, 2)
+        self.widths = widths
+        self.to_population = to_population
+        self.cache_size = max(1, int(cache_size))
+        self.num_stored = len(self.bounds)
+        self._len = self.num_stored
+        self._pinned = dict()  # generations appended or replaced in memory
+        self._cache = collections.OrderedDict()
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def get_lengths(self):
+        """
+        Returns the number of models in each generation, without reading any stored generation from file.
+        :return: array of int
+        """
+        lengths = np.zeros(self._len, dtype='int64')
+        lengths[:self.num_stored] = self.bounds[:, 1] - self.bounds[:, 0]
+        for index, population in viewitems(self._pinned):
+            lengths[index] = len(population)
+        return lengths
+
+    @property
+    def modified(self):
+        """
+        True if any generation has been appended or replaced in memory.
+        :return: bool
+        """
+        return len(self._pinned) > 0
+
+    __nonzero__ = __bool__
+
+    def _get_index(self, index):
+        """
+
+        :param index: int
+        :return: int
+        """
+        index = int(index)
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError('LazyGenerationList: index out of range')
+        return index
+
+    def read(self, index):
+        """
+        Reads a stored generation from file without caching it.
+        :param index: int
+        :return: population
+        """
+        start, stop = self.bounds[index]
+        with open_storage_reader(self.file_path, self.backend, self.swmr) as reader:
+            columns = reader.read_category_rows(self.category, start, stop)
+        return self.to_population(columns, self.category, self.widths)
+
+    def preload(self, start, stop=None):
+        """
+        Reads a range of stored generations from file with a single read, and caches them. The cache is enlarged if
+        necessary to hold all of them. Generations that are already in memory are not read again.
+        :param start: int; first stored generation
+        :param stop: int; last stored generation + 1; default is the number of stored generations
+        """
+        if stop is None:
+            stop = self.num_stored
+        start, stop = max(0, int(start)), min(self.num_stored, int(stop))
+        self.cache_size = max(self.cache_size, stop - start)
+        for index in range(start, stop):
+            if index in self._cache:
+                self._cache[index] = self._cache.pop(index)
+        indexes = [index for index in range(start, stop) if index not in self._pinned and index not in self._cache]
+        if not indexes:
+            return
+        row_start, row_stop = self.bounds[indexes[0], 0], self.bounds[indexes[-1], 1]
+        with open_storage_reader(self.file_path, self.backend, self.swmr) as reader:
+            columns = reader.read_category_rows(self.category, row_start, row_stop)
+        for index in indexes:
+            gen_start, gen_stop = self.bounds[index] - row_start
+            population = self.to_population({key: value[gen_start:gen_stop] for key, value in viewitems(columns)},
+                                            self.category, self.widths)
+            self._cache[index] = population
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        index = self._get_index(index)
+        if index in self._pinned:
+            return self._pinned[index]
+        if index in self._cache:
+            self._cache[index] = self._cache.pop(index)
+            return self._cache[index]
+        population = self.read(index)
+        self._cache[index] = population
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return population
+
+    def __setitem__(self, index, population):
+        index = self._get_index(index)
+        self._cache.pop(index, None)
+        self._pinned[index] = population
+
+    def __delitem__(self, index):
+        index = self._get_index(index)
+        if index != self._len - 1:
+            raise IndexError('LazyGenerationList: only the last generation can be removed')
+        self._pinned.pop(index, None)
+        self._cache.pop(index, None)
+        if index < self.num_stored:
+            self.num_stored -= 1
+            self.bounds = self.bounds[:self.num_stored]
+        self._len -= 1
+
+    def __iter__(self):
+        for index in range(self._len):
+            yield self[index]
+
+    def append(self, population):
+        """
+
+        :param population: list of :class:'Individual'
+        """
+        self._pinned[self._len] = population
+        self._len += 1
+
+    def extend(self, populations):
+        """
+
+        :param populations: list of list of :class:'Individual'
+        """
+        for population in populations:
+            self.append(population)
+
+    def extend_stored(self, bounds):
+        """
+        Appends generations that have been committed to file since the list was created (e.g. by a writer in SWMR
+        mode). Not allowed if generations have already been appended in memory.
+        :param bounds: array of int; (num_generations, 2) table rows that belong to each new stored generation
+        """
+        if self._len != self.num_stored:
+            raise IndexError('LazyGenerationList: cannot extend stored generations after generations have been '
+                             'appended in memory')
+        bounds = np.array(bounds, dtype='int64').reshape(-1, 2)
+        self.bounds = np.concatenate([self.bounds, bounds])
+        self.num_stored = len(self.bounds)
+        self._len = self.num_stored
+
+    def get_column(self, column):
+        """
+        Returns the values of one column for all models in all generations, in order. If no stored generation has been
+        replaced in memory, stored rows are read with a single slice (see StorageReader.get_column).
+        :param column: str
+        :return: array
+        """
+        blocks = []
+        pinned_stored = [index for index in self._pinned if index < self.num_stored]
+        with open_storage_reader(self.file_path, self.backend, self.swmr) as reader:
+            read_rows = lambda start, stop: reader.get_column(self.category, column, start, stop)
+            if not pinned_stored:
+                if self.num_stored > 0:
+                    blocks.append(read_rows(0, int(self.bounds[-1, 1])))
+            else:
+                for index in range(self.num_stored):
+                    if index not in self._pinned:
+                        start, stop = self.bounds[index]
+                        blocks.append(read_rows(start, stop))
+                    else:
+                        blocks.append(population_to_columns(self._pinned[index], self.category,
+                                                            self.widths)[column])
+        for index in range(self.num_stored, self._len):
+            blocks.append(population_to_columns(self._pinned[index], self.category, self.widths)[column])
+        if len(blocks) == 1:
+            return blocks[0]
+        if not blocks:
+            width = self.widths[column]
+            return np.empty((0,) if width is None else (0, width), dtype=get_column_dtype(column))
+        return np.concatenate(blocks)
+
+
+def compact_storage_file(file_path, output_file_path=None, disp=True, compression='gzip', compression_level=None,
+                         chunk_size=256):
+    """
+    Rewrites a storage file with the current storage_version, so that models in reference categories are stored as
+    pointers to rows of the 'population' table (see get_stored_column_names). The file is first written to a temporary
+    file in the same directory, which then replaces the original file, unless output_file_path is specified. The
+    rewritten tables are compressed and chunked with the specified settings.
+    :param file_path: str (path)
+    :param output_file_path: str (path)
+    :param disp: bool
+    :param compression: str or None; see get_compression_kwargs
+    :param compression_level: int
+    :param chunk_size: int; number of rows per chunk
+    """
+    start_time = time.time()
+    if not os.path.isfile(file_path):
+        raise IOError('compact_storage_file: invalid file path: %s' % file_path)
+    temp_file_path = output_file_path if output_file_path is not None else '%s.compact.tmp' % file_path
+    with h5py.File(file_path, 'r') as f:
+        version = get_storage_version(f)
+        num_gen = get_num_generations(f)
+    if version < 2:
+        # files with storage_version 1 contain one group per model, which is converted by PopulationStorage
+        from nested.optimize_utils import PopulationStorage
+        storage = PopulationStorage(file_path=file_path, compression=compression,
+                                    compression_level=compression_level, chunk_size=chunk_size)
+        storage.save(temp_file_path, n='all')
+        storage.close()
+    else:
+        with h5py.File(file_path, 'r') as f:
+            writer = PopulationStorageWriter(temp_file_path, get_h5py_attr(f.attrs, 'param_names'),
+                                             get_h5py_attr(f.attrs, 'feature_names'),
+                                             get_h5py_attr(f.attrs, 'objective_names'), int(f.attrs['path_length']),
+                                             get_h5py_attr(f.attrs, 'normalize'), mode='w', flush_interval=num_gen + 1,
+                                             chunk_size=chunk_size, compression=compression,
+                                             compression_level=compression_level)
+            try:
+                generations = f['generations']
+                for gen_index in range(num_gen):
+                    snapshot = {'count': int(generations['count'][gen_index]),
+                                'min_objectives': generations['min_objectives'][gen_index],
+                                'max_objectives': generations['max_objectives'][gen_index],
+                                'attributes': read_generation_attributes(f, gen_index),
+                                'populations': {category: read_generation_columns(f, category, gen_index)
+                                                for category in population_categories}}
+                    writer.write_generation(snapshot)
+            finally:
+                writer.close()
+    if output_file_path is None:
+        os.rename(temp_file_path, file_path)
+        output_file_path = file_path
+    if disp:
+        print('compact_storage_file: converting %i generations from storage_version: %i to %i in file: %s took %.2f '
+              's; file size: %.2f MB' % (num_gen, version, storage_version, output_file_path,
+                                         time.time() - start_time, os.path.getsize(output_file_path) / 1.e6))
+        sys.stdout.flush()
+
+
+def get_benchmark_generations(num_generations, pop_size, num_params, num_features, num_objectives, survival_rate=0.2,
+                              failure_rate=0.05, seed=0):
+    """
+    Returns snapshots of synthetic generations (see StorageWriter.get_generation_snapshot) that resemble those saved by
+    PopulationAnnealing, for benchmarking storage settings.
+    :param num_generations: int
+    :param pop_size: int
+    :param num_params: int
+    :param num_features: int
+    :param num_objectives: int
+    :param survival_rate: float
+    :param failure_rate: float
+    :param seed: int
+    :return: tuple of (list of str, list of str, list of str, list of dict)
+    """
+    random = np.random.RandomState(seed)
+    param_names = ['param_%i' % i for i in range(num_params)]
+    feature_names = ['feature_%i' % i for i in range(num_features)]
+    objective_names = ['objective_%i' % i for i in range(num_objectives)]
+    widths = get_column_widths(param_names, feature_names, objective_names)
+    num_survivors = max(1, int(survival_rate * pop_size))
+    num_failed = int(failure_rate * pop_size)
+    model_id = 0
+    snapshots = []
+    prev_survivors, prev_specialists = None, None
+    for gen_index in range(num_generations):
+        num_models = pop_size - num_failed
+        population = {column: np.full((num_models,) if widths[column] is None else (num_models, widths[column]),
+                                      get_column_fillvalue(column), dtype=get_column_dtype(column))
+                      for column in get_column_names('population')}
+        population['model_id'][:] = np.arange(model_id, model_id + num_models)
+        population['x'][:] = random.uniform(size=(num_models, num_params))
+        # features and objectives are smooth functions of parameters, so that they compress like measured values
+        weights = random.normal(size=(num_params, num_features + num_objectives))
+        values = np.exp(np.dot(population['x'], weights) / np.sqrt(num_params))
+        population['features'][:] = values[:, :num_features]
+        population['objectives'][:] = values[:, num_features:] ** 2
+        min_objectives = np.min(population['objectives'], axis=0)
+        max_objectives = np.max(population['objectives'], axis=0)
+        population['normalized_objectives'][:] = \
+            (population['objectives'] - min_objectives) / np.maximum(max_objectives - min_objectives, 1.e-12)
+        population['energy'][:] = np.sum(population['normalized_objectives'], axis=1)
+        population['fitness'][:] = random.randint(0, 5, num_models)
+        population['rank'][:] = np.argsort(np.lexsort((population['energy'], population['fitness'])))
+        order = np.argsort(population['rank'])
+        survivors = {column: data[order[:num_survivors]] for column, data in viewitems(population)}
+        survivors['survivor'][:] = True
+        specialist_indexes = np.argmin(population['objectives'], axis=0)
+        specialists = {column: data[specialist_indexes] for column, data in viewitems(population)}
+        model_id += num_models
+        failed = {column: np.full((num_failed,) if widths[column] is None else (num_failed, widths[column]),
+                                  get_column_fillvalue(column), dtype=get_column_dtype(column))
+                  for column in get_column_names('failed')}
+        failed['model_id'][:] = np.arange(model_id, model_id + num_failed)
+        failed['x'][:] = random.uniform(size=(num_failed, num_params))
+        model_id += num_failed
+        empty = {column: data[:0] for column, data in viewitems(survivors)}
+        snapshots.append({'count': model_id, 'min_objectives': min_objectives, 'max_objectives': max_objectives,
+                          'attributes': {'step_size': 0.5},
+                          'populations': {'population': population, 'survivors': survivors,
+                                          'specialists': specialists,
+                                          'prev_survivors': empty if prev_survivors is None else prev_survivors,
+                                          'prev_specialists': empty if prev_specialists is None else prev_specialists,
+                                          'failed': failed}})
+        prev_survivors, prev_specialists = survivors, specialists
+    return param_names, feature_names, objective_names, snapshots
+
+
+def benchmark_storage_settings(output_dir, settings=None, num_generations=50, pop_size=200, num_params=20,
+                               num_features=20, num_objectives=5, num_reads=100, seed=0, disp=True):
+    """
+    Measures, for each combination of compression and chunking settings, the time to write a storage file of
+    synthetic generations (see get_benchmark_generations) to output_dir, the time to read every generation back, the
+    time to read individual models by model_id, and the size of the file. Each file is deleted once it has been
+    measured. Files are read right after they are written, so reads may be served by the page cache of the operating
+    system rather than by the filesystem, particularly on local disks.
+    :param output_dir: str (dir)
+    :param settings: list of tuple; (compression, compression_level, chunk_size); default compares each compression
+        filter at several chunk sizes
+    :param num_generations: int
+    :param pop_size: int
+    :param num_params: int
+    :param num_features: int
+    :param num_objectives: int
+    :param num_reads: int; number of models read by model_id
+    :param seed: int
+    :param disp: bool
+    :return: list of dict
+    """
+    if not os.path.isdir(output_dir):
+        raise IOError('benchmark_storage_settings: invalid output_dir: %s' % output_dir)
+    if settings is None:
+        settings = [(compression, compression_level, chunk_size) for chunk_size in [64, 256, 1024]
+                    for compression, compression_level in [(None, None), ('lzf', None), ('gzip', 1), ('gzip', 4)]]
+        settings.append(('gzip', 9, 256))
+    param_names, feature_names, objective_names, snapshots = \
+        get_benchmark_generations(num_generations, pop_size, num_params, num_features, num_objectives, seed=seed)
+    num_models = snapshots[-1]['count']
+    model_ids = np.random.RandomState(seed).choice(
+        np.concatenate([snapshot['populations']['population']['model_id'] for snapshot in snapshots]),
+        num_reads)
+    file_path = '%s/nested_storage_benchmark_%i.hdf5' % (output_dir, os.getpid())
+    results = []
+    if disp:
+        print('benchmark_storage_settings: %i generations of %i models; %i params, %i features, %i objectives' %
+              (num_generations, pop_size, num_params, num_features, num_objectives))
+        print('%-12s %8s %8s %10s %10s %12s %10s' %
+              ('compression', 'level', 'chunks', 'write (s)', 'read (s)', 'models (s)', 'size (MB)'))
+        sys.stdout.flush()
+    for compression, compression_level, chunk_size in settings:
+        try:
+            start_time = time.time()
+            writer = PopulationStorageWriter(file_path, param_names, feature_names, objective_names, 1, 'global',
+                                             mode='w', chunk_size=chunk_size, compression=compression,
+                                             compression_level=compression_level)
+            try:
+                for snapshot in snapshots:
+                    writer.write_generation(snapshot)
+            finally:
+                writer.close()
+            write_time = time.time() - start_time
+            size = os.path.getsize(file_path)
+            start_time = time.time()
+            with HDF5StorageReader(file_path) as reader:
+                for category in population_categories:
+                    bounds = reader.read_generation_bounds(category)
+                    for gen_start, gen_stop in bounds:
+                        reader.read_category_rows(category, gen_start, gen_stop)
+            read_time = time.time() - start_time
+            start_time = time.time()
+            with HDF5StorageReader(file_path) as reader:
+                for model_id in model_ids:
+                    reader.read_models([model_id])
+            model_read_time = time.time() - start_time
+        finally:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+        result = {'compression': compression, 'compression_level': compression_level, 'chunk_size': chunk_size,
+                  'write_time': write_time, 'read_time': read_time, 'model_read_time': model_read_time,
+                  'size': size, 'num_models': num_models}
+        results.append(result)
+        if disp:
+            print('%-12s %8s %8i %10.3f %10.3f %12.3f %10.2f' %
+                  (compression, '' if compression_level is None else compression_level, chunk_size, write_time,
+                   read_time, model_read_time, size / 1.e6))
+            sys.stdout.flush()
+    return results
+
+
+@click.group()
+def main():
+    """
+    Utilities for storage files written by :class:'PopulationStorage'.
+    """
+    pass
+
+
+@main.command(name='compact')
+@click.argument("file-paths", type=click.Path(exists=True, file_okay=True, dir_okay=False), nargs=-1, required=True)
+@click.option("--output-file-path", type=str, default=None)
+@click.option("--disp", is_flag=True)
+@click.option("--compression", type=click.Choice(['gzip', 'lzf', 'none']), default='gzip')
+@click.option("--compression-level", type=int, default=None)
+@click.option("--chunk-size", type=int, default=256)
+def compact_command(file_paths, output_file_path, disp, compression, compression_level, chunk_size):
+    """
+    Converts storage files in place to the current storage_version, with the specified compression and chunking.
+    :param file_paths: list of str (path)
+    :param output_file_path: str (path); only valid for a single file
+    :param disp: bool
+    :param compression: str
+    :param compression_level: int
+    :param chunk_size: int
+    """
+    if output_file_path is not None and len(file_paths) > 1:
+        raise click.BadParameter('output-file-path can only be specified when converting a single file')
+    for file_path in file_paths:
+        compact_storage_file(file_path, output_file_path=output_file_path, disp=disp, compression=compression,
+                             compression_level=compression_level, chunk_size=chunk_size)
+
+
+@main.command(name='benchmark')
+@click.option("--output-dir", type=click.Path(exists=True, file_okay=False, dir_okay=True), required=True)
+@click.option("--compression", type=click.Choice(['gzip', 'lzf', 'none']), multiple=True)
+@click.option("--compression-level", type=int, default=None)
+@click.option("--chunk-size", type=int, multiple=True)
+@click.option("--num-generations", type=int, default=50)
+@click.option("--pop-size", type=int, default=200)
+@click.option("--num-params", type=int, default=20)
+@click.option("--num-features", type=int, default=20)
+@click.option("--num-objectives", type=int, default=5)
+@click.option("--num-reads", type=int, default=100)
+def benchmark_command(output_dir, compression, compression_level, chunk_size, num_generations, pop_size, num_params,
+                      num_features, num_objectives, num_reads):
+    """
+    Compares the write time, read time, and size of storage files written with different compression and chunking
+    settings to a directory on the filesystem of interest. By default, several settings are compared. Otherwise, each
+    specified compression filter is measured at each specified chunk size.
+    :param output_dir: str (dir)
+    :param compression: list of str
+    :param compression_level: int; only for gzip compression
+    :param chunk_size: list of int
+    :param num_generations: int
+    :param pop_size: int
+    :param num_params: int
+    :param num_features: int
+    :param num_objectives: int
+    :param num_reads: int
+    """
+    settings = None
+    if compression or chunk_size:
+        settings = [(None if this_compression == 'none' else this_compression,
+                     compression_level if this_compression == 'gzip' else None, this_chunk_size)
+                    for this_chunk_size in (chunk_size or [256]) for this_compression in (compression or ['gzip'])]
+    benchmark_storage_settings(output_dir, settings, num_generations=num_generations, pop_size=pop_size,
+                               num_params=num_params, num_features=num_features, num_objectives=num_objectives,
+                               num_reads=num_reads)
+
+
+if __name__ == '__main__':
+    main(args=sys.argv[(list_find(lambda s: s.find(os.path.basename(__file__)) != -1, sys.argv) + 1):],
+         standalone_mode=False)
@@ -0,0 +1,96 @@
+"""
+Tests of the export modes of nested.optimize_utils.merge_exported_data without a communicator that spans the workers,
+as with an IpypInterface, in which case 'parallel' and 'aggregate' modes fall back to 'merge' mode, and the collective
+export operations refuse to run.
+
+To run:
+python -m pytest tests/test_export.py
+"""
+import sys
+import types
+import numpy as np
+import pytest
+from nested.optimize_utils import *
+
+
+class NoCommInterface(object):
+    """
+    Stands in for an IpypInterface: three processes, a controller that is not a worker, and no global_comm.
+    """
+    def __init__(self, temp_output_paths):
+        self.global_size = len(temp_output_paths) + 1
+        self.controller_is_worker = False
+        self.temp_output_paths = temp_output_paths
+
+    def get(self, object_name):
+        if object_name != 'context.temp_output_path':
+            raise ValueError('NoCommInterface.get: invalid object_name: %s' % object_name)
+        return list(self.temp_output_paths)
+
+    def synchronize(self, func, *args, **kwargs):
+        raise RuntimeError('NoCommInterface.synchronize: %s requires a communicator' % func.__name__)
+
+
+def write_temp_output_files(tmp_path, num_files=2):
+    """
+
+    :param tmp_path: :class:'pathlib.Path'
+    :param num_files: int
+    :return: list of str (path)
+    """
+    file_paths = []
+    for i in range(num_files):
+        file_path = str(tmp_path / ('temp_output_%i.hdf5' % i))
+        with h5py.File(file_path, 'w') as f:
+            f.create_group(str(i)).create_dataset('x', data=np.arange(3) + 10 * i)
+        file_paths.append(file_path)
+    return file_paths
+
+
+@pytest.fixture
+def local_context(monkeypatch):
+    module = types.ModuleType('__main__')
+    module.context = Context()
+    monkeypatch.setitem(sys.modules, '__main__', module)
+    return module.context
+
+
+def test_has_export_comm():
+    assert not has_export_comm(NoCommInterface(['a', 'b']))
+    assert has_export_comm(NoCommInterface(['a']))
+    interface = NoCommInterface(['a', 'b'])
+    interface.global_comm = object()
+    assert has_export_comm(interface)
+
+
+@pytest.mark.parametrize('mode', ['parallel', 'aggregate'])
+def test_merge_exported_data_fallback(tmp_path, mode):
+    temp_output_paths = write_temp_output_files(tmp_path)
+    context = Context(interface=NoCommInterface(temp_output_paths))
+    export_file_path = str(tmp_path / 'exported.hdf5')
+    assert merge_exported_data(context, export_file_path=export_file_path, output_dir=str(tmp_path),
+                               mode=mode) == export_file_path
+    with h5py.File(export_file_path, 'r') as f:
+        assert sorted(f.keys()) == ['0', '1']
+        assert np.array_equal(f['0']['x'][:], np.arange(3))
+        assert np.array_equal(f['1']['x'][:], np.arange(3) + 10)
+    assert not any(os.path.isfile(file_path) for file_path in temp_output_paths)
+
+
+def test_collective_export_without_comm(tmp_path, local_context):
+    local_context.temp_output_path = write_temp_output_files(tmp_path, 1)[0]
+    export_file_path = str(tmp_path / 'exported.hdf5')
+    with pytest.raises(RuntimeError):
+        aggregate_temp_output_files([export_file_path], ranks=[1, 2])
+    with pytest.raises(RuntimeError):
+        parallel_merge_temp_output_file(export_file_path, ranks=[1, 2])
+    assert not os.path.isfile(export_file_path)
+    assert os.path.isfile(local_context.temp_output_path)
+
+
+def test_get_export_temp_dir(tmp_path):
+    assert get_export_temp_dir(str(tmp_path)) == str(tmp_path)
+    assert get_export_temp_dir(output_dir='data') == 'data'
+    assert get_export_temp_dir() == tempfile.gettempdir()
+    with pytest.raises(RuntimeError):
+        get_export_temp_dir(str(tmp_path / 'missing'))
@@ -0,0 +1,111 @@
+"""
+Tests of the hypervolume methods of nested.optimize_utils against the number of cells of an integer grid that are
+dominated by a set of points with integer objective values: exact and Monte Carlo hypervolume, exclusive contributions,
+and selection by hypervolume contribution.
+
+To run:
+python -m pytest tests/test_hypervolume.py
+"""
+import numpy as np
+import pytest
+from nested.optimize_utils import *
+
+
+num_levels = 6
+
+
+def get_grid_counts(objectives, reference):
+    """
+    Returns the number of rows of an array of integer objective values that dominate each cell of the integer grid
+    below the reference point, with one row per cell, and one column per row of objective values.
+    :param objectives: 2d array
+    :param reference: int
+    :return: 2d array of bool
+    """
+    num_objectives = objectives.shape[1]
+    cells = np.indices((reference,) * num_objectives).reshape(num_objectives, -1).T
+    return np.all(objectives[None, :, :] <= cells[:, None, :], axis=2)
+
+
+def get_random_front(random, num_rows, num_objectives):
+    """
+    Returns mutually non-dominated rows of distinct integer objective values.
+    :param random: :class:'np.random.RandomState'
+    :param num_rows: int
+    :param num_objectives: int
+    :return: 2d array
+    """
+    objectives = np.unique(random.randint(0, num_levels, size=(num_rows, num_objectives)), axis=0).astype('float64')
+    return objectives[get_fitness_by_dominance(objectives) == 0]
+
+
+@pytest.mark.parametrize('num_objectives', [1, 2, 3, 4, 5])
+def test_hypervolume_exact(num_objectives):
+    random = np.random.RandomState(num_objectives)
+    for trial in range(20):
+        objectives = random.randint(0, num_levels + 1, size=(random.randint(0, 12), num_objectives)).astype('float64')
+        dominated = get_grid_counts(objectives, num_levels)
+        volume = float(np.count_nonzero(np.any(dominated, axis=1)))
+        assert np.isclose(get_hypervolume(objectives, num_levels, method='exact'), volume)
+        # the volume scales with the objective values and the reference point
+        scale = random.rand(num_objectives) + 0.5
+        assert np.isclose(get_hypervolume(objectives * scale, num_levels * scale, method='exact'),
+                          volume * np.prod(scale))
+        if num_objectives > 4:
+            continue
+        contributions = np.sum(dominated[np.sum(dominated, axis=1) == 1], axis=0)
+        assert np.allclose(get_hypervolume_contributions(objectives, num_levels, method='exact'), contributions)
+
+
+@pytest.mark.parametrize('num_objectives', [2, 3, 5])
+def test_hypervolume_monte_carlo(num_objectives):
+    random = np.random.RandomState(num_objectives)
+    for trial in range(5):
+        objectives = get_random_front(random, 10, num_objectives)
+        dominated = get_grid_counts(objectives, num_levels)
+        volume = np.count_nonzero(np.any(dominated, axis=1))
+        estimate = get_hypervolume(objectives, num_levels, method='monte_carlo', num_samples=50000, random=trial)
+        assert abs(estimate - volume) < 0.03 * num_levels ** num_objectives
+        contributions = np.sum(dominated[np.sum(dominated, axis=1) == 1], axis=0)
+        estimates = get_hypervolume_contributions(objectives, num_levels, method='monte_carlo', num_samples=50000,
+                                                  random=trial)
+        assert np.all(np.abs(estimates - contributions) < 0.03 * num_levels ** num_objectives)
+
+
+@pytest.mark.parametrize('num_objectives, method', [(2, 'exact'), (3, 'exact'), (4, 'exact'), (3, 'monte_carlo')])
+def test_hypervolume_selection(num_objectives, method):
+    random = np.random.RandomState(num_objectives)
+    for trial in range(10):
+        objectives = get_random_front(random, 30, num_objectives)
+        num_selected = random.randint(0, len(objectives) + 1)
+        priority = random.permutation(len(objectives))
+        # remove the row with the lowest exclusive contribution, one at a time
+        selected = np.arange(len(objectives))
+        while len(selected) > num_selected:
+            dominated = get_grid_counts(objectives[selected], num_levels)
+            contributions = np.sum(dominated[np.sum(dominated, axis=1) == 1], axis=0)
+            tied = np.flatnonzero(contributions == np.min(contributions))
+            selected = np.delete(selected, tied[np.argmax(priority[selected[tied]])])
+        result = get_hypervolume_selection(objectives, num_selected, num_levels, method=method, priority=priority,
+                                           num_samples=200000, random=0)
+        if method == 'exact':
+            assert np.array_equal(result, selected)
+        else:
+            # estimates of equal contributions are not tied, so only the volume of the selection is compared
+            assert len(result) == num_selected
+            assert get_hypervolume(objectives[result], num_levels) >= \
+                0.97 * get_hypervolume(objectives[selected], num_levels)
+
+
+def test_hypervolume_num_samples():
+    assert get_hypervolume_num_samples(1) == hypervolume_min_samples
+    assert get_hypervolume_num_samples(10 ** 6) == hypervolume_max_samples
+    num_rows = (hypervolume_min_samples + hypervolume_max_samples) // 2 // hypervolume_samples_per_row
+    assert get_hypervolume_num_samples(num_rows) == num_rows * hypervolume_samples_per_row
+
+
+def test_hypervolume_invalid():
+    with pytest.raises(ValueError):
+        get_hypervolume(np.zeros(3), 1.)
+    with pytest.raises(ValueError):
+        get_hypervolume(np.zeros((3, 2)), 1., method='invalid')
@@ -0,0 +1,254 @@
+"""
+Tests of the ranking methods of nested.optimize_utils on random objective values: non-dominated sorting, ranking with
+the fronts of a ParetoArchive, constrained domination, and reference directions.
+
+To run:
+python -m pytest tests/test_ranking.py
+"""
+import itertools
+import numpy as np
+import pytest
+from nested.optimize_utils import *
+
+
+def get_random_objectives(random, num_rows, num_objectives, num_levels=None):
+    """
+    With num_levels, objective values are drawn from a few levels, so that many rows have equal objective values.
+    :param random: :class:'np.random.RandomState'
+    :param num_rows: int
+    :param num_objectives: int
+    :param num_levels: int
+    :return: 2d array
+    """
+    if num_levels is None:
+        return random.rand(num_rows, num_objectives)
+    return random.randint(0, num_levels, size=(num_rows, num_objectives)).astype('float64')
+
+
+def get_brute_force_fitness(objectives):
+    """
+    Repeatedly removes the rows that are not dominated by any other remaining row, comparing each pair of rows.
+    :param objectives: 2d array
+    :return: array of int
+    """
+    fitness_vals = np.full(len(objectives), -1)
+    fitness = 0
+    while np.any(fitness_vals < 0):
+        remaining = np.flatnonzero(fitness_vals < 0)
+        front = [i for i in remaining if not any(np.all(objectives[j] <= objectives[i]) and
+                                                 np.any(objectives[j] < objectives[i]) for j in remaining)]
+        fitness_vals[front] = fitness
+        fitness += 1
+    return fitness_vals
+
+
+def get_ranked_population(objectives, **kwargs):
+    """
+
+    :param objectives: 2d array
+    :return: :class:'PopulationArray'
+    """
+    population = PopulationArray.from_x(np.zeros((len(objectives), 1)), list(range(len(objectives))),
+                                        {'objectives': objectives.shape[1]})
+    set_population_values(population, 'objectives', objectives)
+    evaluate_population_annealing(population, **kwargs)
+    return population
+
+
+@pytest.mark.parametrize('num_objectives', [2, 3, 4, 5])
+def test_fitness_by_dominance(num_objectives):
+    random = np.random.RandomState(num_objectives)
+    methods = ['sort', 'block'] if num_objectives > 3 else ['sweep', 'sort', 'block']
+    for trial in range(30):
+        objectives = get_random_objectives(random, random.randint(0, 80), num_objectives, [None, 3, 8][trial % 3])
+        fitness_vals = get_brute_force_fitness(objectives)
+        for method in methods + ['auto']:
+            assert np.array_equal(get_fitness_by_dominance(objectives, method=method, block_size=7), fitness_vals)
+            # rows beyond max_fronts are assigned a fitness of max_fronts
+            assert np.array_equal(get_fitness_by_dominance(objectives, method=method, block_size=7, max_fronts=2),
+                                  np.minimum(fitness_vals, 2))
+
+
+def test_fitness_by_dominance_invalid():
+    with pytest.raises(ValueError):
+        get_fitness_by_dominance(np.zeros((3, 2)), method='invalid')
+    with pytest.raises(ValueError):
+        get_fitness_by_dominance_sweep(np.zeros((3, 4)))
+
+
+@pytest.mark.parametrize('scale', [1., 1.e4])
+def test_normalize_dynamic(scale):
+    random = np.random.RandomState(0)
+    for min_val in [0., 0.5]:
+        vals = min_val + scale * random.rand(50)
+        max_val = float(np.max(vals))
+        # each value is normalized the same way as an array of values
+        normalized = [normalize_dynamic(val, min_val, max_val) for val in vals]
+        assert np.allclose(normalize_dynamic(vals, min_val, max_val), normalized)
+        assert np.isclose(normalize_dynamic(max_val, min_val, max_val), 1.)
+        assert np.all(normalize_dynamic(vals, min_val, max_val) <= 1. + 1.e-12)
+
+
+@pytest.mark.parametrize('individuals', [False, True])
+def test_population_annealing_ranking(individuals):
+    random = np.random.RandomState(1)
+    for trial in range(10):
+        objectives = get_random_objectives(random, 100, 3, None if trial % 2 else 6) * [1., 10., 1.e4]
+        if individuals:
+            population, chain = [[Individual([0.], i) for i in range(len(objectives))] for copy in range(2)]
+            set_population_values(population, 'objectives', objectives)
+            set_population_values(chain, 'objectives', objectives)
+            evaluate_population_annealing(population)
+        else:
+            population = get_ranked_population(objectives)
+            chain = PopulationArray.from_x(np.zeros((len(objectives), 1)), list(range(len(objectives))),
+                                           {'objectives': 3})
+            set_population_values(chain, 'objectives', objectives)
+        # the chain of assign methods that evaluate_population_annealing replaces
+        assign_fitness_by_dominance(chain)
+        assign_normalized_objectives(chain, *get_objectives_edges(chain))
+        assign_relative_energy(chain)
+        assign_rank_by_fitness_and_energy(chain)
+        for column in ['fitness', 'normalized_objectives', 'energy', 'rank']:
+            assert np.allclose(get_population_values(population, column)[0], get_population_values(chain, column)[0])
+
+
+def test_crowding_distance_and_specialists():
+    random = np.random.RandomState(2)
+    for trial in range(20):
+        objectives = get_random_objectives(random, 30, 3, [None, 3][trial % 2])
+        energy_vals = random.randint(0, 3, size=len(objectives)).astype('float64')
+        distance = np.zeros(len(objectives))
+        for m in range(objectives.shape[1]):
+            indexes = sorted(range(len(objectives)), key=lambda i: objectives[i, m])
+            distance[indexes[0]] += 1.e15
+            distance[indexes[-1]] += 1.e15
+            objective_range = objectives[indexes[-1], m] - objectives[indexes[0], m]
+            for j in range(1, len(indexes) - 1):
+                if objective_range > 0.:
+                    distance[indexes[j]] += (objectives[indexes[j + 1], m] - objectives[indexes[j - 1], m]) / \
+                                            objective_range
+        assert np.allclose(get_crowding_distance(objectives), distance)
+        # ties in each objective are broken by energy, by the previous objectives in reverse order, and by index
+        specialists = [min(range(len(objectives)), key=lambda i: (objectives[i, m], energy_vals[i]) +
+                           tuple(objectives[i, :m][::-1]) + (i,)) for m in range(objectives.shape[1])]
+        assert list(get_specialist_indexes(objectives, energy_vals)) == specialists
+
+
+@pytest.mark.parametrize('num_objectives', [2, 3, 4])
+def test_archived_ranking(num_objectives):
+    random = np.random.RandomState(num_objectives)
+    for trial in range(20):
+        objectives = get_random_objectives(random, 200, num_objectives, None if trial % 2 else 4)
+        archive = ParetoArchive(num_objectives)
+        archive.add(objectives, np.arange(len(objectives)))
+        archived = archive.get_archived(np.arange(len(objectives)))
+        num_ranked, num_fronts = 20 + 5 * trial, trial % 3
+        full = sort_by_rank(get_ranked_population(objectives, archived=archived))
+        lazy = sort_by_rank(get_ranked_population(objectives, archived=archived, num_ranked=num_ranked,
+                                                  num_fronts=num_fronts))
+        if trial % 2:
+            # without equal objective values, the archive contains the first front
+            assert np.array_equal(full.columns['fitness'], sort_by_rank(get_ranked_population(objectives)).columns[
+                'fitness'])
+        full_fitness, lazy_fitness = full.columns['fitness'], lazy.columns['fitness']
+        # only the fronts required for selection are sorted, and ranked in the same order as by a full sort
+        ranked = max(num_ranked, np.count_nonzero(lazy_fitness <= num_fronts))
+        assert np.array_equal(lazy.columns['model_id'][:ranked], full.columns['model_id'][:ranked])
+        assert np.array_equal(lazy_fitness[:ranked], full_fitness[:ranked])
+        # other rows are assigned a lower bound of their fitness
+        assert np.all(lazy_fitness[ranked:] <= full_fitness[np.argsort(full.columns['model_id'])][
+            lazy.columns['model_id'][ranked:]])
+        survivors = [select_survivors_by_rank_and_fitness(population, num_ranked // 2, num_ranked // 2,
+                                                          fitness_range=num_fronts).columns['model_id']
+                     for population in [full, lazy]]
+        assert np.array_equal(survivors[0], survivors[1])
+
+
+@pytest.mark.parametrize('select', [select_survivors_by_rank, select_survivors_by_rank_and_fitness,
+                                    select_survivors_by_hypervolume])
+def test_constrained_selection(select):
+    random = np.random.RandomState(0)
+    objectives = get_random_objectives(random, 100, 3)
+    violation = np.where(random.rand(100) < 0.6, random.rand(100), 0.)
+    # infeasible models have better objective values, and would dominate most feasible models
+    objectives[violation <= 0.] += 1.
+    feasible = violation <= 0.
+    num_feasible = np.count_nonzero(feasible)
+    fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+        get_constrained_ranking(objectives, violation, *get_feasible_objectives_edges(objectives, violation))
+    assert np.max(fitness_vals[feasible]) < np.min(fitness_vals[~feasible])
+    assert np.max(rank_vals[feasible]) < np.min(rank_vals[~feasible])
+    assert np.array_equal(fitness_vals[feasible], get_fitness_by_dominance(objectives[feasible]))
+    # selection applies constrained domination even if the evaluate method did not receive the violation
+    for kwargs in [dict(violation=violation), dict()]:
+        population = get_ranked_population(objectives, **kwargs)
+        for num_survivors in [num_feasible // 2, num_feasible + 5]:
+            survivors = select(population, num_survivors, num_diversity_survivors=5, fitness_range=2,
+                               violation=violation).columns['model_id']
+            assert len(np.unique(survivors)) == len(survivors)
+            if num_survivors < num_feasible:
+                assert np.all(feasible[survivors])
+            else:
+                assert np.all(np.isin(np.flatnonzero(feasible), survivors))
+                infeasible_survivors = survivors[~feasible[survivors]]
+                assert len(infeasible_survivors) == num_survivors - num_feasible
+                assert np.max(violation[infeasible_survivors]) <= \
+                    np.min(violation[np.setdiff1d(np.flatnonzero(~feasible), infeasible_survivors)])
+
+
+@pytest.mark.parametrize('num_objectives', [1, 2, 3, 5])
+def test_reference_directions(num_objectives):
+    for num_partitions in [1, 2, 4]:
+        # every composition of num_partitions into num_objectives non-negative integers, scaled to sum to 1
+        lattice = np.array([point for point in itertools.product(range(num_partitions + 1), repeat=num_objectives)
+                            if sum(point) == num_partitions]) / float(num_partitions)
+        for num_inner_partitions in [0, 1, 2]:
+            directions = get_reference_directions(num_objectives, num_partitions, num_inner_partitions)
+            if num_objectives == 1:
+                assert np.array_equal(directions, np.ones((1, 1)))
+                continue
+            assert len(directions) - len(lattice) == \
+                (comb(num_inner_partitions + num_objectives - 1, num_objectives - 1, exact=True)
+                 if num_inner_partitions else 0)
+            assert len(lattice) == comb(num_partitions + num_objectives - 1, num_objectives - 1, exact=True)
+            # the boundary lattice has no duplicate points, and the inner lattice is shrunk by half towards the center
+            assert len(np.unique(directions[:len(lattice)], axis=0)) == len(lattice)
+            assert np.array_equal(np.unique(directions[:len(lattice)], axis=0), np.unique(lattice, axis=0))
+            if num_inner_partitions:
+                assert np.allclose(directions[len(lattice):], get_reference_directions(
+                    num_objectives, num_inner_partitions) / 2. + 0.5 / num_objectives)
+            assert np.all(directions >= 0.)
+            assert np.allclose(np.sum(directions, axis=1), 1.)
+            # each direction is the nearest to itself
+            niches, distance = get_reference_direction_niches(directions, directions)
+            assert np.array_equal(directions[niches], directions)
+            assert np.allclose(distance, 0., atol=1.e-6)
+    with pytest.raises(ValueError):
+        get_reference_directions(num_objectives, 0)
+
+
+@pytest.mark.parametrize('num_objectives', [2, 3, 5])
+def test_num_reference_partitions(num_objectives):
+    for max_directions in [1, num_objectives, 10, 100, 1000]:
+        num_partitions = get_num_reference_partitions(num_objectives, max_directions)
+        # the largest lattice with no more points than max_directions, or 1 partition
+        if num_partitions > 1:
+            assert len(get_reference_directions(num_objectives, num_partitions)) <= max_directions
+        assert len(get_reference_directions(num_objectives, num_partitions + 1)) > max_directions
+
+
+def test_reference_direction_ranking():
+    random = np.random.RandomState(3)
+    objectives = get_random_objectives(random, 60, 3)
+    min_objectives, max_objectives = np.min(objectives, axis=0), np.max(objectives, axis=0)
+    fitness_vals, normalized_objectives, energy_vals, rank_vals = \
+        get_reference_direction_ranking(objectives, min_objectives, max_objectives)
+    assert np.array_equal(fitness_vals, get_fitness_by_dominance(objectives))
+    assert np.array_equal(np.sort(rank_vals), np.arange(len(objectives)))
+    # fronts are ranked in order of fitness
+    assert np.all(np.diff(fitness_vals[np.argsort(rank_vals)]) >= 0)
+    # the ranking does not depend on the scale of each objective
+    scale = np.array([1., 10., 1.e4])
+    scaled = get_reference_direction_ranking(objectives * scale, min_objectives * scale, max_objectives * scale)
+    assert np.array_equal(scaled[3], rank_vals)
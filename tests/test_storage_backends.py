@@ -0,0 +1,221 @@
+"""
+Round-trip tests of the storage backends of nested.storage ('hdf5', 'sqlite' and 'memory') through
+nested.optimize_utils.PopulationStorage, including lazy loading, files with storage_version 1, hot start of a
+PopulationAnnealing optimization, and model reports (StorageModelReport).
+
+To run:
+python -m pytest tests/test_storage_backends.py
+"""
+import os
+import numpy as np
+import pytest
+from nested.optimize_utils import *
+
+
+param_names = ['p%i' % i for i in range(4)]
+feature_names = ['a', 'b', 'c']
+objective_names = ['oa', 'ob', 'oc']
+categories = ['history', 'survivors', 'specialists', 'prev_survivors', 'prev_specialists', 'failed']
+
+
+def compute_features_and_objectives(x):
+    """
+    Three objectives of a toy problem. Models with a large value of the third parameter fail.
+    :param x: array
+    :return: tuple of dict
+    """
+    features = {'a': float(np.sum(x ** 2)), 'b': float(np.sum((x - 1.) ** 2)), 'c': float(np.abs(x[0] - 0.5))}
+    objectives = {'oa': features['a'], 'ob': features['b'], 'oc': features['c']}
+    if x[2] > 1.9:
+        return dict(), dict()
+    return features, objectives
+
+
+def run_population_annealing(file_path, max_iter, hot_start=False):
+    """
+
+    :param file_path: str (path)
+    :param max_iter: int
+    :param hot_start: bool
+    :return: :class:'PopulationAnnealing'
+    """
+    np.random.seed(0)
+    param_gen = PopulationAnnealing(param_names=param_names, feature_names=feature_names,
+                                    objective_names=objective_names, pop_size=20, bounds=[(-2., 2.)] * 4,
+                                    path_length=2, max_iter=max_iter, storage_file_path=file_path, seed=1,
+                                    hot_start=hot_start)
+    for generation, model_ids in param_gen():
+        results = [compute_features_and_objectives(np.array(x)) for x in generation]
+        param_gen.update_population([result[0] for result in results], [result[1] for result in results])
+    param_gen.storage.close()
+    return param_gen
+
+
+def get_storage_signature(storage):
+    """
+    Returns the stored attributes of every model in every category of every generation.
+    :param storage: :class:'PopulationStorage'
+    :return: tuple
+    """
+    def get_model_signature(individual):
+        values = [individual.model_id, individual.rank, individual.fitness, individual.survivor]
+        for val in [individual.energy, individual.x, individual.objectives, individual.features]:
+            values.append(None if val is None or np.all(np.isnan(val)) else tuple(np.round(np.ravel(val), 9)))
+        return tuple(values)
+
+    return {category: [[get_model_signature(individual) for individual in population]
+                       for population in getattr(storage, category)] for category in categories}, storage.count
+
+
+@pytest.fixture(params=['hdf5', 'sqlite', 'memory'])
+def storage_file_path(request, tmp_path):
+    """
+    Returns an unused file path for each storage backend.
+    """
+    if request.param == 'memory':
+        file_path = get_storage_file_path('%s_%s' % (request.node.name, id(tmp_path)), 'memory')
+        yield file_path
+        memory_storage_files.pop(file_path, None)
+    else:
+        yield get_storage_file_path(str(tmp_path / 'storage'), request.param)
+
+
+@pytest.fixture
+def param_gen(storage_file_path):
+    """
+    Returns a completed PopulationAnnealing optimization, stored with each storage backend.
+    """
+    return run_population_annealing(storage_file_path, max_iter=4)
+
+
+def test_round_trip(param_gen, storage_file_path):
+    storage = PopulationStorage(file_path=storage_file_path)
+    assert len(storage.history) == len(param_gen.storage.history) > 0
+    assert get_storage_signature(storage) == get_storage_signature(param_gen.storage)
+    for gen_index in range(len(storage.history)):
+        assert np.array_equal(storage.min_objectives[gen_index], param_gen.storage.min_objectives[gen_index])
+        assert np.array_equal(storage.max_objectives[gen_index], param_gen.storage.max_objectives[gen_index])
+
+
+def test_save_all_to_other_backend(param_gen, tmp_path):
+    for backend in storage_backends:
+        file_path = get_storage_file_path(str(tmp_path / 'copy'), backend)
+        param_gen.storage.save(file_path, n='all')
+        param_gen.storage.close()
+        storage = PopulationStorage(file_path=file_path)
+        assert get_storage_signature(storage) == get_storage_signature(param_gen.storage)
+        memory_storage_files.pop(file_path, None)
+
+
+def test_lazy_loading(param_gen, storage_file_path):
+    eager = PopulationStorage(file_path=storage_file_path)
+    lazy = PopulationStorage(file_path=storage_file_path, lazy=True)
+    assert isinstance(lazy.history, LazyGenerationList)
+    assert get_storage_signature(lazy) == get_storage_signature(eager)
+    assert np.array_equal(lazy.get_history_matrix('x'), eager.get_history_matrix('x'))
+
+
+def test_get_models(param_gen, storage_file_path):
+    storage = PopulationStorage(file_path=storage_file_path)
+    population = [individual for generation in storage.history for individual in generation]
+    model_ids = [population[-1].model_id, population[0].model_id, population[len(population) // 2].model_id]
+    models = storage.get(model_ids)
+    assert [individual.model_id for individual in models] == model_ids
+    for individual in models:
+        expected = population[[other.model_id for other in population].index(individual.model_id)]
+        assert np.array_equal(individual.x, expected.x)
+    with pytest.raises(KeyError):
+        storage.get([-5])
+
+
+def test_hot_start(param_gen, storage_file_path):
+    hot_param_gen = run_population_annealing(storage_file_path, max_iter=6, hot_start=True)
+    storage = PopulationStorage(file_path=storage_file_path)
+    assert len(storage.history) > len(param_gen.storage.history)
+    assert get_storage_signature(storage) == get_storage_signature(hot_param_gen.storage)
+    # generations stored before the hot start are unchanged
+    signature = get_storage_signature(storage)[0]
+    for category, populations in viewitems(get_storage_signature(param_gen.storage)[0]):
+        assert signature[category][:len(populations)] == populations
+    model_ids = [individual.model_id for generation in storage.history + storage.failed for individual in generation]
+    assert len(model_ids) == len(set(model_ids))
+
+
+def test_storage_model_report(param_gen, storage_file_path):
+    report = StorageModelReport(storage_file_path)
+    storage = param_gen.storage
+    assert report.N_gen == len(storage.history)
+    assert list(report.get_category_id()) == \
+           [individual.model_id for individual in storage.specialists[-1]][:len(objective_names)]
+    assert report.get_best_model()[0] == storage.survivors[-1][0].model_id
+    report.get_models_arr()
+    assert len(report.model_arr) == sum([len(storage.history[i]) + len(storage.failed[i])
+                                         for i in range(len(storage.history))])
+    gen_models = report.get_gen_models_arr('1')
+    assert set(gen_models['model_id']) == \
+           set([individual.model_id for individual in storage.history[1] + storage.failed[1]])
+    individual = storage.history[-1][0]
+    assert np.array_equal(report.get_model_att(np.array([individual.model_id]))[0], individual.x)
+    report.close_file()
+
+
+def test_storage_version_1(param_gen, tmp_path):
+    file_path = str(tmp_path / 'storage_v1.hdf5')
+    param_gen.storage.save_legacy(file_path, n='all')
+    with h5py.File(file_path, 'r') as f:
+        assert get_storage_version(f) == 1
+    storage = PopulationStorage(file_path=file_path)
+    assert get_storage_signature(storage) == get_storage_signature(param_gen.storage)
+    report = StorageModelReport(file_path)
+    assert not report.tables
+    assert report.get_best_model()[0] == param_gen.storage.survivors[-1][0].model_id
+    individual = param_gen.storage.history[1][2]
+    assert np.array_equal(report.get_model_att(np.array([individual.model_id]))[0], individual.x)
+    report.close_file()
+    # generations appended to a file with storage_version 1 keep its format
+    hot_param_gen = run_population_annealing(file_path, max_iter=6, hot_start=True)
+    with h5py.File(file_path, 'r') as f:
+        assert get_storage_version(f) == 1
+    storage = PopulationStorage(file_path=file_path)
+    assert get_storage_signature(storage) == get_storage_signature(hot_param_gen.storage)
+
+
+def test_query_models(param_gen, storage_file_path):
+    storage = PopulationStorage(file_path=storage_file_path)
+    expected = sorted([individual.model_id for generation in storage.history for individual in generation
+                       if individual.objectives is not None and individual.objectives[0] < 2.])
+    with open_storage_reader(storage_file_path) as reader:
+        models = reader.query_models([('oa', '<', 2.)], columns=['model_id'])
+    assert sorted(models['model_id'].tolist()) == expected
+
+
+def test_swmr_attributes(tmp_path):
+    file_path = str(tmp_path / 'swmr.hdf5')
+    writer = PopulationStorageWriter(file_path, param_names, feature_names, objective_names, 1, 'global', mode='w',
+                                     swmr=True)
+    if not writer.file.swmr_mode:
+        writer.close()
+        pytest.skip('SWMR mode is not supported')
+    # attributes are saved while another reader has the file open in SWMR mode
+    swmr_file = open_storage_file(file_path, swmr=True)
+    widths = get_column_widths(param_names, feature_names, objective_names)
+    empty = PopulationArray.from_x(np.zeros((0, len(param_names))), [], widths)
+    generation_attributes = [{'step_size': 0.5}, {'step_size': 0.4, 'hypervolume': 1.5, 'unknown': 1.},
+                             {'step_size': 0.3, 'termination': 'stop', 'unknown': 2.}]
+    for gen_index, attributes in enumerate(generation_attributes):
+        population = PopulationArray.from_x(np.random.random((4, len(param_names))),
+                                            list(range(4 * gen_index, 4 * gen_index + 4)), widths)
+        populations = {category: population if category == 'population' else empty
+                       for category in population_categories}
+        writer.append_generation(populations, 4 * (gen_index + 1), attributes=attributes)
+        writer.flush()
+        assert writer.file.swmr_mode
+    writer.close()
+    swmr_file.close()
+    with open_storage_reader(file_path) as reader:
+        attribute_values = reader.read_generation_attribute_values()
+        assert sorted(reader.read_metadata()['user_attribute_names']) == ['hypervolume', 'step_size', 'termination']
+    assert attribute_values['step_size'] == [0.5, 0.4, 0.3]
+    assert attribute_values['hypervolume'] == [None, 1.5, None]
+    assert attribute_values['termination'][-1] == 'stop'
+    assert 'unknown' not in attribute_values
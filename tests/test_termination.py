@@ -0,0 +1,138 @@
+"""
+Tests of the termination criteria of nested.optimize_utils.PopulationAnnealing (EnergyStall, HypervolumeStall,
+MinStepSize and TimeBudget), both with a stand-in for the generator, and in a short optimization, in which the reason
+for stopping is stored as the 'termination' attribute of the last generation.
+
+To run:
+python -m pytest tests/test_termination.py
+"""
+import time
+import types
+import numpy as np
+import pytest
+from nested.optimize_utils import *
+
+
+param_names = ['p%i' % i for i in range(4)]
+objective_names = ['oa', 'ob']
+
+
+def get_generator(**kwargs):
+    """
+    Returns a stand-in for a :class:'PopulationAnnealing' with only the attributes read by termination criteria.
+    :return: :class:'types.SimpleNamespace'
+    """
+    generator = types.SimpleNamespace(min_objectives=np.zeros(2), max_objectives=np.ones(2), start_time=0.,
+                                      num_cores=1, take_step=types.SimpleNamespace(stepsize=0.5),
+                                      adaptive_step_factor=0.9,
+                                      storage=types.SimpleNamespace(attributes={'hypervolume': []}))
+    generator.__dict__.update(kwargs)
+    return generator
+
+
+def get_candidates(best_objectives):
+    """
+    Returns candidates whose lowest energy is that of best_objectives.
+    :param best_objectives: list of float
+    :return: :class:'PopulationArray'
+    """
+    objectives = np.array([best_objectives, np.add(best_objectives, 0.2)])
+    candidates = PopulationArray.from_x(np.zeros((2, 1)), [0, 1], {'objectives': 2})
+    set_population_values(candidates, 'objectives', objectives)
+    set_population_values(candidates, 'energy', np.sum(objectives, axis=1))
+    return candidates
+
+
+def test_energy_stall():
+    criterion = EnergyStall(num_iter=3, tol=0.01)
+    generator = get_generator()
+    best_vals = [0.9, 0.8, 0.7, 0.698, 0.699, 0.697, 0.6]
+    reasons = [criterion(generator, get_candidates([val, val])) for val in best_vals]
+    # energy is the sum of 2 normalized objectives; the last 3 iterations improve it by 0.006 over 0.7
+    assert reasons[:5] == [None] * 5
+    assert reasons[5] is not None and 'energy' in reasons[5]
+    # energies are recomputed with the current edges, which can change between iterations
+    criterion = EnergyStall(num_iter=1, tol=0.01)
+    assert criterion(generator, get_candidates([0.5, 0.5])) is None
+    generator.max_objectives = np.full(2, 100.)
+    assert criterion(generator, get_candidates([0.49, 0.49])) is not None
+
+
+def test_hypervolume_stall():
+    criterion = HypervolumeStall(num_iter=2, tol=0.01)
+    assert criterion.track_hypervolume
+    generator = get_generator()
+    hypervolume = generator.storage.attributes['hypervolume']
+    reasons = []
+    for val in [None, 1., np.nan, 1.5, 1.6, 1.61, 1.615]:
+        hypervolume.append(val)
+        reasons.append(criterion(generator, None))
+    # missing and NaN values are skipped, and the improvement is relative to the hypervolume 2 iterations ago
+    assert reasons[:6] == [None] * 6
+    assert reasons[6] is not None and 'hypervolume' in reasons[6]
+
+
+def test_min_step_size():
+    criterion = MinStepSize(min_step_size=0.1)
+    generator = get_generator()
+    assert criterion(generator, None) is None
+    # the step size of the next iteration is compared
+    generator.take_step.stepsize = 0.11
+    assert criterion(generator, None) is not None
+
+
+def test_time_budget(monkeypatch):
+    with pytest.raises(ValueError):
+        TimeBudget()
+    current_time = [0.]
+    monkeypatch.setattr(time, 'time', lambda: current_time[0])
+    criterion = TimeBudget(max_time=100.)
+    generator = get_generator()
+    reasons = []
+    for val in [30., 50., 70., 80.]:
+        current_time[0] = val
+        reasons.append(criterion(generator, None))
+    # the slowest iteration took 30 s, so another iteration after 80 s would exceed the budget
+    assert reasons[:3] == [None] * 3
+    assert reasons[3] is not None
+    criterion = TimeBudget(max_core_hours=1., num_cores=36)
+    generator = get_generator(num_cores=1)
+    # 1 core-hour on 36 cores is 100 s, and the slowest iteration took 40 s
+    current_time[0] = 40.
+    assert criterion(generator, None) is None
+    current_time[0] = 61.
+    assert criterion(generator, None) is not None
+    assert 'core-hours' in criterion(generator, None)
+
+
+def test_get_termination_criteria():
+    assert get_termination_criteria(None) == []
+    criteria = get_termination_criteria(['MinStepSize', {'EnergyStall': {'num_iter': 2}}, TimeBudget(max_time=1.)])
+    assert [type(criterion) for criterion in criteria] == [MinStepSize, EnergyStall, TimeBudget]
+    assert criteria[1].num_iter == 2
+    with pytest.raises(ValueError):
+        get_termination_criteria('MissingCriterion')
+    with pytest.raises(TypeError):
+        get_termination_criteria(1)
+    with pytest.raises(ValueError):
+        get_termination_criteria({get_termination_criteria: {'num_iter': 2}})
+
+
+@pytest.mark.parametrize('termination', [{'MinStepSize': {'min_step_size': 0.45}},
+                                         {'HypervolumeStall': {'num_iter': 1, 'tol': 1.e3}}])
+def test_population_annealing_termination(termination):
+    np.random.seed(0)
+    param_gen = PopulationAnnealing(param_names=param_names, feature_names=objective_names,
+                                    objective_names=objective_names, pop_size=10, bounds=[(-2., 2.)] * 4,
+                                    path_length=2, max_iter=10, seed=1, initial_step_size=0.5,
+                                    adaptive_step_factor=0.9, termination=termination)
+    for generation, model_ids in param_gen():
+        objectives = [{'oa': float(np.sum(np.array(x) ** 2)), 'ob': float(np.sum((np.array(x) - 1.) ** 2))}
+                      for x in generation]
+        param_gen.update_population(objectives, objectives)
+    assert param_gen.termination_reason is not None
+    assert param_gen.num_gen < param_gen.max_gens
+    assert param_gen.storage.attributes['termination'][-1] == param_gen.termination_reason
+    if 'HypervolumeStall' in termination:
+        hypervolume = param_gen.storage.attributes['hypervolume']
+        assert np.count_nonzero([val is not None and not np.isnan(val) for val in hypervolume]) == 2